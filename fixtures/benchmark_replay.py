@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Time full scans replayed from a recorded fixture set.
+
+Each run replays the scan through main() in a fresh working directory, so
+no previous scan durations, snapshots or reports carry over between runs:
+
+    python fixtures/benchmark_replay.py --runs 5 --workers 8
+
+Replay answers every call from the fixtures, so the timings measure the
+scanner itself: request handling in botocore, record building, destination
+checks and report writing.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vpc_detective  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'org')
+
+
+def replay_scan(directory, workers):
+    """
+    Replay one scan of the fixtures in directory.
+
+    Args:
+        directory: Fixture directory recorded with --record
+        workers: Account/regions scanned at once
+
+    Returns:
+        float: Wall time of the scan in seconds
+    """
+    work = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.chdir(work)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            vpc_detective.main(['--replay', directory, 'scan', '--workers', str(workers),
+                                '--snapshot-dir', 'snapshots', '--db', 'scans.db'])
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time scans replayed from recorded AWS responses')
+    parser.add_argument('directory', nargs='?', default=FIXTURE_DIR, help='fixture directory recorded with --record')
+    parser.add_argument('--runs', type=int, default=5, help='scans to time')
+    parser.add_argument('--workers', type=int, default=vpc_detective.SCAN_WORKERS,
+                        help='account/regions scanned at once')
+    args = parser.parse_args(argv)
+
+    directory = os.path.abspath(args.directory)
+    with open(os.path.join(directory, 'account-list.json')) as config_file:
+        accounts = json.load(config_file)['Accounts']
+    regions = sum(len(account['regions']) for account in accounts)
+    print(f"Replaying {len(accounts)} accounts and {regions} account/regions from {directory}")
+
+    timings = []
+    for run in range(1, args.runs + 1):
+        timings.append(replay_scan(directory, args.workers))
+        print(f"Run {run}: {timings[-1]:.2f}s")
+    print(f"Best {min(timings):.2f}s, median {statistics.median(timings):.2f}s "
+          f"over {len(timings)} runs with {args.workers} workers")
+
+
+if __name__ == '__main__':
+    main()
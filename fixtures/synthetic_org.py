@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Record the fixture set in fixtures/org from a synthetic AWS organization.
+
+The organization is generated from a fixed seed and served through botocore's
+event system, so the scan is recorded by the ordinary --record path and the
+fixtures hold exactly the calls a scan makes. Re-run this after changing the
+calls a scan makes:
+
+    python fixtures/synthetic_org.py fixtures/org
+
+The organization has a management account, log archive, security tooling,
+a network hub sharing VPCs through AWS RAM, a production and staging account
+per team and a sandbox. Flow logs go to CloudWatch Logs, S3 and Firehose at
+VPC or subnet level, or nowhere; some log groups and buckets are missing, one
+account denies ec2:DescribeFlowLogs, and security groups and network ACLs
+include rules open to the internet. The sandbox's us-east-1 VPCs are the
+scenarios the unit tests replay.
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+import botocore.awsrequest
+import botocore.session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vpc_detective  # noqa: E402
+
+SEED = 44
+CREATED = '2024-03-01T09:00:00+00:00'
+TEAMS = ('payments', 'checkout', 'search', 'catalog', 'analytics', 'identity', 'mobile-api', 'web-frontend')
+AZ_SUFFIXES = ('a', 'b', 'c')
+INTERFACE_SERVICES = ('ssm', 'ssmmessages', 'ec2messages', 'logs', 'sts', 'ecr.api', 'ecr.dkr', 'secretsmanager')
+
+
+class Region:
+    """The resources of one account/region, in describe call shapes."""
+
+    def __init__(self, account_id, name, rng):
+        self.account_id = account_id
+        self.name = name
+        self.rng = rng
+        self.items = {key: [] for key in (
+            'Vpcs', 'Subnets', 'NetworkInterfaces', 'SecurityGroups', 'SecurityGroupRules', 'NetworkAcls',
+            'VpcEndpoints', 'FlowLogs', 'NatGateways', 'InternetGateways'
+        )}
+        self.log_groups = []
+        self.delivery_streams = []
+        self.denied = set()
+        self.next_cidr = 0
+
+    def resource_id(self, prefix):
+        return f"{prefix}-0{self.rng.getrandbits(64):016x}"
+
+    def arn(self, service, resource):
+        return f"arn:aws:{service}:{self.name}:{self.account_id}:{resource}"
+
+    def add_vpc(self, name, cidr=None, is_default=False, owner_id=None, azs=2, tiers=('public', 'private'),
+                natgws=0, app_interfaces=4, flow_logs=(), endpoints=(), open_ports=(), open_acl=False,
+                secondary_cidr=None, ipv6=False, utilization=0.3, vpc_id=None):
+        """
+        Add a VPC with its subnets, network interfaces, security groups,
+        network ACLs, endpoints, gateways and flow logs.
+
+        Args:
+            name: Name tag, or None for no tags
+            cidr: Primary /16 CIDR, or None for the next free 10.x.0.0/16
+            flow_logs: (level, destination type, destination) tuples, where
+                level is 'vpc' or 'subnets' and destination a log group name
+                or an S3/Firehose ARN
+            open_ports: Ports a security group opens to 0.0.0.0/0
+            utilization: Share of each subnet's addresses in use
+
+        Returns:
+            str: VPC ID
+        """
+        vpc_id = vpc_id or self.resource_id('vpc')
+        if cidr is None:
+            self.next_cidr += 1
+            cidr = f"10.{self.next_cidr + 16 * TEAMS.index(self.team) if self.team in TEAMS else self.next_cidr}.0.0/16"
+        owner_id = owner_id or self.account_id
+        tags = [{'Key': 'Name', 'Value': name}] if name else []
+        vpc = {
+            'CidrBlock': cidr, 'DhcpOptionsId': self.resource_id('dopt'), 'State': 'available', 'VpcId': vpc_id,
+            'OwnerId': owner_id, 'InstanceTenancy': 'default', 'IsDefault': is_default,
+            'CidrBlockAssociationSet': [
+                {'AssociationId': self.resource_id('vpc-cidr-assoc'), 'CidrBlock': block,
+                 'CidrBlockState': {'State': 'associated'}}
+                for block in [cidr] + ([secondary_cidr] if secondary_cidr else [])
+            ]
+        }
+        if ipv6:
+            vpc['Ipv6CidrBlockAssociationSet'] = [{
+                'AssociationId': self.resource_id('vpc-cidr-assoc'),
+                'Ipv6CidrBlock': f"2600:1f18:{self.rng.getrandbits(16):x}:{self.rng.getrandbits(8):x}00::/56",
+                'Ipv6CidrBlockState': {'State': 'associated'}, 'NetworkBorderGroup': self.name, 'Ipv6Pool': 'Amazon'
+            }]
+        if tags:
+            vpc['Tags'] = tags
+        self.items['Vpcs'].append(vpc)
+        if owner_id != self.account_id:
+            return vpc_id
+
+        # Subnets: one per tier and availability zone
+        base = '.'.join(cidr.split('.')[:2])
+        subnets = []
+        for tier_index, tier in enumerate(tiers):
+            for az_index in range(azs):
+                octet = 64 * tier_index + az_index * (16 if tier == 'public' else 32) if not is_default else 16 * az_index
+                size = 20 if is_default else (24 if tier == 'public' else 22)
+                subnet_cidr = f"{base}.{octet}.0/{size}"
+                usable = 2 ** (32 - size) - 5
+                subnet = {
+                    'AvailabilityZone': f"{self.name}{AZ_SUFFIXES[az_index]}",
+                    'AvailabilityZoneId': f"{self.name[:3]}{self.name.split('-')[1][0]}1-az{az_index + 1}",
+                    'AvailableIpAddressCount': int(usable * (1 - utilization * self.rng.uniform(0.6, 1.4))) if usable else 0,
+                    'CidrBlock': subnet_cidr, 'DefaultForAz': is_default, 'MapPublicIpOnLaunch': tier == 'public',
+                    'State': 'available', 'SubnetId': self.resource_id('subnet'), 'VpcId': vpc_id,
+                    'OwnerId': self.account_id, 'AssignIpv6AddressOnCreation': False,
+                    'Ipv6CidrBlockAssociationSet': []
+                }
+                subnet['SubnetArn'] = self.arn('ec2', f"subnet/{subnet['SubnetId']}")
+                if name:
+                    subnet['Tags'] = [{'Key': 'Name', 'Value': f"{name}-{tier}-{AZ_SUFFIXES[az_index]}"}]
+                subnets.append((tier, subnet))
+                self.items['Subnets'].append(subnet)
+
+        # Security groups: the default group and an application group
+        default_group = self.add_security_group(vpc_id, 'default', 'default VPC security group', self_reference=True)
+        app_group = self.add_security_group(vpc_id, f"{name or 'app'}-app", 'Application servers',
+                                            ingress=[('tcp', 443, 443, cidr)])
+        groups = [default_group, app_group]
+        if open_ports:
+            groups.append(self.add_security_group(
+                vpc_id, f"{name or 'app'}-public", 'Public access',
+                ingress=[('tcp', port, port, '0.0.0.0/0') for port in open_ports]
+            ))
+        # A leftover group no interface uses
+        self.add_security_group(vpc_id, f"{name or 'app'}-old", 'Decommissioned service', ingress=[('tcp', 8080, 8080, cidr)])
+
+        # Network ACLs: the default one, and a custom one on the public subnets
+        public_subnets = [subnet for tier, subnet in subnets if tier == 'public']
+        custom_subnets = public_subnets if open_acl or tiers[-1] == 'data' else []
+        self.add_network_acl(vpc_id, True, [subnet for _, subnet in subnets if subnet not in custom_subnets])
+        if custom_subnets:
+            self.add_network_acl(vpc_id, False, custom_subnets, open_admin=open_acl)
+
+        private_subnets = [subnet for tier, subnet in subnets if tier != 'public'] or [subnet for _, subnet in subnets]
+        # Internet and NAT gateways
+        if public_subnets:
+            self.items['InternetGateways'].append({
+                'Attachments': [{'State': 'available', 'VpcId': vpc_id}],
+                'InternetGatewayId': self.resource_id('igw'), 'OwnerId': self.account_id, 'Tags': tags
+            })
+        for index in range(natgws):
+            subnet = public_subnets[index % len(public_subnets)]
+            interface = self.add_interface(subnet, [], 'nat_gateway', f"Interface for NAT Gateway", requester_managed=True)
+            self.items['NatGateways'].append({
+                'CreateTime': CREATED, 'NatGatewayId': self.resource_id('nat'), 'State': 'available',
+                'SubnetId': subnet['SubnetId'], 'VpcId': vpc_id, 'ConnectivityType': 'public',
+                'NatGatewayAddresses': [{
+                    'AllocationId': self.resource_id('eipalloc'), 'NetworkInterfaceId': interface['NetworkInterfaceId'],
+                    'PrivateIp': interface['PrivateIpAddress'], 'PublicIp': f"3.{self.rng.randrange(200)}.{self.rng.randrange(256)}.{self.rng.randrange(256)}",
+                    'IsPrimary': True, 'Status': 'succeeded'
+                }]
+            })
+
+        # VPC endpoints
+        for service in endpoints:
+            endpoint = {
+                'VpcEndpointId': self.resource_id('vpce'), 'VpcId': vpc_id, 'State': 'available', 'OwnerId': self.account_id,
+                'ServiceName': f"com.amazonaws.{self.name}.{service}", 'CreationTimestamp': CREATED,
+                'PolicyDocument': '{"Version":"2008-10-17","Statement":[{"Effect":"Allow","Principal":"*","Action":"*","Resource":"*"}]}',
+                'RequesterManaged': False, 'Tags': []
+            }
+            if service in ('s3', 'dynamodb'):
+                endpoint.update(VpcEndpointType='Gateway', RouteTableIds=[self.resource_id('rtb')], SubnetIds=[],
+                                NetworkInterfaceIds=[], PrivateDnsEnabled=False, Groups=[])
+            else:
+                endpoint_subnets = private_subnets[:azs]
+                interfaces = [self.add_interface(subnet, [app_group], 'vpc_endpoint', f"VPC Endpoint Interface {endpoint['VpcEndpointId']}",
+                                                 requester_managed=True) for subnet in endpoint_subnets]
+                endpoint.update(VpcEndpointType='Interface', SubnetIds=[subnet['SubnetId'] for subnet in endpoint_subnets],
+                                NetworkInterfaceIds=[interface['NetworkInterfaceId'] for interface in interfaces],
+                                PrivateDnsEnabled=True, Groups=[{'GroupId': app_group['GroupId'], 'GroupName': app_group['GroupName']}])
+            self.items['VpcEndpoints'].append(endpoint)
+
+        # Application interfaces spread over the private subnets
+        for index in range(app_interfaces):
+            subnet = private_subnets[index % len(private_subnets)]
+            group = groups[2] if len(groups) > 2 and index == 0 else (default_group if is_default else app_group)
+            self.add_interface(subnet, [group], 'interface', 'Primary network interface')
+
+        # Flow logs at VPC or subnet level
+        for level, destination_type, destination in flow_logs:
+            resources = [vpc_id] if level == 'vpc' else [subnet['SubnetId'] for tier, subnet in subnets if tier != 'public']
+            for resource_id in resources:
+                self.add_flow_log(resource_id, destination_type, destination)
+        return vpc_id
+
+    def add_security_group(self, vpc_id, name, description, ingress=(), self_reference=False):
+        group = {
+            'Description': description, 'GroupName': name, 'OwnerId': self.account_id,
+            'GroupId': self.resource_id('sg'), 'VpcId': vpc_id, 'Tags': []
+        }
+        self.items['SecurityGroups'].append(group)
+        rules = [(False, protocol, from_port, to_port, cidr, None) for protocol, from_port, to_port, cidr in ingress]
+        if self_reference:
+            rules.append((False, '-1', -1, -1, None, group['GroupId']))
+        rules.append((True, '-1', -1, -1, '0.0.0.0/0', None))
+        for is_egress, protocol, from_port, to_port, cidr, referenced in rules:
+            rule = {
+                'SecurityGroupRuleId': self.resource_id('sgr'), 'GroupId': group['GroupId'], 'GroupOwnerId': self.account_id,
+                'IsEgress': is_egress, 'IpProtocol': protocol, 'FromPort': from_port, 'ToPort': to_port, 'Tags': [],
+                'SecurityGroupRuleArn': self.arn('ec2', f"security-group-rule/{group['GroupId']}")
+            }
+            if cidr:
+                rule['CidrIpv4'] = cidr
+            else:
+                rule['ReferencedGroupInfo'] = {'GroupId': referenced, 'UserId': self.account_id}
+            self.items['SecurityGroupRules'].append(rule)
+        return group
+
+    def add_network_acl(self, vpc_id, is_default, subnets, open_admin=False):
+        entries = []
+        if is_default:
+            allows = [(100, '-1', None)]
+        else:
+            allows = [(100, '6', (443, 443)), (110, '6', (80, 80)), (120, '6', (1024, 65535))]
+            if open_admin:
+                allows += [(130, '6', (22, 22)), (140, '6', (3389, 3389))]
+        for egress in (False, True):
+            for rule_number, protocol, ports in allows:
+                entry = {'CidrBlock': '0.0.0.0/0', 'Egress': egress, 'Protocol': protocol,
+                         'RuleAction': 'allow', 'RuleNumber': rule_number}
+                if ports:
+                    entry['PortRange'] = {'From': ports[0], 'To': ports[1]}
+                entries.append(entry)
+            entries.append({'CidrBlock': '0.0.0.0/0', 'Egress': egress, 'Protocol': '-1', 'RuleAction': 'deny',
+                            'RuleNumber': 32767})
+        acl_id = self.resource_id('acl')
+        self.items['NetworkAcls'].append({
+            'Associations': [{'NetworkAclAssociationId': self.resource_id('aclassoc'), 'NetworkAclId': acl_id,
+                              'SubnetId': subnet['SubnetId']} for subnet in subnets],
+            'Entries': entries, 'IsDefault': is_default, 'NetworkAclId': acl_id, 'Tags': [], 'VpcId': vpc_id,
+            'OwnerId': self.account_id
+        })
+
+    def add_interface(self, subnet, groups, interface_type, description, requester_managed=False):
+        base = subnet['CidrBlock'].split('/')[0].rsplit('.', 2)[0]
+        third = int(subnet['CidrBlock'].split('.')[2])
+        interface = {
+            'AvailabilityZone': subnet['AvailabilityZone'], 'Description': description,
+            'Groups': [{'GroupName': group['GroupName'], 'GroupId': group['GroupId']} for group in groups],
+            'InterfaceType': interface_type, 'Ipv6Addresses': [],
+            'MacAddress': ':'.join(f"{self.rng.randrange(256):02x}" for _ in range(6)),
+            'NetworkInterfaceId': self.resource_id('eni'), 'OwnerId': self.account_id,
+            'PrivateIpAddress': f"{base}.{third}.{self.rng.randrange(4, 250)}",
+            'RequesterManaged': requester_managed, 'SourceDestCheck': interface_type != 'nat_gateway',
+            'Status': 'in-use', 'SubnetId': subnet['SubnetId'], 'VpcId': subnet['VpcId'], 'TagSet': []
+        }
+        self.items['NetworkInterfaces'].append(interface)
+        return interface
+
+    def add_flow_log(self, resource_id, destination_type, destination):
+        flow_log = {
+            'CreationTime': CREATED, 'DeliverLogsStatus': 'SUCCESS', 'FlowLogId': self.resource_id('fl'),
+            'FlowLogStatus': 'ACTIVE', 'ResourceId': resource_id, 'TrafficType': 'ALL',
+            'LogDestinationType': destination_type, 'MaxAggregationInterval': 600, 'Tags': [],
+            'LogFormat': '${version} ${account-id} ${interface-id} ${srcaddr} ${dstaddr} ${srcport} ${dstport} '
+                         '${protocol} ${packets} ${bytes} ${start} ${end} ${action} ${log-status}'
+        }
+        if destination_type == 'cloud-watch-logs':
+            flow_log['LogGroupName'] = destination
+            flow_log['LogDestination'] = self.arn('logs', f"log-group:{destination}")
+            flow_log['DeliverLogsPermissionArn'] = f"arn:aws:iam::{self.account_id}:role/flow-logs-delivery"
+        else:
+            flow_log['LogDestination'] = destination
+        self.items['FlowLogs'].append(flow_log)
+
+    def add_log_group(self, name, retention_days=None, stored_gb=1.0):
+        log_group = {
+            'logGroupName': name, 'creationTime': 1709283600000, 'metricFilterCount': 0,
+            'arn': self.arn('logs', f"log-group:{name}:*"), 'logGroupArn': self.arn('logs', f"log-group:{name}"),
+            'storedBytes': int(stored_gb * 1024 ** 3), 'logGroupClass': 'STANDARD'
+        }
+        if retention_days:
+            log_group['retentionInDays'] = retention_days
+        self.log_groups.append(log_group)
+        return name
+
+
+class SyntheticOrg:
+    """A generated organization answering EC2, Logs, S3, Firehose and CloudWatch calls."""
+
+    def __init__(self, seed=SEED):
+        self.rng = random.Random(seed)
+        self.accounts = []
+        self.regions = {}
+        self.buckets = {}
+
+    def account(self, name, regions):
+        account_id = str(self.rng.randrange(10 ** 11, 10 ** 12 - 1)).rjust(12, '1')
+        self.accounts.append({'name': name, 'id': account_id, 'role_name': 'ReadOnlyAccess', 'regions': list(regions)})
+        self.buckets[account_id] = []
+        for region_name in regions:
+            region = Region(account_id, region_name, self.rng)
+            region.team = next((team for team in TEAMS if name.startswith(team)), None)
+            self.regions[(account_id, region_name)] = region
+        return account_id
+
+    def region(self, account_id, region_name):
+        return self.regions[(account_id, region_name)]
+
+    def build(self):
+        """
+        Generate the organization's accounts and resources.
+        """
+        rng = self.rng
+        sandbox = self.account('sandbox', ['us-east-1'])
+        management = self.account('management', ['us-east-1'])
+        log_archive = self.account('log-archive', ['us-east-1', 'eu-west-1'])
+        security = self.account('security-tooling', ['us-east-1', 'eu-west-1'])
+        network = self.account('network-hub', ['us-east-1', 'eu-west-1'])
+        legacy = self.account('legacy-ops', ['us-east-1'])
+        workloads = []
+        for team in TEAMS:
+            workloads.append((self.account(f"{team}-prod", ['us-east-1', 'eu-west-1', 'ap-southeast-2']), 'prod'))
+            workloads.append((self.account(f"{team}-staging", ['us-east-1', 'eu-west-1']), 'staging'))
+
+        # Every region keeps its default VPC, mostly untouched
+        for (account_id, region_name), region in self.regions.items():
+            if account_id != sandbox:
+                region.add_vpc(None, cidr='172.31.0.0/16', is_default=True, azs=3, tiers=('public',),
+                               app_interfaces=rng.choice((0, 0, 1, 3)))
+
+        self.build_sandbox(self.region(sandbox, 'us-east-1'))
+
+        # Central flow log bucket in the log archive; one workload delivers to it
+        central_bucket = 'org-vpc-flow-logs-archive'
+        self.buckets[log_archive].append(central_bucket)
+
+        # Network hub: shared VPCs used by several workload accounts
+        shared = []
+        for region_name in ('us-east-1', 'eu-west-1'):
+            hub = self.region(network, region_name)
+            log_group = hub.add_log_group('/network/vpc-flow-logs', 365, 220.0)
+            hub.add_vpc('inspection', natgws=3, azs=3, tiers=('public', 'private', 'firewall'), app_interfaces=12,
+                        flow_logs=[('vpc', 'cloud-watch-logs', log_group)], endpoints=('s3',) + INTERFACE_SERVICES[:4])
+            for index, env in enumerate(('prod', 'nonprod')):
+                vpc_id = hub.add_vpc(f"shared-{env}", azs=3, tiers=('private', 'data'), app_interfaces=30,
+                                     flow_logs=[('vpc', 'cloud-watch-logs', log_group)], endpoints=('s3', 'dynamodb'),
+                                     utilization=0.55)
+                shared.append((region_name, env, vpc_id, hub.items['Vpcs'][-1]))
+        for account_id, env in workloads:
+            for region_name, shared_env, vpc_id, vpc in shared:
+                if (account_id, region_name) in self.regions and (shared_env == 'prod') == (env == 'prod') \
+                        and rng.random() < 0.5:
+                    self.region(account_id, region_name).items['Vpcs'].append(dict(vpc))
+
+        # Core accounts
+        for account_id, name in ((log_archive, 'archive'), (security, 'tooling'), (management, 'management')):
+            for region_name in self.accounts[[account['id'] for account in self.accounts].index(account_id)]['regions']:
+                region = self.region(account_id, region_name)
+                bucket = f"{name}-flow-logs-{region_name}"
+                self.buckets[account_id].append(bucket)
+                region.add_vpc(name, natgws=1, azs=2, app_interfaces=6, endpoints=('s3', 'sts'),
+                               flow_logs=[('vpc', 's3', f"arn:aws:s3:::{bucket}")])
+        legacy_region = self.region(legacy, 'us-east-1')
+        legacy_region.denied.add('DescribeFlowLogs')
+        for name in ('ops-tools', 'bastion', 'jenkins'):
+            legacy_region.add_vpc(name, natgws=1, app_interfaces=5, open_ports=(22,) if name == 'bastion' else (),
+                                  open_acl=name == 'bastion', flow_logs=[('vpc', 'cloud-watch-logs', '/legacy/flow')])
+
+        # Workloads: production spans three regions, staging two
+        for account_id, env in workloads:
+            regions = [self.region(account_id, region_name) for region_name in
+                       self.accounts[[account['id'] for account in self.accounts].index(account_id)]['regions']]
+            team = regions[0].team
+            for region_index, region in enumerate(regions):
+                primary = region_index == 0
+                vpc_count = (rng.randint(3, 6) if primary else rng.randint(1, 3)) if env == 'prod' else rng.randint(1, 2)
+                for index in range(vpc_count):
+                    name = f"{team}-{env}-{['app', 'data', 'batch', 'edge', 'ml', 'legacy'][index]}"
+                    flow_logs = self.choose_flow_logs(region, env, name, central_bucket if team == 'payments' and env == 'prod' else None)
+                    region.add_vpc(
+                        name, azs=3 if env == 'prod' else 2,
+                        tiers=('public', 'private', 'data') if index == 1 else ('public', 'private'),
+                        natgws=(3 if env == 'prod' else 1) if index != 2 else 0,
+                        app_interfaces=rng.randint(8, 40) if env == 'prod' else rng.randint(2, 12),
+                        flow_logs=flow_logs,
+                        endpoints=(('s3',) if rng.random() < 0.7 else ()) + tuple(
+                            rng.sample(INTERFACE_SERVICES, rng.randint(0, 5)) if env == 'prod' else ()
+                        ),
+                        open_ports=rng.choice(((), (), (), (443,), (22,), (3389,))),
+                        open_acl=rng.random() < 0.1,
+                        secondary_cidr=f"100.64.{index * 16}.0/20" if rng.random() < 0.15 else None,
+                        ipv6=rng.random() < 0.2,
+                        utilization=rng.uniform(0.05, 0.85)
+                    )
+
+    def choose_flow_logs(self, region, env, name, central_bucket=None):
+        """
+        Pick a realistic flow log setup for a workload VPC.
+        """
+        roll = self.rng.random()
+        if central_bucket:
+            return [('vpc', 's3', f"arn:aws:s3:::{central_bucket}")]
+        if env == 'staging' and roll < 0.35:
+            return []
+        if roll < 0.55:
+            group = region.add_log_group(f"/aws/vpc/{name}", self.rng.choice((14, 30, 90, 365, None)),
+                                         self.rng.uniform(0.5, 80.0))
+            return [('vpc', 'cloud-watch-logs', group)]
+        if roll < 0.75:
+            bucket = f"{name}-flow-logs"
+            # Some buckets were deleted after their flow logs were created
+            if roll < 0.72:
+                self.buckets[region.account_id].append(bucket)
+            return [('vpc', 's3', f"arn:aws:s3:::{bucket}")]
+        if roll < 0.85:
+            stream = f"{name}-flow-logs"
+            region.delivery_streams.append(stream)
+            return [('vpc', 'kinesis-data-firehose', region.arn('firehose', f"deliverystream/{stream}"))]
+        if roll < 0.95:
+            group = region.add_log_group(f"/aws/vpc/{name}/subnets", 30, self.rng.uniform(0.5, 20.0))
+            return [('subnets', 'cloud-watch-logs', group)]
+        # Delivering to a log group that was deleted
+        return [('vpc', 'cloud-watch-logs', f"/aws/vpc/{name}-deleted")]
+
+    def build_sandbox(self, region):
+        """
+        Add the scenario VPCs the unit tests replay.
+        """
+        region.add_vpc('flow-logs-disabled', cidr='10.10.0.0/16', app_interfaces=2)
+        region.add_vpc('flow-logs-cloudwatch', cidr='10.11.0.0/16', app_interfaces=2,
+                       flow_logs=[('vpc', 'cloud-watch-logs', region.add_log_group('/aws/vpc/flowlogs', 30, 2.0))])
+        region.add_vpc('flow-logs-s3', cidr='10.12.0.0/16', app_interfaces=2,
+                       flow_logs=[('vpc', 's3', 'arn:aws:s3:::flow-log-bucket')])
+        self.buckets[region.account_id].append('flow-log-bucket')
+        region.delivery_streams.append('flow-log-stream')
+        region.add_vpc('flow-logs-kinesis', cidr='10.13.0.0/16', app_interfaces=2, flow_logs=[
+            ('vpc', 'kinesis-data-firehose', region.arn('firehose', 'deliverystream/flow-log-stream'))
+        ])
+        region.add_vpc('flow-logs-multiple', cidr='10.14.0.0/16', app_interfaces=2, flow_logs=[
+            ('vpc', 'cloud-watch-logs', region.add_log_group('/aws/vpc/flowlogs-90', 90, 4.0)),
+            ('vpc', 's3', 'arn:aws:s3:::flow-log-bucket')
+        ])
+        region.add_vpc('Test-VPC', cidr='10.0.0.0/16', azs=2, tiers=('public', 'private'), natgws=2, app_interfaces=6,
+                       flow_logs=[('vpc', 'cloud-watch-logs', '/aws/vpc/flowlogs')])
+
+    def answer(self, account_id, region_name, service_name, model, params):
+        """
+        Answer one API call from the organization's resources.
+
+        Returns:
+            tuple: (status code, parsed response)
+        """
+        region = self.regions.get((account_id, region_name))
+        operation = model.name
+        if region is not None and operation in region.denied:
+            return 403, {'Error': {'Code': 'UnauthorizedOperation',
+                                   'Message': 'You are not authorized to perform this operation.'}}
+
+        if service_name == 'ec2':
+            key = next(name for name, shape in model.output_shape.members.items() if shape.type_name == 'list')
+            items = region.items[key] if region else []
+            for option in params.get('Filters') or []:
+                items = [item for item in items if set(filter_values(item, option['Name'])) & set(option['Values'])]
+            return 200, {key: items}
+        if operation == 'DescribeLogGroups':
+            prefix = params.get('logGroupNamePrefix', '')
+            groups = sorted((group for group in region.log_groups if group['logGroupName'].startswith(prefix)),
+                            key=lambda group: group['logGroupName'])
+            return 200, {'logGroups': groups[:params.get('limit', 50)]}
+        if operation == 'ListBuckets':
+            return 200, {'Buckets': [{'Name': name, 'CreationDate': CREATED} for name in sorted(self.buckets[account_id])],
+                         'Owner': {'DisplayName': 'aws-accounts'}}
+        if operation == 'HeadBucket':
+            owners = [owner for owner, buckets in self.buckets.items() if params['Bucket'] in buckets]
+            if not owners:
+                return 404, {'Error': {'Code': '404', 'Message': 'Not Found'}}
+            return 403, {'Error': {'Code': '403', 'Message': 'Forbidden'}}
+        if operation == 'ListDeliveryStreams':
+            return 200, {'DeliveryStreamNames': sorted(region.delivery_streams), 'HasMoreDeliveryStreams': False}
+        if operation == 'GetMetricData':
+            results = []
+            for query in params['MetricDataQueries']:
+                scale = 4e7 if query['MetricStat']['Metric']['MetricName'] == 'IncomingBytes' else 1.2e5
+                results.append({'Id': query['Id'], 'Label': query['MetricStat']['Metric']['MetricName'],
+                                'Timestamps': [CREATED], 'Values': [round(scale * self.rng.uniform(0.2, 3.0))],
+                                'StatusCode': 'Complete'})
+            return 200, {'MetricDataResults': results, 'Messages': []}
+        return 200, {name: [] for name, shape in model.output_shape.members.items() if shape.type_name == 'list'}
+
+
+def filter_values(item, name):
+    """
+    Values of an item that an EC2 describe filter matches on.
+    """
+    if name == 'vpc-id':
+        return [item.get('VpcId')]
+    if name == 'attachment.vpc-id':
+        return [attachment['VpcId'] for attachment in item.get('Attachments', [])]
+    if name == 'group-id':
+        return [item.get('GroupId')]
+    if name == 'resource-id':
+        return [item.get('ResourceId')]
+    raise ValueError(f"Unsupported filter {name}")
+
+
+class SyntheticSession:
+    """boto3 session stand-in whose clients are answered by a SyntheticOrg."""
+
+    botocore_session = botocore.session.get_session()
+
+    def __init__(self, org, account_id):
+        self.org = org
+        self.account_id = account_id
+
+    def client(self, service_name, region_name=None, config=None):
+        client = self.botocore_session.create_client(
+            service_name, region_name=region_name or 'us-east-1', config=config,
+            aws_access_key_id='synthetic', aws_secret_access_key='synthetic'
+        )
+
+        def remember_params(params, context, **kwargs):
+            context['synthetic_params'] = dict(params)
+
+        def answer(model, context, **kwargs):
+            status_code, response = self.org.answer(self.account_id, region_name, service_name, model,
+                                                    context['synthetic_params'])
+            return botocore.awsrequest.AWSResponse('', status_code, {}, None), json.loads(json.dumps(response))
+
+        client.meta.events.register('provide-client-params.*.*', remember_params)
+        client.meta.events.register('before-call.*.*', answer)
+        return client
+
+    def get_credentials(self):
+        return None
+
+
+def record(directory):
+    """
+    Record a scan of the synthetic organization into directory.
+    """
+    org = SyntheticOrg()
+    org.build()
+    config = {'SSO': {'start_url': 'https://synthetic-org.awsapps.com/start', 'region': 'us-east-1'},
+              'Accounts': org.accounts}
+
+    work = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(work, 'account-list.json')
+        with open(config_path, 'w') as config_file:
+            json.dump(config, config_file)
+        directory = os.path.abspath(directory)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        cwd = os.getcwd()
+        # The scan writes its report to the working directory
+        os.chdir(work)
+        with patch('vpc_detective.aws_sso_lib.get_boto3_session',
+                   side_effect=lambda start_url, sso_region, account_id, role_name, **kwargs: SyntheticSession(org, account_id)):
+            # One worker keeps the destination checks shared between accounts in a fixed order
+            vpc_detective.main(['--config', config_path, '--record', directory, 'scan', '--workers', '1',
+                                '--snapshot-dir', 'snapshots', '--db', 'scans.db'])
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work)
+    vpc_count = sum(len(region.items['Vpcs']) for region in org.regions.values())
+    print(f"Recorded {len(org.accounts)} accounts, {len(org.regions)} account/regions and {vpc_count} VPCs in {directory}")
+
+
+if __name__ == '__main__':
+    record(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'org'))
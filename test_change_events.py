@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Unit tests for event-driven inventory updates from SQS in VPC Detective.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from collections import defaultdict
+from unittest.mock import Mock, patch
+import vpc_detective
+
+from vpc_detective import (
+    WatchInventory,
+    save_scan,
+    load_scan,
+    main,
+    parse_change_event,
+    apply_unit_change_events,
+    process_change_events,
+    consume_change_events
+)
+from test_helpers import make_vpc
+
+ACCOUNT = {'name': 'acct', 'id': '111111111111', 'role_name': 'ReadOnly', 'regions': ['us-east-1']}
+
+
+class LocalSqs:
+    """In-memory stand-in for the SQS receive/delete API."""
+
+    def __init__(self, bodies):
+        self.messages = {str(index): body for index, body in enumerate(bodies)}
+        self.in_flight = set()
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages, WaitTimeSeconds):
+        available = [handle for handle in self.messages if handle not in self.in_flight]
+        batch = available[:MaxNumberOfMessages]
+        self.in_flight.update(batch)
+        return {'Messages': [{'ReceiptHandle': handle, 'Body': self.messages[handle]} for handle in batch]}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        for entry in Entries:
+            self.messages.pop(entry['ReceiptHandle'])
+
+
+def make_event(event_name, request=None, response=None, account='111111111111', region='us-east-1', **detail):
+    return json.dumps({
+        'detail-type': 'AWS API Call via CloudTrail',
+        'source': 'aws.ec2',
+        'account': account,
+        'region': region,
+        'detail': dict(eventName=event_name, requestParameters=request, responseElements=response, **detail)
+    })
+
+
+class TestChangeEvents(unittest.TestCase):
+    """Test cases for change event handling."""
+
+    def test_parse_change_event(self):
+        """Test events are parsed raw or SNS-wrapped and irrelevant ones dropped."""
+        body = make_event('CreateFlowLogs', request={
+            'CreateFlowLogsRequest': {'ResourceId': {'content': 'vpc-0123456789abcdef0', 'tag': 1}}
+        })
+        event = parse_change_event(body)
+        self.assertEqual(event, {
+            'event_name': 'CreateFlowLogs',
+            'scope': 'flow_logs',
+            'account_id': '111111111111',
+            'region': 'us-east-1',
+            'resource_ids': ['vpc-0123456789abcdef0']
+        })
+        self.assertEqual(parse_change_event(json.dumps({'Message': body})), event)
+
+        self.assertIsNone(parse_change_event(make_event('RunInstances')))
+        self.assertIsNone(parse_change_event(make_event('CreateVpc', errorCode='UnauthorizedOperation')))
+        self.assertIsNone(parse_change_event('not json'))
+
+    def test_field_events_refresh_only_affected_vpc(self):
+        """Test a flow log change re-reads flow logs for the named VPC only."""
+        vpcs = [make_vpc('vpc-00000001', flow_logs_status='Disabled'), make_vpc('vpc-00000002', flow_logs_status='Disabled')]
+        event = parse_change_event(make_event('CreateFlowLogs', request={'ResourceId': 'vpc-00000001'}))
+        flow_logs = {'vpc-00000001': [
+            {'ResourceId': 'vpc-00000001', 'FlowLogStatus': 'ACTIVE', 'LogDestinationType': 's3', 'LogDestination': 'arn:aws:s3:::logs'}
+        ]}
+
+        with patch('vpc_detective.get_region_flow_logs', return_value=flow_logs) as mock_flow_logs, \
+             patch('vpc_detective.get_region_network_interfaces', return_value={}) as mock_interfaces, \
+             patch('vpc_detective.get_vpcs') as mock_get_vpcs:
+            updated = apply_unit_change_events(Mock(), Mock(), ACCOUNT, vpcs, [event, event])
+
+        mock_flow_logs.assert_called_once()
+        self.assertEqual(mock_interfaces.call_args[0][1], [{'Name': 'vpc-id', 'Values': ['vpc-00000001']}])
+        mock_get_vpcs.assert_not_called()
+        self.assertEqual([vpc['flow_logs_status'] for vpc in updated], ['Enabled', 'Disabled'])
+        self.assertEqual(vpcs[0]['flow_logs_status'], 'Disabled')
+
+    def test_reread_vpcs_get_destination_checks_and_volumes(self):
+        """Test records re-read from events are enriched like a scan's when the session is given."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        vpcs = [make_vpc('vpc-00000001', flow_logs_status='Disabled'), make_vpc('vpc-00000002')]
+        events = [
+            parse_change_event(make_event('CreateFlowLogs', request={'ResourceId': 'vpc-00000001'})),
+            parse_change_event(make_event('CreateNatGateway', request={'subnetId': 'subnet-1'},
+                                          response={'CreateNatGatewayResponse': {'natGateway': {'vpcId': 'vpc-00000002'}}}))
+        ]
+        session = Mock()
+
+        with patch('vpc_detective.get_region_flow_logs', return_value={}), \
+             patch('vpc_detective.get_region_network_interfaces', return_value={}), \
+             patch('vpc_detective.get_natgws', return_value=1), \
+             patch('vpc_detective.check_flow_log_destinations') as mock_check, \
+             patch('vpc_detective.collect_flow_log_volumes') as mock_volumes:
+            updated = apply_unit_change_events(client, Mock(), ACCOUNT, vpcs, events, boto3_sso_session=session)
+
+        self.assertEqual([vpc['vpc_id'] for vpc in mock_check.call_args[0][2]], ['vpc-00000001'])
+        self.assertEqual(mock_volumes.call_args[0][:3], (session, 'us-east-1', updated))
+
+    def test_flow_log_and_interface_ids_resolve_vpcs(self):
+        """Test flow log and ENI IDs map to their VPC and region listings are read once per batch."""
+        vpcs = [
+            make_vpc('vpc-00000001', flow_logs_status='Enabled', flow_log_ids=['fl-0000000a']),
+            make_vpc('vpc-00000002', flow_logs_status='Enabled', flow_log_ids=['fl-0000000b']),
+            make_vpc('vpc-00000003', flow_logs_status='Enabled')
+        ]
+        events = [
+            parse_change_event(make_event('DeleteFlowLogs', request={'DeleteFlowLogsRequest': {'FlowLogId': {'content': 'fl-0000000a'}}})),
+            parse_change_event(make_event('CreateFlowLogs', request={'ResourceId': 'eni-0000000c'})),
+            parse_change_event(make_event('DeleteFlowLogs', request={'FlowLogId': 'fl-0000000b'}))
+        ]
+        interfaces = {'vpc-00000002': [{'NetworkInterfaceId': 'eni-0000000c', 'SubnetId': 'subnet-1'}]}
+
+        with patch('vpc_detective.get_region_flow_logs', return_value={}) as mock_flow_logs, \
+             patch('vpc_detective.get_region_network_interfaces', return_value=interfaces) as mock_interfaces:
+            updated = apply_unit_change_events(Mock(), Mock(), ACCOUNT, vpcs, events)
+
+        mock_flow_logs.assert_called_once()
+        mock_interfaces.assert_called_once()
+        self.assertEqual([vpc['flow_logs_status'] for vpc in updated], ['Disabled', 'Disabled', 'Enabled'])
+        self.assertEqual(updated[0]['flow_log_ids'], [])
+
+    def test_subnet_and_delete_events_resolve_vpcs(self):
+        """Test subnet IDs map to their VPC and NAT gateway deletes check only VPCs with NAT gateways."""
+        vpcs = [
+            make_vpc('vpc-00000001', natgw_count=1, subnets=[{'subnet_id': 'subnet-0000000a'}]),
+            make_vpc('vpc-00000002')
+        ]
+        create = parse_change_event(make_event('CreateNatGateway', request={'SubnetId': 'subnet-0000000a'}))
+        delete = parse_change_event(make_event('DeleteNatGateway', request={'NatGatewayId': 'nat-0123456789abcdef0'}))
+
+        with patch('vpc_detective.get_natgws', return_value=2) as mock_natgws:
+            updated = apply_unit_change_events(Mock(), Mock(), ACCOUNT, vpcs, [create, delete])
+
+        mock_natgws.assert_called_once()
+        self.assertEqual(mock_natgws.call_args[0][1], 'vpc-00000001')
+        self.assertEqual(updated[0]['natgw_count'], 2)
+        self.assertGreater(updated[0]['estimated_costs']['nat_gateways'], 0)
+
+    def test_vpc_events_rebuild_and_remove_records(self):
+        """Test created VPCs are rebuilt through get_vpcs and deleted VPCs removed."""
+        vpcs = [make_vpc('vpc-00000001'), make_vpc('vpc-00000002')]
+        events = [
+            parse_change_event(make_event('CreateVpc', response={'vpc': {'vpcId': 'vpc-00000003'}})),
+            parse_change_event(make_event('DeleteVpc', request={'vpcId': 'vpc-00000002'}))
+        ]
+        new_vpc = make_vpc('vpc-00000003')
+        del new_vpc['account_name'], new_vpc['account_id']
+
+        with patch('vpc_detective.get_vpcs', return_value=[new_vpc]) as mock_get_vpcs:
+            updated = apply_unit_change_events(Mock(), Mock(), ACCOUNT, vpcs, events)
+
+        self.assertEqual(mock_get_vpcs.call_args[0][2], ['vpc-00000003'])
+        self.assertEqual([vpc['vpc_id'] for vpc in updated], ['vpc-00000001', 'vpc-00000003'])
+        self.assertEqual(updated[1]['account_id'], '111111111111')
+
+    def test_shared_vpcs_stay_references_in_participant_accounts(self):
+        """Test a region re-read from an event keeps RAM-shared VPCs as references, not records."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        vpc_page = defaultdict(list, Vpcs=[
+            {'VpcId': 'vpc-00000001', 'OwnerId': '111111111111', 'CidrBlock': '10.0.0.0/16', 'IsDefault': False},
+            {'VpcId': 'vpc-0000000a', 'OwnerId': '999999999999', 'CidrBlock': '10.9.0.0/16', 'IsDefault': False}
+        ])
+        client.get_paginator.side_effect = lambda operation: Mock(**{
+            'paginate.return_value': [vpc_page if operation == 'describe_vpcs' else defaultdict(list)]
+        })
+        event = parse_change_event(make_event('AuthorizeSecurityGroupIngress', request={'groupId': 'sg-1'}))
+        shared_vpcs = [{'vpc_id': 'vpc-0000000a', 'owner_id': '999999999999', 'key': '999999999999:vpc-0000000a'}]
+
+        with patch('vpc_detective.get_vpc_igw', return_value=False), patch('vpc_detective.get_natgws', return_value=0):
+            updated = apply_unit_change_events(client, Mock(), ACCOUNT, [make_vpc('vpc-00000001')], [event], shared_vpcs)
+
+        self.assertEqual([vpc['vpc_id'] for vpc in updated], ['vpc-00000001'])
+        self.assertEqual([reference['key'] for reference in shared_vpcs], ['999999999999:vpc-0000000a'])
+
+    def test_queue_is_applied_to_inventory(self):
+        """Test queued events update the inventory and failed units stay queued."""
+        account_regions = [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'}]
+        inventory = WatchInventory(account_regions)
+        inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-00000001')], refreshed_at=1000.0)
+        config = {'SSO': {}, 'Accounts': [ACCOUNT]}
+        sqs = LocalSqs([
+            make_event('AttachInternetGateway', request={'vpcId': 'vpc-00000001'}),
+            make_event('CreateVpc', account='999999999999'),
+            'not json'
+        ])
+
+        with patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.get_vpc_igw', return_value=True):
+            consume_change_events(
+                sqs, 'queue', lambda events: process_change_events(inventory, config, events, {}),
+                threading.Event(), drain=True
+            )
+
+        self.assertEqual(sqs.messages, {})
+        vpcs, freshness, _ = inventory.view()
+        self.assertTrue(vpcs[0]['igw_present'])
+        self.assertIsNotNone(freshness['acct (111111111111)']['regions']['us-east-1']['refreshed_at'])
+        self.assertEqual(inventory.units[('111111111111', 'us-east-1')]['refreshed_at'], 1000.0)
+
+        sqs = LocalSqs([make_event('AttachInternetGateway', request={'vpcId': 'vpc-00000001'})])
+        with patch('vpc_detective.get_account_session', side_effect=Exception('expired')):
+            consume_change_events(
+                sqs, 'queue', lambda events: process_change_events(inventory, config, events, {}),
+                threading.Event(), drain=True
+            )
+        self.assertEqual(len(sqs.messages), 1)
+
+    def test_refresh_during_event_application_is_kept(self):
+        """Test events applied to records a refresh replaced meanwhile are redelivered, not stored."""
+        account_regions = [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'}]
+        inventory = WatchInventory(account_regions)
+        inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-00000001')], refreshed_at=1000.0)
+        config = {'SSO': {}, 'Accounts': [ACCOUNT]}
+        events = [parse_change_event(make_event('AttachInternetGateway', request={'vpcId': 'vpc-00000001'}))]
+
+        def refresh_meanwhile(client, vpc_id):
+            inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-00000001', natgw_count=2)], refreshed_at=2000.0)
+            return True
+
+        with patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.get_vpc_igw', side_effect=refresh_meanwhile), \
+             patch('builtins.print'):
+            failed = process_change_events(inventory, config, events, {})
+        self.assertEqual(failed, {('111111111111', 'us-east-1')})
+        self.assertEqual(inventory.view()[0][0]['natgw_count'], 2)
+        self.assertFalse(inventory.view()[0][0]['igw_present'])
+
+        with patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.get_vpc_igw', return_value=True), \
+             patch('builtins.print'):
+            failed = process_change_events(inventory, config, events, {})
+        self.assertEqual(failed, set())
+        self.assertEqual(inventory.view()[0][0]['natgw_count'], 2)
+        self.assertTrue(inventory.view()[0][0]['igw_present'])
+
+    def test_events_command_stores_a_full_inventory(self):
+        """Test the stored event inventory keeps scan statuses and picks up full scans stored meanwhile."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = os.path.join(tmp.name, 'results.db')
+        scanned = [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1',
+                    'scan_status': 'complete', 'duration': 4.0, 'shared_vpcs': []}]
+        save_scan([make_vpc('vpc-00000001')], scanned, db_path)
+
+        class OneMessageSqs(LocalSqs):
+            def receive_message(self, QueueUrl, MaxNumberOfMessages, WaitTimeSeconds):
+                return super().receive_message(QueueUrl, 1, WaitTimeSeconds)
+
+        sqs = OneMessageSqs([
+            make_event('AttachInternetGateway', request={'vpcId': 'vpc-00000001'}),
+            make_event('AttachInternetGateway', request={'vpcId': 'vpc-00000001'})
+        ])
+
+        def full_scan_meanwhile(client, vpc_id):
+            # A full scan finishes while the first batch is applied
+            if sqs.messages.keys() == {'0', '1'}:
+                save_scan([make_vpc('vpc-00000001', natgw_count=3)], scanned, db_path)
+            return True
+
+        config = {'SSO': {}, 'Accounts': [ACCOUNT]}
+        with patch('vpc_detective.load_config', return_value=config), \
+             patch('vpc_detective.boto3', Mock(**{'client.return_value': sqs})), \
+             patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.get_vpc_igw', side_effect=full_scan_meanwhile), \
+             patch('builtins.print'):
+            main(['events', '--db', db_path, '--queue-url', 'queue', '--drain'])
+
+        vpc_data_list, account_regions = load_scan(db_path)
+        self.assertEqual(sqs.messages, {})
+        self.assertEqual([(vpc['natgw_count'], vpc['igw_present']) for vpc in vpc_data_list], [(3, True)])
+        self.assertEqual(account_regions[0]['scan_status'], 'complete')
+        self.assertEqual(account_regions[0]['duration'], 4.0)
+        self.assertEqual(account_regions[0]['shared_vpcs'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for CIDR collection and org-wide overlap detection in VPC Detective.
+"""
+
+import time
+import unittest
+import test_helpers
+import vpc_detective
+
+from vpc_detective import get_vpc_cidr_blocks, find_cidr_overlaps, generate_cidr_overlap_section
+
+
+def make_vpc(vpc_id, cidr_blocks, **fields):
+    return test_helpers.make_vpc(vpc_id, vpc_cidr=cidr_blocks[0], cidr_blocks=cidr_blocks, **fields)
+
+
+class TestCidrOverlaps(unittest.TestCase):
+    """Test cases for CIDR overlap detection."""
+
+    def test_get_vpc_cidr_blocks(self):
+        """Test all associated IPv4 and IPv6 blocks are collected."""
+        vpc_info = {
+            'CidrBlock': '10.0.0.0/16',
+            'CidrBlockAssociationSet': [
+                {'CidrBlock': '10.0.0.0/16', 'CidrBlockState': {'State': 'associated'}},
+                {'CidrBlock': '100.64.0.0/16', 'CidrBlockState': {'State': 'associated'}},
+                {'CidrBlock': '10.9.0.0/16', 'CidrBlockState': {'State': 'disassociated'}}
+            ],
+            'Ipv6CidrBlockAssociationSet': [
+                {'Ipv6CidrBlock': '2600:1f18:1::/56', 'Ipv6CidrBlockState': {'State': 'associated'}}
+            ]
+        }
+
+        self.assertEqual(get_vpc_cidr_blocks(vpc_info), ['10.0.0.0/16', '100.64.0.0/16', '2600:1f18:1::/56'])
+
+    def test_nested_and_disjoint_ranges(self):
+        """Test nested ranges overlap and disjoint ranges do not."""
+        vpcs = [
+            make_vpc('vpc-a', ['10.0.0.0/8']),
+            make_vpc('vpc-b', ['10.1.0.0/16'], account_id='210987654321', region='eu-west-1'),
+            make_vpc('vpc-c', ['10.1.2.0/24']),
+            make_vpc('vpc-d', ['192.168.0.0/16']),
+            make_vpc('vpc-e', ['11.0.0.0/16'])
+        ]
+
+        overlaps = find_cidr_overlaps(vpcs)
+        pairs = {(o['vpc_a']['vpc_id'], o['vpc_b']['vpc_id']) for o in overlaps}
+
+        self.assertEqual(pairs, {('vpc-a', 'vpc-b'), ('vpc-a', 'vpc-c'), ('vpc-b', 'vpc-c')})
+        ab = next(o for o in overlaps if o['vpc_b']['vpc_id'] == 'vpc-b')
+        self.assertEqual(ab['vpc_b']['account_id'], '210987654321')
+        self.assertEqual(ab['vpc_b']['region'], 'eu-west-1')
+
+    def test_ipv6_and_default_vpcs(self):
+        """Test IPv6 ranges are compared and default VPCs skipped by default."""
+        vpcs = [
+            make_vpc('vpc-a', ['10.0.0.0/16', '2600:1f18:1::/56']),
+            make_vpc('vpc-b', ['10.1.0.0/16', '2600:1f18:1:10::/64']),
+            make_vpc('vpc-default-1', ['172.31.0.0/16'], is_default=True),
+            make_vpc('vpc-default-2', ['172.31.0.0/16'], is_default=True)
+        ]
+
+        overlaps = find_cidr_overlaps(vpcs)
+
+        self.assertEqual(len(overlaps), 1)
+        self.assertEqual(overlaps[0]['cidr_b'], '2600:1f18:1:10::/64')
+        self.assertEqual(len(find_cidr_overlaps(vpcs, include_default=True)), 2)
+
+    def test_large_estate_is_fast(self):
+        """Test 50k disjoint CIDRs plus a few overlaps are swept quickly."""
+        vpcs = [make_vpc(f'vpc-{i}', [f'10.{i // 256 % 256}.{i % 256}.0/24'], account_id=str(i // 256))
+                for i in range(50000)]
+        vpcs.append(make_vpc('vpc-wide', ['10.0.0.0/16']))
+
+        started = time.perf_counter()
+        overlaps = find_cidr_overlaps(vpcs)
+        elapsed = time.perf_counter() - started
+
+        # 10.0.x.0/24 repeats once per 65536 VPCs, so only vpc-wide overlaps
+        self.assertEqual(len(overlaps), 256)
+        self.assertLess(elapsed, 5.0)
+
+    def test_overlap_section(self):
+        """Test the markdown section lists each pair with account and region."""
+        vpcs = [make_vpc('vpc-a', ['10.0.0.0/16']), make_vpc('vpc-b', ['10.0.128.0/17'], region='us-west-2')]
+
+        markdown = generate_cidr_overlap_section(vpcs)
+
+        self.assertIn('| 10.0.0.0/16 | vpc-a | acct (111111111111) | us-east-1 | 10.0.128.0/17 | vpc-b | acct (111111111111) | us-west-2 |', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the command-line interface and configuration validation in VPC Detective.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import vpc_detective
+
+from vpc_detective import parse_args, validate_config
+
+VALID_CONFIG = {
+    'SSO': {'start_url': 'https://example.awsapps.com/start', 'region': 'us-east-1'},
+    'Accounts': [
+        {'name': 'production', 'id': '123456789012', 'role_name': 'ReadOnly', 'regions': ['us-east-1', 'us-west-2']},
+        {'name': 'development', 'id': '210987654321', 'role_name': 'ReadOnly', 'region': 'eu-west-1'}
+    ]
+}
+
+
+class TestCli(unittest.TestCase):
+    """Test cases for the CLI."""
+
+    def test_validate_config(self):
+        """Test valid configurations pass and each problem is reported."""
+        self.assertEqual(validate_config(VALID_CONFIG), [])
+
+        config = json.loads(json.dumps(VALID_CONFIG))
+        config['SSO']['region'] = 'useast1'
+        config['Accounts'][0]['id'] = 123456789012
+        config['Accounts'][1]['id'] = '123456789012'
+        config['Accounts'][1]['region'] = 'mars-1'
+        del config['Accounts'][1]['role_name']
+
+        errors = validate_config(config)
+        self.assertEqual(errors, [
+            "SSO.region: invalid region 'useast1'",
+            "Accounts[0] (production): id must be a 12-digit account ID as a string",
+            "Accounts[1] (development): missing role_name",
+            "Accounts[1] (development): invalid region 'mars-1'"
+        ])
+        self.assertEqual(validate_config({'SSO': VALID_CONFIG['SSO'], 'Accounts': []}), ["Accounts: missing or empty"])
+
+    def test_config_option_before_or_after_command(self):
+        """Test --config is accepted on either side of the subcommand."""
+        self.assertEqual(parse_args([]).config, vpc_detective.CONFIG_FILE)
+        self.assertEqual(parse_args(['--config', 'a.json', 'validate']).config, 'a.json')
+        self.assertEqual(parse_args(['scan', '--config', 'b.json']).config, 'b.json')
+
+    def test_offline_commands_do_not_import_aws_libraries(self):
+        """Test validate runs without importing boto3, botocore or aws_sso_lib."""
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, 'accounts.json')
+            with open(config_path, 'w') as config_file:
+                json.dump(VALID_CONFIG, config_file)
+
+            script = (
+                "import sys, vpc_detective; "
+                f"vpc_detective.main(['validate', '--config', {config_path!r}]); "
+                "print(sorted(name for name in ('boto3', 'botocore', 'aws_sso_lib', 'http.server') if name in sys.modules))"
+            )
+            result = subprocess.run(
+                [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.abspath(vpc_detective.__file__))
+            )
+
+        self.assertIn('is valid: 2 account(s), 3 account/region(s)', result.stdout)
+        self.assertTrue(result.stdout.strip().endswith('[]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
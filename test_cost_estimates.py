@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the offline cost estimation engine in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import vpc_detective
+
+from vpc_detective import (
+    load_price_table,
+    get_price,
+    get_natgws,
+    estimate_vpc_costs,
+    apply_cost_estimates,
+    calculate_flow_logs_summary,
+    generate_cost_section,
+    BYTES_PER_GB
+)
+
+
+class TestCostEstimates(unittest.TestCase):
+    """Test cases for cost estimation and rollups."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.vpc = {
+            'vpc_id': 'vpc-1',
+            'region': 'us-east-1',
+            'account_name': 'prod',
+            'account_id': '123456789012',
+            'natgw_count': 2,
+            'vpc_endpoints': [
+                {'id': 'vpce-1', 'type': 'Gateway', 'service': 's3', 'security_groups': [], 'network_interfaces': 0},
+                {'id': 'vpce-2', 'type': 'Interface', 'service': 'ecr.api', 'security_groups': [], 'network_interfaces': 3}
+            ],
+            'flow_logs_log_groups': ['/aws/vpc/shared'],
+            'flow_logs_status': 'Enabled'
+        }
+
+    def test_price_table_is_versioned(self):
+        """Test the bundled price table has a version and default prices."""
+        price_table = load_price_table()
+
+        self.assertIn('version', price_table)
+        self.assertIn('nat_gateway_hour', price_table['default'])
+
+    def test_get_price_falls_back_to_default(self):
+        """Test unknown regions use the default prices."""
+        price_table = load_price_table()
+
+        self.assertEqual(get_price('xx-unknown-9', 'nat_gateway_hour'), price_table['default']['nat_gateway_hour'])
+        self.assertEqual(get_price('eu-central-1', 'nat_gateway_hour'), price_table['regions']['eu-central-1']['nat_gateway_hour'])
+
+    def test_get_price_is_memoized(self):
+        """Test repeated lookups do not re-read the price table."""
+        get_price.cache_clear()
+        with patch('vpc_detective.load_price_table', wraps=load_price_table) as mock_load:
+            get_price('us-west-2', 'interface_endpoint_hour')
+            get_price('us-west-2', 'interface_endpoint_hour')
+
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_estimate_vpc_costs(self):
+        """Test NAT gateway, interface endpoint and storage estimates."""
+        result = estimate_vpc_costs(self.vpc, flow_log_storage_bytes=10 * BYTES_PER_GB)
+
+        self.assertEqual(result['nat_gateways'], round(2 * get_price('us-east-1', 'nat_gateway_hour') * 730, 2))
+        self.assertEqual(result['interface_endpoints'], round(3 * get_price('us-east-1', 'interface_endpoint_hour') * 730, 2))
+        self.assertEqual(result['flow_log_storage'], round(10 * get_price('us-east-1', 'cloudwatch_logs_storage_gb_month'), 2))
+        self.assertAlmostEqual(result['total'], result['nat_gateways'] + result['interface_endpoints'] + result['flow_log_storage'], places=2)
+
+    def test_only_active_nat_gateways_are_counted(self):
+        """Test NAT gateways are counted across pages and deleted or failed ones are left out."""
+        client = Mock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'NatGateways': [{'NatGatewayId': 'nat-1', 'State': 'available'}, {'NatGatewayId': 'nat-2', 'State': 'deleted'}]},
+            {'NatGateways': [{'NatGatewayId': 'nat-3', 'State': 'pending'}, {'NatGatewayId': 'nat-4', 'State': 'failed'}]}
+        ]
+
+        self.assertEqual(get_natgws(client, 'vpc-1'), 2)
+
+    def test_shared_log_group_storage_split(self):
+        """Test a log group shared by two VPCs is counted once in total."""
+        other = dict(self.vpc, vpc_id='vpc-2', natgw_count=0, vpc_endpoints=[])
+        vpc = dict(self.vpc, natgw_count=0, vpc_endpoints=[])
+        log_group_cache = {'/aws/vpc/shared': {'logGroupName': '/aws/vpc/shared', 'storedBytes': 100 * BYTES_PER_GB}}
+
+        apply_cost_estimates([vpc, other], log_group_cache)
+
+        storage_price = get_price('us-east-1', 'cloudwatch_logs_storage_gb_month')
+        self.assertEqual(vpc['estimated_costs']['flow_log_storage'], round(50 * storage_price, 2))
+        self.assertEqual(other['estimated_costs']['flow_log_storage'], round(50 * storage_price, 2))
+
+    def test_cost_rollup_by_account_and_region(self):
+        """Test cost totals roll up in the coverage summary."""
+        vpc_data = [
+            dict(self.vpc, estimated_costs={'nat_gateways': 60.0, 'interface_endpoints': 0.0, 'flow_log_storage': 0.0, 'total': 60.0}),
+            dict(self.vpc, vpc_id='vpc-2', region='us-west-2',
+                 estimated_costs={'nat_gateways': 0.0, 'interface_endpoints': 20.0, 'flow_log_storage': 1.5, 'total': 21.5})
+        ]
+
+        result = calculate_flow_logs_summary(vpc_data)
+
+        self.assertEqual(result['costs']['total'], 81.5)
+        self.assertEqual(result['costs']['by_account'], {'prod (123456789012)': 81.5})
+        self.assertEqual(result['costs']['by_region'], {'us-east-1': 60.0, 'us-west-2': 21.5})
+
+        markdown = generate_cost_section(vpc_data, result['costs'])
+        self.assertIn('**Total**: $81.50', markdown)
+        self.assertIn('| vpc-2 | $0.00 | $20.00 | $1.50 | $21.50 |', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
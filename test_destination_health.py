@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for flow log destination health checks in VPC Detective.
+"""
+
+import threading
+import time
+import unittest
+from concurrent import futures
+from unittest.mock import Mock, patch
+import botocore.exceptions
+
+from vpc_detective import DestinationCache, check_flow_log_destinations, find_missing_log_groups, generate_markdown
+import test_helpers
+
+BUCKET_ARN = 'arn:aws:s3:::shared-flow-logs/vpc/'
+MISSING_BUCKET_ARN = 'arn:aws:s3:::deleted-flow-logs'
+OTHER_BUCKET_ARN = 'arn:aws:s3:::partner-flow-logs'
+STREAM_ARN = 'arn:aws:firehose:us-east-1:111111111111:deliverystream/flow-logs'
+MISSING_STREAM_ARN = 'arn:aws:firehose:us-east-1:111111111111:deliverystream/deleted'
+
+
+def make_vpc(vpc_id, destination_arns):
+    return test_helpers.make_vpc(vpc_id, flow_logs_destinations=['Kinesis', 'S3'], flow_logs_destination_arns=destination_arns,
+                                 flow_logs_destination_issues=[])
+
+
+def head_bucket(Bucket):
+    code = {'deleted-flow-logs': '404', 'partner-flow-logs': '403'}[Bucket]
+    raise botocore.exceptions.ClientError({'Error': {'Code': code, 'Message': code}}, 'HeadBucket')
+
+
+class TestDestinationHealth(unittest.TestCase):
+    """Test cases for flow log destination health checks."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.s3_client = Mock()
+        self.s3_client.list_buckets.return_value = {'Buckets': [{'Name': 'shared-flow-logs'}]}
+        self.s3_client.head_bucket.side_effect = head_bucket
+        self.firehose_client = Mock()
+        self.firehose_client.list_delivery_streams.return_value = {
+            'DeliveryStreamNames': ['flow-logs'], 'HasMoreDeliveryStreams': False
+        }
+        self.session = Mock()
+        self.session.client.side_effect = lambda service, **kwargs: {'s3': self.s3_client, 'firehose': self.firehose_client}[service]
+
+    def test_shared_destinations_are_checked_once(self):
+        """Test each destination is checked once per run however many VPCs use it."""
+        cache = DestinationCache()
+        vpcs = [make_vpc(f'vpc-{index}', [BUCKET_ARN, MISSING_BUCKET_ARN, STREAM_ARN]) for index in range(50)]
+        check_flow_log_destinations(self.session, '111111111111', vpcs, cache)
+        more_vpcs = [make_vpc('vpc-x', [BUCKET_ARN, OTHER_BUCKET_ARN, MISSING_STREAM_ARN])]
+        check_flow_log_destinations(self.session, '111111111111', more_vpcs, cache)
+
+        self.s3_client.list_buckets.assert_called_once()
+        self.firehose_client.list_delivery_streams.assert_called_once()
+        self.assertEqual(self.s3_client.head_bucket.call_count, 2)
+        self.assertEqual(vpcs[49]['flow_logs_destination_issues'], [
+            {'type': 'S3', 'destination': MISSING_BUCKET_ARN, 'problem': 'bucket not found'}
+        ])
+        self.assertEqual(more_vpcs[0]['flow_logs_destination_issues'], [
+            {'type': 'Kinesis', 'destination': MISSING_STREAM_ARN, 'problem': 'delivery stream not found'}
+        ])
+
+    def test_concurrent_checks_share_one_lookup(self):
+        """Test workers checking the same destinations at once wait on a single listing and head_bucket."""
+        started = threading.Event()
+
+        def slow_list_buckets():
+            started.set()
+            time.sleep(0.05)
+            return {'Buckets': [{'Name': 'shared-flow-logs'}]}
+
+        self.s3_client.list_buckets.side_effect = slow_list_buckets
+        cache = DestinationCache()
+        vpc_lists = [[make_vpc(f'vpc-{index}', [BUCKET_ARN, MISSING_BUCKET_ARN])] for index in range(8)]
+
+        with futures.ThreadPoolExecutor(max_workers=8) as executor:
+            checks = [executor.submit(check_flow_log_destinations, self.session, '111111111111', vpc_list, cache)
+                      for vpc_list in vpc_lists]
+            self.assertTrue(started.wait(2))
+            for check in checks:
+                check.result()
+
+        self.s3_client.list_buckets.assert_called_once()
+        self.s3_client.head_bucket.assert_called_once_with(Bucket='deleted-flow-logs')
+        for vpc_list in vpc_lists:
+            self.assertEqual([issue['destination'] for issue in vpc_list[0]['flow_logs_destination_issues']], [MISSING_BUCKET_ARN])
+
+    def test_unreadable_destinations_are_not_flagged(self):
+        """Test destinations that cannot be listed are left unflagged."""
+        denied = botocore.exceptions.ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'List')
+        self.s3_client.list_buckets.side_effect = denied
+        self.s3_client.head_bucket.side_effect = denied
+        self.firehose_client.list_delivery_streams.side_effect = denied
+        vpcs = [make_vpc('vpc-1', [BUCKET_ARN, MISSING_STREAM_ARN])]
+
+        with patch('builtins.print'):
+            check_flow_log_destinations(self.session, '111111111111', vpcs)
+
+        self.assertEqual(vpcs[0]['flow_logs_destination_issues'], [])
+
+    def test_missing_log_groups(self):
+        """Test only log groups looked up and not found are reported."""
+        cache = {'/vpc/kept': {'logGroupName': '/vpc/kept'}, '/vpc/deleted': None}
+        issues = find_missing_log_groups(['/vpc/deleted', '/vpc/kept', '/vpc/unread'], cache)
+        self.assertEqual(issues, [{'type': 'CloudWatch', 'destination': '/vpc/deleted', 'problem': 'log group not found'}])
+
+    def test_report_shows_unhealthy_destinations(self):
+        """Test failures appear in the Destination column and the summary."""
+        vpcs = [make_vpc('vpc-1', [MISSING_BUCKET_ARN]), make_vpc('vpc-2', [MISSING_BUCKET_ARN])]
+        check_flow_log_destinations(self.session, '111111111111', vpcs)
+
+        markdown = generate_markdown(vpcs, [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'}])
+        self.assertIn('| Enabled | Kinesis, S3 ⚠️ S3 bucket not found | N/A |', markdown)
+        self.assertIn('- **VPCs with Unhealthy Destinations**: 2', markdown)
+        self.assertIn(f'- **{MISSING_BUCKET_ARN}** (S3): bucket not found, used by 2 VPCs (vpc-1, vpc-2)', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,12 +6,7 @@ This script tests the new Flow Logs detection without requiring actual AWS crede
 """
 
 from unittest.mock import Mock, patch
-import sys
-import importlib.util
-spec = importlib.util.spec_from_file_location("vpc_detective", "vpc-detective.py")
-vpc_detective = importlib.util.module_from_spec(spec)
-sys.modules["vpc_detective"] = vpc_detective
-spec.loader.exec_module(vpc_detective)
+import vpc_detective
 
 from vpc_detective import get_vpc_flow_logs, get_cloudwatch_retention, calculate_flow_logs_summary
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-VPC fault isolation and the retry queue in VPC Detective.
+"""
+
+import time
+import unittest
+from collections import defaultdict
+from unittest.mock import Mock, patch
+import botocore.exceptions
+import vpc_detective
+
+from vpc_detective import get_vpcs, drain_retry_queue, generate_markdown
+
+
+def client_error(code):
+    return botocore.exceptions.ClientError({'Error': {'Code': code, 'Message': code}}, 'Describe')
+
+
+class TestFaultIsolation(unittest.TestCase):
+    """Test cases for fault isolation."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.client = Mock()
+        self.client.meta.region_name = 'us-east-1'
+        vpc_page = defaultdict(list, Vpcs=[
+            {'VpcId': 'vpc-1', 'CidrBlock': '10.0.0.0/16', 'IsDefault': False},
+            {'VpcId': 'vpc-2', 'CidrBlock': '10.1.0.0/16', 'IsDefault': False}
+        ])
+        interface_page = defaultdict(list, NetworkInterfaces=[
+            {'NetworkInterfaceId': 'eni-1', 'VpcId': 'vpc-1', 'Groups': []},
+            {'NetworkInterfaceId': 'eni-2', 'VpcId': 'vpc-2', 'Groups': []}
+        ])
+        self.pages = {'describe_vpcs': [vpc_page], 'describe_network_interfaces': [interface_page]}
+        self.client.get_paginator.side_effect = self.get_paginator
+
+        sleep_patcher = patch('vpc_detective.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        print_patcher = patch('builtins.print')
+        print_patcher.start()
+        self.addCleanup(print_patcher.stop)
+
+    def get_paginator(self, operation):
+        paginator = Mock()
+        pages = self.pages.get(operation, [defaultdict(list)])
+        if isinstance(pages, Exception):
+            paginator.paginate.side_effect = pages
+        else:
+            paginator.paginate.return_value = pages
+        return paginator
+
+    def test_failed_field_is_retried_without_losing_the_region(self):
+        """Test a throttled call is retried after the main pass and other VPCs are kept."""
+        igw_results = {'vpc-1': [client_error('Throttling'), True], 'vpc-2': [False]}
+
+        def fake_igw(client, vpc_id):
+            result = igw_results[vpc_id].pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with patch('vpc_detective.get_vpc_igw', side_effect=fake_igw), \
+             patch('vpc_detective.get_natgws', side_effect=client_error('UnauthorizedOperation')) as mock_natgws:
+            vpcs = get_vpcs(self.client, Mock())
+
+        self.assertEqual([vpc['igw_present'] for vpc in vpcs], [True, False])
+        self.assertEqual([vpc['natgw_count'] for vpc in vpcs], ['Error', 'Error'])
+        self.assertEqual(mock_natgws.call_count, 2)
+        self.mock_sleep.assert_called_once_with(vpc_detective.RETRY_BASE_DELAY)
+
+    def test_region_wide_failure_is_retried_for_every_vpc(self):
+        """Test a failed region-wide read fills every VPC's fields once a retry succeeds."""
+        interface_pages = self.pages['describe_network_interfaces']
+        calls = []
+
+        def get_paginator(operation):
+            if operation == 'describe_network_interfaces':
+                calls.append(operation)
+                if len(calls) == 1:
+                    self.pages[operation] = client_error('RequestLimitExceeded')
+                else:
+                    self.pages[operation] = interface_pages
+            return self.get_paginator(operation)
+
+        self.client.get_paginator.side_effect = get_paginator
+        with patch('vpc_detective.get_vpc_igw', return_value=True), patch('vpc_detective.get_natgws', return_value=0):
+            vpcs = get_vpcs(self.client, Mock())
+
+        self.assertEqual([vpc['interface_count'] for vpc in vpcs], [1, 1])
+        self.assertEqual([vpc['security_group_count'] for vpc in vpcs], [0, 0])
+
+    def test_security_groups_acls_and_endpoints_are_retried(self):
+        """Test throttled security group, NACL and endpoint reads are retried and denied ones reported as Error."""
+        results = {
+            'describe_network_acls': [client_error('Throttling'), [defaultdict(list, NetworkAcls=[
+                {'NetworkAclId': 'acl-1', 'VpcId': 'vpc-1', 'IsDefault': False, 'Associations': [{}], 'Entries': []}
+            ])]],
+            'describe_vpc_endpoints': [client_error('RequestLimitExceeded'), [defaultdict(list, VpcEndpoints=[
+                {'VpcEndpointId': 'vpce-1', 'VpcId': 'vpc-2', 'ServiceName': 'com.amazonaws.us-east-1.s3'}
+            ])]],
+            'describe_security_groups': [client_error('UnauthorizedOperation')]
+        }
+
+        def get_paginator(operation):
+            if operation in results:
+                self.pages[operation] = results[operation].pop(0)
+            return self.get_paginator(operation)
+
+        self.client.get_paginator.side_effect = get_paginator
+        with patch('vpc_detective.get_vpc_igw', return_value=True), patch('vpc_detective.get_natgws', return_value=0):
+            vpcs = get_vpcs(self.client, Mock())
+
+        self.assertEqual([vpc['custom_nacl_count'] for vpc in vpcs], [1, 0])
+        self.assertEqual([vpc['endpoint_count'] for vpc in vpcs], [0, 1])
+        self.assertEqual([vpc['security_group_count'] for vpc in vpcs], ['Error', 'Error'])
+        self.assertEqual([vpc['interface_count'] for vpc in vpcs], [1, 1])
+        self.mock_sleep.assert_called_once_with(vpc_detective.RETRY_BASE_DELAY)
+
+    def test_fields_still_failing_are_reported_as_error(self):
+        """Test fields that fail every retry show Error in the report."""
+        self.pages['describe_subnets'] = client_error('Throttling')
+        with patch('vpc_detective.get_vpc_igw', side_effect=client_error('InternalError')), \
+             patch('vpc_detective.get_natgws', return_value=0):
+            vpcs = get_vpcs(self.client, Mock())
+
+        self.assertEqual(self.mock_sleep.call_count, vpc_detective.RETRY_ATTEMPTS)
+        self.assertEqual(vpcs[0]['igw_present'], 'Error')
+        self.assertEqual(vpcs[0]['subnet_count'], 'Error')
+
+        for vpc in vpcs:
+            vpc.update(account_name='acct', account_id='111111111111')
+        markdown = generate_markdown(vpcs, [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'}])
+        self.assertIn('| vpc-1 | 10.0.0.0/16 | No | Error | 0 | $0.00 | Error | Error | Error | 1 |', markdown)
+
+    def test_vpc_listing_is_retried(self):
+        """Test a throttled VPC listing is retried and a denied one fails the region."""
+        results = {'describe_vpcs': [client_error('Throttling'), self.pages['describe_vpcs']]}
+
+        def get_paginator(operation):
+            if results.get(operation):
+                self.pages[operation] = results[operation].pop(0)
+            return self.get_paginator(operation)
+
+        self.client.get_paginator.side_effect = get_paginator
+        with patch('vpc_detective.get_vpc_igw', return_value=True), patch('vpc_detective.get_natgws', return_value=0):
+            vpcs = get_vpcs(self.client, Mock())
+
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], ['vpc-1', 'vpc-2'])
+        self.assertEqual([vpc['interface_count'] for vpc in vpcs], [1, 1])
+        self.mock_sleep.assert_called_once_with(vpc_detective.RETRY_BASE_DELAY)
+
+        self.pages['describe_vpcs'] = client_error('UnauthorizedOperation')
+        self.client.get_paginator.side_effect = self.get_paginator
+        with self.assertRaises(botocore.exceptions.ClientError):
+            get_vpcs(self.client, Mock())
+        self.mock_sleep.assert_called_once()
+
+    def test_drain_reports_calls_that_fail_for_good(self):
+        """Test a retry failing with a final error is given up on and reported, not dropped."""
+        denied = Mock(side_effect=client_error('AccessDenied'))
+        throttled = Mock(side_effect=client_error('Throttling'))
+        queue = [
+            {'description': 'NAT gateways for vpc-1', 'call': denied, 'apply': Mock()},
+            {'description': 'NAT gateways for vpc-2', 'call': throttled, 'apply': Mock()}
+        ]
+
+        remaining = drain_retry_queue(queue, attempts=2)
+
+        self.assertEqual(remaining, ['NAT gateways for vpc-1', 'NAT gateways for vpc-2'])
+        self.assertEqual((denied.call_count, throttled.call_count), (1, 2))
+
+    def test_drain_stops_before_deadline(self):
+        """Test no backoff wait starts that would end after the deadline."""
+        call = Mock(side_effect=client_error('Throttling'))
+        queue = [{'description': 'NAT gateways for vpc-1', 'call': call, 'apply': Mock()}]
+
+        remaining = drain_retry_queue(queue, deadline=time.time() + 0.5)
+
+        self.assertEqual(remaining, ['NAT gateways for vpc-1'])
+        self.mock_sleep.assert_not_called()
+        call.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
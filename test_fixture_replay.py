@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit tests for recording and replaying AWS responses in VPC Detective.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import botocore.awsrequest
+import botocore.session
+import vpc_detective
+
+from vpc_detective import main
+from test_helpers import FIXTURE_DIR
+
+ACCOUNT_ID = '123456789012'
+CONFIG = {
+    'SSO': {'start_url': 'https://real.awsapps.com/start', 'region': 'us-east-1'},
+    'Accounts': [{'name': 'production', 'id': ACCOUNT_ID, 'role_name': 'ReadOnly', 'regions': ['us-east-1']}]
+}
+RESPONSES = {
+    'DescribeVpcs': {'Vpcs': [
+        {'VpcId': 'vpc-0a1', 'CidrBlock': '10.0.0.0/16', 'IsDefault': False, 'OwnerId': ACCOUNT_ID,
+         'Tags': [{'Key': 'Name', 'Value': 'Main'}]},
+        {'VpcId': 'vpc-0b2', 'CidrBlock': '10.1.0.0/16', 'IsDefault': False, 'OwnerId': '999999999999'}
+    ]},
+    'DescribeSubnets': {'Subnets': [
+        {'SubnetId': 'subnet-0a1', 'VpcId': 'vpc-0a1', 'CidrBlock': '10.0.1.0/24', 'AvailabilityZone': 'us-east-1a',
+         'AvailableIpAddressCount': 200}
+    ]},
+    'DescribeFlowLogs': {'FlowLogs': [
+        {'ResourceId': 'vpc-0a1', 'FlowLogStatus': 'ACTIVE', 'LogDestinationType': 'cloud-watch-logs',
+         'LogGroupName': '/vpc/main'}
+    ]},
+    'DescribeLogGroups': {'logGroups': [
+        {'logGroupName': '/vpc/main', 'retentionInDays': 30, 'storedBytes': 1024,
+         'arn': f'arn:aws:logs:us-east-1:{ACCOUNT_ID}:log-group:/vpc/main'}
+    ]},
+    'DescribeInternetGateways': {'InternetGateways': [{'InternetGatewayId': 'igw-0a1'}]}
+}
+
+
+class FakeAwsSession:
+    """boto3 session stand-in whose clients answer from RESPONSES without network access."""
+
+    def __init__(self):
+        self.session = botocore.session.get_session()
+
+    def client(self, service_name, region_name=None, config=None):
+        client = self.session.create_client(service_name, region_name=region_name or 'us-east-1',
+                                            aws_access_key_id='fake', aws_secret_access_key='fake')
+        client.meta.events.register('before-call.*.*', self.answer)
+        return client
+
+    def get_credentials(self):
+        return None
+
+    def answer(self, model, **kwargs):
+        response = RESPONSES.get(model.name)
+        if response is None:
+            # Every list in the output is empty
+            response = {name: [] for name, shape in model.output_shape.members.items() if shape.type_name == 'list'}
+        return botocore.awsrequest.AWSResponse('', 200, {}, None), json.loads(json.dumps(response))
+
+
+class TestFixtureReplay(unittest.TestCase):
+    """Test cases for record and replay."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        with open('account-list.json', 'w') as config_file:
+            json.dump(CONFIG, config_file)
+        self.addCleanup(setattr, vpc_detective, 'active_fixtures', None)
+        print_patcher = patch('builtins.print')
+        print_patcher.start()
+        self.addCleanup(print_patcher.stop)
+
+    def run_scan(self, *options):
+        main(list(options) + ['scan', '--snapshot-dir', 'snapshots', '--db', 'scans.db'])
+        with open('vpc-documentation.md') as report:
+            # Timings in the schedule section differ from run to run
+            content = report.read().split('## Scan Schedule')[0]
+        return [line for line in content.splitlines() if not line.startswith('*Generated on')]
+
+    def test_recorded_scan_replays_offline(self):
+        """Test a recorded scan replays from main() without SSO and gives the same report."""
+        with patch('vpc_detective.aws_sso_lib.get_boto3_session', return_value=FakeAwsSession()):
+            recorded = self.run_scan('--config', 'account-list.json', '--record', 'fixtures')
+
+        fixture_text = ''
+        for root, _, files in os.walk('fixtures'):
+            for name in files:
+                with open(os.path.join(root, name)) as fixture_file:
+                    fixture_text += fixture_file.read()
+        self.assertNotIn(ACCOUNT_ID, fixture_text)
+        self.assertNotIn('999999999999', fixture_text)
+        self.assertNotIn('real.awsapps.com', fixture_text)
+        self.assertTrue(os.path.exists(os.path.join('fixtures', '000000000001', 'us-east-1', 'ec2.json')))
+
+        with patch('vpc_detective.aws_sso_lib.get_boto3_session', side_effect=AssertionError('SSO used')):
+            replayed = self.run_scan('--replay', 'fixtures')
+
+        fake_ids = [line.replace(ACCOUNT_ID, '000000000001').replace('999999999999', '000000000002') for line in recorded]
+        self.assertEqual(replayed, fake_ids)
+        report = ''.join(replayed)
+        self.assertIn('| Main | vpc-0a1 | 10.0.0.0/16 | No | Yes |', report)
+        self.assertIn('- Unnamed (vpc-0b2), owner 000000000002: owner account not scanned', report)
+
+    def test_recorded_organization_replays_offline(self):
+        """Test the shipped fixture set scans from main() with every call answered."""
+        with patch('vpc_detective.aws_sso_lib.get_boto3_session', side_effect=AssertionError('SSO used')), \
+                patch('builtins.print') as mock_print:
+            report = ''.join(self.run_scan('--replay', FIXTURE_DIR))
+
+        printed = ' '.join(str(arg) for call in mock_print.call_args_list for arg in call.args)
+        self.assertNotIn('FixtureNotFound', printed)
+        with open(os.path.join(FIXTURE_DIR, 'account-list.json')) as config_file:
+            for account in json.load(config_file)['Accounts']:
+                self.assertIn(f"{account['name']} ({account['id']})", report)
+
+    def test_unrecorded_calls_fail_without_retries(self):
+        """Test a call missing from the fixtures fails at once with FixtureNotFound."""
+        fixtures = vpc_detective.AwsFixtures('replay', self.directory)
+        client = vpc_detective.FixtureSession(fixtures, '000000000001').client('ec2', region_name='us-east-1')
+
+        with self.assertRaises(botocore.exceptions.ClientError) as raised:
+            client.describe_vpcs()
+
+        self.assertEqual(raised.exception.response['Error']['Code'], 'FixtureNotFound')
+        self.assertFalse(vpc_detective.is_retryable_error(raised.exception))
+        self.assertNotIn('FixtureNotFound', vpc_detective.NON_RETRYABLE_ERRORS)
+
+    def test_calls_fail_once_their_recording_runs_out(self):
+        """Test a call repeated more often than it was recorded fails instead of repeating the last response."""
+        path = os.path.join(self.directory, '000000000001', 'us-east-1')
+        os.makedirs(path)
+        with open(os.path.join(path, 'ec2.json'), 'w') as fixture_file:
+            json.dump({'calls': [{'operation': 'DescribeVpcs', 'params': {}, 'status_code': 200,
+                                  'response': RESPONSES['DescribeVpcs']}]}, fixture_file)
+        fixtures = vpc_detective.AwsFixtures('replay', self.directory)
+        client = vpc_detective.FixtureSession(fixtures, '000000000001').client('ec2', region_name='us-east-1')
+
+        self.assertEqual(len(client.describe_vpcs()['Vpcs']), 2)
+        with self.assertRaises(botocore.exceptions.ClientError) as raised:
+            client.describe_vpcs()
+
+        self.assertEqual(raised.exception.response['Error']['Code'], 'FixtureNotFound')
+        self.assertIn('already replayed', raised.exception.response['Error']['Message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for flow log volume analytics in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock
+import vpc_detective
+
+from vpc_detective import get_log_group_volumes, apply_flow_log_volumes, calculate_flow_logs_summary, generate_markdown
+import test_helpers
+
+
+def make_vpc(vpc_id, log_groups):
+    return test_helpers.make_vpc(vpc_id, flow_logs_status='Enabled' if log_groups else 'Disabled',
+                                 flow_logs_destinations=['CloudWatch'] if log_groups else [], flow_logs_log_groups=log_groups)
+
+
+def fake_metric_pages(MetricDataQueries, StartTime, EndTime):
+    """Answer every query with two datapoints: bytes 1000 + 24, events 10 + 2."""
+    results = []
+    for query in MetricDataQueries:
+        values = [1000.0, 24.0] if query['MetricStat']['Metric']['MetricName'] == 'IncomingBytes' else [10.0, 2.0]
+        results.append({'Id': query['Id'], 'Values': values})
+    return [{'MetricDataResults': results}]
+
+
+class TestFlowLogVolumes(unittest.TestCase):
+    """Test cases for flow log volumes."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.cloudwatch_client = Mock()
+        self.paginator = self.cloudwatch_client.get_paginator.return_value
+        self.paginator.paginate.side_effect = fake_metric_pages
+
+    def test_queries_are_batched_and_deduplicated(self):
+        """Test each log group is queried once and calls carry at most 500 queries."""
+        log_groups = [f'/vpc/group-{index}' for index in range(300)]
+
+        volumes = get_log_group_volumes(self.cloudwatch_client, log_groups + log_groups[:50], window_hours=24)
+
+        batch_sizes = [len(call.kwargs['MetricDataQueries']) for call in self.paginator.paginate.call_args_list]
+        self.assertEqual(batch_sizes, [vpc_detective.METRIC_DATA_BATCH, 100])
+        self.assertEqual(len(volumes), 300)
+        self.assertEqual(volumes['/vpc/group-7'], {'incoming_bytes': 1024.0, 'incoming_log_events': 12.0})
+        queries = [query for call in self.paginator.paginate.call_args_list for query in call.kwargs['MetricDataQueries']]
+        self.assertEqual({query['MetricStat']['Metric']['Dimensions'][0]['Value'] for query in queries}, set(log_groups))
+        self.assertEqual(queries[0]['MetricStat']['Period'], 86400)
+
+    def test_shared_log_groups_are_split_and_rolled_up(self):
+        """Test shared log groups are counted once in the account and region totals."""
+        vpcs = [make_vpc('vpc-1', ['/vpc/shared', '/vpc/own']), make_vpc('vpc-2', ['/vpc/shared']), make_vpc('vpc-3', [])]
+        volumes = get_log_group_volumes(self.cloudwatch_client, [group for vpc in vpcs for group in vpc['flow_logs_log_groups']])
+        apply_flow_log_volumes(vpcs, volumes, 24)
+
+        self.assertEqual(vpcs[0]['flow_logs_volume'], {'window_hours': 24, 'incoming_bytes': 1536.0, 'incoming_log_events': 18.0})
+        self.assertEqual(vpcs[1]['flow_logs_volume']['incoming_bytes'], 512.0)
+        self.assertIsNone(vpcs[2]['flow_logs_volume'])
+
+        volume_rollup = calculate_flow_logs_summary(vpcs)['volumes']
+        self.assertEqual(volume_rollup['total'], {'incoming_bytes': 2048.0, 'incoming_log_events': 24.0})
+        self.assertEqual(volume_rollup['by_account']['acct (111111111111)']['incoming_bytes'], 2048.0)
+        self.assertEqual(volume_rollup['by_region']['us-east-1']['incoming_log_events'], 24.0)
+
+        markdown = generate_markdown(vpcs, [{'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'}])
+        self.assertIn('### Flow Log Volume (last 24 hours)', markdown)
+        self.assertIn('| acct (111111111111) | us-east-1 | vpc-1 | /vpc/shared, /vpc/own | 0.00 GB | 18 |', markdown)
+
+    def test_metric_errors_mark_volumes(self):
+        """Test VPCs with CloudWatch destinations show Error when metrics cannot be read."""
+        vpcs = [make_vpc('vpc-1', ['/vpc/own']), make_vpc('vpc-2', [])]
+        apply_flow_log_volumes(vpcs, None)
+
+        self.assertEqual([vpc['flow_logs_volume'] for vpc in vpcs], ['Error', None])
+        self.assertEqual(calculate_flow_logs_summary(vpcs)['volumes']['window_hours'], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,18 +9,25 @@ error handling and data processing.
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import botocore.exceptions
-import sys
-import importlib.util
-spec = importlib.util.spec_from_file_location("vpc_detective", "vpc-detective.py")
-vpc_detective = importlib.util.module_from_spec(spec)
-sys.modules["vpc_detective"] = vpc_detective
-spec.loader.exec_module(vpc_detective)
+import vpc_detective
 
-from vpc_detective import get_vpc_flow_logs, get_cloudwatch_retention, calculate_flow_logs_summary
+from vpc_detective import (
+    get_vpc_flow_logs,
+    get_cloudwatch_retention,
+    calculate_flow_logs_summary,
+    get_flow_log_coverage,
+    apply_flow_log_fields
+)
+from test_helpers import replay_vpcs
 
 
 class TestFlowLogsDetection(unittest.TestCase):
-    """Test cases for Flow Logs detection functionality."""
+    """Test cases for Flow Logs detection, replayed from the recorded organization in fixtures/org."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Collect the sandbox account's scenario VPCs once."""
+        cls.vpcs = replay_vpcs()
 
     def setUp(self):
         """Set up test fixtures."""
@@ -28,145 +35,86 @@ class TestFlowLogsDetection(unittest.TestCase):
         self.mock_logs_client = Mock()
         self.vpc_id = 'vpc-12345678'
 
+    def flow_logs(self, vpc):
+        return {
+            'status': vpc['flow_logs_status'],
+            'destinations': vpc['flow_logs_destinations'],
+            'retention_days': vpc['flow_logs_retention'],
+            'log_groups': vpc['flow_logs_log_groups'],
+            'destination_arns': vpc['flow_logs_destination_arns']
+        }
+
     def test_get_vpc_flow_logs_disabled(self):
         """Test VPC with no Flow Logs configured."""
-        # Mock paginator with no flow logs
-        mock_paginator = Mock()
-        mock_page_iterator = [{'FlowLogs': []}]
-        mock_paginator.paginate.return_value = mock_page_iterator
-        self.mock_ec2_client.get_paginator.return_value = mock_paginator
-
-        result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
-
         expected = {
             'status': 'Disabled',
             'destinations': [],
-            'retention_days': 'N/A'
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': []
         }
-        self.assertEqual(result, expected)
+        self.assertEqual(self.flow_logs(self.vpcs['flow-logs-disabled']), expected)
 
     def test_get_vpc_flow_logs_single_cloudwatch(self):
         """Test VPC with single Flow Logs to CloudWatch."""
-        # Mock flow logs response
-        flow_log = {
-            'FlowLogStatus': 'ACTIVE',
-            'LogDestinationType': 'cloud-watch-logs',
-            'LogGroupName': '/aws/vpc/flowlogs'
-        }
-        mock_paginator = Mock()
-        mock_page_iterator = [{'FlowLogs': [flow_log]}]
-        mock_paginator.paginate.return_value = mock_page_iterator
-        self.mock_ec2_client.get_paginator.return_value = mock_paginator
-
-        # Mock CloudWatch logs response
-        self.mock_logs_client.describe_log_groups.return_value = {
-            'logGroups': [{
-                'logGroupName': '/aws/vpc/flowlogs',
-                'retentionInDays': 30
-            }]
-        }
-
-        result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
-
         expected = {
             'status': 'Enabled',
             'destinations': ['CloudWatch'],
-            'retention_days': '30 days'
+            'retention_days': '30 days',
+            'log_groups': ['/aws/vpc/flowlogs'],
+            'destination_arns': []
         }
-        self.assertEqual(result, expected)
+        self.assertEqual(self.flow_logs(self.vpcs['flow-logs-cloudwatch']), expected)
 
     def test_get_vpc_flow_logs_single_s3(self):
         """Test VPC with single Flow Logs to S3."""
-        flow_log = {
-            'FlowLogStatus': 'ACTIVE',
-            'LogDestinationType': 's3'
-        }
-        mock_paginator = Mock()
-        mock_page_iterator = [{'FlowLogs': [flow_log]}]
-        mock_paginator.paginate.return_value = mock_page_iterator
-        self.mock_ec2_client.get_paginator.return_value = mock_paginator
-
-        result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
-
         expected = {
             'status': 'Enabled',
             'destinations': ['S3'],
-            'retention_days': 'N/A'
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': ['arn:aws:s3:::flow-log-bucket']
         }
-        self.assertEqual(result, expected)
+        self.assertEqual(self.flow_logs(self.vpcs['flow-logs-s3']), expected)
 
     def test_get_vpc_flow_logs_single_kinesis(self):
         """Test VPC with single Flow Logs to Kinesis."""
-        flow_log = {
-            'FlowLogStatus': 'ACTIVE',
-            'LogDestinationType': 'kinesis-data-firehose'
-        }
-        mock_paginator = Mock()
-        mock_page_iterator = [{'FlowLogs': [flow_log]}]
-        mock_paginator.paginate.return_value = mock_page_iterator
-        self.mock_ec2_client.get_paginator.return_value = mock_paginator
-
-        result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
-
         expected = {
             'status': 'Enabled',
             'destinations': ['Kinesis'],
-            'retention_days': 'N/A'
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': ['arn:aws:firehose:us-east-1:000000000001:deliverystream/flow-log-stream']
         }
-        self.assertEqual(result, expected)
+        self.assertEqual(self.flow_logs(self.vpcs['flow-logs-kinesis']), expected)
 
     def test_get_vpc_flow_logs_multiple_destinations(self):
         """Test VPC with multiple Flow Logs to different destinations."""
-        flow_logs = [
-            {
-                'FlowLogStatus': 'ACTIVE',
-                'LogDestinationType': 'cloud-watch-logs',
-                'LogGroupName': '/aws/vpc/flowlogs'
-            },
-            {
-                'FlowLogStatus': 'ACTIVE',
-                'LogDestinationType': 's3'
-            }
-        ]
-        mock_paginator = Mock()
-        mock_page_iterator = [{'FlowLogs': flow_logs}]
-        mock_paginator.paginate.return_value = mock_page_iterator
-        self.mock_ec2_client.get_paginator.return_value = mock_paginator
-
-        # Mock CloudWatch logs response
-        self.mock_logs_client.describe_log_groups.return_value = {
-            'logGroups': [{
-                'logGroupName': '/aws/vpc/flowlogs',
-                'retentionInDays': 90
-            }]
-        }
-
-        result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
-
         expected = {
             'status': 'Multiple',
             'destinations': ['CloudWatch', 'S3'],
-            'retention_days': '90 days'
+            'retention_days': '90 days',
+            'log_groups': ['/aws/vpc/flowlogs-90'],
+            'destination_arns': ['arn:aws:s3:::flow-log-bucket']
         }
-        self.assertEqual(result, expected)
+        self.assertEqual(self.flow_logs(self.vpcs['flow-logs-multiple']), expected)
 
     def test_get_vpc_flow_logs_access_denied(self):
         """Test Flow Logs API access denied error handling."""
-        error = botocore.exceptions.ClientError(
-            {'Error': {'Code': 'AccessDenied', 'Message': 'Access denied'}},
-            'DescribeFlowLogs'
-        )
-        self.mock_ec2_client.get_paginator.side_effect = error
-
+        # legacy-ops denies ec2:DescribeFlowLogs
         with patch('builtins.print') as mock_print:
-            result = get_vpc_flow_logs(self.mock_ec2_client, self.mock_logs_client, self.vpc_id)
+            vpcs = replay_vpcs('000000000006')
 
         expected = {
             'status': 'Error',
             'destinations': [],
-            'retention_days': 'N/A'
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': []
         }
-        self.assertEqual(result, expected)
+        self.assertTrue(vpcs)
+        for vpc in vpcs.values():
+            self.assertEqual(self.flow_logs(vpc), expected)
         mock_print.assert_called()
 
     def test_get_vpc_flow_logs_other_error(self):
@@ -183,7 +131,9 @@ class TestFlowLogsDetection(unittest.TestCase):
         expected = {
             'status': 'Error',
             'destinations': [],
-            'retention_days': 'N/A'
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': []
         }
         self.assertEqual(result, expected)
         mock_print.assert_called()
@@ -260,6 +210,51 @@ class TestCloudWatchRetention(unittest.TestCase):
         mock_print.assert_called()
 
 
+class TestFlowLogCoverage(unittest.TestCase):
+    """Test cases for flow log coverage across VPC, subnet and ENI flow logs."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.subnets = [{'SubnetId': 'subnet-a'}, {'SubnetId': 'subnet-b'}]
+        self.interfaces = [
+            {'NetworkInterfaceId': 'eni-1', 'SubnetId': 'subnet-b'},
+            {'NetworkInterfaceId': 'eni-2', 'SubnetId': 'subnet-b'}
+        ]
+
+    def make_flow_log(self, resource_id):
+        return {'ResourceId': resource_id, 'FlowLogStatus': 'ACTIVE', 'LogDestinationType': 's3',
+                'LogDestination': f'arn:aws:s3:::{resource_id}-logs'}
+
+    def coverage(self, *resource_ids):
+        flow_logs_by_resource = {resource_id: [self.make_flow_log(resource_id)] for resource_id in resource_ids}
+        result = get_flow_log_coverage('vpc-1', flow_logs_by_resource, self.subnets, self.interfaces)
+        return result['coverage'], result['percentage'], len(result['flow_logs'])
+
+    def test_coverage_levels(self):
+        """Test VPC, subnet and ENI flow logs are attributed and rated."""
+        self.assertEqual(self.coverage('vpc-1'), ('full', 100.0, 1))
+        self.assertEqual(self.coverage('subnet-a', 'eni-1', 'eni-2'), ('full', 100.0, 3))
+        self.assertEqual(self.coverage('subnet-b'), ('partial', 50.0, 1))
+        self.assertEqual(self.coverage('eni-1'), ('partial', 0.0, 1))
+        self.assertEqual(self.coverage('vpc-2', 'subnet-c', 'eni-3'), ('none', 0.0, 0))
+
+    def test_subnet_flow_logs_enable_the_vpc(self):
+        """Test a VPC with only subnet flow logs is no longer reported as Disabled."""
+        vpc = {'vpc_id': 'vpc-1'}
+        apply_flow_log_fields([vpc], {'subnet-a': [self.make_flow_log('subnet-a')]},
+                              {'vpc-1': self.subnets}, {'vpc-1': self.interfaces}, Mock(), {})
+
+        self.assertEqual(vpc['flow_logs_status'], 'Enabled')
+        self.assertEqual((vpc['flow_logs_coverage'], vpc['flow_logs_coverage_percentage']), ('partial', 50.0))
+        self.assertEqual(vpc['flow_logs_destination_arns'], ['arn:aws:s3:::subnet-a-logs'])
+
+        vpc.update(account_name='acct', account_id='111111111111', region='us-east-1')
+        self.assertEqual(calculate_flow_logs_summary([vpc])['coverage_levels'], {'full': 0, 'partial': 1, 'none': 0})
+
+        apply_flow_log_fields([vpc], None, None, None, Mock(), {})
+        self.assertEqual((vpc['flow_logs_status'], vpc['flow_logs_coverage']), ('Error', None))
+
+
 class TestFlowLogsSummary(unittest.TestCase):
     """Test cases for Flow Logs summary calculations."""
 
@@ -272,7 +267,29 @@ class TestFlowLogsSummary(unittest.TestCase):
             'vpcs_with_flow_logs': 0,
             'vpcs_without_flow_logs': 0,
             'coverage_percentage': 0.0,
-            'by_account': {}
+            'by_account': {},
+            'endpoints': {
+                'gateway_endpoints': 0,
+                'interface_endpoints': 0,
+                'by_service': {},
+                'missing_s3_gateway_with_natgw': []
+            },
+            'costs': {
+                'total': 0.0,
+                'by_account': {},
+                'by_region': {}
+            },
+            'coverage_levels': {'full': 0, 'partial': 0, 'none': 0},
+            'destination_health': {
+                'vpcs_with_unhealthy_destinations': 0,
+                'unhealthy_destinations': {}
+            },
+            'volumes': {
+                'window_hours': None,
+                'total': {'incoming_bytes': 0.0, 'incoming_log_events': 0.0},
+                'by_account': {},
+                'by_region': {}
+            }
         }
         self.assertEqual(result, expected)
 
@@ -376,6 +393,21 @@ class TestFlowLogsSummary(unittest.TestCase):
         self.assertEqual(result['by_account'][prod_key]['percentage'], 100.0)
         self.assertEqual(result['by_account'][dev_key]['percentage'], 0.0)
 
+    def test_calculate_flow_logs_summary_counts_full_coverage_only(self):
+        """Test a VPC with only ENI or subnet flow logs is not counted as covered."""
+        vpc_data = [
+            {'account_name': 'prod', 'account_id': '123456789012', 'flow_logs_status': 'Enabled', 'flow_logs_coverage': 'full'},
+            {'account_name': 'prod', 'account_id': '123456789012', 'flow_logs_status': 'Enabled', 'flow_logs_coverage': 'partial'},
+            {'account_name': 'prod', 'account_id': '123456789012', 'flow_logs_status': 'Enabled', 'flow_logs_coverage': 'none'}
+        ]
+
+        result = calculate_flow_logs_summary(vpc_data)
+
+        self.assertEqual(result['vpcs_with_flow_logs'], 1)
+        self.assertAlmostEqual(result['coverage_percentage'], 33.3, places=1)
+        self.assertEqual(result['by_account']['prod (123456789012)']['enabled'], 1)
+        self.assertEqual(result['coverage_levels'], {'full': 1, 'partial': 1, 'none': 1})
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
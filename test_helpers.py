@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Shared record factories and fakes for the VPC Detective unit tests.
+"""
+
+import os
+import vpc_detective
+
+# Recorded scan of the synthetic organization built by fixtures/synthetic_org.py
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'org')
+SANDBOX_ACCOUNT_ID = '000000000001'
+
+
+def make_vpc(vpc_id, region='us-east-1', account_id='111111111111', account_name='acct', **fields):
+    """Build a VPC record as scan_region returns it; keyword arguments replace or add fields."""
+    vpc = {
+        'vpc_id': vpc_id, 'vpc_name': vpc_id, 'vpc_cidr': '10.0.0.0/16', 'is_default': False,
+        'region': region, 'account_name': account_name, 'account_id': account_id,
+        'igw_present': False, 'natgw_count': 0, 'subnet_count': 1, 'interface_count': 1,
+        'flow_logs_status': 'Enabled', 'flow_logs_destinations': ['S3'], 'flow_logs_retention': 'N/A',
+        'flow_logs_log_groups': []
+    }
+    vpc.update(fields)
+    return vpc
+
+
+def fake_scan_region(session, account_name, account_id, region, **kwargs):
+    """Stand-in for scan_region returning one VPC named after its account and region."""
+    return [make_vpc(f"vpc-{account_id}-{region}", region, account_id, account_name)]
+
+
+def replay_vpcs(account_id=SANDBOX_ACCOUNT_ID, region='us-east-1'):
+    """Collect one recorded account/region of fixtures/org with get_vpcs, keyed by VPC name."""
+    session = vpc_detective.FixtureSession(vpc_detective.AwsFixtures('replay', FIXTURE_DIR), account_id)
+    vpcs = vpc_detective.get_vpcs(session.client('ec2', region_name=region), session.client('logs', region_name=region),
+                                  account_id=account_id)
+    return {vpc['vpc_name']: vpc for vpc in vpcs}
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the HTML report in VPC Detective.
+"""
+
+import json
+import os
+import re
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from vpc_detective import format_vpc_cells, main, markdown_to_html, save_scan, stream_html_report
+import test_helpers
+
+
+# Fields the report tables below expect
+REPORT_FIELDS = {
+    'igw_present': True, 'subnet_count': 2, 'interface_count': 3, 'flow_logs_destinations': ['CloudWatch'],
+    'flow_logs_retention': '30 days'
+}
+
+
+def make_vpc(vpc_id, region, account_id='111111111111', account_name='prod'):
+    return test_helpers.make_vpc(vpc_id, region, account_id, account_name, **REPORT_FIELDS, vpc_name=vpc_id.upper())
+
+
+ACCOUNT_REGIONS = [
+    {'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1'},
+    {'account_name': 'prod', 'account_id': '111111111111', 'region': 'eu-west-1'}
+]
+
+
+def load_table(document):
+    """Decode the embedded columnar data into rows."""
+    data = json.loads(re.search(r'<script id="vpc-data" type="application/json">(.*?)</script>', document, re.S).group(1))
+    columns = [[column['values'][code] for code in column['codes']] if isinstance(column, dict) else column
+               for column in data['data']]
+    return data, [list(row) for row in zip(*columns)]
+
+
+class TestHtmlReport(unittest.TestCase):
+    """Test cases for the HTML report."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.vpcs = [make_vpc(f'vpc-{index}', 'us-east-1' if index % 3 else 'eu-west-1') for index in range(12)]
+        self.vpcs[0]['vpc_name'] = '</script><b>odd</b>'
+
+    def test_report_embeds_columnar_rows(self):
+        """Test every VPC is embedded as a table row, repeated values are coded and no value can end the script."""
+        with patch('vpc_detective.HTML_CHUNK_ROWS', 5):
+            pieces = list(stream_html_report(self.vpcs, ACCOUNT_REGIONS))
+        document = ''.join(pieces)
+
+        data, rows = load_table(document)
+        self.assertEqual(data['rows'], 12)
+        self.assertEqual(data['columns'][:3], ['Account', 'Region', 'VPC Name'])
+        self.assertEqual(rows, [['prod (111111111111)', vpc['region']] + format_vpc_cells(vpc) for vpc in self.vpcs])
+        self.assertEqual(data['data'][1]['values'], ['eu-west-1', 'us-east-1'])
+        self.assertIsInstance(data['data'][3], list)
+        self.assertEqual(document.count('</script>'), 2)
+
+        # Written a chunk of rows at a time rather than as one string
+        self.assertGreater(len(pieces), 20)
+        self.assertLess(max(len(piece) for piece in pieces), len(document) / 2)
+
+    def test_summary_sections(self):
+        """Test the markdown report's summary sections and the footer are converted to HTML."""
+        document = ''.join(stream_html_report(self.vpcs, ACCOUNT_REGIONS, footer='## Scan Schedule\n\n*Done in 3s.*\n'))
+
+        self.assertIn('<h2>Flow Logs Coverage Summary</h2>', document)
+        self.assertIn('<li><strong>Total VPCs</strong>: 12</li>', document)
+        self.assertIn('<h2>Scan Schedule</h2>\n<p><em>Done in 3s.</em></p>', document)
+
+        converted = ''.join(markdown_to_html('| A | B |\n|---|---|\n| 1 | <2> |\n\n> note\n- item\n'))
+        self.assertEqual(converted, '<table><thead><tr><th>A</th><th>B</th></tr></thead><tbody>\n<tr><td>1</td><td>&lt;2&gt;</td></tr>\n'
+                                    '</tbody></table>\n<blockquote>\n<p>note</p>\n</blockquote>\n<ul>\n<li>item</li>\n</ul>\n')
+
+    def test_aws_names_are_not_markup(self):
+        """Test link or emphasis syntax in AWS names comes out as text."""
+        self.vpcs[1]['subnets'] = [{
+            'subnet_id': 'subnet-1', 'name': '[docs](javascript:alert(document.domain)) *x*', 'az': 'us-east-1a',
+            'cidr': '10.0.0.0/24', 'available_ips': 1, 'usable_ips': 251, 'utilization': 99.6, 'hot': True
+        }]
+        document = ''.join(stream_html_report(self.vpcs, ACCOUNT_REGIONS))
+
+        self.assertIn('<td>[docs](javascript:alert(document.domain)) *x* (subnet-1)</td>', document)
+        self.assertNotIn('<a ', document)
+        self.assertEqual(''.join(markdown_to_html('- **[a](javascript:x)**')), '<ul>\n<li><strong>[a](javascript:x)</strong></li>\n</ul>\n')
+
+    def test_summary_is_converted_by_section(self):
+        """Test the summary is generated and converted one section at a time."""
+        with patch('vpc_detective.markdown_to_html', wraps=markdown_to_html) as mock_convert:
+            ''.join(stream_html_report(self.vpcs, ACCOUNT_REGIONS))
+
+        sections = [call.args[0] for call in mock_convert.call_args_list]
+        self.assertGreater(len(sections), 5)
+        self.assertTrue(sections[1].startswith('## Flow Logs Coverage Summary'))
+
+    def test_render_command_html(self):
+        """Test render --html writes the HTML report from the result store."""
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, 'results.db')
+            output = os.path.join(directory, 'report.html')
+            save_scan(self.vpcs, ACCOUNT_REGIONS, db_path)
+            with patch('builtins.print'):
+                main(['render', '--db', db_path, '--html', output])
+            with open(output, encoding='utf-8') as f:
+                document = f.read()
+
+        self.assertTrue(document.startswith('<!DOCTYPE html>'))
+        self.assertEqual(len(load_table(document)[1]), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the importable scan API and its sinks in VPC Detective.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from vpc_detective import CallbackSink, JsonSink, run_scan, scan
+
+CONFIG = {'SSO': {}, 'Accounts': [
+    {'name': 'prod', 'id': '111111111111', 'role_name': 'ReadOnly', 'regions': ['us-east-1', 'eu-west-1']},
+    {'name': 'dev', 'id': '222222222222', 'role_name': 'ReadOnly', 'region': 'us-west-2'}
+]}
+
+
+class TestLibraryApi(unittest.TestCase):
+    """Test cases for the scan generator and sinks."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.scanned = []
+        self.release = threading.Event()
+        self.hold = threading.Event()
+        self.hold.set()
+        for target, kwargs in (('vpc_detective.get_account_session', {'return_value': Mock()}),
+                               ('vpc_detective.scan_region', {'side_effect': self.fake_scan_region}),
+                               ('builtins.print', {})):
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_scan_region(self, session, account_name, account_id, region, **kwargs):
+        self.scanned.append(region)
+        # us-east-1 finishes well after eu-west-1
+        if region == 'us-east-1':
+            self.release.wait(5)
+            time.sleep(0.2)
+        if region == 'eu-west-1':
+            self.release.set()
+            self.hold.wait(5)
+        return [{'vpc_id': f"vpc-{region}", 'region': region, 'account_id': account_id, 'account_name': account_name}]
+
+    def test_scan_yields_regions_as_they_complete(self):
+        """Test results arrive in completion order and stopping early skips regions not started."""
+        results = list(scan(CONFIG, workers=3))
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1][0]['region'], 'us-east-1')
+        self.assertEqual(results[-1][1][0]['vpc_id'], 'vpc-us-east-1')
+        self.assertEqual(results[-1][0]['scan_status'], 'complete')
+
+        self.scanned.clear()
+        self.hold.clear()
+        generator = scan(CONFIG, workers=1)
+        first_account_region, _ = next(generator)
+        threading.Timer(0.1, self.hold.set).start()
+        generator.close()
+        self.assertEqual(first_account_region['region'], 'us-east-1')
+        self.assertNotIn('us-west-2', self.scanned)
+
+    def test_run_scan_feeds_sinks(self):
+        """Test the JSON sink streams records and every sink sees the whole scan."""
+        received = []
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'vpcs.json')
+            json_sink = JsonSink(path)
+            closing_sink = Mock()
+
+            def on_region(account_region, vpc_list):
+                received.append(account_region['region'])
+                # Records already reported are in the file before the scan ends
+                json_sink.file.flush()
+                with open(path) as partial:
+                    self.assertIn(vpc_list[0]['vpc_id'], partial.read())
+
+            vpcs, account_regions = run_scan(CONFIG, [json_sink, CallbackSink(on_region), closing_sink], workers=3)
+            with open(path) as output:
+                document = json.load(output)
+
+        self.assertEqual(sorted(received), ['eu-west-1', 'us-east-1', 'us-west-2'])
+        self.assertEqual(received[-1], 'us-east-1')
+        self.assertEqual([ar['region'] for ar in account_regions], ['us-east-1', 'eu-west-1', 'us-west-2'])
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], ['vpc-us-east-1', 'vpc-eu-west-1', 'vpc-us-west-2'])
+        self.assertEqual(sorted(vpc['vpc_id'] for vpc in document['vpcs']), sorted(vpc['vpc_id'] for vpc in vpcs))
+        self.assertEqual([ar['region'] for ar in document['account_regions']], ['us-east-1', 'eu-west-1', 'us-west-2'])
+        closing_sink.close.assert_called_once_with(vpcs, account_regions)
+        self.assertEqual(closing_sink.add.call_count, 3)
+
+    def test_sinks_are_closed_when_the_scan_fails(self):
+        """Test a failing scan still leaves valid JSON, with the regions not scanned marked as errors."""
+        def failing_scan(config, **options):
+            yield ({'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1', 'scan_status': 'complete'},
+                   [{'vpc_id': 'vpc-us-east-1', 'account_id': '111111111111'}])
+            raise RuntimeError('SSO token expired')
+
+        with tempfile.TemporaryDirectory() as directory, patch('vpc_detective.scan', side_effect=failing_scan):
+            path = os.path.join(directory, 'vpcs.json')
+            with self.assertRaises(RuntimeError):
+                run_scan(CONFIG, [JsonSink(path)], workers=1)
+            with open(path) as output:
+                document = json.load(output)
+
+        self.assertEqual([vpc['vpc_id'] for vpc in document['vpcs']], ['vpc-us-east-1'])
+        self.assertEqual([ar.get('scan_status') for ar in document['account_regions']], ['complete', 'error', 'error'])
+        self.assertIn('SSO token expired', document['account_regions'][1]['scan_note'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Unit tests for network ACL collection and rule evaluation in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import botocore.exceptions
+import vpc_detective
+
+from vpc_detective import (
+    get_region_network_acls,
+    compile_network_acl,
+    evaluate_network_acl,
+    find_open_acl_rules,
+    analyze_vpc_network_acls
+)
+
+
+def make_entry(rule_number, action, cidr='0.0.0.0/0', protocol='-1', ports=None, egress=False):
+    entry = {
+        'RuleNumber': rule_number,
+        'RuleAction': action,
+        'CidrBlock': cidr,
+        'Protocol': protocol,
+        'Egress': egress
+    }
+    if ports:
+        entry['PortRange'] = {'From': ports[0], 'To': ports[1]}
+    return entry
+
+
+class TestNetworkAclEvaluation(unittest.TestCase):
+    """Test cases for network ACL compilation and evaluation."""
+
+    def test_rules_evaluated_in_rule_number_order(self):
+        """Test that the lowest matching rule number decides the outcome."""
+        network_acl = {'Entries': [
+            make_entry(200, 'allow', protocol='6', ports=(22, 22)),
+            make_entry(100, 'deny', cidr='203.0.113.0/24', protocol='6', ports=(22, 22)),
+            make_entry(32767, 'deny')
+        ]}
+        compiled = compile_network_acl(network_acl)
+
+        self.assertEqual([rule[0] for rule in compiled['ingress']], [100, 200, 32767])
+        self.assertEqual(evaluate_network_acl(compiled, 'ingress', '203.0.113.10', '6', 22), 'deny')
+        self.assertEqual(evaluate_network_acl(compiled, 'ingress', '198.51.100.10', '6', 22), 'allow')
+        self.assertEqual(evaluate_network_acl(compiled, 'ingress', '198.51.100.10', '6', 443), 'deny')
+        self.assertEqual(evaluate_network_acl(compiled, 'egress', '198.51.100.10', '6', 22), 'deny')
+
+    def test_open_allow_shadowed_by_earlier_deny(self):
+        """Test open allows are reported unless earlier denies cover every port they allow."""
+        compiled = compile_network_acl({'Entries': [
+            make_entry(90, 'deny', protocol='6', ports=(0, 1024)),
+            make_entry(100, 'deny', protocol='6', ports=(1025, 65535)),
+            make_entry(110, 'allow', protocol='6', ports=(443, 443)),
+            make_entry(120, 'allow', protocol='6', ports=(0, 65535)),
+            make_entry(130, 'allow', protocol='17', ports=(53, 53)),
+            make_entry(140, 'allow', protocol='-1')
+        ]})
+
+        self.assertEqual(find_open_acl_rules(compiled), [130, 140])
+
+        compiled = compile_network_acl({'Entries': [
+            make_entry(100, 'deny', protocol='-1'),
+            make_entry(110, 'allow', protocol='-1')
+        ]})
+        self.assertEqual(find_open_acl_rules(compiled), [])
+
+        # Denies around a single port leave it reachable
+        compiled = compile_network_acl({'Entries': [
+            make_entry(100, 'deny', protocol='6', ports=(0, 442)),
+            make_entry(105, 'deny', protocol='6', ports=(444, 65535)),
+            make_entry(110, 'allow', protocol='6', ports=(0, 65535))
+        ]})
+        self.assertEqual(find_open_acl_rules(compiled), [110])
+
+    def test_deny_after_allow_does_not_shadow(self):
+        """Test a later deny does not hide an earlier open allow, and private ranges are not open."""
+        compiled = compile_network_acl({'Entries': [
+            make_entry(100, 'allow', cidr='::/0', protocol='6', ports=(22, 22)),
+            make_entry(32767, 'deny')
+        ]})
+        private = compile_network_acl({'Entries': [make_entry(100, 'allow', cidr='10.0.0.0/8'), make_entry(32767, 'deny')]})
+
+        self.assertEqual(find_open_acl_rules(compiled), [100])
+        self.assertEqual(find_open_acl_rules(private), [])
+
+    def test_analyze_vpc_network_acls(self):
+        """Test custom counts, associations and open custom NACLs, with default NACLs left out."""
+        network_acls = {'vpc-1': [
+            {'NetworkAclId': 'acl-default', 'VpcId': 'vpc-1', 'IsDefault': True,
+             'Associations': [{'SubnetId': 'subnet-1'}],
+             'Entries': [make_entry(100, 'allow'), make_entry(32767, 'deny')]},
+            {'NetworkAclId': 'acl-custom', 'VpcId': 'vpc-1', 'IsDefault': False,
+             'Associations': [{'SubnetId': 'subnet-2'}, {'SubnetId': 'subnet-3'}],
+             'Entries': [make_entry(100, 'allow', cidr='10.0.0.0/8'), make_entry(32767, 'deny')]},
+            {'NetworkAclId': 'acl-open', 'VpcId': 'vpc-1', 'IsDefault': False, 'Associations': [],
+             'Entries': [make_entry(100, 'allow', protocol='6', ports=(3389, 3389)), make_entry(32767, 'deny')]}
+        ]}
+        compiled_acls = {}
+
+        result = analyze_vpc_network_acls('vpc-1', network_acls, compiled_acls)
+
+        self.assertEqual(result, {
+            'custom_count': 2,
+            'subnet_associations': 2,
+            'open': ['acl-open']
+        })
+        self.assertEqual(set(compiled_acls), {'acl-custom', 'acl-open'})
+
+    def test_analyze_without_network_acl_data(self):
+        """Test VPCs are marked Error when NACLs could not be read."""
+        result = analyze_vpc_network_acls('vpc-1', None, {})
+
+        self.assertEqual(result['custom_count'], 'Error')
+        self.assertEqual(result['open'], [])
+
+    def test_get_region_network_acls(self):
+        """Test NACLs are paginated once and grouped by VPC."""
+        client = Mock()
+        paginator = Mock()
+        paginator.paginate.return_value = [{'NetworkAcls': [
+            {'NetworkAclId': 'acl-1', 'VpcId': 'vpc-1'},
+            {'NetworkAclId': 'acl-2', 'VpcId': 'vpc-2'}
+        ]}]
+        client.get_paginator.return_value = paginator
+
+        result = get_region_network_acls(client)
+
+        client.get_paginator.assert_called_once_with('describe_network_acls')
+        self.assertEqual(len(result['vpc-1']), 1)
+        self.assertEqual(len(result['vpc-2']), 1)
+
+    def test_get_region_network_acls_access_denied(self):
+        """Test access denied is raised for the caller's retry queue to handle."""
+        client = Mock()
+        client.get_paginator.side_effect = botocore.exceptions.ClientError(
+            {'Error': {'Code': 'UnauthorizedOperation', 'Message': 'Denied'}},
+            'DescribeNetworkAcls'
+        )
+
+        with self.assertRaises(botocore.exceptions.ClientError):
+            get_region_network_acls(client)
+
+
+if __name__ == '__main__':
+    unittest.main()
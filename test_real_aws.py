@@ -12,11 +12,7 @@ import os
 from datetime import datetime
 
 # Import the VPC Detective functions
-import importlib.util
-spec = importlib.util.spec_from_file_location("vpc_detective", "vpc-detective.py")
-vpc_detective = importlib.util.module_from_spec(spec)
-sys.modules["vpc_detective"] = vpc_detective
-spec.loader.exec_module(vpc_detective)
+import vpc_detective
 
 from vpc_detective import get_vpcs, generate_markdown
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sharded (one file per account) reports in VPC Detective.
+"""
+
+import concurrent.futures
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from vpc_detective import generate_markdown, main, save_scan, write_sharded_report
+import test_helpers
+
+
+# Fields the report tables below expect
+REPORT_FIELDS = {
+    'igw_present': True, 'subnet_count': 2, 'interface_count': 3, 'flow_logs_destinations': ['CloudWatch'],
+    'flow_logs_retention': '30 days'
+}
+
+
+def make_vpc(vpc_id, region, account_id, account_name, interface_count=3):
+    return test_helpers.make_vpc(vpc_id, region, account_id, account_name, **dict(REPORT_FIELDS, interface_count=interface_count),
+                                 vpc_name=vpc_id.upper())
+
+
+ACCOUNT_REGIONS = [
+    {'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1'},
+    {'account_name': 'prod', 'account_id': '111111111111', 'region': 'eu-west-1', 'scan_status': 'timed_out',
+     'scan_note': 'Scan deadline reached'},
+    {'account_name': 'dev', 'account_id': '222222222222', 'region': 'us-east-1'}
+]
+
+
+class TestReportShards(unittest.TestCase):
+    """Test cases for sharded reports."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.vpcs = [
+            make_vpc('vpc-prod', 'us-east-1', '111111111111', 'prod'),
+            make_vpc('vpc-dev', 'us-east-1', '222222222222', 'dev')
+        ]
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name)) as f:
+            return f.read()
+
+    def test_account_files_and_index(self):
+        """Test each account gets its own file with the single-file report's tables, and the index links them."""
+        counts = write_sharded_report(self.vpcs, ACCOUNT_REGIONS, self.directory, footer='## Footer\n')
+
+        self.assertEqual(counts, {'written': 2, 'unchanged': 0, 'removed': 0})
+        prod = self.read('account-111111111111.md')
+        self.assertIn('## Account: prod (111111111111)', prod)
+        self.assertIn('| VPC-PROD | vpc-prod |', prod)
+        self.assertIn('**Timed out**: Scan deadline reached', prod)
+        self.assertNotIn('vpc-dev', prod)
+        self.assertIn(prod.split('\n\n', 1)[1], generate_markdown(self.vpcs, ACCOUNT_REGIONS))
+
+        index = self.read('index.md')
+        self.assertIn('| prod (111111111111) | 2 | 1 | 1 | [account-111111111111.md](account-111111111111.md) |', index)
+        self.assertIn('## Flow Logs Coverage Summary', index)
+        self.assertIn('- **dev (222222222222)**: 1/1 VPCs (100.0%)', index)
+        self.assertTrue(index.endswith('## Footer\n'))
+        self.assertNotIn('| VPC-PROD |', index)
+
+    def test_only_changed_accounts_are_rewritten(self):
+        """Test an account file is rewritten only when its content changes and dropped accounts are removed."""
+        write_sharded_report(self.vpcs, ACCOUNT_REGIONS, self.directory)
+        prod_path = os.path.join(self.directory, 'account-111111111111.md')
+        dev_path = os.path.join(self.directory, 'account-222222222222.md')
+        os.utime(prod_path, (0, 0))
+        os.utime(dev_path, (0, 0))
+
+        self.vpcs[1]['interface_count'] = 7
+        counts = write_sharded_report(self.vpcs, ACCOUNT_REGIONS, self.directory)
+
+        self.assertEqual(counts, {'written': 1, 'unchanged': 1, 'removed': 0})
+        self.assertEqual(os.path.getmtime(prod_path), 0)
+        self.assertNotEqual(os.path.getmtime(dev_path), 0)
+        self.assertIn('| 7 |', self.read('account-222222222222.md'))
+
+        # A missing file is written even though the manifest knows its hash
+        os.remove(prod_path)
+        counts = write_sharded_report(self.vpcs[:1], ACCOUNT_REGIONS[:2], self.directory)
+        self.assertEqual(counts, {'written': 1, 'unchanged': 0, 'removed': 1})
+        self.assertFalse(os.path.exists(dev_path))
+        with open(os.path.join(self.directory, 'shards.json')) as f:
+            self.assertEqual(list(json.load(f)), ['account-111111111111.md'])
+
+    def test_account_files_are_rendered_in_worker_processes(self):
+        """Test account chunks rendered in worker processes match rendering in this process."""
+        with patch.object(concurrent.futures, 'ProcessPoolExecutor', wraps=concurrent.futures.ProcessPoolExecutor) as pool:
+            counts = write_sharded_report(self.vpcs, ACCOUNT_REGIONS, self.directory, workers=2)
+        in_process = tempfile.TemporaryDirectory()
+        self.addCleanup(in_process.cleanup)
+        with patch.object(concurrent.futures, 'ProcessPoolExecutor') as unused_pool:
+            write_sharded_report(self.vpcs, ACCOUNT_REGIONS, in_process.name, workers=1)
+
+        pool.assert_called_once_with(max_workers=2)
+        unused_pool.assert_not_called()
+        self.assertEqual(counts, {'written': 2, 'unchanged': 0, 'removed': 0})
+        for name in ['account-111111111111.md', 'account-222222222222.md', 'shards.json']:
+            with open(os.path.join(in_process.name, name)) as f:
+                self.assertEqual(self.read(name), f.read())
+
+    def test_render_command_shards(self):
+        """Test render --shard-dir writes the sharded report from the result store."""
+        db_path = os.path.join(self.directory, 'results.db')
+        save_scan(self.vpcs, ACCOUNT_REGIONS, db_path)
+        shard_dir = os.path.join(self.directory, 'report')
+
+        with patch('builtins.print') as mock_print:
+            main(['render', '--db', db_path, '--shard-dir', shard_dir])
+
+        self.assertEqual(sorted(os.listdir(shard_dir)), ['account-111111111111.md', 'account-222222222222.md', 'index.md', 'shards.json'])
+        self.assertIn('2 account file(s) written, 0 unchanged, 0 removed', mock_print.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
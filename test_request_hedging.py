@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Unit tests for hedged requests in VPC Detective.
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import botocore.session
+from botocore.stub import Stubber
+import vpc_detective
+
+from vpc_detective import RequestHedger, generate_hedging_section
+
+
+def make_slow_first_call(release):
+    """Make a method whose first call hangs until released and later calls answer at once."""
+    calls = []
+
+    def method(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'original'
+        return 'hedge'
+    return method, calls
+
+
+class TestRequestHedging(unittest.TestCase):
+    """Test cases for request hedging."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.hedger = RequestHedger(max_in_flight=1, min_samples=5)
+        for _ in range(5):
+            self.hedger.record('ec2.describe_vpcs', 0.001)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.hedger.shutdown()
+
+    def test_no_hedge_without_enough_samples(self):
+        """Test operations are not hedged until their p95 is known."""
+        self.assertIsNone(self.hedger.threshold('ec2.describe_flow_logs'))
+        self.assertEqual(self.hedger.call('ec2.describe_flow_logs', lambda **kwargs: kwargs, {'VpcId': 'vpc-1'}), {'VpcId': 'vpc-1'})
+        self.assertEqual(self.hedger.summary()['ec2.describe_flow_logs']['hedged'], 0)
+
+    def test_slow_call_is_hedged(self):
+        """Test a call past its p95 sends a duplicate and uses the first answer."""
+        method, calls = make_slow_first_call(self.release)
+
+        result = self.hedger.call('ec2.describe_vpcs', method, {'MaxResults': 5})
+
+        self.assertEqual(result, 'hedge')
+        self.assertEqual(calls, [{'MaxResults': 5}, {'MaxResults': 5}])
+        stats = self.hedger.summary()['ec2.describe_vpcs']
+        self.assertEqual((stats['calls'], stats['hedged'], stats['hedge_wins'], stats['hit_rate']), (1, 1, 1, 100.0))
+
+    def test_hedges_are_capped(self):
+        """Test no hedge is sent while the in-flight cap is used up."""
+        method, calls = make_slow_first_call(self.release)
+        self.hedger.slots.acquire()
+        threading.Timer(0.05, self.release.set).start()
+
+        result = self.hedger.call('ec2.describe_vpcs', method, {})
+
+        self.assertEqual(result, 'original')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.hedger.summary()['ec2.describe_vpcs']['capped'], 1)
+
+    def test_failed_original_does_not_hide_successful_hedge(self):
+        """Test an error is raised only when the original and the hedge have both failed."""
+        wait = vpc_detective.futures.wait
+
+        def wait_for_both(fs, timeout=None, return_when=None):
+            # Hand back the original's failure and the hedge's answer together
+            return wait(fs, timeout, vpc_detective.futures.ALL_COMPLETED if return_when else vpc_detective.futures.FIRST_COMPLETED)
+
+        def method(outcomes):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                time.sleep(0.05)
+                raise outcome
+            return outcome
+
+        with patch.object(self.hedger, 'threshold', return_value=0.0), \
+             patch.object(vpc_detective.futures, 'wait', side_effect=wait_for_both):
+            outcomes = [RuntimeError('original failed'), 'hedge']
+            self.assertEqual(self.hedger.call('ec2.describe_vpcs', lambda: method(outcomes), {}), 'hedge')
+            outcomes = [RuntimeError('original failed'), RuntimeError('hedge failed')]
+            with self.assertRaisesRegex(RuntimeError, 'original failed'):
+                self.hedger.call('ec2.describe_vpcs', lambda: method(outcomes), {})
+
+        self.assertEqual(self.hedger.summary()['ec2.describe_vpcs']['hedge_wins'], 1)
+
+    def test_client_wrapper_hedges_reads_and_pages(self):
+        """Test describe calls and every paginator page are routed through the hedger."""
+        client = botocore.session.get_session().create_client(
+            'ec2', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test'
+        )
+        stubber = Stubber(client)
+        stubber.add_response('describe_internet_gateways', {'InternetGateways': []})
+        stubber.add_response('describe_vpcs', {'Vpcs': [{'VpcId': 'vpc-1'}], 'NextToken': 'page-2'}, {'MaxResults': 5})
+        stubber.add_response('describe_vpcs', {'Vpcs': [{'VpcId': 'vpc-2'}]}, {'MaxResults': 5, 'NextToken': 'page-2'})
+        hedged = self.hedger.wrap(client)
+
+        with stubber:
+            self.assertEqual(hedged.describe_internet_gateways(Filters=[])['InternetGateways'], [])
+            pages = list(hedged.get_paginator('describe_vpcs').paginate(MaxResults=5))
+        hedged.close()
+
+        self.assertEqual([page['Vpcs'][0]['VpcId'] for page in pages], ['vpc-1', 'vpc-2'])
+        stubber.assert_no_pending_responses()
+        summary = self.hedger.summary()
+        self.assertEqual(set(summary), {'ec2.describe_internet_gateways', 'ec2.describe_vpcs'})
+        self.assertEqual(summary['ec2.describe_vpcs']['calls'], 2)
+
+    def test_hedging_section(self):
+        """Test hit rates are reported per operation and overall."""
+        method, _ = make_slow_first_call(self.release)
+        self.hedger.call('ec2.describe_vpcs', method, {})
+
+        section = generate_hedging_section(self.hedger.summary())
+        self.assertIn('| ec2.describe_vpcs | 1 | 1 ms | 1 | 1 | 100.0% | 0 |', section)
+        self.assertIn('the hedge answered first for 1 (100.0%)', section)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite result store and query/render commands in VPC Detective.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import vpc_detective
+
+from vpc_detective import open_store, save_scan, load_scan, list_scans, query_store, main
+import test_helpers
+
+
+def make_vpc(vpc_id, region, destinations, account_id='123456789012', account_name='prod'):
+    return test_helpers.make_vpc(
+        vpc_id, region, account_id, account_name, vpc_name=vpc_id.upper(), igw_present=True, subnet_count=2, interface_count=3,
+        flow_logs_status='Enabled' if len(destinations) == 1 else ('Multiple' if destinations else 'Disabled'),
+        flow_logs_destinations=destinations
+    )
+
+
+class TestResultStore(unittest.TestCase):
+    """Test cases for the SQLite result store."""
+
+    def setUp(self):
+        """Set up a store with one scan."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'results.db')
+        self.account_regions = [
+            {'account_name': 'prod', 'account_id': '123456789012', 'region': 'us-west-2'},
+            {'account_name': 'prod', 'account_id': '123456789012', 'region': 'us-east-1'},
+            {'account_name': 'dev', 'account_id': '210987654321', 'region': 'us-west-2'}
+        ]
+        self.vpcs = [
+            make_vpc('vpc-s3', 'us-west-2', ['S3']),
+            make_vpc('vpc-both', 'us-west-2', ['CloudWatch', 'S3']),
+            make_vpc('vpc-cw', 'us-east-1', ['CloudWatch']),
+            make_vpc('vpc-off', 'us-west-2', [], account_id='210987654321', account_name='dev')
+        ]
+        self.scan_id = save_scan(self.vpcs, self.account_regions, self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_destination_filter(self):
+        """Test 'which VPCs in us-west-2 send flow logs only to S3?'."""
+        rows = query_store(self.db_path, region='us-west-2', only_destination='S3')
+
+        self.assertEqual([row['vpc_id'] for row in rows], ['vpc-s3'])
+
+    def test_destination_filter(self):
+        """Test VPCs sending flow logs to S3 among other destinations."""
+        rows = query_store(self.db_path, destination='S3')
+
+        self.assertEqual(sorted(row['vpc_id'] for row in rows), ['vpc-both', 'vpc-s3'])
+
+    def test_group_by(self):
+        """Test aggregations over the latest scan."""
+        rows = query_store(self.db_path, group_by='flow-logs')
+        counts = {row['flow_logs_status']: row['vpc_count'] for row in rows}
+
+        self.assertEqual(counts, {'Enabled': 2, 'Multiple': 1, 'Disabled': 1})
+        rows = query_store(self.db_path, account='dev', group_by='region')
+        self.assertEqual(rows, [{'region': 'us-west-2', 'vpc_count': 1}])
+
+    def test_queries_use_indexes(self):
+        """Test region and status filters are answered from indexes."""
+        connection = open_store(self.db_path)
+        try:
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM vpcs WHERE scan_id = ? AND region = ?", (1, 'us-west-2')
+            ).fetchall()
+        finally:
+            connection.close()
+
+        self.assertIn('idx_vpcs_region', ' '.join(row[-1] for row in plan))
+
+    def test_latest_scan_is_default(self):
+        """Test queries read the newest scan unless one is given."""
+        save_scan(self.vpcs[:1], self.account_regions, self.db_path)
+
+        self.assertEqual(len(query_store(self.db_path)), 1)
+        self.assertEqual(len(query_store(self.db_path, scan_id=self.scan_id)), 4)
+        self.assertEqual([scan['vpc_count'] for scan in list_scans(self.db_path)], [1, 4])
+
+    def test_event_scans_replace_each_other(self):
+        """Test event-updated inventories are kept once, read by default and skipped by listings and history."""
+        for _ in range(3):
+            events_id = save_scan(self.vpcs[:2], self.account_regions, self.db_path, kind='events')
+
+        self.assertEqual([scan['scan_id'] for scan in list_scans(self.db_path)], [self.scan_id])
+        self.assertEqual(list_scans(self.db_path, kinds=('scan', 'events'))[0]['scan_id'], events_id)
+        self.assertEqual(len(query_store(self.db_path)), 2)
+        connection = open_store(self.db_path)
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM vpcs").fetchone()[0], 6)
+        finally:
+            connection.close()
+
+        save_scan([], [dict(self.account_regions[0], scan_status='complete', duration=4.0)], self.db_path)
+        save_scan([], self.account_regions, self.db_path, kind='events')
+        self.assertEqual(list(vpc_detective.load_unit_history(self.db_path, scan_count=1)), [('123456789012', 'us-west-2')])
+
+    def test_store_without_scan_kinds_is_migrated(self):
+        """Test a store written before scan kinds existed is read as full scans."""
+        os.remove(self.db_path)
+        connection = open_store(self.db_path)
+        connection.executescript("DROP TABLE scans; CREATE TABLE scans (scan_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                 "generated_at TEXT NOT NULL, account_regions TEXT NOT NULL); "
+                                 "INSERT INTO scans (generated_at, account_regions) VALUES ('2024-01-01T00:00:00', '[]');")
+        connection.close()
+
+        self.assertEqual([scan['scan_id'] for scan in list_scans(self.db_path)], [1])
+
+    def test_render_from_store(self):
+        """Test the render command rebuilds the report without AWS."""
+        vpc_data_list, account_regions = load_scan(self.db_path)
+        self.assertEqual(vpc_data_list, self.vpcs)
+        self.assertEqual(account_regions, self.account_regions)
+
+        output = os.path.join(self.tmp.name, 'report.md')
+        with patch('builtins.print'):
+            main(['render', '--db', self.db_path, '--output', output])
+
+        with open(output) as f:
+            markdown = f.read()
+        self.assertIn('## Account: dev (210987654321)', markdown)
+        self.assertIn('vpc-both', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
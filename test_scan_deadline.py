@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the scan deadline, per-call timeouts and partial-result reporting in VPC Detective.
+"""
+
+import threading
+import time
+import unittest
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest.mock import Mock, patch, mock_open
+import vpc_detective
+
+import botocore
+from vpc_detective import (
+    ScanDeadlineExceeded,
+    get_vpcs,
+    scan,
+    scan_region,
+    scan_command,
+    generate_markdown,
+    make_client_config
+)
+from test_helpers import make_vpc
+
+
+class TestScanDeadline(unittest.TestCase):
+    """Test cases for the scan deadline."""
+
+    def test_get_vpcs_stops_at_deadline(self):
+        """Test collection stops before the next VPC once the deadline has passed."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        page = defaultdict(list, Vpcs=[{'VpcId': 'vpc-1', 'CidrBlock': '10.0.0.0/16', 'IsDefault': False}])
+        client.get_paginator.return_value.paginate.return_value = [page]
+
+        with self.assertRaises(ScanDeadlineExceeded) as raised:
+            get_vpcs(client, Mock(), deadline=time.time() - 1)
+
+        self.assertEqual(raised.exception.vpc_list, [])
+        client.describe_internet_gateways.assert_not_called()
+
+    def test_get_vpcs_stops_between_region_reads(self):
+        """Test no region-wide read starts once the deadline has passed."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        client.get_paginator.return_value.paginate.return_value = [defaultdict(list)]
+
+        with patch('vpc_detective.time.time', side_effect=[1000.0, 1000.0, 1100.0]):
+            with self.assertRaises(ScanDeadlineExceeded):
+                get_vpcs(client, Mock(), deadline=1050.0)
+
+        self.assertEqual([call.args[0] for call in client.get_paginator.call_args_list],
+                         ['describe_security_groups', 'describe_security_group_rules', 'describe_network_interfaces'])
+
+    def test_sign_in_wait_stops_at_deadline(self):
+        """Test a region waiting for a slow sign-in is skipped once the deadline passes."""
+        config = {'SSO': {}, 'Accounts': [{'name': 'acct', 'id': '111111111111', 'role_name': 'ReadOnly', 'region': 'us-east-1'}]}
+        signed_in = threading.Event()
+
+        def slow_session(aws_sso, account):
+            signed_in.wait(5)
+            return Mock()
+
+        with patch('vpc_detective.get_account_session', side_effect=slow_session), \
+             patch('vpc_detective.scan_region') as mock_scan_region, patch('builtins.print'):
+            started = time.monotonic()
+            results = list(scan(config, deadline=time.time() + 0.2))
+            signed_in.set()
+
+        self.assertLess(time.monotonic() - started, 2)
+        account_region, vpc_list = results[0]
+        self.assertEqual((account_region['scan_status'], vpc_list), ('timed_out', []))
+        self.assertIn('signing in', account_region['scan_note'])
+        mock_scan_region.assert_not_called()
+
+    def test_scan_region_tags_partial_results(self):
+        """Test VPCs collected before the deadline are tagged with their account."""
+        session = Mock()
+        partial = [{'vpc_id': 'vpc-1', 'region': 'us-east-1'}]
+        config = make_client_config(2, 5)
+
+        with patch('vpc_detective.get_vpcs', side_effect=ScanDeadlineExceeded(partial)):
+            with self.assertRaises(ScanDeadlineExceeded) as raised:
+                scan_region(session, 'acct', '111111111111', 'us-east-1', config, time.time())
+
+        self.assertEqual(raised.exception.vpc_list[0]['account_id'], '111111111111')
+        self.assertIs(session.client.call_args.kwargs['config'], config)
+        self.assertEqual(config.connect_timeout, 2)
+
+    def test_scan_marks_incomplete_regions(self):
+        """Test partial, timed-out and failed regions are kept and marked in the report."""
+        config = {'SSO': {}, 'Accounts': [{
+            'name': 'acct', 'id': '111111111111', 'role_name': 'ReadOnly',
+            'regions': ['us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-2']
+        }]}
+        # The deadline is set at 1000; each region reads the clock before and
+        # after waiting for sign-in, and the last starts after the deadline
+        clock = iter([1000.0] + [1001.0] * 3 + [1002.0] * 3 + [1003.0] * 3 + [1100.0])
+
+        def fake_scan_region(session, account_name, account_id, region, **kwargs):
+            if region == 'us-east-1':
+                return [make_vpc('vpc-1', region)]
+            if region == 'us-west-2':
+                raise ScanDeadlineExceeded([make_vpc('vpc-2', region)])
+            raise botocore.exceptions.ReadTimeoutError(endpoint_url='https://ec2.eu-west-1.amazonaws.com')
+
+        args = SimpleNamespace(config='account-list.json', deadline=60, connect_timeout=5, read_timeout=20, hedge=False, max_hedges=4, volume_hours=24,
+                               workers=1, auth_ahead=2, json=None, shard_dir=None, html=None, snapshot_dir='snapshots', db='db')
+        with patch('vpc_detective.load_config', return_value=config), \
+             patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.scan_region', side_effect=fake_scan_region), \
+             patch('vpc_detective.time.time', side_effect=lambda: next(clock)), \
+             patch('vpc_detective.generate_markdown', return_value='') as mock_generate, \
+             patch('vpc_detective.save_snapshot'), patch('vpc_detective.save_scan'), \
+             patch('builtins.open', mock_open()), patch('builtins.print'):
+            scan_command(args)
+
+        vpcs, account_regions = mock_generate.call_args[0]
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], ['vpc-1', 'vpc-2'])
+        self.assertEqual(
+            [ar['scan_status'] for ar in account_regions],
+            ['complete', 'partial', 'error', 'timed_out']
+        )
+
+        markdown = generate_markdown(vpcs, account_regions)
+        self.assertIn('## Scan Completeness', markdown)
+        self.assertIn('| acct (111111111111) | us-west-2 | Partial |', markdown)
+        self.assertIn('| *Not scanned* |', markdown)
+        self.assertIn('> ⚠️ **Timed out**', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the scan planner (scan --plan) in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import patch
+import vpc_detective
+
+from vpc_detective import build_snapshot, estimate_region_calls, get_region_sizes, main, plan_scan
+import test_helpers
+
+CONFIG = {'SSO': {}, 'Accounts': [
+    {'name': 'prod', 'id': '111111111111', 'role_name': 'ReadOnly', 'regions': ['us-east-1', 'eu-west-1']},
+    {'name': 'dev', 'id': '222222222222', 'role_name': 'ReadOnly', 'regions': ['us-east-1']}
+]}
+
+
+# Region sizes the plan is worked out from
+PLAN_FIELDS = {
+    'account_name': 'prod', 'subnet_count': 4, 'interface_count': 600, 'security_group_count': 10, 'custom_nacl_count': 1,
+    'endpoint_count': 2, 'flow_logs_log_groups': ['/vpc/flow-logs'], 'flow_logs_destinations': ['CloudWatch']
+}
+
+
+def make_vpc(vpc_id, region='us-east-1', **fields):
+    return test_helpers.make_vpc(vpc_id, region, **dict(PLAN_FIELDS, **fields))
+
+
+def make_snapshot():
+    return build_snapshot(
+        [make_vpc('vpc-1'), make_vpc('vpc-2', interface_count='Error', flow_logs_log_groups=['/vpc/other']),
+         make_vpc('vpc-3', region='eu-west-1')],
+        [
+            {'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1', 'scan_status': 'complete',
+             'duration': 30.0, 'shared_vpcs': [{'vpc_id': 'vpc-9'}]},
+            {'account_name': 'prod', 'account_id': '111111111111', 'region': 'eu-west-1', 'scan_status': 'partial'}
+        ]
+    )
+
+
+class TestScanPlan(unittest.TestCase):
+    """Test cases for the scan planner."""
+
+    def test_region_sizes_and_calls(self):
+        """Test a completed region is sized from its records and its calls counted per operation."""
+        sizes = get_region_sizes(make_snapshot())
+
+        self.assertEqual(sizes, {('111111111111', 'us-east-1'): {
+            'vpcs': 2, 'shared_vpcs': 1, 'subnets': 8, 'interfaces': 600, 'security_groups': 20,
+            'network_acls': 4, 'endpoints': 4, 'flow_logs': 2, 'log_groups': 2, 'duration': 30.0
+        }})
+        calls = estimate_region_calls(sizes[('111111111111', 'us-east-1')])
+        self.assertEqual(calls['ec2:DescribeVpcs'], 1)
+        self.assertEqual(calls['ec2:DescribeInternetGateways'], 2)
+        self.assertEqual(calls['logs:DescribeLogGroups'], 2)
+        self.assertEqual(calls['cloudwatch:GetMetricData'], 1)
+        self.assertEqual(sum(calls.values()), 15)
+
+        big = dict(vpc_detective.PLAN_DEFAULT_REGION, interfaces=2500, flow_logs=2500, log_groups=300)
+        calls = estimate_region_calls(big, volume_hours=0)
+        self.assertEqual(calls['ec2:DescribeNetworkInterfaces'], 3)
+        self.assertEqual(calls['ec2:DescribeFlowLogs'], 3)
+
+        # Subnet and ENI flow logs page DescribeFlowLogs, not the VPC count
+        snapshot = build_snapshot([make_vpc('vpc-1', flow_log_ids=[f'fl-{index}' for index in range(1500)])],
+                                  [{'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1'}])
+        size = get_region_sizes(snapshot)[('111111111111', 'us-east-1')]
+        self.assertEqual(size['flow_logs'], 1500)
+        self.assertEqual(estimate_region_calls(size)['ec2:DescribeFlowLogs'], 2)
+        self.assertEqual(calls['cloudwatch:GetMetricData'], 0)
+
+    def test_plan_estimates_new_regions_and_workers(self):
+        """Test new regions borrow known sizes and the total follows the worker count."""
+        plan = plan_scan(CONFIG, make_snapshot(), workers=1)
+
+        by_unit = {(region['account_id'], region['region']): region for region in plan['regions']}
+        self.assertEqual(by_unit[('111111111111', 'us-east-1')]['basis'], 'snapshot')
+        self.assertEqual(by_unit[('111111111111', 'us-east-1')]['seconds'], 30.0)
+        self.assertEqual(by_unit[('111111111111', 'eu-west-1')]['basis'], 'estimate')
+        self.assertEqual(by_unit[('222222222222', 'us-east-1')]['vpcs'], 2)
+        self.assertAlmostEqual(plan['seconds_per_call'], 2.0)
+        self.assertAlmostEqual(plan['expected_seconds'], 90.0)
+        self.assertEqual(plan['total_calls'], 45)
+
+        self.assertAlmostEqual(plan_scan(CONFIG, make_snapshot(), workers=2)['expected_seconds'], 60.0)
+        self.assertAlmostEqual(plan_scan(CONFIG, make_snapshot(), workers=3)['expected_seconds'], 30.0)
+
+    def test_plan_without_snapshot_applies_rate_limit(self):
+        """Test regions default to a lone default VPC and large regions are held to the EC2 rate."""
+        plan = plan_scan({'Accounts': [CONFIG['Accounts'][1]]})
+        self.assertEqual(plan['regions'][0]['vpcs'], 1)
+        self.assertAlmostEqual(plan['expected_seconds'], plan['total_calls'] * vpc_detective.PLAN_CALL_SECONDS)
+
+        snapshot = build_snapshot(
+            [make_vpc(f'vpc-{index}') for index in range(1000)],
+            [{'account_name': 'prod', 'account_id': '111111111111', 'region': 'us-east-1', 'duration': 10.0}]
+        )
+        plan = plan_scan({'Accounts': [{'name': 'prod', 'id': '111111111111', 'region': 'us-east-1'}]}, snapshot)
+        ec2_calls = sum(count for operation, count in plan['regions'][0]['calls'].items() if operation.startswith('ec2:'))
+        self.assertEqual(plan['expected_seconds'], (ec2_calls - vpc_detective.EC2_DESCRIBE_BURST) / vpc_detective.EC2_DESCRIBE_RATE)
+
+    def test_plan_command_makes_no_aws_calls(self):
+        """Test scan --plan prints the plan instead of scanning."""
+        with patch('vpc_detective.load_config', return_value=CONFIG), \
+             patch('vpc_detective.find_latest_snapshots', return_value=['snapshots/latest.json']), \
+             patch('vpc_detective.load_snapshot', return_value=make_snapshot()), \
+             patch('vpc_detective.scan_command') as mock_scan, \
+             patch('builtins.print') as mock_print:
+            main(['scan', '--plan', '--workers', '2', '--deadline', '45'])
+
+        mock_scan.assert_not_called()
+        output = '\n'.join(str(call.args[0]) for call in mock_print.call_args_list)
+        self.assertIn('| prod (111111111111) | us-east-1 | 2 | 15 | 30.0s | snapshot |', output)
+        self.assertIn('About 45 API calls, taking about 60s on 2 worker(s)', output)
+        self.assertIn('expected to pass its 45s deadline', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for longest-first scheduling of account/regions in VPC Detective.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch, mock_open
+import vpc_detective
+
+from vpc_detective import load_unit_history, predict_unit_durations, save_scan, scan_command
+
+CONFIG = {'SSO': {}, 'Accounts': [
+    {'name': 'prod', 'id': '111111111111', 'role_name': 'ReadOnly', 'regions': ['us-east-1', 'us-west-2', 'eu-west-1']},
+    {'name': 'dev', 'id': '222222222222', 'role_name': 'ReadOnly', 'regions': ['us-east-1']}
+]}
+
+
+def make_unit(account_id, region, duration=None, status='complete', vpc_count=1):
+    unit = {'account_name': 'acct', 'account_id': account_id, 'region': region, 'scan_status': status}
+    if duration is not None:
+        unit.update(duration=duration, vpc_count=vpc_count, interface_count=10 * vpc_count)
+    return unit
+
+
+class TestScanSchedule(unittest.TestCase):
+    """Test cases for scan scheduling."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = os.path.join(directory.name, 'scans.db')
+
+    def test_history_uses_latest_completed_duration(self):
+        """Test the newest completed duration wins and incomplete regions are ignored."""
+        save_scan([], [make_unit('111111111111', 'us-east-1', 40.0), make_unit('111111111111', 'us-west-2', 9.0)], self.db)
+        save_scan([], [
+            make_unit('111111111111', 'us-east-1', 30.0, vpc_count=3),
+            make_unit('111111111111', 'us-west-2', 1.0, status='timed_out'),
+            make_unit('111111111111', 'eu-west-1')
+        ], self.db)
+
+        history = load_unit_history(self.db)
+
+        self.assertEqual(history, {
+            ('111111111111', 'us-east-1'): {'duration': 30.0, 'vpc_count': 3, 'interface_count': 30},
+            ('111111111111', 'us-west-2'): {'duration': 9.0, 'vpc_count': 1, 'interface_count': 10}
+        })
+        self.assertEqual(load_unit_history(os.path.join(os.path.dirname(self.db), 'missing.db')), {})
+
+    def test_new_units_are_estimated(self):
+        """Test new regions get their account's median, then the overall median, then the default."""
+        history = {
+            ('111111111111', 'us-east-1'): {'duration': 30.0},
+            ('111111111111', 'us-west-2'): {'duration': 10.0},
+            ('333333333333', 'us-east-1'): {'duration': 2.0}
+        }
+        units = [('111111111111', 'us-east-1'), ('111111111111', 'eu-west-1'), ('222222222222', 'us-east-1')]
+
+        self.assertEqual(predict_unit_durations(units, history), {
+            ('111111111111', 'us-east-1'): (30.0, 'history'),
+            ('111111111111', 'eu-west-1'): (20.0, 'estimate'),
+            ('222222222222', 'us-east-1'): (10.0, 'estimate')
+        })
+        self.assertEqual(predict_unit_durations(units[:1], {}), {units[0]: (vpc_detective.DEFAULT_UNIT_SECONDS, 'estimate')})
+
+    def test_scan_starts_longest_regions_first(self):
+        """Test regions start longest first across workers and are reported in configuration order."""
+        save_scan([], [
+            make_unit('111111111111', 'us-east-1', 1.0),
+            make_unit('111111111111', 'us-west-2', 5.0),
+            make_unit('111111111111', 'eu-west-1', 60.0),
+            make_unit('222222222222', 'us-east-1', 20.0)
+        ], self.db)
+        started = []
+        lock = threading.Lock()
+
+        def fake_scan_region(session, account_name, account_id, region, **kwargs):
+            with lock:
+                started.append((account_id, region))
+            return [{'vpc_id': f"vpc-{account_id}-{region}", 'interface_count': 2}]
+
+        args = SimpleNamespace(config='account-list.json', deadline=None, connect_timeout=5, read_timeout=20, hedge=False, max_hedges=4,
+                               volume_hours=24, workers=1, auth_ahead=2, json=None, shard_dir=None, html=None, snapshot_dir='snapshots', db=self.db)
+        with patch('vpc_detective.load_config', return_value=CONFIG), \
+             patch('vpc_detective.get_account_session', return_value=Mock()) as mock_session, \
+             patch('vpc_detective.scan_region', side_effect=fake_scan_region), \
+             patch('vpc_detective.resolve_shared_vpcs'), \
+             patch('vpc_detective.generate_markdown', return_value='') as mock_generate, \
+             patch('vpc_detective.save_snapshot'), patch('vpc_detective.save_scan'), \
+             patch('builtins.open', mock_open()) as mock_file, patch('builtins.print'):
+            scan_command(args)
+            args.workers = 3
+            scan_command(args)
+
+        self.assertEqual(started[:4], [
+            ('111111111111', 'eu-west-1'), ('222222222222', 'us-east-1'),
+            ('111111111111', 'us-west-2'), ('111111111111', 'us-east-1')
+        ])
+        self.assertEqual(sorted(started[4:]), sorted(started[:4]))
+        self.assertEqual(mock_session.call_count, 4)
+
+        vpcs, account_regions = mock_generate.call_args[0]
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], [
+            'vpc-111111111111-us-east-1', 'vpc-111111111111-us-west-2', 'vpc-111111111111-eu-west-1', 'vpc-222222222222-us-east-1'
+        ])
+        self.assertEqual(account_regions[2]['predicted_duration'], 60.0)
+        self.assertEqual(account_regions[2]['prediction_basis'], 'history')
+        self.assertEqual((account_regions[2]['vpc_count'], account_regions[2]['interface_count']), (1, 2))
+        self.assertLess(account_regions[2]['duration'], 60.0)
+
+        report = mock_file().write.call_args[0][0]
+        self.assertIn('## Scan Schedule', report)
+        self.assertIn('| prod (111111111111) | eu-west-1 | 1 | 2 | 60.0s |', report)
+        self.assertIn('on 3 worker(s)', report)
+
+    def test_failed_scan_report_keeps_original_error(self):
+        """Test the schedule section of a scan that stopped part way skips the regions never scheduled."""
+        def fake_scan_region(session, account_name, account_id, region, **kwargs):
+            if region == 'us-west-2':
+                raise KeyboardInterrupt
+            return [{'vpc_id': f"vpc-{account_id}-{region}", 'interface_count': 2}]
+
+        args = SimpleNamespace(config='account-list.json', deadline=None, connect_timeout=5, read_timeout=20, hedge=False, max_hedges=4,
+                               volume_hours=24, workers=1, auth_ahead=2, json=None, shard_dir=None, html=None, snapshot_dir='snapshots', db=self.db)
+        with patch('vpc_detective.load_config', return_value=CONFIG), \
+             patch('vpc_detective.get_account_session', return_value=Mock()), \
+             patch('vpc_detective.scan_region', side_effect=fake_scan_region), \
+             patch('vpc_detective.resolve_shared_vpcs'), \
+             patch('vpc_detective.generate_markdown', return_value=''), \
+             patch('vpc_detective.save_snapshot'), patch('vpc_detective.save_scan'), \
+             patch('builtins.open', mock_open()) as mock_file, patch('builtins.print'):
+            with self.assertRaises(KeyboardInterrupt):
+                scan_command(args)
+
+        report = mock_file().write.call_args[0][0]
+        self.assertIn('| prod (111111111111) | us-east-1 | 1 | 2 |', report)
+        self.assertNotIn('us-west-2 |', report.split('## Scan Schedule')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
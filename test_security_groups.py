@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for security group exposure and unused-group analysis in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import botocore.exceptions
+import vpc_detective
+
+from vpc_detective import (
+    get_region_network_interfaces,
+    get_interface_count,
+    get_region_security_groups,
+    build_security_group_index,
+    analyze_vpc_security_groups,
+    generate_security_group_section
+)
+
+
+def make_paginator(pages):
+    paginator = Mock()
+    paginator.paginate.return_value = pages
+    return paginator
+
+
+class TestSecurityGroupAnalysis(unittest.TestCase):
+    """Test cases for security group collection and analysis."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.interfaces_by_vpc = {
+            'vpc-1': [
+                {'NetworkInterfaceId': 'eni-1', 'VpcId': 'vpc-1', 'Groups': [{'GroupId': 'sg-web'}]},
+                {'NetworkInterfaceId': 'eni-2', 'VpcId': 'vpc-1', 'Groups': [{'GroupId': 'sg-web'}, {'GroupId': 'sg-db'}]}
+            ]
+        }
+        self.security_groups = {
+            'groups_by_vpc': {
+                'vpc-1': [
+                    {'GroupId': 'sg-web', 'GroupName': 'web', 'VpcId': 'vpc-1'},
+                    {'GroupId': 'sg-db', 'GroupName': 'db', 'VpcId': 'vpc-1'},
+                    {'GroupId': 'sg-old', 'GroupName': 'old', 'VpcId': 'vpc-1'},
+                    {'GroupId': 'sg-default', 'GroupName': 'default', 'VpcId': 'vpc-1'}
+                ]
+            },
+            'rules_by_group': {
+                'sg-web': [
+                    {'GroupId': 'sg-web', 'IsEgress': False, 'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443, 'CidrIpv4': '0.0.0.0/0'},
+                    {'GroupId': 'sg-web', 'IsEgress': True, 'IpProtocol': '-1', 'FromPort': -1, 'ToPort': -1, 'CidrIpv4': '0.0.0.0/0'}
+                ],
+                'sg-db': [
+                    {'GroupId': 'sg-db', 'IsEgress': False, 'IpProtocol': 'tcp', 'FromPort': 5432, 'ToPort': 5432, 'CidrIpv4': '10.0.0.0/16'}
+                ],
+                'sg-old': [
+                    {'GroupId': 'sg-old', 'IsEgress': False, 'IpProtocol': 'tcp', 'FromPort': 8000, 'ToPort': 8080, 'CidrIpv6': '::/0'}
+                ]
+            }
+        }
+
+    def test_region_network_interfaces_single_pagination(self):
+        """Test that ENIs are collected once and grouped by VPC."""
+        client = Mock()
+        client.get_paginator.return_value = make_paginator([
+            {'NetworkInterfaces': [{'NetworkInterfaceId': 'eni-1', 'VpcId': 'vpc-1'}]},
+            {'NetworkInterfaces': [{'NetworkInterfaceId': 'eni-2', 'VpcId': 'vpc-2'},
+                                   {'NetworkInterfaceId': 'eni-3', 'VpcId': 'vpc-1'}]}
+        ])
+
+        result = get_region_network_interfaces(client)
+
+        client.get_paginator.assert_called_once_with('describe_network_interfaces')
+        self.assertEqual(get_interface_count(client, 'vpc-1', result), 2)
+        self.assertEqual(get_interface_count(client, 'vpc-2', result), 1)
+        self.assertEqual(get_interface_count(client, 'vpc-3', result), 0)
+
+    def test_build_security_group_index(self):
+        """Test the group to ENI reverse index."""
+        index = build_security_group_index(self.interfaces_by_vpc)
+
+        self.assertEqual(index['sg-web'], {'eni-1', 'eni-2'})
+        self.assertEqual(index['sg-db'], {'eni-2'})
+        self.assertNotIn('sg-old', index)
+
+    def test_analyze_exposed_and_unused(self):
+        """Test exposed ingress rules and unused groups are detected."""
+        index = build_security_group_index(self.interfaces_by_vpc)
+
+        result = analyze_vpc_security_groups('vpc-1', self.security_groups, index)
+
+        self.assertEqual(result['count'], 4)
+        self.assertEqual(result['exposed'], ['sg-web', 'sg-old'])
+        self.assertEqual(result['unused'], ['sg-old'])
+        self.assertEqual(result['exposed_rules'][0], {
+            'group_id': 'sg-web',
+            'group_name': 'web',
+            'protocol': 'TCP',
+            'ports': '443',
+            'source': '0.0.0.0/0'
+        })
+        self.assertEqual(result['exposed_rules'][1]['ports'], '8000-8080')
+        self.assertEqual(result['exposed_rules'][1]['source'], '::/0')
+
+    def test_analyze_without_security_group_data(self):
+        """Test VPCs are marked Error when security groups could not be read."""
+        result = analyze_vpc_security_groups('vpc-1', None, {})
+
+        self.assertEqual(result['count'], 'Error')
+        self.assertEqual(result['exposed_rules'], [])
+
+    def test_get_region_security_groups_access_denied(self):
+        """Test access denied is raised for the caller's retry queue to handle."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        client.get_paginator.side_effect = botocore.exceptions.ClientError(
+            {'Error': {'Code': 'UnauthorizedOperation', 'Message': 'Denied'}},
+            'DescribeSecurityGroups'
+        )
+
+        with self.assertRaises(botocore.exceptions.ClientError):
+            get_region_security_groups(client)
+
+    def test_get_region_security_groups_batched(self):
+        """Test groups and rules are each paginated once per region."""
+        client = Mock()
+        paginators = {
+            'describe_security_groups': make_paginator([{'SecurityGroups': [{'GroupId': 'sg-1', 'VpcId': 'vpc-1'}]}]),
+            'describe_security_group_rules': make_paginator([{'SecurityGroupRules': [{'GroupId': 'sg-1'}]}])
+        }
+        client.get_paginator.side_effect = lambda name: paginators[name]
+
+        result = get_region_security_groups(client)
+
+        self.assertEqual(client.get_paginator.call_count, 2)
+        self.assertEqual(len(result['groups_by_vpc']['vpc-1']), 1)
+        self.assertEqual(len(result['rules_by_group']['sg-1']), 1)
+
+    def test_security_group_section(self):
+        """Test the markdown detail section lists exposed rules."""
+        vpc = {
+            'vpc_id': 'vpc-1',
+            'region': 'us-east-1',
+            'account_name': 'prod',
+            'account_id': '123456789012',
+            'exposed_rules': [{'group_id': 'sg-web', 'group_name': 'web', 'protocol': 'TCP', 'ports': '443', 'source': '0.0.0.0/0'}],
+            'unused_security_groups': ['sg-old']
+        }
+
+        result = generate_security_group_section([vpc])
+
+        self.assertIn('| prod (123456789012) | us-east-1 | vpc-1 | web (sg-web) | TCP | 443 | 0.0.0.0/0 |', result)
+        self.assertIn('sg-old', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
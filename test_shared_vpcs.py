@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AWS RAM shared VPC handling in VPC Detective.
+"""
+
+import unittest
+from collections import defaultdict
+from unittest.mock import Mock, patch
+
+from vpc_detective import get_vpcs, get_record_key, resolve_shared_vpcs, calculate_flow_logs_summary, generate_markdown
+import test_helpers
+
+OWNER = '111111111111'
+PARTICIPANT = '222222222222'
+
+
+def make_vpc(vpc_id, account_id, owner_id=None):
+    return test_helpers.make_vpc(vpc_id, account_id=account_id, account_name=f'acct-{account_id[0]}', owner_id=owner_id or account_id)
+
+
+class TestSharedVpcs(unittest.TestCase):
+    """Test cases for shared VPCs."""
+
+    def test_participant_keeps_only_a_reference(self):
+        """Test VPCs owned by another account are not collected in a participant account."""
+        client = Mock()
+        client.meta.region_name = 'us-east-1'
+        vpc_page = defaultdict(list, Vpcs=[
+            {'VpcId': 'vpc-own', 'CidrBlock': '10.0.0.0/16', 'IsDefault': False, 'OwnerId': PARTICIPANT},
+            {'VpcId': 'vpc-shared', 'CidrBlock': '10.1.0.0/16', 'IsDefault': False, 'OwnerId': OWNER,
+             'Tags': [{'Key': 'Name', 'Value': 'Shared'}]}
+        ])
+        flow_log_page = defaultdict(list, FlowLogs=[
+            {'ResourceId': 'vpc-shared', 'FlowLogStatus': 'ACTIVE', 'LogDestinationType': 's3', 'LogDestination': 'arn:aws:s3:::logs'}
+        ])
+        pages = {'describe_vpcs': [vpc_page], 'describe_flow_logs': [flow_log_page]}
+
+        def get_paginator(operation):
+            paginator = Mock()
+            paginator.paginate.return_value = pages.get(operation, [defaultdict(list)])
+            return paginator
+
+        client.get_paginator.side_effect = get_paginator
+        shared_vpcs = []
+
+        with patch('vpc_detective.get_vpc_igw', return_value=False) as mock_igw, \
+             patch('vpc_detective.get_natgws', return_value=0):
+            vpcs = get_vpcs(client, Mock(), account_id=PARTICIPANT, shared_vpcs=shared_vpcs)
+
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], ['vpc-own'])
+        self.assertEqual(vpcs[0]['owner_id'], PARTICIPANT)
+        self.assertEqual(shared_vpcs, [{
+            'vpc_id': 'vpc-shared', 'vpc_name': 'Shared', 'owner_id': OWNER, 'region': 'us-east-1',
+            'key': f'{OWNER}:vpc-shared'
+        }])
+        self.assertEqual(mock_igw.call_count, 1)
+        self.assertEqual(vpcs[0]['flow_logs_status'], 'Disabled')
+
+    def test_shared_vpc_is_counted_once(self):
+        """Test the owner's record is counted once and participants link to it."""
+        vpcs = [make_vpc('vpc-shared', OWNER)]
+        account_regions = [
+            {'account_name': 'acct-1', 'account_id': OWNER, 'region': 'us-east-1', 'shared_vpcs': []},
+            {'account_name': 'acct-2', 'account_id': PARTICIPANT, 'region': 'us-east-1', 'shared_vpcs': [
+                {'vpc_id': 'vpc-shared', 'vpc_name': 'Shared', 'owner_id': OWNER, 'region': 'us-east-1', 'key': f'{OWNER}:vpc-shared'},
+                {'vpc_id': 'vpc-other', 'vpc_name': 'Other', 'owner_id': '333333333333', 'region': 'us-east-1', 'key': '333333333333:vpc-other'}
+            ]}
+        ]
+
+        resolve_shared_vpcs(vpcs, account_regions)
+
+        self.assertEqual(get_record_key(vpcs[0]), f'{OWNER}:vpc-shared')
+        self.assertEqual(calculate_flow_logs_summary(vpcs)['total_vpcs'], 1)
+        markdown = generate_markdown(vpcs, account_regions)
+        self.assertIn(f'- Shared (vpc-shared), owner {OWNER}: details under the owner account', markdown)
+        self.assertIn('- Other (vpc-other), owner 333333333333: owner account not scanned', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for SSO sign-in running ahead of collection in VPC Detective.
+"""
+
+import time
+import unittest
+from concurrent import futures
+from unittest.mock import Mock, patch
+
+from vpc_detective import AccountSessions, scan
+import test_helpers
+
+ACCOUNTS = [{'name': f'acct{index}', 'id': f'{index:012d}', 'role_name': 'ReadOnly', 'region': 'us-east-1'}
+            for index in range(1, 5)]
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestSignInPipeline(unittest.TestCase):
+    """Test cases for pipelined sign-in."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.signed_in = []
+        print_patcher = patch('builtins.print')
+        print_patcher.start()
+        self.addCleanup(print_patcher.stop)
+
+    def fake_session(self, aws_sso, account, delay=0.0):
+        time.sleep(delay)
+        self.signed_in.append(account['id'])
+        return Mock()
+
+    def test_sign_in_stays_a_bounded_distance_ahead(self):
+        """Test no more than `ahead` accounts are signed in before a worker uses them."""
+        with patch('vpc_detective.get_account_session', side_effect=self.fake_session):
+            sessions = AccountSessions({}, ACCOUNTS, ahead=2)
+            self.addCleanup(sessions.close)
+
+            self.assertTrue(wait_for(lambda: len(self.signed_in) == 2))
+            time.sleep(0.05)
+            self.assertEqual(self.signed_in, [ACCOUNTS[0]['id'], ACCOUNTS[1]['id']])
+
+            session = sessions.get(ACCOUNTS[0])
+            self.assertIs(sessions.get(ACCOUNTS[0]), session)
+            self.assertTrue(wait_for(lambda: len(self.signed_in) == 3))
+            time.sleep(0.05)
+            self.assertEqual(len(self.signed_in), 3)
+            session.session.get_credentials.assert_called_once()
+
+    def test_sign_in_overlaps_collection(self):
+        """Test the next account is signed in while the current one is collected."""
+        def fake_scan_region(session, account_name, account_id, region, **kwargs):
+            time.sleep(0.1)
+            return test_helpers.fake_scan_region(session, account_name, account_id, region)
+
+        with patch('vpc_detective.get_account_session', side_effect=lambda aws_sso, account: self.fake_session(aws_sso, account, 0.1)), \
+             patch('vpc_detective.scan_region', side_effect=fake_scan_region):
+            started = time.monotonic()
+            results = list(scan({'SSO': {}, 'Accounts': ACCOUNTS}, workers=1))
+            elapsed = time.monotonic() - started
+
+        # One sign-in, then four collections with the other sign-ins hidden behind them
+        self.assertLess(elapsed, 0.7)
+        self.assertEqual(len(results), 4)
+        waits = [account_region['credential_wait'] for account_region, _ in results]
+        self.assertGreater(waits[0], 0.05)
+        self.assertLess(sum(waits[1:]), 0.15)
+
+    def test_sign_in_failure_stops_the_scan(self):
+        """Test a failed sign-in is raised to the caller once its account is needed."""
+        def fake_session(aws_sso, account):
+            if account['id'] == ACCOUNTS[1]['id']:
+                raise RuntimeError('SSO token expired')
+            return self.fake_session(aws_sso, account)
+
+        collected = []
+
+        def fake_scan_region(session, account_name, account_id, region, **kwargs):
+            collected.append(account_id)
+            return []
+
+        with patch('vpc_detective.get_account_session', side_effect=fake_session), \
+             patch('vpc_detective.scan_region', side_effect=fake_scan_region):
+            with self.assertRaises(RuntimeError):
+                list(scan({'SSO': {}, 'Accounts': ACCOUNTS}, workers=1))
+
+        self.assertEqual(collected[0], ACCOUNTS[0]['id'])
+        self.assertNotIn(ACCOUNTS[1]['id'], collected)
+
+    def test_close_wakes_waiting_workers(self):
+        """Test a worker waiting for an account that will not be signed in is released on close."""
+        with patch('vpc_detective.get_account_session', side_effect=self.fake_session):
+            sessions = AccountSessions({}, ACCOUNTS, ahead=1)
+            self.assertTrue(wait_for(lambda: len(self.signed_in) == 1))
+            waiter = futures.ThreadPoolExecutor(max_workers=1)
+            self.addCleanup(waiter.shutdown)
+            waiting = waiter.submit(sessions.get, ACCOUNTS[3])
+
+            time.sleep(0.05)
+            sessions.close()
+            with self.assertRaises(futures.CancelledError):
+                waiting.result(timeout=2)
+        self.assertEqual(self.signed_in, [ACCOUNTS[0]['id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
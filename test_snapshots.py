@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for scan snapshots and drift reports in VPC Detective.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import vpc_detective
+
+from vpc_detective import (
+    build_snapshot,
+    save_snapshot,
+    find_latest_snapshots,
+    diff_snapshots,
+    generate_drift_markdown,
+    main
+)
+import test_helpers
+
+
+# Differences from test_helpers.make_vpc that the snapshot diffs below change
+SNAPSHOT_FIELDS = {
+    'igw_present': True, 'natgw_count': 1, 'interface_count': 4, 'account_name': 'prod', 'account_id': '123456789012',
+    'flow_logs_destinations': ['CloudWatch'], 'flow_logs_retention': '90 days',
+    'subnets': [{'subnet_id': 'subnet-1', 'cidr': '10.0.1.0/24', 'available_ips': 200, 'utilization': 20.3, 'hot': False}]
+}
+
+
+def make_vpc(vpc_id, **fields):
+    return test_helpers.make_vpc(vpc_id, **dict(SNAPSHOT_FIELDS, vpc_name=vpc_id.upper(), **fields))
+
+
+class TestSnapshots(unittest.TestCase):
+    """Test cases for snapshots and drift diffs."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.account_regions = [{'account_name': 'prod', 'account_id': '123456789012', 'region': 'us-east-1'}]
+
+    def test_volatile_fields_do_not_change_hash(self):
+        """Test ENI counts and free IPs do not count as drift."""
+        old = build_snapshot([make_vpc('vpc-1')], self.account_regions)
+        busy = make_vpc('vpc-1', interface_count=40)
+        busy['subnets'][0].update(available_ips=10, utilization=96.0, hot=True)
+        new = build_snapshot([busy], self.account_regions)
+
+        self.assertEqual(old['vpcs']['123456789012:vpc-1']['hash'], new['vpcs']['123456789012:vpc-1']['hash'])
+
+    def test_list_order_does_not_change_hash(self):
+        """Test normalization sorts order-free lists."""
+        old = build_snapshot([make_vpc('vpc-1', unused_security_groups=['sg-a', 'sg-b'])], self.account_regions)
+        new = build_snapshot([make_vpc('vpc-1', unused_security_groups=['sg-b', 'sg-a'])], self.account_regions)
+
+        self.assertEqual(diff_snapshots(old, new)['unchanged'], 1)
+
+    def test_diff_snapshots(self):
+        """Test added, removed and changed records with field details."""
+        old = build_snapshot([make_vpc('vpc-1'), make_vpc('vpc-2'), make_vpc('vpc-3')], self.account_regions)
+        new = build_snapshot([
+            make_vpc('vpc-1'),
+            make_vpc('vpc-2', flow_logs_status='Disabled', flow_logs_destinations=[], flow_logs_retention='30 days', natgw_count=3),
+            make_vpc('vpc-4')
+        ], self.account_regions)
+
+        drift = diff_snapshots(old, new)
+
+        self.assertEqual([record['vpc_id'] for record in drift['added']], ['vpc-4'])
+        self.assertEqual([record['vpc_id'] for record in drift['removed']], ['vpc-3'])
+        self.assertEqual(drift['unchanged'], 1)
+        changes = {change['field']: change for change in drift['changed'][0]['changes']}
+        self.assertEqual(set(changes), {'flow_logs_status', 'flow_logs_destinations', 'flow_logs_retention', 'natgw_count'})
+        self.assertEqual(changes['flow_logs_status']['description'], 'Flow logs disabled')
+        self.assertEqual(changes['flow_logs_retention']['description'], 'Retention shortened')
+        self.assertEqual(changes['natgw_count']['description'], 'NAT gateways added')
+
+        markdown = generate_drift_markdown(drift)
+        self.assertIn('- **New VPCs**: 1', markdown)
+        self.assertIn('| flow_logs_status | Enabled | Disabled | Flow logs disabled |', markdown)
+
+    def test_incomplete_regions_do_not_report_removals(self):
+        """Test VPCs missing from a timed-out region are not reported as removed."""
+        old = build_snapshot([make_vpc('vpc-1'), make_vpc('vpc-2')], self.account_regions)
+        timed_out = [dict(self.account_regions[0], scan_status='partial', scan_note='Scan deadline reached')]
+        new = build_snapshot([make_vpc('vpc-1')], timed_out)
+
+        self.assertEqual(diff_snapshots(old, new)['removed'], [])
+
+    def test_diff_command_uses_latest_snapshots(self):
+        """Test the diff command compares the two newest snapshots."""
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_dir = os.path.join(tmp, 'snapshots')
+            with patch.object(vpc_detective, 'datetime') as mock_datetime:
+                mock_datetime.now.return_value.strftime.return_value = '20250101-000000'
+                mock_datetime.now.return_value.isoformat.return_value = '2025-01-01T00:00:00'
+                save_snapshot([make_vpc('vpc-1')], self.account_regions, snapshot_dir)
+                mock_datetime.now.return_value.strftime.return_value = '20250102-000000'
+                mock_datetime.now.return_value.isoformat.return_value = '2025-01-02T00:00:00'
+                save_snapshot([make_vpc('vpc-1', igw_present=False)], self.account_regions, snapshot_dir)
+
+            self.assertEqual(len(find_latest_snapshots(snapshot_dir)), 2)
+
+            output = os.path.join(tmp, 'drift')
+            with patch('builtins.print'):
+                main(['diff', '--snapshot-dir', snapshot_dir, '--output', output])
+
+            with open(output + '.json') as f:
+                drift = json.load(f)
+            self.assertEqual(drift['old_generated_at'], '2025-01-01T00:00:00')
+            self.assertEqual(drift['changed'][0]['changes'][0]['description'], 'Internet gateway detached')
+            self.assertTrue(os.path.exists(output + '.md'))
+
+
+if __name__ == '__main__':
+    unittest.main()
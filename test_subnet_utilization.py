@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for subnet IP utilization and AZ distribution in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock
+import vpc_detective
+
+from vpc_detective import (
+    get_region_subnets,
+    get_vpc_subnets,
+    calculate_subnet_utilization,
+    summarize_vpc_subnets,
+    generate_hot_subnet_section
+)
+
+
+class TestSubnetUtilization(unittest.TestCase):
+    """Test cases for subnet utilization."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.subnets_by_vpc = {
+            'vpc-1': [
+                # /24 has 251 usable addresses
+                {'SubnetId': 'subnet-a', 'VpcId': 'vpc-1', 'CidrBlock': '10.0.1.0/24',
+                 'AvailabilityZone': 'us-east-1a', 'AvailableIpAddressCount': 11,
+                 'Tags': [{'Key': 'Name', 'Value': 'private-a'}]},
+                {'SubnetId': 'subnet-b', 'VpcId': 'vpc-1', 'CidrBlock': '10.0.2.0/24',
+                 'AvailabilityZone': 'us-east-1b', 'AvailableIpAddressCount': 251},
+                {'SubnetId': 'subnet-c', 'VpcId': 'vpc-1', 'CidrBlock': '10.0.3.0/24',
+                 'AvailabilityZone': 'us-east-1a', 'AvailableIpAddressCount': 126}
+            ],
+            'vpc-2': [
+                {'SubnetId': 'subnet-v6', 'VpcId': 'vpc-2', 'Ipv6Native': True,
+                 'AvailabilityZone': 'us-east-1a', 'AvailableIpAddressCount': 0}
+            ]
+        }
+
+    def test_region_subnets_single_pagination(self):
+        """Test subnets are paginated once per region and counted across pages."""
+        client = Mock()
+        paginator = Mock()
+        paginator.paginate.return_value = [
+            {'Subnets': [{'SubnetId': 'subnet-a', 'VpcId': 'vpc-1'}]},
+            {'Subnets': [{'SubnetId': 'subnet-b', 'VpcId': 'vpc-1'}]}
+        ]
+        client.get_paginator.return_value = paginator
+
+        subnets_by_vpc = get_region_subnets(client)
+
+        client.get_paginator.assert_called_once_with('describe_subnets')
+        self.assertEqual(get_vpc_subnets(client, 'vpc-1', subnets_by_vpc), 2)
+        self.assertEqual(get_vpc_subnets(client, 'vpc-9', subnets_by_vpc), 0)
+
+    def test_calculate_subnet_utilization(self):
+        """Test per-subnet utilization and hot flags."""
+        result = calculate_subnet_utilization(self.subnets_by_vpc, threshold=90.0)
+        records = {record['subnet_id']: record for record in result['vpc-1']}
+
+        self.assertEqual(records['subnet-a']['usable_ips'], 251)
+        self.assertAlmostEqual(records['subnet-a']['utilization'], 240 / 251 * 100)
+        self.assertTrue(records['subnet-a']['hot'])
+        self.assertEqual(records['subnet-a']['name'], 'private-a')
+        self.assertEqual(records['subnet-b']['utilization'], 0.0)
+        self.assertFalse(records['subnet-c']['hot'])
+        self.assertIsNone(result['vpc-2'][0]['utilization'])
+        self.assertFalse(result['vpc-2'][0]['hot'])
+
+    def test_summarize_vpc_subnets(self):
+        """Test VPC-level utilization and AZ spread."""
+        records = calculate_subnet_utilization(self.subnets_by_vpc)
+
+        summary = summarize_vpc_subnets(records['vpc-1'])
+
+        self.assertAlmostEqual(summary['utilization'], (753 - 388) / 753 * 100)
+        self.assertEqual(summary['az_distribution'], {'us-east-1a': 2, 'us-east-1b': 1})
+        self.assertIsNone(summarize_vpc_subnets(records['vpc-2'])['utilization'])
+
+    def test_hot_subnet_section(self):
+        """Test the hot subnets section lists only subnets above the threshold."""
+        records = calculate_subnet_utilization(self.subnets_by_vpc)
+        vpc = {'vpc_id': 'vpc-1', 'region': 'us-east-1', 'account_name': 'prod',
+               'account_id': '123456789012', 'subnets': records['vpc-1']}
+
+        markdown = generate_hot_subnet_section([vpc])
+
+        self.assertIn('| private-a (subnet-a) | us-east-1a | 10.0.1.0/24 | 11/251 | 95.6% |', markdown)
+        self.assertNotIn('subnet-b', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Unit tests for VPC endpoint inventory and rollups in VPC Detective.
+"""
+
+import unittest
+from unittest.mock import Mock
+import vpc_detective
+
+from vpc_detective import (
+    get_region_vpc_endpoints,
+    get_endpoint_service,
+    analyze_vpc_endpoints,
+    calculate_flow_logs_summary,
+    generate_endpoint_section
+)
+
+
+class TestVpcEndpoints(unittest.TestCase):
+    """Test cases for VPC endpoint collection and rollups."""
+
+    def test_get_endpoint_service(self):
+        """Test service names are shortened to the service they reach."""
+        self.assertEqual(get_endpoint_service('com.amazonaws.us-east-1.s3'), 's3')
+        self.assertEqual(get_endpoint_service('com.amazonaws.eu-west-2.ecr.dkr'), 'ecr.dkr')
+        self.assertEqual(get_endpoint_service('com.amazonaws.us-gov-west-1.dynamodb'), 'dynamodb')
+        self.assertEqual(get_endpoint_service('com.amazonaws.vpce.us-east-1.vpce-svc-0123'), 'vpce-svc-0123')
+
+    def test_get_region_vpc_endpoints(self):
+        """Test endpoints are paginated once, grouped by VPC, skipping deleted ones."""
+        client = Mock()
+        paginator = Mock()
+        paginator.paginate.return_value = [{'VpcEndpoints': [
+            {'VpcEndpointId': 'vpce-1', 'VpcId': 'vpc-1', 'State': 'available'},
+            {'VpcEndpointId': 'vpce-2', 'VpcId': 'vpc-1', 'State': 'Deleted'},
+            {'VpcEndpointId': 'vpce-3', 'VpcId': 'vpc-2', 'State': 'pending'}
+        ]}]
+        client.get_paginator.return_value = paginator
+
+        result = get_region_vpc_endpoints(client)
+
+        client.get_paginator.assert_called_once_with('describe_vpc_endpoints')
+        self.assertEqual([e['VpcEndpointId'] for e in result['vpc-1']], ['vpce-1'])
+        self.assertEqual([e['VpcEndpointId'] for e in result['vpc-2']], ['vpce-3'])
+
+    def test_analyze_vpc_endpoints(self):
+        """Test endpoint types, services and security groups per VPC."""
+        vpc_endpoints = {'vpc-1': [
+            {'VpcEndpointId': 'vpce-1', 'VpcEndpointType': 'Gateway',
+             'ServiceName': 'com.amazonaws.us-east-1.s3'},
+            {'VpcEndpointId': 'vpce-2', 'VpcEndpointType': 'Interface',
+             'ServiceName': 'com.amazonaws.us-east-1.ecr.api', 'Groups': [{'GroupId': 'sg-1'}]}
+        ]}
+
+        result = analyze_vpc_endpoints('vpc-1', vpc_endpoints)
+
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(result['endpoints'][0], {'id': 'vpce-1', 'type': 'Gateway', 'service': 's3', 'security_groups': [], 'network_interfaces': 0})
+        self.assertEqual(result['endpoints'][1]['security_groups'], ['sg-1'])
+        self.assertEqual(analyze_vpc_endpoints('vpc-1', None)['count'], 'Error')
+
+    def test_summary_endpoint_rollup(self):
+        """Test endpoint rollups are computed with the coverage summary."""
+        base = {'account_name': 'prod', 'account_id': '123456789012', 'region': 'us-east-1', 'flow_logs_status': 'Enabled'}
+        vpc_data = [
+            dict(base, vpc_id='vpc-1', natgw_count=2, endpoint_count=1,
+                 vpc_endpoints=[{'id': 'vpce-1', 'type': 'Gateway', 'service': 's3', 'security_groups': []}]),
+            dict(base, vpc_id='vpc-2', natgw_count=1, endpoint_count=1,
+                 vpc_endpoints=[{'id': 'vpce-2', 'type': 'Interface', 'service': 'ecr.api', 'security_groups': ['sg-1']}]),
+            dict(base, vpc_id='vpc-3', natgw_count=0, endpoint_count=0, vpc_endpoints=[]),
+            dict(base, vpc_id='vpc-4', natgw_count=3, endpoint_count='Error', vpc_endpoints=[])
+        ]
+
+        result = calculate_flow_logs_summary(vpc_data)
+        rollup = result['endpoints']
+
+        self.assertEqual(result['total_vpcs'], 4)
+        self.assertEqual(rollup['gateway_endpoints'], 1)
+        self.assertEqual(rollup['interface_endpoints'], 1)
+        self.assertEqual(rollup['by_service'], {'s3': 1, 'ecr.api': 1})
+        self.assertEqual([vpc['vpc_id'] for vpc in rollup['missing_s3_gateway_with_natgw']], ['vpc-2'])
+
+        markdown = generate_endpoint_section(vpc_data, rollup)
+        self.assertIn('**vpc-2** (123456789012, us-east-1): 1 NAT GWs', markdown)
+        self.assertIn('| vpce-2 | Interface | ecr.api | sg-1 |', markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
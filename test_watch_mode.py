@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for watch mode (in-memory inventory, staggered refresh, HTTP endpoint) in VPC Detective.
+"""
+
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+import vpc_detective
+
+from vpc_detective import (
+    WatchInventory,
+    build_watch_schedule,
+    run_watch_refresher,
+    make_watch_handler
+)
+from test_helpers import make_vpc
+
+
+class TestWatchMode(unittest.TestCase):
+    """Test cases for watch mode."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.account_regions = [
+            {'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-east-1'},
+            {'account_name': 'acct', 'account_id': '111111111111', 'region': 'us-west-2'}
+        ]
+        self.inventory = WatchInventory(self.account_regions)
+
+    def test_inventory_reports_age_per_account(self):
+        """Test data age is the oldest region age and unknown until scanned."""
+        self.inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-1')],
+                              refreshed_at=time.time() - 120)
+
+        vpcs, freshness, _ = self.inventory.view()
+        self.assertEqual(len(vpcs), 1)
+        self.assertIsNone(freshness['acct (111111111111)']['age_seconds'])
+
+        self.inventory.update('111111111111', 'us-west-2', [], refreshed_at=time.time() - 30)
+        _, freshness, _ = self.inventory.view()
+        self.assertEqual(freshness['acct (111111111111)']['age_seconds'], 120)
+        self.assertEqual(freshness['acct (111111111111)']['regions']['us-west-2']['age_seconds'], 30)
+
+    def test_failed_refresh_keeps_previous_data(self):
+        """Test an error keeps the last good VPCs and reports the error."""
+        self.inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-1')])
+        self.inventory.update('111111111111', 'us-east-1', error='Throttling')
+
+        vpcs, freshness, _ = self.inventory.view()
+        self.assertEqual([vpc['vpc_id'] for vpc in vpcs], ['vpc-1'])
+        self.assertEqual(freshness['acct (111111111111)']['regions']['us-east-1']['error'], 'Throttling')
+
+    def test_report_is_cached_until_inventory_changes(self):
+        """Test the markdown report is only re-rendered after an update."""
+        with patch('vpc_detective.generate_markdown', return_value='# report\n') as mock_generate:
+            self.inventory.report()
+            self.inventory.report()
+            self.inventory.update('111111111111', 'us-east-1', [])
+            report = self.inventory.report()
+
+        self.assertEqual(mock_generate.call_count, 2)
+        self.assertIn('## Data Freshness', report)
+
+    def test_schedule_is_staggered(self):
+        """Test first refreshes are spread evenly across the interval."""
+        schedule = sorted(build_watch_schedule(4, 3600, 1000.0))
+
+        self.assertEqual(schedule, [(1000.0, 0), (1900.0, 1), (2800.0, 2), (3700.0, 3)])
+
+    def test_refresher_refreshes_units_in_turn(self):
+        """Test the refresher scans each unit and reuses account sessions."""
+        config = {
+            'SSO': {'start_url': 'https://example.awsapps.com/start', 'region': 'us-east-1'},
+            'Accounts': [{'name': 'acct', 'id': '111111111111', 'role_name': 'ReadOnly', 'regions': ['us-east-1', 'us-west-2']}]
+        }
+        stop_event = threading.Event()
+        scanned = []
+
+        def fake_scan(session, account_name, account_id, region, **kwargs):
+            scanned.append(region)
+            if len(scanned) == 2:
+                stop_event.set()
+            return [make_vpc(f'vpc-{region}', region, account_id)]
+
+        with patch('vpc_detective.get_account_session', return_value=object()) as mock_session, \
+                patch('vpc_detective.scan_region', side_effect=fake_scan):
+            run_watch_refresher(self.inventory, config, 0.01, stop_event)
+
+        self.assertEqual(scanned, ['us-east-1', 'us-west-2'])
+        self.assertEqual(mock_session.call_count, 1)
+        self.assertEqual(len(self.inventory.view()[0]), 2)
+
+    def test_http_endpoint(self):
+        """Test the HTTP endpoint serves records, summary and report."""
+        self.inventory.update('111111111111', 'us-east-1', [make_vpc('vpc-1')])
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_watch_handler(self.inventory))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            vpcs = json.load(urlopen(f"{base}/vpcs"))
+            summary = json.load(urlopen(f"{base}/summary"))
+            report = urlopen(f"{base}/report").read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(vpcs['vpcs'][0]['vpc_id'], 'vpc-1')
+        self.assertIn('acct (111111111111)', vpcs['data_age'])
+        self.assertEqual(summary['summary']['total_vpcs'], 1)
+        self.assertIn('vpc-1', report)
+        self.assertIn('## Data Freshness', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,6181 @@
+import argparse
+import functools
+import hashlib
+import heapq
+import html
+import importlib
+import json
+import os
+import ipaddress
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    
+    boto3, botocore and aws_sso_lib take a few hundred milliseconds to
+    import, so commands that never call AWS (validate, render, query, diff)
+    start without them; the same goes for the standard library modules only
+    watch mode and request hedging use. Submodules such as
+    botocore.exceptions are imported on demand as well.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        try:
+            return getattr(self._module, attribute)
+        except AttributeError:
+            return importlib.import_module(f"{self._name}.{attribute}")
+
+
+boto3 = LazyModule('boto3')
+botocore = LazyModule('botocore')
+aws_sso_lib = LazyModule('aws_sso_lib')
+futures = LazyModule('concurrent.futures')
+http_server = LazyModule('http.server')
+statistics = LazyModule('statistics')
+
+
+# CIDR ranges that make a rule reachable from the whole internet
+OPEN_CIDRS = ('0.0.0.0/0', '::/0')
+
+# Inbound traffic probed against network ACLs: a NACL is open when one of
+# its 0.0.0.0/0 or ::/0 allow rules is reached by traffic from an internet
+# address (a documentation range, so narrower rules rarely match it). Rules
+# for all protocols are probed with TCP, UDP and ICMP.
+NACL_PROBE_ADDRESSES = {4: '198.51.100.1', 6: '2001:db8::1'}
+NACL_PROBE_PROTOCOLS = ('6', '17', '1')
+
+# Matches the region component of endpoint service names (us-east-1, us-gov-west-1)
+REGION_PATTERN = re.compile(r'^[a-z]{2}(-[a-z]+)+-\d+$')
+
+# Addresses AWS reserves in every subnet, and the utilization that makes a subnet "hot"
+AWS_RESERVED_IPS = 5
+HOT_SUBNET_THRESHOLD = 80.0
+
+# CIDR association states that count as part of the VPC
+ACTIVE_CIDR_STATES = ('associating', 'associated')
+
+# NAT gateway states that are billed; deleted and failed gateways stay listed for a while
+ACTIVE_NATGW_STATES = ('pending', 'available')
+
+# Offline price table used for cost estimates
+PRICE_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price-table.json')
+HOURS_PER_MONTH = 730
+BYTES_PER_GB = 1024 ** 3
+
+# Flow log volume: CloudWatch Logs metrics summed over this window for each
+# log group, read with GetMetricData in batches of the API maximum of 500
+# queries per call
+FLOW_LOG_VOLUME_HOURS = 24
+METRIC_DATA_BATCH = 500
+FLOW_LOG_VOLUME_METRICS = (('IncomingBytes', 'incoming_bytes'), ('IncomingLogEvents', 'incoming_log_events'))
+
+# Account list read by the scan
+CONFIG_FILE = './account-list.json'
+
+# Sharded reports (--shard-dir): one markdown file per account, rendered in
+# up to REPORT_WORKERS processes, and an index with the summary sections.
+# The manifest holds each account file's content hash so that files whose
+# content has not changed are not rewritten.
+REPORT_WORKERS = os.cpu_count() or 1
+SHARD_INDEX_FILE = 'index.md'
+SHARD_MANIFEST_FILE = 'shards.json'
+
+# HTML report (--html): VPC rows are embedded as columnar JSON, written
+# HTML_CHUNK_ROWS values at a time; columns with few distinct values are
+# stored once per value plus a list of codes. The page renders only the
+# table rows in view, HTML_ROW_HEIGHT pixels each. Summary text gets only
+# the emphasis and code markup below: it holds AWS-controlled names, so
+# link syntax stays text and table cells are escaped without any markup.
+HTML_CHUNK_ROWS = 5000
+HTML_ROW_HEIGHT = 24
+MARKDOWN_INLINE_PATTERNS = (
+    (re.compile(r'\*\*(.+?)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'\*(.+?)\*'), r'<em>\1</em>'),
+    (re.compile(r'`(.+?)`'), r'<code>\1</code>')
+)
+HTML_REPORT_STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Helvetica, Arial, sans-serif; margin: 1.5em; color: #1f2328; }
+table { border-collapse: collapse; font-size: 13px; }
+th, td { text-align: left; padding: 2px 6px; white-space: nowrap; }
+section table td, section table th { border: 1px solid #d0d7de; }
+#viewport { height: 70vh; overflow: auto; border: 1px solid #d0d7de; }
+#viewport thead th { position: sticky; background: #f6f8fa; z-index: 1; cursor: pointer; }
+#viewport thead tr:first-child th { top: 0; }
+#viewport thead tr.filters th { top: 24px; cursor: default; }
+#viewport thead input { width: 7em; font-size: 12px; }
+#viewport tbody td { line-height: 20px; max-width: 28em; overflow: hidden; text-overflow: ellipsis; }
+#viewport tbody tr.odd { background: #f6f8fa; }
+.controls { margin: 0.5em 0; }
+.controls input { width: 24em; }
+"""
+HTML_REPORT_SCRIPT = """
+(function () {
+  var data = JSON.parse(document.getElementById('vpc-data').textContent);
+  var columns = data.columns, total = data.rows, ROW = data.row_height, OVERSCAN = 20;
+  var viewport = document.getElementById('viewport'), body = document.getElementById('rows');
+  var search = document.getElementById('filter'), counter = document.getElementById('count');
+  var inputs = Array.prototype.slice.call(document.querySelectorAll('#viewport thead input'));
+  var headers = Array.prototype.slice.call(document.querySelectorAll('#viewport thead tr:first-child th'));
+  var lowered = [], visible = [], sortColumn = -1, sortDirection = 1, pending = null, frame = false;
+
+  function cell(c, r) {
+    var column = data.data[c];
+    return column.codes ? column.values[column.codes[r]] : column[r];
+  }
+  function lower(c) {
+    // Lower-cased once per column, on first use; coded columns only per distinct value
+    if (!lowered[c]) {
+      var column = data.data[c];
+      lowered[c] = (column.codes ? column.values : column).map(function (v) { return v.toLowerCase(); });
+    }
+    return lowered[c];
+  }
+  function matcher(c, needle) {
+    var column = data.data[c], values = lower(c);
+    if (column.codes) {
+      var hits = values.map(function (v) { return v.indexOf(needle) !== -1; });
+      return function (r) { return hits[column.codes[r]]; };
+    }
+    return function (r) { return values[r].indexOf(needle) !== -1; };
+  }
+  function escape(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+  }
+  function sortKey(text) {
+    var number = parseFloat(text.replace(/[$,%]/g, ''));
+    return isNaN(number) ? text.toLowerCase() : number;
+  }
+  function sortRows() {
+    if (sortColumn < 0) return;
+    var keys = {};
+    visible.forEach(function (r) { keys[r] = sortKey(cell(sortColumn, r)); });
+    visible.sort(function (a, b) {
+      var x = keys[a], y = keys[b];
+      if (typeof x !== typeof y) return (typeof x === 'number' ? -1 : 1) * sortDirection;
+      return (x < y ? -1 : x > y ? 1 : a - b) * sortDirection;
+    });
+  }
+  function applyFilters() {
+    var tests = [];
+    inputs.forEach(function (input, c) {
+      var needle = input.value.trim().toLowerCase();
+      if (needle) tests.push(matcher(c, needle));
+    });
+    var needle = search.value.trim().toLowerCase();
+    var anyColumn = needle ? columns.map(function (_, c) { return matcher(c, needle); }) : [];
+    visible = [];
+    for (var r = 0; r < total; r++) {
+      var keep = true, t;
+      for (t = 0; keep && t < tests.length; t++) keep = tests[t](r);
+      if (keep && anyColumn.length) {
+        keep = false;
+        for (t = 0; !keep && t < anyColumn.length; t++) keep = anyColumn[t](r);
+      }
+      if (keep) visible.push(r);
+    }
+    sortRows();
+    viewport.scrollTop = 0;
+    render();
+  }
+  function render() {
+    frame = false;
+    var first = Math.max(0, Math.floor(viewport.scrollTop / ROW) - OVERSCAN);
+    var last = Math.min(visible.length, first + Math.ceil(viewport.clientHeight / ROW) + 2 * OVERSCAN);
+    var html = ['<tr style="height:' + first * ROW + 'px"></tr>'];
+    for (var i = first; i < last; i++) {
+      html.push(i % 2 ? '<tr class="odd" style="height:' + ROW + 'px">' : '<tr style="height:' + ROW + 'px">');
+      for (var c = 0; c < columns.length; c++) html.push('<td>' + escape(cell(c, visible[i])) + '</td>');
+      html.push('</tr>');
+    }
+    html.push('<tr style="height:' + (visible.length - last) * ROW + 'px"></tr>');
+    body.innerHTML = html.join('');
+    counter.textContent = visible.length + ' of ' + total + ' VPCs';
+  }
+  function schedule() {
+    clearTimeout(pending);
+    pending = setTimeout(applyFilters, 150);
+  }
+
+  viewport.addEventListener('scroll', function () {
+    if (!frame) { frame = true; window.requestAnimationFrame(render); }
+  });
+  search.addEventListener('input', schedule);
+  inputs.forEach(function (input) { input.addEventListener('input', schedule); });
+  headers.forEach(function (header, c) {
+    header.addEventListener('click', function () {
+      sortDirection = sortColumn === c ? -sortDirection : 1;
+      sortColumn = c;
+      sortRows();
+      render();
+    });
+  });
+  applyFilters();
+})();
+"""
+
+# Scan snapshots used for drift reports
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_VERSION = 1
+
+# Record fields that change between scans without any configuration change,
+# or that only index resources already described by other fields (flow log
+# IDs, used to map change events to VPCs). They are kept in snapshots but
+# left out of record hashes and drift diffs.
+VOLATILE_FIELDS = ('interface_count', 'ip_utilization', 'estimated_costs', 'flow_logs_volume', 'flow_log_ids')
+VOLATILE_SUBNET_FIELDS = ('available_ips', 'utilization', 'hot')
+
+# Local SQLite result store. A scan's kind is 'scan' for a full scan or
+# 'events' for the inventory kept current by the events command; only the
+# latest 'events' scan is kept, and history and listings skip them.
+RESULT_DB = 'vpc-detective.db'
+SCAN_KINDS = ('scan', 'events')
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    generated_at TEXT NOT NULL,
+    account_regions TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'scan'
+);
+CREATE TABLE IF NOT EXISTS vpcs (
+    scan_id INTEGER NOT NULL REFERENCES scans(scan_id),
+    account_id TEXT NOT NULL,
+    account_name TEXT NOT NULL,
+    region TEXT NOT NULL,
+    vpc_id TEXT NOT NULL,
+    vpc_name TEXT,
+    flow_logs_status TEXT,
+    flow_logs_destinations TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (scan_id, account_id, vpc_id)
+);
+CREATE TABLE IF NOT EXISTS vpc_destinations (
+    scan_id INTEGER NOT NULL,
+    account_id TEXT NOT NULL,
+    vpc_id TEXT NOT NULL,
+    destination TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vpcs_account ON vpcs (scan_id, account_id);
+CREATE INDEX IF NOT EXISTS idx_vpcs_region ON vpcs (scan_id, region);
+CREATE INDEX IF NOT EXISTS idx_vpcs_flow_logs_status ON vpcs (scan_id, flow_logs_status);
+CREATE INDEX IF NOT EXISTS idx_vpcs_flow_logs_destinations ON vpcs (scan_id, flow_logs_destinations);
+CREATE INDEX IF NOT EXISTS idx_vpc_destinations ON vpc_destinations (scan_id, destination);
+"""
+
+# Columns the query command can group by
+QUERY_GROUP_COLUMNS = {
+    'account': 'account_name, account_id',
+    'region': 'region',
+    'flow-logs': 'flow_logs_status',
+    'destination': 'flow_logs_destinations'
+}
+
+# Watch mode defaults: refresh every account/region once per interval
+WATCH_INTERVAL = 3600
+WATCH_HOST = '127.0.0.1'
+WATCH_PORT = 8080
+
+# Endpoint states that no longer provide connectivity
+INACTIVE_ENDPOINT_STATES = ('deleting', 'deleted', 'rejected', 'failed', 'expired')
+
+# EC2 API calls (delivered as CloudTrail events through EventBridge and SQS)
+# mapped to the part of a VPC record they change. 'vpc' rebuilds the record.
+CHANGE_EVENT_SCOPES = {
+    'CreateFlowLogs': 'flow_logs',
+    'DeleteFlowLogs': 'flow_logs',
+    'CreateNatGateway': 'nat_gateways',
+    'DeleteNatGateway': 'nat_gateways',
+    'AttachInternetGateway': 'internet_gateway',
+    'DetachInternetGateway': 'internet_gateway',
+    'CreateVpc': 'vpc',
+    'DeleteVpc': 'vpc',
+    'AssociateVpcCidrBlock': 'vpc',
+    'DisassociateVpcCidrBlock': 'vpc',
+    'CreateSubnet': 'vpc',
+    'DeleteSubnet': 'vpc',
+    'CreateVpcEndpoint': 'vpc',
+    'DeleteVpcEndpoints': 'vpc',
+    'CreateSecurityGroup': 'vpc',
+    'DeleteSecurityGroup': 'vpc',
+    'AuthorizeSecurityGroupIngress': 'vpc',
+    'RevokeSecurityGroupIngress': 'vpc',
+    'CreateNetworkAcl': 'vpc',
+    'DeleteNetworkAcl': 'vpc',
+    'CreateNetworkAclEntry': 'vpc',
+    'ReplaceNetworkAclEntry': 'vpc',
+    'DeleteNetworkAclEntry': 'vpc',
+    'ReplaceNetworkAclAssociation': 'vpc'
+}
+
+# Resource IDs picked out of event request parameters and response elements.
+# Subnet, network interface and flow log IDs are mapped to their VPC.
+RESOURCE_ID_PATTERN = re.compile(r'\b(?:vpc|subnet|eni|fl)-[0-9a-f]{8,17}\b')
+
+# SQS long-poll wait and the most messages applied together in one batch
+SQS_WAIT_SECONDS = 20
+CHANGE_EVENT_BATCH = 100
+
+# Most values EC2 accepts in one describe filter; listings for more VPCs
+# read the whole region instead
+EC2_FILTER_VALUES = 200
+
+# Per-call timeouts (seconds) so one hanging endpoint cannot stall a scan
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+
+# Account/regions are scanned on this many worker threads, longest first,
+# while SSO sign-in runs up to AUTH_AHEAD accounts ahead of them.
+# Predictions use each unit's duration in the most recent of this many stored
+# scans; units with no history get the median of their account's other
+# regions, then of every unit, then the default.
+SCAN_WORKERS = 1
+AUTH_AHEAD = 2
+SCHEDULE_HISTORY_SCANS = 10
+DEFAULT_UNIT_SECONDS = 5.0
+
+# Scan planning (scan --plan). List calls are assumed to return full pages
+# of PLAN_PAGE_SIZE items, and each call to take PLAN_CALL_SECONDS unless a
+# previous snapshot's durations give a measured figure. EC2 describe calls
+# are limited per account and region by a token bucket with AWS's published
+# defaults for non-mutating actions. Regions missing from the snapshot are
+# sized like the median known region, or like a region with just its
+# default VPC.
+PLAN_PAGE_SIZE = 1000
+PLAN_CALL_SECONDS = 0.2
+PLAN_RULES_PER_GROUP = 5
+EC2_DESCRIBE_BURST = 100
+EC2_DESCRIBE_RATE = 20
+PLAN_DEFAULT_REGION = {
+    'vpcs': 1, 'shared_vpcs': 0, 'subnets': 3, 'interfaces': 0, 'security_groups': 1,
+    'network_acls': 1, 'endpoints': 0, 'flow_logs': 0, 'log_groups': 0
+}
+
+# Request hedging: only idempotent read calls are hedged, at most this many
+# hedges are in flight, and an operation needs this many latency samples
+# (from a sliding window) before its p95 is trusted
+HEDGE_PREFIXES = ('describe_', 'list_')
+HEDGE_MAX_IN_FLIGHT = 4
+HEDGE_MIN_SAMPLES = 20
+HEDGE_SAMPLE_WINDOW = 200
+
+# Failed calls are retried after the main pass: this many rounds, with the
+# wait doubling from the base delay. Errors in NON_RETRYABLE_ERRORS, and
+# errors raised with retryable = False, are final.
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+NON_RETRYABLE_ERRORS = (
+    'AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation', 'AuthFailure', 'OptInRequired'
+)
+
+# Recorded AWS responses: one file per account, region and service under the
+# fixture directory, next to a copy of the account list with fake IDs
+FIXTURE_CONFIG_FILE = 'account-list.json'
+FIXTURE_GLOBAL_REGION = 'global'
+ACCOUNT_ID_PATTERN = re.compile(r'(?<!\d)\d{12}(?!\d)')
+
+# Columns of the per-region VPC tables in the report (see format_vpc_cells)
+VPC_TABLE_COLUMNS = (
+    'VPC Name', 'VPC ID', 'CIDR Blocks', 'Default', 'IGW', 'NAT GWs', 'Est. Cost/mo', 'Subnets', 'AZs', 'IP Util.',
+    'Interfaces', 'SGs', 'Open SGs', 'Unused SGs', 'Custom NACLs', 'NACL Subnets', 'Open NACLs', 'Endpoints',
+    'Flow Logs', 'Destination', 'Retention'
+)
+
+# How completely each account/region was scanned
+SCAN_STATUS_LABELS = {
+    'complete': 'Complete',
+    'partial': 'Partial',
+    'timed_out': 'Timed out',
+    'error': 'Error'
+}
+
+# Note for regions missing from the scan an event-updated inventory was loaded from
+EVENTS_ONLY_NOTE = 'Not in the stored scan; only VPCs named by change events were read'
+
+
+class ScanDeadlineExceeded(Exception):
+    """
+    Raised when the scan deadline passes part way through a region.
+    
+    Carries the VPC records collected before the deadline.
+    """
+
+    def __init__(self, vpc_list):
+        super().__init__(f"Scan deadline reached after {len(vpc_list)} VPC(s)")
+        self.vpc_list = vpc_list
+
+
+def print_banner(return_banner=False):
+    banner = r"""
+
+██╗   ██╗██████╗  ██████╗██████╗ ███████╗████████╗███████╗ ██████╗████████╗██╗██╗   ██╗███████╗
+██║   ██║██╔══██╗██╔════╝██╔══██╗██╔════╝╚══██╔══╝██╔════╝██╔════╝╚══██╔══╝██║██║   ██║██╔════╝
+██║   ██║██████╔╝██║     ██║  ██║█████╗     ██║   █████╗  ██║        ██║   ██║██║   ██║█████╗  
+╚██╗ ██╔╝██╔═══╝ ██║     ██║  ██║██╔══╝     ██║   ██╔══╝  ██║        ██║   ██║╚██╗ ██╔╝██╔══╝  
+ ╚████╔╝ ██║     ╚██████╗██████╔╝███████╗   ██║   ███████╗╚██████╗   ██║   ██║ ╚████╔╝ ███████╗
+  ╚═══╝  ╚═╝      ╚═════╝╚═════╝ ╚══════╝   ╚═╝   ╚══════╝ ╚═════╝   ╚═╝   ╚═╝  ╚═══╝  ╚══════╝
+    Sniffing out your subnets since 2025 
+    """
+    if return_banner:
+        return banner
+    print(banner)
+
+
+def get_region_network_interfaces(client, filters=None):
+    """
+    Retrieve every network interface in the region with a single pagination.
+    
+    Required IAM permission: ec2:DescribeNetworkInterfaces
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe filters, e.g. to limit the call to some VPCs
+        
+    Returns:
+        dict: Network interfaces grouped by VPC ID
+    """
+    interfaces_by_vpc = {}
+    try:
+        paginator = client.get_paginator('describe_network_interfaces')
+        for page in paginator.paginate(Filters=filters or []):
+            for interface in page['NetworkInterfaces']:
+                interfaces_by_vpc.setdefault(interface.get('VpcId'), []).append(interface)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return interfaces_by_vpc
+
+
+def get_interface_count(client, vpc_id, interfaces_by_vpc=None):
+    if interfaces_by_vpc is not None:
+        return len(interfaces_by_vpc.get(vpc_id, []))
+
+    interface_count = 0
+    try:
+        paginator = client.get_paginator('describe_network_interfaces')
+        page_iterator = paginator.paginate(
+            Filters=[
+                {
+                    'Name': 'vpc-id',
+                    'Values': [vpc_id]
+                }
+            ]
+        )
+        for page in page_iterator:
+            interface_count += len(page['NetworkInterfaces'])
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return interface_count
+
+
+def get_region_subnets(client, filters=None):
+    """
+    Retrieve every subnet in the region with a single pagination.
+    
+    Required IAM permission: ec2:DescribeSubnets
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe filters, e.g. to limit the call to some VPCs
+        
+    Returns:
+        dict: Subnets grouped by VPC ID
+    """
+    subnets_by_vpc = {}
+    try:
+        paginator = client.get_paginator('describe_subnets')
+        for page in paginator.paginate(Filters=filters or []):
+            for subnet in page['Subnets']:
+                subnets_by_vpc.setdefault(subnet['VpcId'], []).append(subnet)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return subnets_by_vpc
+
+
+def calculate_subnet_utilization(subnets_by_vpc, threshold=HOT_SUBNET_THRESHOLD):
+    """
+    Calculate IP utilization for every subnet in a region in one pass.
+    
+    AWS reserves five addresses in each subnet, so usable addresses are the
+    CIDR size minus five. IPv6-only subnets have no IPv4 range and are
+    reported with no utilization.
+    
+    Args:
+        subnets_by_vpc: Output of get_region_subnets
+        threshold: Utilization percentage at or above which a subnet is hot
+        
+    Returns:
+        dict: Subnet utilization records grouped by VPC ID
+        {vpc_id: [{'subnet_id', 'name', 'cidr', 'az', 'usable_ips',
+                   'available_ips', 'utilization', 'hot'}, ...]}
+    """
+    utilization_by_vpc = {}
+    for vpc_id, subnets in subnets_by_vpc.items():
+        records = utilization_by_vpc.setdefault(vpc_id, [])
+        for subnet in subnets:
+            cidr = subnet.get('CidrBlock')
+            usable_ips = max(ipaddress.ip_network(cidr).num_addresses - AWS_RESERVED_IPS, 0) if cidr else 0
+            available_ips = subnet.get('AvailableIpAddressCount', 0)
+            utilization = (usable_ips - available_ips) / usable_ips * 100 if usable_ips else None
+            records.append({
+                'subnet_id': subnet['SubnetId'],
+                'name': next((tag['Value'] for tag in subnet.get('Tags', []) if tag['Key'] == 'Name'), ''),
+                'cidr': cidr or '-',
+                'az': subnet.get('AvailabilityZone', '-'),
+                'usable_ips': usable_ips,
+                'available_ips': available_ips,
+                'utilization': utilization,
+                'hot': utilization is not None and utilization >= threshold
+            })
+    return utilization_by_vpc
+
+
+def summarize_vpc_subnets(subnet_records):
+    """
+    Summarize IP utilization and AZ spread for one VPC's subnets.
+    
+    Args:
+        subnet_records: One VPC's entry from calculate_subnet_utilization
+        
+    Returns:
+        dict: {'utilization': float or None, 'az_distribution': {az: subnet_count}}
+    """
+    usable_ips = sum(record['usable_ips'] for record in subnet_records)
+    available_ips = sum(record['available_ips'] for record in subnet_records if record['usable_ips'])
+    az_distribution = {}
+    for record in subnet_records:
+        az_distribution[record['az']] = az_distribution.get(record['az'], 0) + 1
+    return {
+        'utilization': (usable_ips - available_ips) / usable_ips * 100 if usable_ips else None,
+        'az_distribution': dict(sorted(az_distribution.items()))
+    }
+
+
+def get_vpc_subnets(client, vpc_id, subnets_by_vpc=None):
+    if subnets_by_vpc is not None:
+        return len(subnets_by_vpc.get(vpc_id, []))
+
+    subnet_count = 0
+    try:
+        paginator = client.get_paginator('describe_subnets')
+        page_iterator = paginator.paginate(
+            Filters=[
+                {
+                    'Name': 'vpc-id',
+                    'Values': [vpc_id]
+                }
+            ]
+        )
+        for page in page_iterator:
+            subnet_count = len(page['Subnets'])
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return subnet_count
+
+
+def get_natgws(client, vpc_id):
+    natgw_count = 0
+    try:
+        paginator = client.get_paginator('describe_nat_gateways')
+        page_iterator = paginator.paginate(
+            Filters = [
+                {
+                    'Name': 'vpc-id',
+                    'Values': [vpc_id]
+                }
+            ]
+        )
+        for page in page_iterator:
+            natgw_count += sum(1 for natgw in page['NatGateways'] if natgw.get('State') in ACTIVE_NATGW_STATES)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return natgw_count
+
+
+def get_vpc_igw(client, vpc_id):
+    try:
+        response = client.describe_internet_gateways(
+            Filters=[
+                {
+                    'Name': 'attachment.vpc-id',
+                    'Values': [vpc_id]
+                }
+            ]
+        )
+        if len(response['InternetGateways']) > 0:
+            return True
+        else:
+            return False
+    except botocore.exceptions.ClientError as error:
+        raise error
+
+
+def build_security_group_index(interfaces_by_vpc):
+    """
+    Build a reverse index from security group ID to the ENIs that use it.
+    
+    Args:
+        interfaces_by_vpc: Output of get_region_network_interfaces
+        
+    Returns:
+        dict: Security group ID -> set of network interface IDs
+    """
+    group_index = {}
+    for interfaces in interfaces_by_vpc.values():
+        for interface in interfaces:
+            for group in interface.get('Groups', []):
+                group_index.setdefault(group['GroupId'], set()).add(interface['NetworkInterfaceId'])
+    return group_index
+
+
+def get_region_security_groups(client, filters=None):
+    """
+    Retrieve all security groups and security group rules in the region.
+    
+    Required IAM permissions:
+    - ec2:DescribeSecurityGroups
+    - ec2:DescribeSecurityGroupRules
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe filters for the security groups; rules are
+            then limited to the groups found
+        
+    Returns:
+        dict: Security groups grouped by VPC ID and rules grouped by group ID
+        {
+            'groups_by_vpc': {vpc_id: [group, ...]},
+            'rules_by_group': {group_id: [rule, ...]}
+        }
+    """
+    groups_by_vpc = {}
+    rules_by_group = {}
+    try:
+        paginator = client.get_paginator('describe_security_groups')
+        for page in paginator.paginate(Filters=filters or []):
+            for group in page['SecurityGroups']:
+                groups_by_vpc.setdefault(group.get('VpcId'), []).append(group)
+        
+        rule_filters = []
+        if filters:
+            group_ids = [group['GroupId'] for groups in groups_by_vpc.values() for group in groups]
+            rule_filters = [{'Name': 'group-id', 'Values': group_ids}] if group_ids else None
+        
+        if rule_filters is not None:
+            paginator = client.get_paginator('describe_security_group_rules')
+            for page in paginator.paginate(Filters=rule_filters):
+                for rule in page['SecurityGroupRules']:
+                    rules_by_group.setdefault(rule['GroupId'], []).append(rule)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    
+    return {
+        'groups_by_vpc': groups_by_vpc,
+        'rules_by_group': rules_by_group
+    }
+
+
+def format_rule_ports(rule):
+    """
+    Format the protocol and port range of a security group rule for display.
+    
+    Args:
+        rule: Security group rule dictionary from describe_security_group_rules
+        
+    Returns:
+        tuple: (protocol, ports) display strings
+    """
+    protocol = rule.get('IpProtocol', '-1')
+    if protocol == '-1':
+        return 'All', 'All'
+    
+    from_port = rule.get('FromPort', -1)
+    to_port = rule.get('ToPort', -1)
+    if from_port == -1 or (from_port == 0 and to_port == 65535):
+        ports = 'All'
+    elif from_port == to_port:
+        ports = str(from_port)
+    else:
+        ports = f"{from_port}-{to_port}"
+    return protocol.upper(), ports
+
+
+def analyze_vpc_security_groups(vpc_id, security_groups, group_index):
+    """
+    Find security groups in a VPC that are open to the internet or unused.
+    
+    A group is exposed when it has an ingress rule from 0.0.0.0/0 or ::/0 and
+    unused when no network interface references it. Default groups cannot be
+    deleted, so they are never reported as unused.
+    
+    Args:
+        vpc_id: VPC identifier string
+        security_groups: Output of get_region_security_groups
+        group_index: Output of build_security_group_index
+        
+    Returns:
+        dict: Security group findings
+        {
+            'count': int or 'Error',
+            'exposed': [group_id, ...],
+            'unused': [group_id, ...],
+            'exposed_rules': [{'group_id', 'group_name', 'protocol', 'ports', 'source'}, ...]
+        }
+    """
+    if security_groups is None:
+        return {
+            'count': 'Error',
+            'exposed': [],
+            'unused': [],
+            'exposed_rules': []
+        }
+    
+    groups = security_groups['groups_by_vpc'].get(vpc_id, [])
+    exposed = []
+    unused = []
+    exposed_rules = []
+    
+    for group in groups:
+        group_id = group['GroupId']
+        
+        for rule in security_groups['rules_by_group'].get(group_id, []):
+            if rule.get('IsEgress'):
+                continue
+            source = rule.get('CidrIpv4') or rule.get('CidrIpv6')
+            if source not in OPEN_CIDRS:
+                continue
+            protocol, ports = format_rule_ports(rule)
+            exposed_rules.append({
+                'group_id': group_id,
+                'group_name': group.get('GroupName', ''),
+                'protocol': protocol,
+                'ports': ports,
+                'source': source
+            })
+            if group_id not in exposed:
+                exposed.append(group_id)
+        
+        if group.get('GroupName') != 'default' and not group_index.get(group_id):
+            unused.append(group_id)
+    
+    return {
+        'count': len(groups),
+        'exposed': exposed,
+        'unused': unused,
+        'exposed_rules': exposed_rules
+    }
+
+
+def get_region_network_acls(client, filters=None):
+    """
+    Retrieve all network ACLs in the region with a single pagination.
+    
+    Required IAM permission: ec2:DescribeNetworkAcls
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe filters, e.g. to limit the call to some VPCs
+        
+    Returns:
+        dict: Network ACLs grouped by VPC ID
+    """
+    acls_by_vpc = {}
+    try:
+        paginator = client.get_paginator('describe_network_acls')
+        for page in paginator.paginate(Filters=filters or []):
+            for network_acl in page['NetworkAcls']:
+                acls_by_vpc.setdefault(network_acl['VpcId'], []).append(network_acl)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return acls_by_vpc
+
+
+def compile_network_acl(network_acl):
+    """
+    Compile network ACL entries into rule lists ordered for evaluation.
+    
+    Entries are sorted by rule number and their CIDRs and port ranges parsed
+    once, so a NACL can be evaluated repeatedly without re-parsing.
+    
+    Args:
+        network_acl: Network ACL dictionary from describe_network_acls
+        
+    Returns:
+        dict: Compiled rules per direction
+        {
+            'ingress': [(rule_number, action, network, protocol, from_port, to_port), ...],
+            'egress': [...]
+        }
+    """
+    compiled = {'ingress': [], 'egress': []}
+    for entry in sorted(network_acl.get('Entries', []), key=lambda entry: entry['RuleNumber']):
+        cidr = entry.get('CidrBlock') or entry.get('Ipv6CidrBlock')
+        if not cidr:
+            continue
+        port_range = entry.get('PortRange')
+        if port_range:
+            from_port, to_port = port_range['From'], port_range['To']
+        else:
+            from_port, to_port = 0, 65535
+        direction = 'egress' if entry['Egress'] else 'ingress'
+        compiled[direction].append((
+            entry['RuleNumber'],
+            entry['RuleAction'],
+            ipaddress.ip_network(cidr),
+            entry['Protocol'],
+            from_port,
+            to_port
+        ))
+    return compiled
+
+
+def evaluate_network_acl(compiled_acl, direction, address, protocol, port):
+    """
+    Evaluate traffic against a compiled network ACL.
+    
+    Rules are checked in rule number order and the first match decides the
+    outcome, so a lower-numbered deny always wins over a later allow. Traffic
+    matching no rule is denied.
+    
+    Args:
+        compiled_acl: Output of compile_network_acl
+        direction: 'ingress' or 'egress'
+        address: Remote IP address string
+        protocol: Protocol number string ('6', '17', ...) or '-1' for all
+        port: Port number
+        
+    Returns:
+        str: 'allow' or 'deny'
+    """
+    ip = ipaddress.ip_address(address)
+    for _, action, network, rule_protocol, from_port, to_port in compiled_acl[direction]:
+        if ip.version != network.version or ip not in network:
+            continue
+        if rule_protocol != '-1' and rule_protocol != protocol:
+            continue
+        if rule_protocol in ['6', '17'] and not from_port <= port <= to_port:
+            continue
+        return action
+    return 'deny'
+
+
+def find_open_acl_rules(compiled_acl):
+    """
+    Find inbound allow rules for 0.0.0.0/0 or ::/0 that internet traffic reaches.
+    
+    An open allow rule is shadowed only when lower-numbered deny rules cover
+    every protocol and port it allows. Ports are probed at the rule's own
+    bounds and just inside the bounds of each earlier rule, since the
+    outcome can only change there.
+    
+    Args:
+        compiled_acl: Output of compile_network_acl
+        
+    Returns:
+        list: Rule numbers of open allow rules that are not shadowed
+    """
+    open_rules = []
+    rules = compiled_acl['ingress']
+    for index, (rule_number, action, network, protocol, from_port, to_port) in enumerate(rules):
+        if action != 'allow' or str(network) not in OPEN_CIDRS:
+            continue
+        # Evaluated up to this rule, an allow means traffic got this far
+        upto = {'ingress': rules[:index + 1]}
+        address = NACL_PROBE_ADDRESSES[network.version]
+        ports = {from_port, to_port}
+        for _, _, _, _, earlier_from, earlier_to in rules[:index]:
+            ports.update(port for port in (earlier_from - 1, earlier_from, earlier_to, earlier_to + 1) if from_port <= port <= to_port)
+        protocols = NACL_PROBE_PROTOCOLS if protocol == '-1' else (protocol,)
+        if any(evaluate_network_acl(upto, 'ingress', address, probe_protocol, port) == 'allow'
+               for probe_protocol in protocols for port in sorted(ports)):
+            open_rules.append(rule_number)
+    return open_rules
+
+
+def analyze_vpc_network_acls(vpc_id, network_acls, compiled_acls):
+    """
+    Summarize network ACLs for a VPC.
+    
+    Only custom NACLs are checked for open allow rules: the default NACL
+    allows all traffic unless it was changed, so flagging it would flag
+    every VPC.
+    
+    Args:
+        vpc_id: VPC identifier string
+        network_acls: Output of get_region_network_acls, or None if the
+            network ACLs could not be read
+        compiled_acls: Cache of compiled NACLs keyed by NACL ID, filled on demand
+        
+    Returns:
+        dict: Network ACL findings
+        {
+            'custom_count': int or 'Error',
+            'subnet_associations': int or 'Error',
+            'open': [network_acl_id, ...]
+        }
+    """
+    if network_acls is None:
+        return {
+            'custom_count': 'Error',
+            'subnet_associations': 'Error',
+            'open': []
+        }
+    
+    custom_count = 0
+    subnet_associations = 0
+    open_acls = []
+    for network_acl in network_acls.get(vpc_id, []):
+        acl_id = network_acl['NetworkAclId']
+        if network_acl.get('IsDefault'):
+            continue
+        custom_count += 1
+        subnet_associations += len(network_acl.get('Associations', []))
+        
+        if acl_id not in compiled_acls:
+            compiled_acls[acl_id] = compile_network_acl(network_acl)
+        if find_open_acl_rules(compiled_acls[acl_id]):
+            open_acls.append(acl_id)
+    
+    return {
+        'custom_count': custom_count,
+        'subnet_associations': subnet_associations,
+        'open': open_acls
+    }
+
+
+def get_region_vpc_endpoints(client, filters=None):
+    """
+    Retrieve all VPC endpoints in the region with a single pagination.
+    
+    Required IAM permission: ec2:DescribeVpcEndpoints
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe filters, e.g. to limit the call to some VPCs
+        
+    Returns:
+        dict: VPC endpoints grouped by VPC ID
+    """
+    endpoints_by_vpc = {}
+    try:
+        paginator = client.get_paginator('describe_vpc_endpoints')
+        for page in paginator.paginate(Filters=filters or []):
+            for endpoint in page['VpcEndpoints']:
+                if endpoint.get('State', '').lower() in INACTIVE_ENDPOINT_STATES:
+                    continue
+                endpoints_by_vpc.setdefault(endpoint['VpcId'], []).append(endpoint)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return endpoints_by_vpc
+
+
+def get_endpoint_service(service_name):
+    """
+    Shorten an endpoint service name to the service it reaches.
+    
+    'com.amazonaws.us-east-1.s3' becomes 's3' and
+    'com.amazonaws.us-east-1.ecr.dkr' becomes 'ecr.dkr'.
+    
+    Args:
+        service_name: ServiceName from describe_vpc_endpoints
+        
+    Returns:
+        str: Short service name
+    """
+    parts = service_name.split('.')
+    for index, part in enumerate(parts):
+        if REGION_PATTERN.match(part) and index + 1 < len(parts):
+            return '.'.join(parts[index + 1:])
+    return service_name
+
+
+def analyze_vpc_endpoints(vpc_id, vpc_endpoints):
+    """
+    Summarize the Gateway and Interface endpoints of a VPC.
+    
+    Args:
+        vpc_id: VPC identifier string
+        vpc_endpoints: Output of get_region_vpc_endpoints, or None if the
+            endpoints could not be read
+        
+    Returns:
+        dict: VPC endpoint findings
+        {
+            'count': int or 'Error',
+            'endpoints': [{'id', 'type', 'service', 'security_groups', 'network_interfaces'}, ...]
+        }
+    """
+    if vpc_endpoints is None:
+        return {
+            'count': 'Error',
+            'endpoints': []
+        }
+    
+    endpoints = []
+    for endpoint in vpc_endpoints.get(vpc_id, []):
+        endpoints.append({
+            'id': endpoint['VpcEndpointId'],
+            'type': endpoint.get('VpcEndpointType', 'Gateway'),
+            'service': get_endpoint_service(endpoint['ServiceName']),
+            'security_groups': [group['GroupId'] for group in endpoint.get('Groups', [])],
+            'network_interfaces': len(endpoint.get('NetworkInterfaceIds', []))
+        })
+    
+    return {
+        'count': len(endpoints),
+        'endpoints': endpoints
+    }
+
+
+def get_cloudwatch_retention(logs_client, log_group_name, log_group_cache=None):
+    """
+    Get retention period for CloudWatch Log Group.
+    
+    Required IAM permission: logs:DescribeLogGroups
+    
+    Args:
+        logs_client: CloudWatch Logs boto3 client
+        log_group_name: Log group name string
+        log_group_cache: Optional dict of log group name -> log group details,
+            shared by VPCs in a region so each group is described once
+        
+    Returns:
+        str: Retention period ('30 days', 'Never', 'N/A')
+    """
+    try:
+        if log_group_cache is not None and log_group_name in log_group_cache:
+            log_group = log_group_cache[log_group_name]
+        else:
+            response = logs_client.describe_log_groups(
+                logGroupNamePrefix=log_group_name,
+                limit=1
+            )
+            
+            log_group = None
+            if response['logGroups'] and response['logGroups'][0]['logGroupName'] == log_group_name:
+                log_group = response['logGroups'][0]
+            if log_group_cache is not None:
+                log_group_cache[log_group_name] = log_group
+        
+        if log_group:
+            retention_days = log_group.get('retentionInDays')
+            if retention_days:
+                return f"{retention_days} days"
+            else:
+                return "Never"
+        
+        return "N/A"
+        
+    except botocore.exceptions.ClientError as error:
+        error_code = error.response['Error']['Code']
+        if error_code in ['AccessDenied', 'UnauthorizedOperation']:
+            print(f"    Warning: No CloudWatch Logs permissions for log group {log_group_name}")
+        else:
+            print(f"    Error getting retention for log group {log_group_name}: {error}")
+        return "N/A"
+
+
+def get_vpc_flow_logs(ec2_client, logs_client, vpc_id, log_group_cache=None):
+    """
+    Retrieve Flow Logs configuration for a specific VPC.
+    
+    Required IAM permissions: 
+    - ec2:DescribeFlowLogs
+    - logs:DescribeLogGroups (for CloudWatch destinations)
+    
+    Args:
+        ec2_client: EC2 boto3 client
+        logs_client: CloudWatch Logs boto3 client  
+        vpc_id: VPC identifier string
+        log_group_cache: Optional log group cache passed to get_cloudwatch_retention
+        
+    Returns:
+        dict: Flow Logs information
+        {
+            'status': 'Enabled|Disabled|Multiple|Error',
+            'destinations': ['CloudWatch', 'S3', 'Kinesis'],
+            'retention_days': str,
+            'log_groups': [str],  # CloudWatch log group names
+            'destination_arns': [str]  # S3 bucket and Firehose stream ARNs
+        }
+    """
+    try:
+        paginator = ec2_client.get_paginator('describe_flow_logs')
+        page_iterator = paginator.paginate(
+            Filters=[
+                {'Name': 'resource-id', 'Values': [vpc_id]},
+                {'Name': 'resource-type', 'Values': ['VPC']}
+            ]
+        )
+        
+        flow_logs = []
+        for page in page_iterator:
+            flow_logs.extend(page['FlowLogs'])
+        
+        # Filter for active flow logs only
+        active_flow_logs = [fl for fl in flow_logs if fl['FlowLogStatus'] == 'ACTIVE']
+        return summarize_flow_logs(active_flow_logs, logs_client, log_group_cache)
+        
+    except botocore.exceptions.ClientError as error:
+        error_code = error.response['Error']['Code']
+        if error_code in ['AccessDenied', 'UnauthorizedOperation']:
+            print(f"    Warning: No Flow Logs permissions for VPC {vpc_id}")
+        else:
+            print(f"    Error getting Flow Logs for VPC {vpc_id}: {error}")
+        
+        return {
+            'status': 'Error',
+            'destinations': [],
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': []
+        }
+
+
+def summarize_flow_logs(active_flow_logs, logs_client, log_group_cache=None):
+    """
+    Summarize the active flow logs attributed to one VPC.
+    
+    Args:
+        active_flow_logs: Active flow logs from describe_flow_logs
+        logs_client: CloudWatch Logs boto3 client
+        log_group_cache: Optional log group cache passed to get_cloudwatch_retention
+        
+    Returns:
+        dict: Flow Logs information in the format of get_vpc_flow_logs
+    """
+    if not active_flow_logs:
+        return {
+            'status': 'Disabled',
+            'destinations': [],
+            'retention_days': 'N/A',
+            'log_groups': [],
+            'destination_arns': []
+        }
+    
+    # Determine destinations and status
+    destinations = set()
+    log_groups = set()
+    destination_arns = set()
+    retention_periods = []
+    
+    for flow_log in active_flow_logs:
+        destination_type = flow_log['LogDestinationType']
+        
+        if destination_type == 'cloud-watch-logs':
+            destinations.add('CloudWatch')
+            # Get retention for CloudWatch destinations
+            log_group_name = flow_log['LogGroupName']
+            log_groups.add(log_group_name)
+            retention = get_cloudwatch_retention(logs_client, log_group_name, log_group_cache)
+            if retention != 'N/A':
+                retention_periods.append(retention)
+                
+        elif destination_type == 's3':
+            destinations.add('S3')
+            destination_arns.add(flow_log['LogDestination'])
+            
+        elif destination_type == 'kinesis-data-firehose':
+            destinations.add('Kinesis')
+            destination_arns.add(flow_log['LogDestination'])
+    
+    # Determine status
+    if len(active_flow_logs) == 1:
+        status = 'Enabled'
+    else:
+        status = 'Multiple'
+    
+    # Determine retention (shortest period for CloudWatch, N/A for others)
+    if retention_periods:
+        # Find shortest retention period
+        retention_days_list = []
+        for period in retention_periods:
+            if period == 'Never':
+                retention_days_list.append(float('inf'))
+            else:
+                days = int(period.split()[0])
+                retention_days_list.append(days)
+        
+        min_retention = min(retention_days_list)
+        if min_retention == float('inf'):
+            retention_result = 'Never'
+        else:
+            retention_result = f"{int(min_retention)} days"
+    else:
+        retention_result = 'N/A'
+    
+    return {
+        'status': status,
+        'destinations': sorted(list(destinations)),
+        'retention_days': retention_result,
+        'log_groups': sorted(log_groups),
+        'destination_arns': sorted(destination_arns)
+    }
+
+
+def get_region_flow_logs(client):
+    """
+    Retrieve every active flow log in the region with a single pagination.
+    
+    Flow logs on VPCs, subnets and network interfaces are all returned so
+    each can be attributed to its VPC (see get_flow_log_coverage).
+    DescribeFlowLogs has no VPC filter, so the whole region is read even
+    when refreshing some VPCs.
+    
+    Required IAM permission: ec2:DescribeFlowLogs
+    
+    Args:
+        client: EC2 boto3 client
+        
+    Returns:
+        dict: Active flow logs grouped by resource ID (vpc-, subnet- or eni-)
+    """
+    flow_logs_by_resource = {}
+    try:
+        paginator = client.get_paginator('describe_flow_logs')
+        for page in paginator.paginate():
+            for flow_log in page['FlowLogs']:
+                if flow_log['FlowLogStatus'] == 'ACTIVE':
+                    flow_logs_by_resource.setdefault(flow_log.get('ResourceId'), []).append(flow_log)
+    except botocore.exceptions.ClientError as error:
+        raise error
+    return flow_logs_by_resource
+
+
+def get_flow_log_coverage(vpc_id, flow_logs_by_resource, subnets, interfaces):
+    """
+    Attribute VPC, subnet and ENI flow logs to a VPC and rate its coverage.
+    
+    A VPC flow log covers every subnet. Otherwise a subnet is covered when it
+    has its own flow log, or when it has network interfaces and each of them
+    has one.
+    
+    Args:
+        vpc_id: VPC identifier string
+        flow_logs_by_resource: Output of get_region_flow_logs
+        subnets: The VPC's subnets from get_region_subnets
+        interfaces: The VPC's network interfaces from get_region_network_interfaces
+        
+    Returns:
+        dict: {'flow_logs': [active flow logs attributed to the VPC],
+               'coverage': 'full|partial|none',
+               'percentage': float}  # share of subnets covered
+    """
+    vpc_flow_logs = flow_logs_by_resource.get(vpc_id, [])
+    flow_logs = list(vpc_flow_logs)
+    interfaces_by_subnet = {}
+    for interface in interfaces:
+        interfaces_by_subnet.setdefault(interface.get('SubnetId'), []).append(interface)
+        flow_logs.extend(flow_logs_by_resource.get(interface['NetworkInterfaceId'], []))
+    
+    covered_subnets = 0
+    for subnet in subnets:
+        subnet_flow_logs = flow_logs_by_resource.get(subnet['SubnetId'], [])
+        flow_logs.extend(subnet_flow_logs)
+        subnet_interfaces = interfaces_by_subnet.get(subnet['SubnetId'], [])
+        if subnet_flow_logs or (subnet_interfaces and all(
+            interface['NetworkInterfaceId'] in flow_logs_by_resource for interface in subnet_interfaces
+        )):
+            covered_subnets += 1
+    
+    if vpc_flow_logs or (subnets and covered_subnets == len(subnets)):
+        coverage, percentage = 'full', 100.0
+    elif flow_logs:
+        coverage = 'partial'
+        percentage = covered_subnets / len(subnets) * 100 if subnets else 0.0
+    else:
+        coverage, percentage = 'none', 0.0
+    
+    return {'flow_logs': flow_logs, 'coverage': coverage, 'percentage': percentage}
+
+
+def apply_flow_log_fields(vpcs, flow_logs_by_resource, subnets_by_vpc, interfaces_by_vpc, logs_client, log_group_cache):
+    """
+    Set flow log fields from the region's flow logs, subnets and interfaces.
+    
+    Args:
+        vpcs: VPC data dictionaries, updated in place
+        flow_logs_by_resource: Output of get_region_flow_logs, or None if the
+            flow logs could not be read
+        subnets_by_vpc: Output of get_region_subnets, or None
+        interfaces_by_vpc: Output of get_region_network_interfaces, or None
+        logs_client: CloudWatch Logs boto3 client
+        log_group_cache: Log group cache passed to get_cloudwatch_retention
+    """
+    for vpc in vpcs:
+        vpc_id = vpc['vpc_id']
+        if flow_logs_by_resource is None:
+            coverage = {'coverage': None, 'percentage': None}
+            flow_logs_data = {
+                'status': 'Error',
+                'destinations': [],
+                'retention_days': 'N/A',
+                'log_groups': [],
+                'destination_arns': []
+            }
+            coverage['flow_logs'] = []
+        else:
+            coverage = get_flow_log_coverage(
+                vpc_id, flow_logs_by_resource,
+                (subnets_by_vpc or {}).get(vpc_id, []), (interfaces_by_vpc or {}).get(vpc_id, [])
+            )
+            flow_logs_data = summarize_flow_logs(coverage['flow_logs'], logs_client, log_group_cache)
+        vpc.update({
+            'flow_logs_status': flow_logs_data['status'],
+            'flow_logs_coverage': coverage['coverage'],
+            'flow_logs_coverage_percentage': coverage['percentage'],
+            'flow_logs_destinations': flow_logs_data['destinations'],
+            'flow_logs_retention': flow_logs_data['retention_days'],
+            'flow_logs_log_groups': flow_logs_data['log_groups'],
+            'flow_logs_destination_arns': flow_logs_data['destination_arns'],
+            'flow_logs_destination_issues': find_missing_log_groups(flow_logs_data['log_groups'], log_group_cache),
+            'flow_log_ids': sorted({flow_log['FlowLogId'] for flow_log in coverage['flow_logs'] if flow_log.get('FlowLogId')})
+        })
+
+
+def find_missing_log_groups(log_groups, log_group_cache):
+    """
+    List CloudWatch flow log destinations whose log group no longer exists.
+    
+    Only groups get_cloudwatch_retention looked up and did not find are
+    reported; groups that could not be read are left alone.
+    
+    Args:
+        log_groups: Log group names a VPC's flow logs deliver to
+        log_group_cache: Log group details gathered by get_cloudwatch_retention
+        
+    Returns:
+        list: Destination issues ({'type', 'destination', 'problem'})
+    """
+    return [
+        {'type': 'CloudWatch', 'destination': log_group_name, 'problem': 'log group not found'}
+        for log_group_name in log_groups
+        if log_group_name in log_group_cache and log_group_cache[log_group_name] is None
+    ]
+
+
+def parse_destination_arn(arn):
+    """
+    Split a flow log destination ARN into the parts needed to check it.
+    
+    Args:
+        arn: S3 bucket ARN (optionally with a key prefix) or Firehose
+            delivery stream ARN
+        
+    Returns:
+        dict: {'service', 'region', 'account_id', 'name'}, or None if the
+            ARN is not an S3 or Firehose ARN
+    """
+    parts = arn.split(':', 5)
+    if len(parts) != 6 or parts[0] != 'arn':
+        return None
+    service, region, account_id, resource = parts[2], parts[3], parts[4], parts[5]
+    if service == 's3':
+        return {'service': 's3', 'region': region, 'account_id': account_id, 'name': resource.split('/', 1)[0]}
+    if service == 'firehose' and resource.startswith('deliverystream/'):
+        return {'service': 'firehose', 'region': region, 'account_id': account_id, 'name': resource.split('/', 1)[1]}
+    return None
+
+
+def list_owned_buckets(s3_client):
+    """
+    List the names of every S3 bucket owned by the account.
+    
+    Required IAM permission: s3:ListAllMyBuckets
+    
+    Args:
+        s3_client: S3 boto3 client
+        
+    Returns:
+        set: Bucket names, or None if the buckets could not be listed
+    """
+    try:
+        return {bucket['Name'] for bucket in s3_client.list_buckets()['Buckets']}
+    except botocore.exceptions.ClientError as error:
+        print(f"    Warning: Could not list S3 buckets, checking flow log buckets one by one: {error}")
+        return None
+
+
+def check_s3_bucket(s3_client, bucket_name):
+    """
+    Check that an S3 bucket outside the account's own bucket list exists.
+    
+    Required IAM permission: s3:ListBucket
+    
+    Args:
+        s3_client: S3 boto3 client
+        bucket_name: Bucket name
+        
+    Returns:
+        str: Problem description, or None if the bucket exists or could not
+            be checked (403 means it exists but belongs to someone else)
+    """
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+        return None
+    except botocore.exceptions.ClientError as error:
+        error_code = error.response['Error']['Code']
+        if error_code in ['404', 'NoSuchBucket', 'NotFound']:
+            return 'bucket not found'
+        if error_code not in ['403', 'AccessDenied']:
+            print(f"    Warning: Could not check flow log bucket {bucket_name}: {error}")
+        return None
+
+
+def list_delivery_streams(firehose_client):
+    """
+    List the names of every Firehose delivery stream in a region.
+    
+    Required IAM permission: firehose:ListDeliveryStreams
+    
+    Args:
+        firehose_client: Firehose boto3 client
+        
+    Returns:
+        set: Delivery stream names, or None if they could not be listed
+    """
+    try:
+        stream_names = set()
+        kwargs = {'Limit': 10000}
+        while True:
+            response = firehose_client.list_delivery_streams(**kwargs)
+            stream_names.update(response['DeliveryStreamNames'])
+            if not response.get('HasMoreDeliveryStreams') or not response['DeliveryStreamNames']:
+                return stream_names
+            kwargs['ExclusiveStartDeliveryStreamName'] = response['DeliveryStreamNames'][-1]
+    except botocore.exceptions.ClientError as error:
+        print(f"    Warning: Could not list Firehose delivery streams in {firehose_client.meta.region_name}: {error}")
+        return None
+
+
+class DestinationCache:
+    """
+    Flow log destination checks shared by every account and region of a run.
+    
+    Each key is looked up once: the first worker to ask runs the lookup and
+    workers asking for the same key meanwhile wait for its result.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = {}
+
+    def get(self, key, lookup):
+        """
+        Return the cached result for key, running lookup() if no worker has.
+        
+        Args:
+            key: Destination ARN or listing key
+            lookup: Callable producing the result
+        """
+        with self.lock:
+            result = self.results.get(key)
+            owner = result is None
+            if owner:
+                result = self.results[key] = futures.Future()
+        if owner:
+            try:
+                result.set_result(lookup())
+            except Exception as error:
+                result.set_exception(error)
+        return result.result()
+
+
+def check_flow_log_destinations(boto3_sso_session, account_id, vpc_list, destination_cache=None, client_config=None):
+    """
+    Check that the S3 buckets and Firehose streams flow logs deliver to exist.
+    
+    An ACTIVE flow log keeps its status after its destination is deleted, so
+    the destinations are checked in bulk: one bucket listing per account and
+    one stream listing per region, with head_bucket only for buckets owned
+    by another account. Results are kept in destination_cache by ARN, so a
+    destination shared by many VPCs, accounts or regions is checked once
+    per run. Listings are cached under ('s3', account_id) and
+    ('firehose', account_id, region) keys.
+    
+    Firehose streams in another account cannot be listed and are not
+    checked.
+    
+    Args:
+        boto3_sso_session: Session for the account
+        account_id: Account ID of the session
+        vpc_list: VPC data dictionaries, whose flow_logs_destination_issues
+            are extended in place
+        destination_cache: Optional DestinationCache shared across regions
+            and accounts
+        client_config: Optional botocore Config for the S3 and Firehose clients
+    """
+    if destination_cache is None:
+        destination_cache = DestinationCache()
+    
+    destination_arns = sorted({arn for vpc in vpc_list for arn in vpc.get('flow_logs_destination_arns', [])})
+    clients = {}
+    
+    def get_client(service, region):
+        if (service, region) not in clients:
+            clients[(service, region)] = boto3_sso_session.client(service, region_name=region, config=client_config)
+        return clients[(service, region)]
+    
+    def check_destination(arn):
+        destination = parse_destination_arn(arn)
+        if destination is None:
+            return None
+        if destination['service'] == 's3':
+            s3_client = get_client('s3', None)
+            owned_buckets = destination_cache.get(('s3', account_id), functools.partial(list_owned_buckets, s3_client))
+            if owned_buckets is None or destination['name'] not in owned_buckets:
+                return check_s3_bucket(s3_client, destination['name'])
+        elif destination['account_id'] == account_id:
+            stream_names = destination_cache.get(
+                ('firehose', account_id, destination['region']),
+                lambda: list_delivery_streams(get_client('firehose', destination['region']))
+            )
+            if stream_names is not None and destination['name'] not in stream_names:
+                return 'delivery stream not found'
+        return None
+    
+    try:
+        problems = {arn: destination_cache.get(arn, functools.partial(check_destination, arn)) for arn in destination_arns}
+    finally:
+        for client in clients.values():
+            client.close()
+    
+    for vpc in vpc_list:
+        for arn in vpc.get('flow_logs_destination_arns', []):
+            if problems[arn]:
+                destination_type = 'S3' if parse_destination_arn(arn)['service'] == 's3' else 'Kinesis'
+                vpc['flow_logs_destination_issues'].append(
+                    {'type': destination_type, 'destination': arn, 'problem': problems[arn]}
+                )
+
+
+@functools.lru_cache(maxsize=None)
+def load_price_table(path=PRICE_TABLE_FILE):
+    """
+    Load the local price table used for offline cost estimates.
+    
+    Args:
+        path: Path to the price table JSON file
+        
+    Returns:
+        dict: Price table with 'version', 'currency', 'default' and 'regions'
+    """
+    with open(path) as price_file:
+        return json.load(price_file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_price(region, item):
+    """
+    Look up a unit price for a region, falling back to the default prices.
+    
+    Args:
+        region: AWS region name
+        item: Price table key, e.g. 'nat_gateway_hour'
+        
+    Returns:
+        float: Unit price in the price table currency
+    """
+    price_table = load_price_table()
+    region_prices = price_table['regions'].get(region, {})
+    return region_prices.get(item, price_table['default'][item])
+
+
+def estimate_vpc_costs(vpc, flow_log_storage_bytes=0):
+    """
+    Estimate the fixed monthly cost of a VPC's billable network resources.
+    
+    Covers NAT gateway and interface endpoint hours (per endpoint ENI) and
+    CloudWatch Logs storage for flow logs. Data processing charges depend on
+    traffic volume and are not included.
+    
+    Args:
+        vpc: VPC data dictionary
+        flow_log_storage_bytes: Stored bytes of the VPC's flow log groups
+        
+    Returns:
+        dict: Monthly estimates
+        {
+            'nat_gateways': float,
+            'interface_endpoints': float,
+            'flow_log_storage': float,
+            'total': float
+        }
+    """
+    region = vpc['region']
+    
+    natgw_count = vpc['natgw_count'] if isinstance(vpc.get('natgw_count'), int) else 0
+    nat_gateways = natgw_count * get_price(region, 'nat_gateway_hour') * HOURS_PER_MONTH
+    
+    endpoint_hours = sum(
+        endpoint['network_interfaces'] for endpoint in vpc.get('vpc_endpoints', [])
+        if endpoint['type'] == 'Interface'
+    )
+    interface_endpoints = endpoint_hours * get_price(region, 'interface_endpoint_hour') * HOURS_PER_MONTH
+    
+    flow_log_storage = flow_log_storage_bytes / BYTES_PER_GB * get_price(region, 'cloudwatch_logs_storage_gb_month')
+    
+    return {
+        'nat_gateways': round(nat_gateways, 2),
+        'interface_endpoints': round(interface_endpoints, 2),
+        'flow_log_storage': round(flow_log_storage, 2),
+        'total': round(nat_gateways + interface_endpoints + flow_log_storage, 2)
+    }
+
+
+def apply_cost_estimates(vpc_list, log_group_cache):
+    """
+    Attach cost estimates to every VPC collected in a region.
+    
+    Storage of a log group shared by several VPCs is split evenly between
+    them so region and account totals count it once.
+    
+    Args:
+        vpc_list: VPC data dictionaries for one region, updated in place
+        log_group_cache: Log group details gathered by get_cloudwatch_retention
+    """
+    sharers = {}
+    for vpc in vpc_list:
+        for log_group_name in vpc['flow_logs_log_groups']:
+            sharers[log_group_name] = sharers.get(log_group_name, 0) + 1
+    
+    for vpc in vpc_list:
+        storage_bytes = 0
+        for log_group_name in vpc['flow_logs_log_groups']:
+            log_group = log_group_cache.get(log_group_name)
+            if log_group:
+                storage_bytes += log_group.get('storedBytes', 0) / sharers[log_group_name]
+        vpc['estimated_costs'] = estimate_vpc_costs(vpc, storage_bytes)
+
+
+def get_log_group_volumes(cloudwatch_client, log_group_names, window_hours=FLOW_LOG_VOLUME_HOURS, end_time=None):
+    """
+    Read IncomingBytes and IncomingLogEvents for CloudWatch log groups.
+    
+    Every log group is queried once however many VPCs share it, and the
+    queries are sent in batches of METRIC_DATA_BATCH per GetMetricData call.
+    
+    Required IAM permission: cloudwatch:GetMetricData
+    
+    Args:
+        cloudwatch_client: CloudWatch boto3 client for the log groups' region
+        log_group_names: Log group names, duplicates allowed
+        window_hours: Length of the window summed, ending at end_time
+        end_time: Optional datetime ending the window (default: now)
+        
+    Returns:
+        dict: Log group name -> {'incoming_bytes', 'incoming_log_events'},
+            or None if the metrics could not be read
+    """
+    end_time = end_time or datetime.now(timezone.utc)
+    start_time = end_time - timedelta(hours=window_hours)
+    # One datapoint per metric; periods must be a multiple of 60 seconds
+    period = max(60, int(window_hours * 3600) // 60 * 60)
+    
+    volumes = {}
+    queries = []
+    query_targets = {}
+    for index, log_group_name in enumerate(sorted(set(log_group_names))):
+        volumes[log_group_name] = {key: 0.0 for _, key in FLOW_LOG_VOLUME_METRICS}
+        for metric_name, key in FLOW_LOG_VOLUME_METRICS:
+            query_id = f"{key}_{index}"
+            query_targets[query_id] = (log_group_name, key)
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/Logs',
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'LogGroupName', 'Value': log_group_name}]
+                    },
+                    'Period': period,
+                    'Stat': 'Sum'
+                },
+                'ReturnData': True
+            })
+    
+    try:
+        paginator = cloudwatch_client.get_paginator('get_metric_data')
+        for start in range(0, len(queries), METRIC_DATA_BATCH):
+            for page in paginator.paginate(MetricDataQueries=queries[start:start + METRIC_DATA_BATCH],
+                                           StartTime=start_time, EndTime=end_time):
+                for result in page['MetricDataResults']:
+                    log_group_name, key = query_targets[result['Id']]
+                    volumes[log_group_name][key] += sum(result['Values'])
+        return volumes
+    except botocore.exceptions.ClientError as error:
+        error_code = error.response['Error']['Code']
+        if error_code in ['AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation']:
+            print(f"    Warning: No CloudWatch metrics permissions for flow log volumes")
+        else:
+            print(f"    Error getting flow log volumes: {error}")
+        return None
+
+
+def apply_flow_log_volumes(vpc_list, volumes, window_hours=FLOW_LOG_VOLUME_HOURS):
+    """
+    Attach flow log volumes to every VPC collected in a region.
+    
+    Like flow log storage costs, a log group shared by several VPCs is split
+    evenly between them so region and account totals count it once.
+    
+    Args:
+        vpc_list: VPC data dictionaries for one region, updated in place
+        volumes: Output of get_log_group_volumes
+        window_hours: Length of the window the volumes cover
+    """
+    sharers = {}
+    for vpc in vpc_list:
+        for log_group_name in vpc['flow_logs_log_groups']:
+            sharers[log_group_name] = sharers.get(log_group_name, 0) + 1
+    
+    for vpc in vpc_list:
+        if not vpc['flow_logs_log_groups']:
+            vpc['flow_logs_volume'] = None
+        elif volumes is None:
+            vpc['flow_logs_volume'] = 'Error'
+        else:
+            vpc['flow_logs_volume'] = {'window_hours': window_hours}
+            for _, key in FLOW_LOG_VOLUME_METRICS:
+                vpc['flow_logs_volume'][key] = sum(
+                    volumes[log_group_name][key] / sharers[log_group_name]
+                    for log_group_name in vpc['flow_logs_log_groups']
+                )
+
+
+def format_bytes(size):
+    """
+    Format a byte count for the report.
+    
+    Args:
+        size: Number of bytes
+        
+    Returns:
+        str: Size in GB with two decimals, e.g. '1.25 GB'
+    """
+    return f"{size / BYTES_PER_GB:,.2f} GB"
+
+
+def get_vpc_cidr_blocks(vpc_info):
+    """
+    List every IPv4 and IPv6 CIDR block associated with a VPC.
+    
+    Args:
+        vpc_info: VPC dictionary from describe_vpcs
+        
+    Returns:
+        list: CIDR block strings, primary IPv4 block first
+    """
+    cidr_blocks = [vpc_info['CidrBlock']]
+    for association in vpc_info.get('CidrBlockAssociationSet', []):
+        if association['CidrBlockState']['State'] not in ACTIVE_CIDR_STATES:
+            continue
+        if association['CidrBlock'] not in cidr_blocks:
+            cidr_blocks.append(association['CidrBlock'])
+    for association in vpc_info.get('Ipv6CidrBlockAssociationSet', []):
+        if association['Ipv6CidrBlockState']['State'] not in ACTIVE_CIDR_STATES:
+            continue
+        cidr_blocks.append(association['Ipv6CidrBlock'])
+    return cidr_blocks
+
+
+def find_cidr_overlaps(vpc_data_list, include_default=False):
+    """
+    Find overlapping CIDR blocks between VPCs across the whole scan.
+    
+    Ranges are sorted by start address (widest first on ties) and swept once.
+    CIDR blocks either nest or are disjoint, so the ranges still open at any
+    point form a chain of enclosing blocks held on a stack; each block
+    overlaps exactly the blocks on the stack when it is reached. This is
+    O(n log n) plus the number of overlaps reported.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        include_default: Whether default VPCs take part; they all share
+            172.31.0.0/16 and are rarely peered
+        
+    Returns:
+        list: Overlapping pairs
+        [{'cidr_a', 'vpc_a', 'cidr_b', 'vpc_b'}, ...] where vpc_* are
+        {'vpc_id', 'account_id', 'account_name', 'region'}
+    """
+    ranges = []
+    for vpc in vpc_data_list:
+        if vpc.get('is_default') and not include_default:
+            continue
+        vpc_ref = {
+            'vpc_id': vpc['vpc_id'],
+            'account_id': vpc.get('account_id', ''),
+            'account_name': vpc.get('account_name', ''),
+            'region': vpc['region']
+        }
+        for cidr in vpc.get('cidr_blocks') or [vpc['vpc_cidr']]:
+            network = ipaddress.ip_network(cidr, strict=False)
+            start = int(network.network_address)
+            end = int(network.broadcast_address)
+            ranges.append((network.version, start, -end, cidr, vpc_ref))
+    
+    ranges.sort(key=lambda item: item[:3])
+    
+    overlaps = []
+    stack = []
+    for version, start, negative_end, cidr, vpc_ref in ranges:
+        while stack and (stack[-1][0] != version or -stack[-1][2] < start):
+            stack.pop()
+        for _, _, _, open_cidr, open_vpc_ref in stack:
+            if open_vpc_ref is vpc_ref:
+                continue
+            overlaps.append({
+                'cidr_a': open_cidr,
+                'vpc_a': open_vpc_ref,
+                'cidr_b': cidr,
+                'vpc_b': vpc_ref
+            })
+        stack.append((version, start, negative_end, cidr, vpc_ref))
+    
+    return overlaps
+
+
+def is_retryable_error(error):
+    """
+    Check whether retrying a failed AWS call could succeed.
+    
+    Permission and authentication errors are final, as are errors whose
+    raiser set retryable = False on them; throttling, service errors,
+    timeouts and connection errors are worth another attempt.
+    """
+    if not getattr(error, 'retryable', True):
+        return False
+    if isinstance(error, botocore.exceptions.ClientError):
+        return error.response['Error']['Code'] not in NON_RETRYABLE_ERRORS
+    return True
+
+
+def collect_or_queue(retry_queue, description, call, apply, failed_value='Error'):
+    """
+    Make one AWS call and apply its result, queueing it for retry on failure.
+    
+    On failure apply() receives failed_value so the record is complete
+    either way, and the call is queued unless retrying cannot help.
+    
+    Args:
+        retry_queue: List of failed calls, appended to in place
+        description: What the call reads, for messages
+        call: Callable making the AWS call
+        apply: Callable storing the call's result
+        failed_value: Value passed to apply() when the call fails
+    """
+    try:
+        apply(call())
+    except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as error:
+        print(f"    Error getting {description}: {error}")
+        apply(failed_value)
+        if is_retryable_error(error):
+            retry_queue.append({'description': description, 'call': call, 'apply': apply})
+
+
+def drain_retry_queue(retry_queue, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, deadline=None):
+    """
+    Retry queued calls with exponential backoff after the main pass.
+    
+    Each round waits twice as long as the one before, then retries every
+    call still failing. Calls queued by a successful retry's apply() are
+    retried in the next round. A call that fails with an error retrying
+    cannot fix is given up at once. Draining stops early rather than run
+    past the deadline.
+    
+    Args:
+        retry_queue: Output of collect_or_queue, emptied of calls that succeed
+        attempts: Rounds of retries
+        base_delay: Seconds to wait before the first round
+        deadline: Optional time.time() value to finish by
+        
+    Returns:
+        list: Descriptions of calls given up on
+    """
+    abandoned = []
+    for attempt in range(attempts):
+        if not retry_queue:
+            break
+        delay = base_delay * 2 ** attempt
+        if deadline is not None and time.time() + delay >= deadline:
+            break
+        time.sleep(delay)
+        
+        entries = retry_queue[:]
+        del retry_queue[:]
+        for entry in entries:
+            try:
+                entry['apply'](entry['call']())
+            except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as error:
+                if is_retryable_error(error):
+                    retry_queue.append(entry)
+                else:
+                    abandoned.append(entry)
+    
+    abandoned.extend(retry_queue)
+    for entry in abandoned:
+        print(f"    Giving up on {entry['description']}; reported as Error")
+    return [entry['description'] for entry in abandoned]
+
+
+def apply_subnet_fields(vpcs, subnets_by_vpc, subnet_utilization):
+    """
+    Set subnet fields from the region's subnets.
+    
+    Args:
+        vpcs: VPC data dictionaries, updated in place
+        subnets_by_vpc: Output of get_region_subnets, or None if the subnets
+            could not be read
+        subnet_utilization: Output of calculate_subnet_utilization for them
+    """
+    for vpc in vpcs:
+        if subnets_by_vpc is None:
+            vpc.update(subnet_count='Error', subnets=[], ip_utilization=None, az_distribution={})
+            continue
+        subnet_records = subnet_utilization.get(vpc['vpc_id'], [])
+        subnet_summary = summarize_vpc_subnets(subnet_records)
+        vpc['subnet_count'] = get_vpc_subnets(None, vpc['vpc_id'], subnets_by_vpc)
+        vpc['subnets'] = subnet_records
+        vpc['ip_utilization'] = subnet_summary['utilization']
+        vpc['az_distribution'] = subnet_summary['az_distribution']
+
+
+def apply_interface_fields(vpcs, interfaces_by_vpc, security_groups):
+    """
+    Set network interface counts and security group findings.
+    
+    Unused security groups are found through the interfaces, so both depend
+    on the region's interfaces having been read.
+    
+    Args:
+        vpcs: VPC data dictionaries, updated in place
+        interfaces_by_vpc: Output of get_region_network_interfaces, or None
+            if the interfaces could not be read
+        security_groups: Output of get_region_security_groups
+    """
+    group_index = build_security_group_index(interfaces_by_vpc) if interfaces_by_vpc is not None else None
+    for vpc in vpcs:
+        vpc_id = vpc['vpc_id']
+        if interfaces_by_vpc is None:
+            vpc['interface_count'] = 'Error'
+            sg_findings = analyze_vpc_security_groups(vpc_id, None, None)
+        else:
+            vpc['interface_count'] = get_interface_count(None, vpc_id, interfaces_by_vpc)
+            sg_findings = analyze_vpc_security_groups(vpc_id, security_groups, group_index)
+        vpc['security_group_count'] = sg_findings['count']
+        vpc['exposed_security_groups'] = sg_findings['exposed']
+        vpc['unused_security_groups'] = sg_findings['unused']
+        vpc['exposed_rules'] = sg_findings['exposed_rules']
+
+
+def apply_network_acl_fields(vpcs, network_acls, compiled_acls):
+    """
+    Set network ACL findings.
+    
+    Args:
+        vpcs: VPC data dictionaries, updated in place
+        network_acls: Output of get_region_network_acls, or None if the
+            network ACLs could not be read
+        compiled_acls: Cache of compiled NACLs keyed by NACL ID
+    """
+    for vpc in vpcs:
+        nacl_findings = analyze_vpc_network_acls(vpc['vpc_id'], network_acls, compiled_acls)
+        vpc['custom_nacl_count'] = nacl_findings['custom_count']
+        vpc['nacl_subnet_associations'] = nacl_findings['subnet_associations']
+        vpc['open_nacls'] = nacl_findings['open']
+
+
+def apply_endpoint_fields(vpcs, vpc_endpoints):
+    """
+    Set VPC endpoint findings.
+    
+    Args:
+        vpcs: VPC data dictionaries, updated in place
+        vpc_endpoints: Output of get_region_vpc_endpoints, or None if the
+            endpoints could not be read
+    """
+    for vpc in vpcs:
+        endpoint_findings = analyze_vpc_endpoints(vpc['vpc_id'], vpc_endpoints)
+        vpc['endpoint_count'] = endpoint_findings['count']
+        vpc['vpc_endpoints'] = endpoint_findings['endpoints']
+
+
+def make_shared_vpc_reference(vpc_info, vpc_name, region):
+    """
+    Build the reference a participant account keeps for a RAM-shared VPC.
+    
+    Args:
+        vpc_info: VPC dictionary from describe_vpcs
+        vpc_name: Name tag of the VPC
+        region: Region of the VPC
+        
+    Returns:
+        dict: {'vpc_id', 'vpc_name', 'owner_id', 'region', 'key'}, where key is
+            the owner's record key (see get_record_key)
+    """
+    return {
+        'vpc_id': vpc_info['VpcId'],
+        'vpc_name': vpc_name,
+        'owner_id': vpc_info['OwnerId'],
+        'region': region,
+        'key': f"{vpc_info['OwnerId']}:{vpc_info['VpcId']}"
+    }
+
+
+def get_region_vpcs(client, filters=None):
+    """
+    Retrieve the VPCs visible in the region with a single pagination.
+    
+    Required IAM permission: ec2:DescribeVpcs
+    
+    Args:
+        client: EC2 boto3 client
+        filters: Optional describe_vpcs filters
+        
+    Returns:
+        list: VPC dictionaries from describe_vpcs
+    """
+    vpc_infos = []
+    paginator = client.get_paginator('describe_vpcs')
+    for page in paginator.paginate(Filters=filters or []):
+        vpc_infos.extend(page['Vpcs'])
+    return vpc_infos
+
+
+def get_vpcs(client, logs_client, vpc_ids=None, deadline=None, account_id=None, shared_vpcs=None):
+    vpc_list = []
+    region = client.meta.region_name
+    # Limit every region-wide call to the given VPCs when refreshing only some of them
+    filters = [{'Name': 'vpc-id', 'Values': list(vpc_ids)}] if vpc_ids else []
+    # Calls that failed during the main pass; their fields read 'Error' until a retry succeeds
+    retry_queue = []
+    # Region-wide data shared by every VPC in this region
+    region_data = {}
+    log_group_cache = {}
+    compiled_acls = {}
+    
+    # Applied again to every VPC collected so far when a retry succeeds;
+    # flow log coverage depends on the subnets and interfaces as well
+    def apply_flow_logs(flow_logs_by_resource):
+        region_data['flow_logs'] = flow_logs_by_resource
+        apply_flow_log_fields(vpc_list, flow_logs_by_resource, region_data.get('subnets'),
+                              region_data.get('interfaces'), logs_client, log_group_cache)
+    
+    def apply_interfaces(interfaces_by_vpc):
+        region_data['interfaces'] = interfaces_by_vpc
+        apply_interface_fields(vpc_list, interfaces_by_vpc, region_data.get('security_groups'))
+        if 'flow_logs' in region_data:
+            apply_flow_logs(region_data['flow_logs'])
+    
+    def apply_security_groups(security_groups):
+        region_data['security_groups'] = security_groups
+        if 'interfaces' in region_data:
+            apply_interface_fields(vpc_list, region_data['interfaces'], security_groups)
+    
+    def apply_network_acls(network_acls):
+        region_data['network_acls'] = network_acls
+        apply_network_acl_fields(vpc_list, network_acls, compiled_acls)
+    
+    def apply_endpoints(vpc_endpoints):
+        region_data['endpoints'] = vpc_endpoints
+        apply_endpoint_fields(vpc_list, vpc_endpoints)
+    
+    def apply_subnets(subnets_by_vpc):
+        region_data['subnets'] = subnets_by_vpc
+        region_data['subnet_utilization'] = calculate_subnet_utilization(subnets_by_vpc or {})
+        apply_subnet_fields(vpc_list, subnets_by_vpc, region_data['subnet_utilization'])
+        if 'flow_logs' in region_data:
+            apply_flow_logs(region_data['flow_logs'])
+    
+    def check_deadline():
+        if deadline is not None and time.time() >= deadline:
+            apply_cost_estimates(vpc_list, log_group_cache)
+            raise ScanDeadlineExceeded(vpc_list)
+    
+    # Region-wide reads, each started only while there is time left
+    region_reads = [
+        (f"security groups in {region}", functools.partial(get_region_security_groups, client, filters), apply_security_groups),
+        (f"network interfaces in {region}", functools.partial(get_region_network_interfaces, client, filters), apply_interfaces),
+        (f"subnets in {region}", functools.partial(get_region_subnets, client, filters), apply_subnets),
+        (f"flow logs in {region}", functools.partial(get_region_flow_logs, client), apply_flow_logs),
+        (f"network ACLs in {region}", functools.partial(get_region_network_acls, client, filters), apply_network_acls),
+        (f"VPC endpoints in {region}", functools.partial(get_region_vpc_endpoints, client, filters), apply_endpoints)
+    ]
+    for description, call, apply in region_reads:
+        check_deadline()
+        collect_or_queue(retry_queue, description, call, apply, failed_value=None)
+
+    # The VPC listing is retried like the other reads; records are built
+    # once it succeeds, with whatever region-wide data has been read by then
+    def apply_vpcs(vpc_infos):
+        region_data['vpcs'] = vpc_infos
+        for vpc_info in vpc_infos or []:
+            check_deadline()
+            vpc_id = vpc_info['VpcId']
+            vpc_cidr = vpc_info['CidrBlock']
+            is_default = vpc_info['IsDefault']
+            tags = vpc_info.get('Tags', [])
+            vpc_name = next((tag['Value'] for tag in tags if tag['Key'] == 'Name'), 'Unnamed')
+            owner_id = vpc_info.get('OwnerId', account_id)
+        
+            # A VPC shared in through AWS RAM is collected in its owner account;
+            # participants only keep a reference to the owner's record
+            if account_id and owner_id != account_id:
+                if shared_vpcs is not None:
+                    shared_vpcs.append(make_shared_vpc_reference(vpc_info, vpc_name, region))
+                continue
+
+            vpc_data = {
+                'vpc_id': vpc_id,
+                'vpc_name': vpc_name,
+                'vpc_cidr': vpc_cidr,
+                'cidr_blocks': get_vpc_cidr_blocks(vpc_info),
+                'is_default': is_default
+            }
+            if owner_id:
+                vpc_data['owner_id'] = owner_id
+
+            # additional information; a failed call only affects its own field
+            collect_or_queue(
+                retry_queue, f"internet gateways for {vpc_id}",
+                functools.partial(get_vpc_igw, client, vpc_id),
+                functools.partial(vpc_data.__setitem__, 'igw_present')
+            )
+            collect_or_queue(
+                retry_queue, f"NAT gateways for {vpc_id}",
+                functools.partial(get_natgws, client, vpc_id),
+                functools.partial(vpc_data.__setitem__, 'natgw_count')
+            )
+            apply_subnet_fields([vpc_data], region_data['subnets'], region_data['subnet_utilization'])
+            apply_interface_fields([vpc_data], region_data['interfaces'], region_data['security_groups'])
+            apply_network_acl_fields([vpc_data], region_data['network_acls'], compiled_acls)
+            apply_endpoint_fields([vpc_data], region_data['endpoints'])
+        
+            # Flow Logs information, including subnet and ENI flow logs
+            apply_flow_log_fields([vpc_data], region_data['flow_logs'], region_data['subnets'],
+                                  region_data['interfaces'], logs_client, log_group_cache)
+
+            vpc_data['region'] = region
+            vpc_list.append(vpc_data)
+    
+    def list_vpcs():
+        try:
+            return get_region_vpcs(client, filters)
+        except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as error:
+            region_data['vpcs_error'] = error
+            raise
+    
+    check_deadline()
+    collect_or_queue(retry_queue, f"VPCs in {region}", list_vpcs, apply_vpcs, failed_value=None)
+    # Without the listing there is nothing to report, so the region fails
+    if region_data['vpcs'] is None and not is_retryable_error(region_data['vpcs_error']):
+        raise region_data['vpcs_error']
+    
+    drain_retry_queue(retry_queue, deadline=deadline)
+    if region_data['vpcs'] is None:
+        raise region_data['vpcs_error']
+    apply_cost_estimates(vpc_list, log_group_cache)
+    return vpc_list
+
+
+def update_endpoint_rollup(endpoint_rollup, vpc):
+    """
+    Add one VPC's endpoints to the org-wide endpoint rollup.
+    
+    Args:
+        endpoint_rollup: Rollup dictionary updated in place
+        vpc: VPC data dictionary
+    """
+    if not isinstance(vpc.get('endpoint_count'), int):
+        return
+    
+    has_s3_gateway = False
+    for endpoint in vpc['vpc_endpoints']:
+        if endpoint['type'] == 'Gateway':
+            endpoint_rollup['gateway_endpoints'] += 1
+            if endpoint['service'] == 's3':
+                has_s3_gateway = True
+        else:
+            endpoint_rollup['interface_endpoints'] += 1
+        by_service = endpoint_rollup['by_service']
+        by_service[endpoint['service']] = by_service.get(endpoint['service'], 0) + 1
+    
+    natgw_count = vpc.get('natgw_count', 0)
+    if not has_s3_gateway and isinstance(natgw_count, int) and natgw_count > 0:
+        endpoint_rollup['missing_s3_gateway_with_natgw'].append({
+            'vpc_id': vpc['vpc_id'],
+            'account_id': vpc['account_id'],
+            'region': vpc['region'],
+            'natgw_count': natgw_count
+        })
+
+
+def update_cost_rollup(cost_rollup, vpc):
+    """
+    Add one VPC's estimated monthly cost to the region and account totals.
+    
+    Args:
+        cost_rollup: Rollup dictionary updated in place
+        vpc: VPC data dictionary
+    """
+    if 'estimated_costs' not in vpc:
+        return
+    
+    total = vpc['estimated_costs']['total']
+    account_key = f"{vpc['account_name']} ({vpc['account_id']})"
+    cost_rollup['total'] += total
+    cost_rollup['by_account'][account_key] = cost_rollup['by_account'].get(account_key, 0.0) + total
+    cost_rollup['by_region'][vpc['region']] = cost_rollup['by_region'].get(vpc['region'], 0.0) + total
+
+
+def update_volume_rollup(volume_rollup, vpc):
+    """
+    Add one VPC's flow log volume to the region and account totals.
+    
+    Args:
+        volume_rollup: Rollup dictionary updated in place
+        vpc: VPC data dictionary
+    """
+    volume = vpc.get('flow_logs_volume')
+    if not isinstance(volume, dict):
+        return
+    
+    account_key = f"{vpc['account_name']} ({vpc['account_id']})"
+    volume_rollup['window_hours'] = volume['window_hours']
+    for totals in (
+        volume_rollup['total'],
+        volume_rollup['by_account'].setdefault(account_key, {'incoming_bytes': 0.0, 'incoming_log_events': 0.0}),
+        volume_rollup['by_region'].setdefault(vpc['region'], {'incoming_bytes': 0.0, 'incoming_log_events': 0.0})
+    ):
+        totals['incoming_bytes'] += volume['incoming_bytes']
+        totals['incoming_log_events'] += volume['incoming_log_events']
+
+
+def calculate_flow_logs_summary(vpc_data_list):
+    """
+    Calculate Flow Logs coverage statistics across all VPCs.
+    
+    A VPC counts as having flow logs only when they cover every subnet;
+    partial coverage is counted separately under 'coverage_levels'. Org-wide
+    VPC endpoint and cost rollups are gathered in the same pass over the VPC
+    list.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        
+    Returns:
+        dict: Summary statistics including overall and per-account breakdowns
+    """
+    endpoint_rollup = {
+        'gateway_endpoints': 0,
+        'interface_endpoints': 0,
+        'by_service': {},
+        'missing_s3_gateway_with_natgw': []
+    }
+    cost_rollup = {
+        'total': 0.0,
+        'by_account': {},
+        'by_region': {}
+    }
+    destination_health = {
+        'vpcs_with_unhealthy_destinations': 0,
+        'unhealthy_destinations': {}
+    }
+    coverage_levels = {'full': 0, 'partial': 0, 'none': 0}
+    volume_rollup = {
+        'window_hours': None,
+        'total': {'incoming_bytes': 0.0, 'incoming_log_events': 0.0},
+        'by_account': {},
+        'by_region': {}
+    }
+    
+    if not vpc_data_list:
+        return {
+            'total_vpcs': 0,
+            'vpcs_with_flow_logs': 0,
+            'vpcs_without_flow_logs': 0,
+            'coverage_percentage': 0.0,
+            'by_account': {},
+            'endpoints': endpoint_rollup,
+            'costs': cost_rollup,
+            'coverage_levels': coverage_levels,
+            'destination_health': destination_health,
+            'volumes': volume_rollup
+        }
+    
+    total_vpcs = len(vpc_data_list)
+    vpcs_with_flow_logs = 0
+    by_account = {}
+    
+    for vpc in vpc_data_list:
+        account_key = f"{vpc['account_name']} ({vpc['account_id']})"
+        
+        if account_key not in by_account:
+            by_account[account_key] = {
+                'total': 0,
+                'enabled': 0,
+                'disabled': 0,
+                'percentage': 0.0
+            }
+        
+        by_account[account_key]['total'] += 1
+        
+        # Only full coverage counts; records stored before coverage levels
+        # fall back to their flow log status
+        if 'flow_logs_coverage' in vpc:
+            covered = vpc['flow_logs_coverage'] == 'full'
+        else:
+            covered = vpc['flow_logs_status'] in ['Enabled', 'Multiple']
+        if covered:
+            vpcs_with_flow_logs += 1
+            by_account[account_key]['enabled'] += 1
+        else:
+            by_account[account_key]['disabled'] += 1
+        
+        update_endpoint_rollup(endpoint_rollup, vpc)
+        update_cost_rollup(cost_rollup, vpc)
+        update_volume_rollup(volume_rollup, vpc)
+        if vpc.get('flow_logs_coverage') in coverage_levels:
+            coverage_levels[vpc['flow_logs_coverage']] += 1
+        
+        issues = vpc.get('flow_logs_destination_issues', [])
+        if issues:
+            destination_health['vpcs_with_unhealthy_destinations'] += 1
+        for issue in issues:
+            unhealthy = destination_health['unhealthy_destinations'].setdefault(
+                issue['destination'], {'type': issue['type'], 'problem': issue['problem'], 'vpc_ids': []}
+            )
+            unhealthy['vpc_ids'].append(vpc['vpc_id'])
+    
+    # Overall statistics
+    vpcs_without_flow_logs = total_vpcs - vpcs_with_flow_logs
+    coverage_percentage = (vpcs_with_flow_logs / total_vpcs * 100) if total_vpcs > 0 else 0.0
+    
+    # Calculate percentages for each account
+    for account_data in by_account.values():
+        if account_data['total'] > 0:
+            account_data['percentage'] = (account_data['enabled'] / account_data['total'] * 100)
+    
+    return {
+        'total_vpcs': total_vpcs,
+        'vpcs_with_flow_logs': vpcs_with_flow_logs,
+        'vpcs_without_flow_logs': vpcs_without_flow_logs,
+        'coverage_percentage': coverage_percentage,
+        'by_account': by_account,
+        'endpoints': endpoint_rollup,
+        'costs': cost_rollup,
+        'coverage_levels': coverage_levels,
+        'destination_health': destination_health,
+        'volumes': volume_rollup
+    }
+
+
+def generate_volume_section(vpc_data_list, volume_rollup):
+    """
+    Generate the coverage summary subsection for flow log volumes.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        volume_rollup: 'volumes' entry of calculate_flow_logs_summary
+        
+    Returns:
+        str: Markdown with volumes by account, region and VPC, or '' when no
+            volumes were collected
+    """
+    if volume_rollup['window_hours'] is None:
+        return ""
+    
+    total = volume_rollup['total']
+    markdown_content = f"### Flow Log Volume (last {volume_rollup['window_hours']:g} hours)\n"
+    markdown_content += "*CloudWatch Logs IncomingBytes and IncomingLogEvents; a log group shared by several VPCs is split evenly between them.*\n\n"
+    markdown_content += f"- **Total**: {format_bytes(total['incoming_bytes'])}, {int(total['incoming_log_events']):,} events\n\n"
+    
+    markdown_content += "#### By Account\n"
+    for account_name, totals in volume_rollup['by_account'].items():
+        markdown_content += f"- **{account_name}**: {format_bytes(totals['incoming_bytes'])}, {int(totals['incoming_log_events']):,} events\n"
+    markdown_content += "\n"
+    
+    markdown_content += "#### By Region\n"
+    for region, totals in sorted(volume_rollup['by_region'].items()):
+        markdown_content += f"- **{region}**: {format_bytes(totals['incoming_bytes'])}, {int(totals['incoming_log_events']):,} events\n"
+    markdown_content += "\n"
+    
+    volume_vpcs = [vpc for vpc in vpc_data_list if isinstance(vpc.get('flow_logs_volume'), dict)]
+    markdown_content += "#### By VPC\n\n"
+    markdown_content += "| Account | Region | VPC ID | Log Groups | Incoming Bytes | Incoming Events |\n"
+    markdown_content += "|---------|--------|--------|------------|----------------|-----------------|\n"
+    for vpc in sorted(volume_vpcs, key=lambda vpc: vpc['flow_logs_volume']['incoming_bytes'], reverse=True):
+        volume = vpc['flow_logs_volume']
+        account = f"{vpc['account_name']} ({vpc['account_id']})"
+        markdown_content += f"| {account} | {vpc['region']} | {vpc['vpc_id']} | {', '.join(vpc['flow_logs_log_groups'])} | {format_bytes(volume['incoming_bytes'])} | {int(volume['incoming_log_events']):,} |\n"
+    markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_endpoint_section(vpc_data_list, endpoint_rollup):
+    """
+    Generate the markdown section for VPC endpoints.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        endpoint_rollup: 'endpoints' entry of calculate_flow_logs_summary
+        
+    Returns:
+        str: Markdown listing endpoints per VPC and org-wide rollups
+    """
+    markdown_content = "## VPC Endpoints\n\n"
+    
+    markdown_content += "### Overall Statistics\n"
+    markdown_content += f"- **Gateway Endpoints**: {endpoint_rollup['gateway_endpoints']}\n"
+    markdown_content += f"- **Interface Endpoints**: {endpoint_rollup['interface_endpoints']}\n"
+    if endpoint_rollup['by_service']:
+        services = ', '.join(f"{service} ({count})" for service, count in sorted(endpoint_rollup['by_service'].items()))
+        markdown_content += f"- **Services**: {services}\n"
+    markdown_content += "\n"
+    
+    missing = endpoint_rollup['missing_s3_gateway_with_natgw']
+    markdown_content += "### VPCs with NAT Gateways but no S3 Gateway Endpoint\n\n"
+    if not missing:
+        markdown_content += "*Every VPC with NAT gateways has an S3 gateway endpoint*\n\n"
+    else:
+        for vpc in missing:
+            markdown_content += f"- **{vpc['vpc_id']}** ({vpc['account_id']}, {vpc['region']}): {vpc['natgw_count']} NAT GWs\n"
+        markdown_content += "\n"
+    
+    endpoint_vpcs = [vpc for vpc in vpc_data_list if vpc.get('vpc_endpoints')]
+    if endpoint_vpcs:
+        markdown_content += "### Endpoints by VPC\n\n"
+        markdown_content += "| Account | Region | VPC ID | Endpoint ID | Type | Service | Security Groups |\n"
+        markdown_content += "|---------|--------|--------|-------------|------|---------|-----------------|\n"
+        for vpc in endpoint_vpcs:
+            account = f"{vpc['account_name']} ({vpc['account_id']})"
+            for endpoint in vpc['vpc_endpoints']:
+                security_groups = ', '.join(endpoint['security_groups']) if endpoint['security_groups'] else '-'
+                markdown_content += f"| {account} | {vpc['region']} | {vpc['vpc_id']} | {endpoint['id']} | {endpoint['type']} | {endpoint['service']} | {security_groups} |\n"
+        markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_cost_section(vpc_data_list, cost_rollup):
+    """
+    Generate the markdown section for estimated monthly costs.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        cost_rollup: 'costs' entry of calculate_flow_logs_summary
+        
+    Returns:
+        str: Markdown with cost totals by account, region and VPC
+    """
+    price_table = load_price_table()
+    currency = price_table['currency']
+    
+    markdown_content = "## Estimated Monthly Costs\n\n"
+    markdown_content += f"*Offline estimate from price table {price_table['version']} ({currency}). Covers NAT gateway and interface endpoint hours and CloudWatch flow log storage; data processing charges are not included.*\n\n"
+    markdown_content += f"- **Total**: ${cost_rollup['total']:,.2f}\n\n"
+    
+    if cost_rollup['by_account']:
+        markdown_content += "### By Account\n"
+        for account_name, total in cost_rollup['by_account'].items():
+            markdown_content += f"- **{account_name}**: ${total:,.2f}\n"
+        markdown_content += "\n"
+    
+    if cost_rollup['by_region']:
+        markdown_content += "### By Region\n"
+        for region, total in sorted(cost_rollup['by_region'].items()):
+            markdown_content += f"- **{region}**: ${total:,.2f}\n"
+        markdown_content += "\n"
+    
+    costed_vpcs = [vpc for vpc in vpc_data_list if vpc.get('estimated_costs', {}).get('total')]
+    if costed_vpcs:
+        markdown_content += "### By VPC\n\n"
+        markdown_content += "| Account | Region | VPC ID | NAT GWs | Interface Endpoints | Flow Log Storage | Total |\n"
+        markdown_content += "|---------|--------|--------|---------|---------------------|------------------|-------|\n"
+        for vpc in sorted(costed_vpcs, key=lambda vpc: vpc['estimated_costs']['total'], reverse=True):
+            costs = vpc['estimated_costs']
+            account = f"{vpc['account_name']} ({vpc['account_id']})"
+            markdown_content += f"| {account} | {vpc['region']} | {vpc['vpc_id']} | ${costs['nat_gateways']:,.2f} | ${costs['interface_endpoints']:,.2f} | ${costs['flow_log_storage']:,.2f} | ${costs['total']:,.2f} |\n"
+        markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_hot_subnet_section(vpc_data_list):
+    """
+    Generate the markdown section listing subnets above the fullness threshold.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        
+    Returns:
+        str: Markdown table of hot subnets, fullest first
+    """
+    hot_subnets = []
+    for vpc in vpc_data_list:
+        for subnet in vpc.get('subnets', []):
+            if subnet['hot']:
+                hot_subnets.append((vpc, subnet))
+    
+    markdown_content = "## Hot Subnets\n\n"
+    if not hot_subnets:
+        markdown_content += f"*No subnets at or above {HOT_SUBNET_THRESHOLD:.0f}% IP utilization*\n\n"
+        return markdown_content
+    
+    markdown_content += f"*Subnets at or above {HOT_SUBNET_THRESHOLD:.0f}% IP utilization*\n\n"
+    markdown_content += "| Account | Region | VPC ID | Subnet | AZ | CIDR | Available IPs | Utilization |\n"
+    markdown_content += "|---------|--------|--------|--------|----|------|---------------|-------------|\n"
+    for vpc, subnet in sorted(hot_subnets, key=lambda item: item[1]['utilization'], reverse=True):
+        account = f"{vpc['account_name']} ({vpc['account_id']})"
+        subnet_label = f"{subnet['name']} ({subnet['subnet_id']})" if subnet['name'] else subnet['subnet_id']
+        markdown_content += f"| {account} | {vpc['region']} | {vpc['vpc_id']} | {subnet_label} | {subnet['az']} | {subnet['cidr']} | {subnet['available_ips']}/{subnet['usable_ips']} | {subnet['utilization']:.1f}% |\n"
+    markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_cidr_overlap_section(vpc_data_list):
+    """
+    Generate the markdown section listing overlapping VPC CIDR blocks.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        
+    Returns:
+        str: Markdown table of overlapping CIDR pairs
+    """
+    overlaps = find_cidr_overlaps(vpc_data_list)
+    
+    markdown_content = "## CIDR Overlaps\n\n"
+    if not overlaps:
+        markdown_content += "*No overlapping CIDR blocks found between non-default VPCs*\n\n"
+        return markdown_content
+    
+    markdown_content += f"*{len(overlaps)} overlapping CIDR pairs between non-default VPCs*\n\n"
+    markdown_content += "| CIDR | VPC ID | Account | Region | Overlaps CIDR | VPC ID | Account | Region |\n"
+    markdown_content += "|------|--------|---------|--------|---------------|--------|---------|--------|\n"
+    for overlap in overlaps:
+        vpc_a = overlap['vpc_a']
+        vpc_b = overlap['vpc_b']
+        markdown_content += f"| {overlap['cidr_a']} | {vpc_a['vpc_id']} | {vpc_a['account_name']} ({vpc_a['account_id']}) | {vpc_a['region']} | {overlap['cidr_b']} | {vpc_b['vpc_id']} | {vpc_b['account_name']} ({vpc_b['account_id']}) | {vpc_b['region']} |\n"
+    markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_security_group_section(vpc_data_list):
+    """
+    Generate the markdown detail section for security group findings.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        
+    Returns:
+        str: Markdown listing exposed rules and unused groups per VPC
+    """
+    exposed_vpcs = [vpc for vpc in vpc_data_list if vpc.get('exposed_rules')]
+    unused_vpcs = [vpc for vpc in vpc_data_list if vpc.get('unused_security_groups')]
+    
+    markdown_content = "## Security Group Findings\n\n"
+    
+    markdown_content += "### Rules Open to the Internet\n\n"
+    if not exposed_vpcs:
+        markdown_content += "*No security group rules allow traffic from 0.0.0.0/0 or ::/0*\n\n"
+    else:
+        markdown_content += "| Account | Region | VPC ID | Security Group | Protocol | Ports | Source |\n"
+        markdown_content += "|---------|--------|--------|----------------|----------|-------|--------|\n"
+        for vpc in exposed_vpcs:
+            account = f"{vpc['account_name']} ({vpc['account_id']})"
+            for rule in vpc['exposed_rules']:
+                group = f"{rule['group_name']} ({rule['group_id']})"
+                markdown_content += f"| {account} | {vpc['region']} | {vpc['vpc_id']} | {group} | {rule['protocol']} | {rule['ports']} | {rule['source']} |\n"
+        markdown_content += "\n"
+    
+    markdown_content += "### Unused Security Groups\n\n"
+    if not unused_vpcs:
+        markdown_content += "*No unused security groups found*\n\n"
+    else:
+        for vpc in unused_vpcs:
+            markdown_content += f"- **{vpc['vpc_id']}** ({vpc['account_id']}, {vpc['region']}): {', '.join(vpc['unused_security_groups'])}\n"
+        markdown_content += "\n"
+    
+    return markdown_content
+
+
+def generate_completeness_section(account_regions):
+    """
+    Generate the markdown section listing account/regions that were not fully scanned.
+    
+    Args:
+        account_regions: List of scanned account/region dictionaries
+        
+    Returns:
+        str: Markdown section, or an empty string when every region is complete
+    """
+    incomplete = [ar for ar in account_regions if ar.get('scan_status', 'complete') != 'complete']
+    if not incomplete:
+        return ""
+    
+    content = "## Scan Completeness\n\n"
+    content += f"*{len(incomplete)} of {len(account_regions)} account/regions are incomplete; totals below cover only the VPCs that were collected.*\n\n"
+    content += "| Account | Region | Status | Details |\n"
+    content += "|---------|--------|--------|---------|\n"
+    for ar in incomplete:
+        content += f"| {ar['account_name']} ({ar['account_id']}) | {ar['region']} | {SCAN_STATUS_LABELS[ar['scan_status']]} | {ar.get('scan_note', '-')} |\n"
+    return content + "\n"
+
+
+def generate_markdown(vpc_data_list, account_regions):
+    # Get the ASCII art banner
+    markdown_content = "# 🕵️ VPC Detective\n"
+    markdown_content += "## 🔎 Sniffing out your subnets since 2025 🔎\n"
+    markdown_content += f"*Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+    
+    by_account_region, region_status, shared_by_region = group_by_account_region(vpc_data_list, account_regions)
+    
+    # Generate markdown tables for each account and region
+    for account, regions in by_account_region.items():
+        markdown_content += generate_account_markdown(account, regions, region_status, shared_by_region)
+    
+    markdown_content += generate_summary_markdown(vpc_data_list, account_regions)
+    return markdown_content
+
+
+def group_by_account_region(vpc_data_list, account_regions):
+    """
+    Group VPCs by account and region for the report.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        
+    Returns:
+        tuple: ({account: {region: [vpc, ...]}}, {(account, region): incomplete
+            account/region}, {(account, region): shared VPC references}), where
+            account is 'name (id)' and accounts and regions keep scan order
+    """
+    # Group by account and region
+    by_account_region = {}
+    
+    # First, initialize the structure with all account/region combinations
+    for ar in account_regions:
+        account_key = f"{ar['account_name']} ({ar['account_id']})"
+        if account_key not in by_account_region:
+            by_account_region[account_key] = {}
+        
+        region = ar['region']
+        if region not in by_account_region[account_key]:
+            by_account_region[account_key][region] = []
+    
+    # Then populate with VPC data
+    for vpc in vpc_data_list:
+        account_key = f"{vpc['account_name']} ({vpc['account_id']})"
+        region = vpc['region']
+        by_account_region[account_key][region].append(vpc)
+    
+    # Scan status of each account/region; older scans have none and were complete
+    region_status = {
+        (f"{ar['account_name']} ({ar['account_id']})", ar['region']): ar
+        for ar in account_regions if ar.get('scan_status', 'complete') != 'complete'
+    }
+    
+    # VPCs shared into each account/region, collected under their owner
+    shared_by_region = {
+        (f"{ar['account_name']} ({ar['account_id']})", ar['region']): ar['shared_vpcs']
+        for ar in account_regions if ar.get('shared_vpcs')
+    }
+    
+    return by_account_region, region_status, shared_by_region
+
+
+def generate_account_markdown(account, regions, region_status, shared_by_region):
+    """
+    Generate the markdown section with one account's VPC tables.
+    
+    Args:
+        account: Account key, 'name (id)'
+        regions: Dictionary of region to the account's VPCs in it
+        region_status: Incomplete account/regions (see group_by_account_region)
+        shared_by_region: Shared VPC references (see group_by_account_region)
+        
+    Returns:
+        str: Markdown section
+    """
+    content = f"## Account: {account}\n\n"
+    
+    for region, vpcs in regions.items():
+        content += f"### Region: {region}\n\n"
+        
+        status = region_status.get((account, region))
+        if status:
+            content += f"> ⚠️ **{SCAN_STATUS_LABELS[status['scan_status']]}**: {status.get('scan_note', '')}\n\n"
+        
+        # Create main VPC table
+        content += "| " + " | ".join(VPC_TABLE_COLUMNS) + " |\n"
+        content += "|---------|--------|------------|---------|-----|---------|--------------|--------|-----|----------|------------|-----|----------|------------|--------------|--------------|------------|-----------|-----------|-------------|-----------|\n"
+        
+        if not vpcs and status:
+            content += "| *Not scanned* | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - |\n"
+        elif not vpcs:
+            content += "| *No VPCs found* | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - | - |\n"
+        else:
+            # Add VPCs to the table
+            for vpc in vpcs:
+                content += "| " + " | ".join(format_vpc_cells(vpc)) + " |\n"
+        
+        content += "\n"
+        
+        shared_vpcs = shared_by_region.get((account, region))
+        if shared_vpcs:
+            content += "**Shared VPCs** (owned by another account; counted once, under the owner):\n"
+            for reference in shared_vpcs:
+                if reference.get('owner_scanned'):
+                    where = "details under the owner account"
+                else:
+                    where = "owner account not scanned"
+                content += f"- {reference['vpc_name']} ({reference['vpc_id']}), owner {reference['owner_id']}: {where}\n"
+            content += "\n"
+    
+    return content
+
+
+def format_vpc_cells(vpc):
+    """
+    Format a VPC record as the cells of a report table row.
+    
+    Args:
+        vpc: VPC data dictionary
+        
+    Returns:
+        list: One string per column in VPC_TABLE_COLUMNS
+    """
+    vpc_name = vpc['vpc_name']
+    vpc_cidrs = ', '.join(vpc.get('cidr_blocks') or [vpc['vpc_cidr']])
+    is_default = 'Yes' if vpc['is_default'] else 'No'
+    if vpc['igw_present'] == 'Error':
+        igw_present = 'Error'
+    else:
+        igw_present = 'Yes' if vpc['igw_present'] else 'No'
+    
+    # Format subnet utilization
+    az_count = len(vpc['az_distribution']) if 'az_distribution' in vpc else '-'
+    if vpc['subnet_count'] == 'Error':
+        az_count = ip_utilization = 'Error'
+    elif vpc.get('ip_utilization') is not None:
+        ip_utilization = f"{vpc['ip_utilization']:.1f}%"
+    else:
+        ip_utilization = '-'
+    
+    # Format cost estimate
+    if 'estimated_costs' in vpc:
+        estimated_cost = f"${vpc['estimated_costs']['total']:,.2f}"
+    else:
+        estimated_cost = '-'
+    
+    # Format security group findings
+    sg_count = vpc.get('security_group_count', '-')
+    if sg_count in ['Error', '-']:
+        open_sgs = unused_sgs = sg_count
+    else:
+        open_sgs = len(vpc['exposed_security_groups'])
+        unused_sgs = len(vpc['unused_security_groups'])
+    
+    # Format network ACL findings
+    custom_nacls = vpc.get('custom_nacl_count', '-')
+    nacl_subnets = vpc.get('nacl_subnet_associations', '-')
+    if custom_nacls in ['Error', '-']:
+        open_nacls = custom_nacls
+    else:
+        open_nacls = len(vpc['open_nacls'])
+    
+    # Format Flow Logs information
+    flow_logs_status = vpc['flow_logs_status']
+    if vpc.get('flow_logs_coverage') == 'partial':
+        flow_logs_status += f" (partial, {vpc['flow_logs_coverage_percentage']:.0f}% of subnets)"
+    flow_logs_destinations = ', '.join(vpc['flow_logs_destinations']) if vpc['flow_logs_destinations'] else '-'
+    destination_issues = vpc.get('flow_logs_destination_issues')
+    if destination_issues:
+        problems = '; '.join(f"{issue['type']} {issue['problem']}" for issue in destination_issues)
+        flow_logs_destinations += f" ⚠️ {problems}"
+    flow_logs_retention = vpc['flow_logs_retention']
+    
+    return [str(cell) for cell in (
+        vpc_name, vpc['vpc_id'], vpc_cidrs, is_default, igw_present, vpc['natgw_count'], estimated_cost,
+        vpc['subnet_count'], az_count, ip_utilization, vpc['interface_count'], sg_count, open_sgs, unused_sgs,
+        custom_nacls, nacl_subnets, open_nacls, vpc.get('endpoint_count', '-'), flow_logs_status,
+        flow_logs_destinations, flow_logs_retention
+    )]
+
+
+def generate_summary_markdown(vpc_data_list, account_regions):
+    """
+    Generate the report sections that summarize every account: scan
+    completeness, flow log coverage, volumes, endpoints, costs and findings.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        
+    Returns:
+        str: Markdown sections
+    """
+    return ''.join(generate_summary_sections(vpc_data_list, account_regions))
+
+
+def generate_summary_sections(vpc_data_list, account_regions):
+    """
+    Generate the summary sections of the report one at a time (see
+    generate_summary_markdown).
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        
+    Yields:
+        str: Markdown for each section
+    """
+    yield generate_completeness_section(account_regions)
+    
+    flow_logs_summary = calculate_flow_logs_summary(vpc_data_list)
+    yield generate_flow_logs_section(flow_logs_summary)
+    yield generate_volume_section(vpc_data_list, flow_logs_summary['volumes'])
+    yield generate_endpoint_section(vpc_data_list, flow_logs_summary['endpoints'])
+    yield generate_cost_section(vpc_data_list, flow_logs_summary['costs'])
+    yield generate_hot_subnet_section(vpc_data_list)
+    yield generate_cidr_overlap_section(vpc_data_list)
+    yield generate_security_group_section(vpc_data_list)
+
+
+def generate_flow_logs_section(flow_logs_summary):
+    """
+    Generate the markdown section with flow log coverage statistics.
+    
+    Args:
+        flow_logs_summary: Output of calculate_flow_logs_summary
+        
+    Returns:
+        str: Markdown section
+    """
+    content = "## Flow Logs Coverage Summary\n\n"
+    
+    # Overall statistics
+    content += "### Overall Statistics\n"
+    content += f"- **Total VPCs**: {flow_logs_summary['total_vpcs']}\n"
+    content += f"- **VPCs with Flow Logs on every subnet**: {flow_logs_summary['vpcs_with_flow_logs']} ({flow_logs_summary['coverage_percentage']:.1f}%)\n"
+    content += f"- **VPCs with subnets missing Flow Logs**: {flow_logs_summary['vpcs_without_flow_logs']} ({100 - flow_logs_summary['coverage_percentage']:.1f}%)\n"
+    coverage_levels = flow_logs_summary['coverage_levels']
+    content += f"- **Coverage**: {coverage_levels['full']} full, {coverage_levels['partial']} partial, {coverage_levels['none']} none\n"
+    destination_health = flow_logs_summary['destination_health']
+    content += f"- **VPCs with Unhealthy Destinations**: {destination_health['vpcs_with_unhealthy_destinations']}\n\n"
+    
+    if destination_health['unhealthy_destinations']:
+        content += "### Unhealthy Destinations\n"
+        for destination, unhealthy in sorted(destination_health['unhealthy_destinations'].items()):
+            content += f"- **{destination}** ({unhealthy['type']}): {unhealthy['problem']}, used by {len(unhealthy['vpc_ids'])} VPCs ({', '.join(unhealthy['vpc_ids'])})\n"
+        content += "\n"
+    
+    # Per-account statistics
+    if flow_logs_summary['by_account']:
+        content += "### By Account\n"
+        for account_name, account_data in flow_logs_summary['by_account'].items():
+            content += f"- **{account_name}**: {account_data['enabled']}/{account_data['total']} VPCs ({account_data['percentage']:.1f}%)\n"
+        content += "\n"
+    
+    return content
+
+
+def get_shard_file(account_id):
+    """
+    Name the sharded report file for an account.
+    """
+    return f"account-{account_id}.md"
+
+
+def render_account_shard(path, account, regions, region_status, shared_by_region, previous_hash):
+    """
+    Render one account's report file and write it if its content changed.
+    
+    Args:
+        path: Account file
+        account: Account key, 'name (id)'
+        regions: Dictionary of region to the account's VPCs in it
+        region_status: Incomplete account/regions (see group_by_account_region)
+        shared_by_region: Shared VPC references (see group_by_account_region)
+        previous_hash: Content hash from the last run, or None
+        
+    Returns:
+        tuple: (content hash, True if the file was written)
+    """
+    content = f"[Back to index]({SHARD_INDEX_FILE})\n\n"
+    content += generate_account_markdown(account, regions, region_status, shared_by_region)
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    if content_hash == previous_hash and os.path.exists(path):
+        return content_hash, False
+    with open(path, 'w') as f:
+        f.write(content)
+    return content_hash, True
+
+
+def render_account_shards(directory, chunk):
+    """
+    Render a chunk of account files; runs in a report worker process.
+    
+    Args:
+        directory: Report directory
+        chunk: List of (file name, account, regions, region_status,
+            shared_by_region, previous hash) with the arguments of
+            render_account_shard
+        
+    Returns:
+        list: (file name, content hash, True if the file was written)
+    """
+    return [
+        (shard_file,) + render_account_shard(os.path.join(directory, shard_file), *arguments)
+        for shard_file, *arguments in chunk
+    ]
+
+
+def generate_shard_index(vpc_data_list, account_regions, by_account_region, shard_files):
+    """
+    Generate the index of a sharded report: a table linking each account's
+    file, followed by the summary sections.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        by_account_region: VPCs by account and region (see group_by_account_region)
+        shard_files: Dictionary of account key to its file name
+        
+    Returns:
+        str: Markdown index
+    """
+    content = "# 🕵️ VPC Detective\n"
+    content += "## 🔎 Sniffing out your subnets since 2025 🔎\n"
+    content += f"*Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+    
+    incomplete = {(f"{ar['account_name']} ({ar['account_id']})", ar['region'])
+                  for ar in account_regions if ar.get('scan_status', 'complete') != 'complete'}
+    content += "## Accounts\n\n"
+    content += "| Account | Regions | Incomplete Regions | VPCs | Report |\n"
+    content += "|---------|---------|--------------------|------|--------|\n"
+    for account, regions in by_account_region.items():
+        shard_file = shard_files[account]
+        incomplete_count = sum(1 for region in regions if (account, region) in incomplete)
+        vpc_count = sum(len(vpcs) for vpcs in regions.values())
+        content += f"| {account} | {len(regions)} | {incomplete_count} | {vpc_count} | [{shard_file}]({shard_file}) |\n"
+    content += "\n"
+    
+    return content + generate_summary_markdown(vpc_data_list, account_regions)
+
+
+def write_sharded_report(vpc_data_list, account_regions, directory, footer='', workers=REPORT_WORKERS):
+    """
+    Write the report as one markdown file per account plus an index.
+    
+    Rendering is pure Python, so account files are rendered in worker
+    processes. Accounts are grouped into one chunk per worker, balanced by
+    VPC count, and each chunk carries only its accounts' records, so every
+    record is sent to a worker once. Account files are only written when
+    their content hash differs from the one recorded in the manifest on
+    the last run, so an unchanged account's file keeps its modification
+    time. Files for accounts no longer scanned are removed. The index,
+    which carries the generation time and summary, is always written.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        directory: Output directory, created if missing
+        footer: Markdown appended to the index, such as run statistics
+        workers: Most worker processes; 1 renders in this process
+        
+    Returns:
+        dict: Counts of account files 'written', 'unchanged' and 'removed'
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, SHARD_MANIFEST_FILE)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    
+    by_account_region, region_status, shared_by_region = group_by_account_region(vpc_data_list, account_regions)
+    shard_files = {f"{ar['account_name']} ({ar['account_id']})": get_shard_file(ar['account_id']) for ar in account_regions}
+    account_status = {}
+    for key, status in region_status.items():
+        account_status.setdefault(key[0], {})[key] = status
+    account_shared = {}
+    for key, references in shared_by_region.items():
+        account_shared.setdefault(key[0], {})[key] = references
+    
+    # Largest accounts first, each to the chunk with the fewest VPCs so far
+    chunks = [[] for _ in range(max(1, min(workers, len(by_account_region))))]
+    chunk_sizes = [0] * len(chunks)
+    for account, regions in sorted(by_account_region.items(), key=lambda item: -sum(map(len, item[1].values()))):
+        index = chunk_sizes.index(min(chunk_sizes))
+        shard_file = shard_files[account]
+        chunks[index].append((shard_file, account, regions, account_status.get(account, {}),
+                              account_shared.get(account, {}), previous.get(shard_file)))
+        chunk_sizes[index] += sum(map(len, regions.values())) + 1
+    
+    if len(chunks) > 1:
+        with futures.ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            rendered = [shard for shards in executor.map(functools.partial(render_account_shards, directory), chunks)
+                        for shard in shards]
+    else:
+        rendered = render_account_shards(directory, chunks[0])
+    manifest = {shard_file: content_hash for shard_file, content_hash, _ in rendered}
+    written = sum(changed for _, _, changed in rendered)
+    
+    removed = 0
+    for shard_file in previous:
+        if shard_file not in manifest and os.path.exists(os.path.join(directory, shard_file)):
+            os.remove(os.path.join(directory, shard_file))
+            removed += 1
+    
+    with open(os.path.join(directory, SHARD_INDEX_FILE), 'w') as f:
+        f.write(generate_shard_index(vpc_data_list, account_regions, by_account_region, shard_files) + footer)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    
+    return {'written': written, 'unchanged': len(manifest) - written, 'removed': removed}
+
+
+def format_inline_markdown(text):
+    """
+    Convert the bold, italic and code markup in a line of the report to HTML.
+    
+    The text is escaped first, so the only tags in the result are the
+    attribute-free ones added here; links are left as text.
+    """
+    text = html.escape(text)
+    # Most table cells have no markup; skip the patterns for them
+    if '*' in text or '`' in text or '[' in text:
+        for pattern, replacement in MARKDOWN_INLINE_PATTERNS:
+            text = pattern.sub(replacement, text)
+    return text
+
+
+def markdown_to_html(markdown):
+    """
+    Convert report markdown to HTML a block at a time.
+    
+    Only covers what the report sections use: headings, paragraphs, bullet
+    lists, block quotes, pipe tables and inline bold, italics and code.
+    Table cells hold names taken from AWS and are only escaped.
+    
+    Args:
+        markdown: Markdown text
+        
+    Yields:
+        str: HTML for each line
+    """
+    open_block = None
+    for line in markdown.split('\n'):
+        if line.startswith('|'):
+            kind = 'table'
+        elif line.startswith('- '):
+            kind = 'ul'
+        elif line.startswith('> '):
+            kind = 'blockquote'
+        else:
+            kind = None
+        if open_block and kind != open_block:
+            yield '</tbody></table>\n' if open_block == 'table' else f"</{open_block}>\n"
+            open_block = None
+        
+        if kind == 'table':
+            cells = [html.escape(cell.strip()) for cell in line.strip().strip('|').split('|')]
+            if open_block is None:
+                open_block = kind
+                yield '<table><thead><tr>' + ''.join(f"<th>{cell}</th>" for cell in cells) + '</tr></thead><tbody>\n'
+            elif not set(line) <= set('|-: '):
+                yield '<tr>' + ''.join(f"<td>{cell}</td>" for cell in cells) + '</tr>\n'
+        elif kind == 'ul':
+            if open_block is None:
+                open_block = kind
+                yield '<ul>\n'
+            yield f"<li>{format_inline_markdown(line[2:])}</li>\n"
+        elif kind == 'blockquote':
+            if open_block is None:
+                open_block = kind
+                yield '<blockquote>\n'
+            yield f"<p>{format_inline_markdown(line[2:])}</p>\n"
+        elif line.startswith('#'):
+            level = len(line) - len(line.lstrip('#'))
+            yield f"<h{level}>{format_inline_markdown(line[level:].strip())}</h{level}>\n"
+        elif line.strip():
+            yield f"<p>{format_inline_markdown(line)}</p>\n"
+    if open_block:
+        yield '</tbody></table>\n' if open_block == 'table' else f"</{open_block}>\n"
+
+
+def stream_json_list(values):
+    """
+    Serialize a list as JSON for a <script> element, HTML_CHUNK_ROWS items at a time.
+    
+    '<' is escaped so that no value can close the element.
+    
+    Args:
+        values: List of JSON-serializable values
+        
+    Yields:
+        str: Pieces of the JSON array
+    """
+    yield '['
+    for start in range(0, len(values), HTML_CHUNK_ROWS):
+        chunk = json.dumps(values[start:start + HTML_CHUNK_ROWS], ensure_ascii=False)[1:-1]
+        yield (',' if start else '') + chunk.replace('<', '\\u003c')
+    yield ']'
+
+
+def stream_html_columns(rows, column_count):
+    """
+    Serialize table rows as columnar JSON.
+    
+    Columns with at most half as many distinct values as rows are stored as
+    {"values": [...], "codes": [...]}, with each row's value given by its
+    index into "values"; other columns are plain lists.
+    
+    Args:
+        rows: List of rows, each a list of cell strings
+        column_count: Number of columns
+        
+    Yields:
+        str: Pieces of the JSON array of columns
+    """
+    yield '['
+    for index in range(column_count):
+        column = [row[index] for row in rows]
+        distinct = {}
+        codes = [distinct.setdefault(value, len(distinct)) for value in column]
+        if index:
+            yield ','
+        if len(distinct) * 2 <= len(column):
+            yield '{"values": '
+            yield from stream_json_list(list(distinct))
+            yield ', "codes": '
+            yield from stream_json_list(codes)
+            yield '}'
+        else:
+            yield from stream_json_list(column)
+    yield ']'
+
+
+def stream_html_report(vpc_data_list, account_regions, footer=''):
+    """
+    Generate a self-contained HTML report, a piece at a time.
+    
+    The page has the VPC table from the markdown report, with account and
+    region columns, as a filterable and sortable table that only renders
+    the rows in view, followed by the markdown report's summary sections,
+    converted one section at a time.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        footer: Markdown appended to the summary, such as run statistics
+        
+    Yields:
+        str: Pieces of the HTML document
+    """
+    columns = ('Account', 'Region') + VPC_TABLE_COLUMNS
+    yield '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>VPC Detective</title>\n'
+    yield f"<style>{HTML_REPORT_STYLE}</style>\n</head>\n<body>\n"
+    yield "<h1>🕵️ VPC Detective</h1>\n<p>🔎 Sniffing out your subnets since 2025 🔎</p>\n"
+    yield f"<p><em>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</em></p>\n"
+    
+    yield '<h2>VPCs</h2>\n<div class="controls"><input id="filter" type="search" placeholder="Filter all columns"> <span id="count"></span></div>\n'
+    yield '<div id="viewport"><table><thead><tr>' + ''.join(f"<th>{html.escape(column)}</th>" for column in columns) + '</tr>\n'
+    yield '<tr class="filters">' + ''.join(f'<th><input type="search" aria-label="Filter {html.escape(column)}"></th>' for column in columns)
+    yield '</tr></thead><tbody id="rows"></tbody></table></div>\n'
+    
+    rows = [[f"{vpc['account_name']} ({vpc['account_id']})", vpc['region']] + format_vpc_cells(vpc) for vpc in vpc_data_list]
+    yield '<script id="vpc-data" type="application/json">'
+    yield json.dumps({'columns': columns, 'rows': len(rows), 'row_height': HTML_ROW_HEIGHT})[:-1] + ', "data": '
+    yield from stream_html_columns(rows, len(columns))
+    yield '}</script>\n'
+    yield f"<script>{HTML_REPORT_SCRIPT}</script>\n"
+    
+    yield '<section>\n'
+    for section in generate_summary_sections(vpc_data_list, account_regions):
+        yield from markdown_to_html(section)
+    yield from markdown_to_html(footer)
+    yield '</section>\n</body>\n</html>\n'
+
+
+def write_html_report(path, vpc_data_list, account_regions, footer=''):
+    """
+    Write the HTML report (see stream_html_report) to a file as it is generated.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for piece in stream_html_report(vpc_data_list, account_regions, footer):
+            f.write(piece)
+
+
+def get_record_key(vpc):
+    """
+    Build the key that identifies a VPC record across scans.
+    
+    VPCs are keyed by their owner, so a VPC shared through AWS RAM has one
+    key whichever account it was seen from. Records without an owner (older
+    snapshots) use the scanned account, which is the owner for every record
+    collected.
+    
+    Args:
+        vpc: VPC data dictionary
+        
+    Returns:
+        str: 'owner_id:vpc_id'
+    """
+    return f"{vpc.get('owner_id') or vpc['account_id']}:{vpc['vpc_id']}"
+
+
+def normalize_record(vpc):
+    """
+    Normalize a VPC record so equal configurations serialize identically.
+    
+    Lists whose order carries no meaning are sorted.
+    
+    Args:
+        vpc: VPC data dictionary
+        
+    Returns:
+        dict: Normalized copy of the record
+    """
+    record = dict(vpc)
+    for field in ['exposed_security_groups', 'unused_security_groups', 'open_nacls', 'flow_logs_log_groups']:
+        if field in record:
+            record[field] = sorted(record[field])
+    if 'subnets' in record:
+        record['subnets'] = sorted(record['subnets'], key=lambda subnet: subnet['subnet_id'])
+    if 'vpc_endpoints' in record:
+        record['vpc_endpoints'] = sorted(record['vpc_endpoints'], key=lambda endpoint: endpoint['id'])
+    if 'exposed_rules' in record:
+        record['exposed_rules'] = sorted(record['exposed_rules'], key=lambda rule: json.dumps(rule, sort_keys=True))
+    return record
+
+
+def get_stable_fields(record):
+    """
+    Strip volatile fields from a normalized record.
+    
+    Args:
+        record: Normalized VPC record
+        
+    Returns:
+        dict: Record without fields listed in VOLATILE_FIELDS
+    """
+    stable = {field: value for field, value in record.items() if field not in VOLATILE_FIELDS}
+    if 'subnets' in stable:
+        stable['subnets'] = [
+            {field: value for field, value in subnet.items() if field not in VOLATILE_SUBNET_FIELDS}
+            for subnet in stable['subnets']
+        ]
+    return stable
+
+
+def hash_record(record):
+    """
+    Hash the stable fields of a normalized record.
+    
+    Args:
+        record: Normalized VPC record
+        
+    Returns:
+        str: SHA-256 hex digest
+    """
+    canonical = json.dumps(get_stable_fields(record), sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def build_snapshot(vpc_data_list, account_regions):
+    """
+    Build a normalized snapshot of a scan.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        
+    Returns:
+        dict: Snapshot with records keyed by get_record_key
+    """
+    vpcs = {}
+    for vpc in vpc_data_list:
+        record = normalize_record(vpc)
+        vpcs[get_record_key(vpc)] = {
+            'hash': hash_record(record),
+            'record': record
+        }
+    return {
+        'snapshot_version': SNAPSHOT_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'account_regions': account_regions,
+        'vpcs': vpcs
+    }
+
+
+def save_snapshot(vpc_data_list, account_regions, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Write a snapshot of the scan to the snapshot directory.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        snapshot_dir: Directory holding snapshot files
+        
+    Returns:
+        str: Path of the snapshot file
+    """
+    snapshot = build_snapshot(vpc_data_list, account_regions)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"vpc-snapshot-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as snapshot_file:
+        json.dump(snapshot, snapshot_file, indent=2, default=str)
+    return path
+
+
+def load_snapshot(path):
+    with open(path) as snapshot_file:
+        return json.load(snapshot_file)
+
+
+def find_latest_snapshots(snapshot_dir=SNAPSHOT_DIR, count=2):
+    """
+    Find the most recent snapshot files, oldest first.
+    
+    Args:
+        snapshot_dir: Directory holding snapshot files
+        count: Number of snapshots to return
+        
+    Returns:
+        list: Snapshot file paths
+    """
+    if not os.path.isdir(snapshot_dir):
+        return []
+    names = sorted(name for name in os.listdir(snapshot_dir)
+                   if name.startswith('vpc-snapshot-') and name.endswith('.json'))
+    return [os.path.join(snapshot_dir, name) for name in names[-count:]]
+
+
+def describe_field_change(field, old_value, new_value):
+    """
+    Describe notable field changes in plain words.
+    
+    Args:
+        field: Record field name
+        old_value: Value in the older snapshot
+        new_value: Value in the newer snapshot
+        
+    Returns:
+        str: Short description, or '' when the change has no special meaning
+    """
+    if field == 'flow_logs_status':
+        if new_value == 'Disabled' and old_value in ['Enabled', 'Multiple']:
+            return 'Flow logs disabled'
+        if old_value == 'Disabled' and new_value in ['Enabled', 'Multiple']:
+            return 'Flow logs enabled'
+    if field == 'flow_logs_retention':
+        old_days = retention_to_days(old_value)
+        new_days = retention_to_days(new_value)
+        if old_days is not None and new_days is not None:
+            return 'Retention shortened' if new_days < old_days else 'Retention extended'
+    if field == 'natgw_count' and isinstance(old_value, int) and isinstance(new_value, int):
+        return 'NAT gateways added' if new_value > old_value else 'NAT gateways removed'
+    if field == 'igw_present' and isinstance(old_value, bool) and isinstance(new_value, bool):
+        return 'Internet gateway attached' if new_value else 'Internet gateway detached'
+    return ''
+
+
+def retention_to_days(retention):
+    """
+    Convert a retention string to a comparable number of days.
+    
+    Args:
+        retention: '30 days', 'Never' or 'N/A'
+        
+    Returns:
+        float: Days ('Never' is infinite), or None for 'N/A'
+    """
+    if retention == 'Never':
+        return float('inf')
+    if isinstance(retention, str) and retention.endswith(' days'):
+        return int(retention.split()[0])
+    return None
+
+
+def diff_snapshots(old_snapshot, new_snapshot):
+    """
+    Compare two snapshots and report what drifted.
+    
+    Records are joined by key in one pass over each snapshot. Only records
+    whose hashes differ are compared field by field. Records missing from
+    account/regions that the newer scan did not complete are not reported
+    as removed.
+    
+    Args:
+        old_snapshot: Older snapshot dictionary
+        new_snapshot: Newer snapshot dictionary
+        
+    Returns:
+        dict: Drift report
+        {
+            'old_generated_at', 'new_generated_at',
+            'added': [record, ...],
+            'removed': [record, ...],
+            'changed': [{'key', 'vpc_id', 'account_id', 'region', 'changes': [...]}, ...],
+            'unchanged': int
+        }
+    """
+    old_vpcs = old_snapshot['vpcs']
+    new_vpcs = new_snapshot['vpcs']
+    added = []
+    changed = []
+    unchanged = 0
+    
+    for key, new_entry in new_vpcs.items():
+        old_entry = old_vpcs.get(key)
+        if old_entry is None:
+            added.append(new_entry['record'])
+            continue
+        if old_entry['hash'] == new_entry['hash']:
+            unchanged += 1
+            continue
+        
+        old_fields = get_stable_fields(old_entry['record'])
+        new_fields = get_stable_fields(new_entry['record'])
+        changes = []
+        for field in sorted(set(old_fields) | set(new_fields)):
+            old_value = old_fields.get(field)
+            new_value = new_fields.get(field)
+            if old_value != new_value:
+                changes.append({
+                    'field': field,
+                    'old': old_value,
+                    'new': new_value,
+                    'description': describe_field_change(field, old_value, new_value)
+                })
+        record = new_entry['record']
+        changed.append({
+            'key': key,
+            'vpc_id': record['vpc_id'],
+            'account_id': record['account_id'],
+            'region': record['region'],
+            'changes': changes
+        })
+    
+    incomplete = {
+        (ar['account_id'], ar['region']) for ar in new_snapshot.get('account_regions', [])
+        if ar.get('scan_status', 'complete') != 'complete'
+    }
+    removed = [
+        entry['record'] for key, entry in old_vpcs.items()
+        if key not in new_vpcs and (entry['record']['account_id'], entry['record']['region']) not in incomplete
+    ]
+    
+    return {
+        'old_generated_at': old_snapshot['generated_at'],
+        'new_generated_at': new_snapshot['generated_at'],
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': unchanged
+    }
+
+
+def format_drift_value(value):
+    if isinstance(value, (list, dict)):
+        text = json.dumps(value, sort_keys=True, default=str)
+        return text if len(text) <= 60 else text[:57] + '...'
+    return '-' if value is None or value == '' else str(value)
+
+
+def generate_drift_markdown(drift):
+    """
+    Generate a markdown drift report.
+    
+    Args:
+        drift: Output of diff_snapshots
+        
+    Returns:
+        str: Markdown content
+    """
+    markdown_content = "# 🕵️ VPC Detective Drift Report\n"
+    markdown_content += f"*Comparing {drift['old_generated_at']} with {drift['new_generated_at']}*\n\n"
+    
+    markdown_content += "## Summary\n"
+    markdown_content += f"- **New VPCs**: {len(drift['added'])}\n"
+    markdown_content += f"- **Removed VPCs**: {len(drift['removed'])}\n"
+    markdown_content += f"- **Changed VPCs**: {len(drift['changed'])}\n"
+    markdown_content += f"- **Unchanged VPCs**: {drift['unchanged']}\n\n"
+    
+    for title, records in [('New VPCs', drift['added']), ('Removed VPCs', drift['removed'])]:
+        if not records:
+            continue
+        markdown_content += f"## {title}\n\n"
+        markdown_content += "| Account | Region | VPC Name | VPC ID | CIDR Block | Flow Logs |\n"
+        markdown_content += "|---------|--------|----------|--------|------------|-----------|\n"
+        for record in records:
+            markdown_content += f"| {record['account_name']} ({record['account_id']}) | {record['region']} | {record['vpc_name']} | {record['vpc_id']} | {record['vpc_cidr']} | {record['flow_logs_status']} |\n"
+        markdown_content += "\n"
+    
+    if drift['changed']:
+        markdown_content += "## Changed VPCs\n\n"
+        markdown_content += "| Account | Region | VPC ID | Field | Before | After | Change |\n"
+        markdown_content += "|---------|--------|--------|-------|--------|-------|--------|\n"
+        for vpc in drift['changed']:
+            for change in vpc['changes']:
+                markdown_content += f"| {vpc['account_id']} | {vpc['region']} | {vpc['vpc_id']} | {change['field']} | {format_drift_value(change['old'])} | {format_drift_value(change['new'])} | {change['description'] or '-'} |\n"
+        markdown_content += "\n"
+    
+    return markdown_content
+
+
+def diff_command(args):
+    """
+    Write markdown and JSON drift reports for two snapshots.
+    
+    Without explicit paths the two most recent snapshots are compared.
+    """
+    if args.old and args.new:
+        old_path, new_path = args.old, args.new
+    else:
+        latest = find_latest_snapshots(args.snapshot_dir)
+        if len(latest) < 2:
+            print(f"Need two snapshots to compare; found {len(latest)} in {args.snapshot_dir}")
+            return
+        old_path, new_path = latest
+    
+    print(f"Comparing {old_path} with {new_path}")
+    drift = diff_snapshots(load_snapshot(old_path), load_snapshot(new_path))
+    
+    with open(f"{args.output}.md", 'w') as f:
+        f.write(generate_drift_markdown(drift))
+    with open(f"{args.output}.json", 'w') as f:
+        json.dump(drift, f, indent=2, default=str)
+    
+    print(f"Drift report has been generated in {args.output}.md and {args.output}.json")
+
+
+def open_store(db_path=RESULT_DB):
+    """
+    Open the SQLite result store, creating tables and indexes if needed.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        
+    Returns:
+        sqlite3.Connection: Open connection
+    """
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(STORE_SCHEMA)
+    columns = [row['name'] for row in connection.execute("PRAGMA table_info(scans)")]
+    if 'kind' not in columns:
+        # Stores written before scan kinds existed hold only full scans
+        with connection:
+            connection.execute("ALTER TABLE scans ADD COLUMN kind TEXT NOT NULL DEFAULT 'scan'")
+    return connection
+
+
+def save_scan(vpc_data_list, account_regions, db_path=RESULT_DB, kind='scan'):
+    """
+    Write a scan's VPC records and account/region list to the result store.
+    
+    Saving an 'events' scan replaces the previous one, so the store holds
+    one copy of the event-updated inventory however many batches arrive.
+    
+    Args:
+        vpc_data_list: List of VPC data dictionaries
+        account_regions: List of scanned account/region dictionaries
+        db_path: Path to the SQLite database file
+        kind: 'scan' for a full scan, 'events' for an event-updated inventory
+        
+    Returns:
+        int: ID of the stored scan
+    """
+    connection = open_store(db_path)
+    try:
+        with connection:
+            if kind == 'events':
+                previous = "(SELECT scan_id FROM scans WHERE kind = 'events')"
+                connection.execute(f"DELETE FROM vpc_destinations WHERE scan_id IN {previous}")
+                connection.execute(f"DELETE FROM vpcs WHERE scan_id IN {previous}")
+                connection.execute("DELETE FROM scans WHERE kind = 'events'")
+            cursor = connection.execute(
+                "INSERT INTO scans (generated_at, account_regions, kind) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), json.dumps(account_regions), kind)
+            )
+            scan_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO vpcs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(
+                    scan_id,
+                    vpc['account_id'],
+                    vpc['account_name'],
+                    vpc['region'],
+                    vpc['vpc_id'],
+                    vpc['vpc_name'],
+                    vpc['flow_logs_status'],
+                    ','.join(sorted(vpc['flow_logs_destinations'])),
+                    json.dumps(vpc, default=str)
+                ) for vpc in vpc_data_list]
+            )
+            connection.executemany(
+                "INSERT INTO vpc_destinations VALUES (?, ?, ?, ?)",
+                [(scan_id, vpc['account_id'], vpc['vpc_id'], destination)
+                 for vpc in vpc_data_list for destination in vpc['flow_logs_destinations']]
+            )
+    finally:
+        connection.close()
+    return scan_id
+
+
+def get_scan_id(connection, scan_id=None):
+    """
+    Resolve the scan to read, defaulting to the most recent one.
+    
+    Args:
+        connection: Open result store connection
+        scan_id: Explicit scan ID, or None for the latest scan
+        
+    Returns:
+        int: Scan ID, or None if the store holds no scans
+    """
+    if scan_id is not None:
+        return scan_id
+    row = connection.execute("SELECT MAX(scan_id) FROM scans").fetchone()
+    return row[0]
+
+
+def list_scans(db_path=RESULT_DB, kinds=('scan',)):
+    """
+    List stored scans with their VPC counts, newest first.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        kinds: Scan kinds to list; event-updated inventories are skipped by default
+        
+    Returns:
+        list: [{'scan_id', 'generated_at', 'vpc_count'}, ...]
+    """
+    connection = open_store(db_path)
+    try:
+        rows = connection.execute(
+            "SELECT s.scan_id, s.generated_at, COUNT(v.vpc_id) AS vpc_count "
+            "FROM scans s LEFT JOIN vpcs v ON v.scan_id = s.scan_id "
+            f"WHERE s.kind IN ({', '.join('?' for _ in kinds)}) "
+            "GROUP BY s.scan_id ORDER BY s.scan_id DESC",
+            tuple(kinds)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        connection.close()
+
+
+def get_latest_full_scan(db_path=RESULT_DB):
+    """
+    Get the ID of the newest full scan, ignoring event-updated inventories.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        
+    Returns:
+        int: Scan ID, or None if the store holds no full scans
+    """
+    if not os.path.exists(db_path):
+        return None
+    connection = open_store(db_path)
+    try:
+        return connection.execute("SELECT MAX(scan_id) FROM scans WHERE kind = 'scan'").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def load_scan(db_path=RESULT_DB, scan_id=None):
+    """
+    Load a stored scan's VPC records and account/region list.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        scan_id: Scan to load, or None for the latest scan
+        
+    Returns:
+        tuple: (vpc_data_list, account_regions), or (None, None) if not found
+    """
+    connection = open_store(db_path)
+    try:
+        scan_id = get_scan_id(connection, scan_id)
+        scan = connection.execute("SELECT account_regions FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        if scan is None:
+            return None, None
+        rows = connection.execute(
+            "SELECT record FROM vpcs WHERE scan_id = ? ORDER BY rowid", (scan_id,)
+        ).fetchall()
+        return [json.loads(row['record']) for row in rows], json.loads(scan['account_regions'])
+    finally:
+        connection.close()
+
+
+def query_store(db_path=RESULT_DB, scan_id=None, account=None, region=None, flow_logs_status=None,
+                destination=None, only_destination=None, group_by=None):
+    """
+    Filter or aggregate a stored scan using the store's indexes.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        scan_id: Scan to query, or None for the latest scan
+        account: Account ID or name
+        region: Region name
+        flow_logs_status: 'Enabled', 'Disabled', 'Multiple' or 'Error'
+        destination: Flow logs go to this destination (among others)
+        only_destination: Flow logs go to this destination and nowhere else
+        group_by: Key of QUERY_GROUP_COLUMNS to count VPCs by
+        
+    Returns:
+        list: Matching VPC rows, or group rows with a 'vpc_count' column
+    """
+    connection = open_store(db_path)
+    try:
+        conditions = ["v.scan_id = ?"]
+        params = [get_scan_id(connection, scan_id)]
+        if account:
+            conditions.append("(v.account_id = ? OR v.account_name = ?)")
+            params.extend([account, account])
+        if region:
+            conditions.append("v.region = ?")
+            params.append(region)
+        if flow_logs_status:
+            conditions.append("v.flow_logs_status = ?")
+            params.append(flow_logs_status)
+        if only_destination:
+            conditions.append("v.flow_logs_destinations = ?")
+            params.append(only_destination)
+        if destination:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM vpc_destinations d WHERE d.scan_id = v.scan_id "
+                "AND d.account_id = v.account_id AND d.vpc_id = v.vpc_id AND d.destination = ?)"
+            )
+            params.append(destination)
+        where = ' AND '.join(conditions)
+        
+        if group_by:
+            columns = QUERY_GROUP_COLUMNS[group_by]
+            sql = f"SELECT {columns}, COUNT(*) AS vpc_count FROM vpcs v WHERE {where} GROUP BY {columns} ORDER BY vpc_count DESC"
+        else:
+            sql = ("SELECT account_name, account_id, region, vpc_id, vpc_name, flow_logs_status, flow_logs_destinations "
+                   f"FROM vpcs v WHERE {where} ORDER BY account_name, region, vpc_id")
+        return [dict(row) for row in connection.execute(sql, params).fetchall()]
+    finally:
+        connection.close()
+
+
+def query_command(args):
+    """
+    Answer filters and aggregations from the result store without AWS calls.
+    """
+    if args.list_scans:
+        rows = list_scans(args.db)
+    else:
+        rows = query_store(
+            args.db,
+            scan_id=args.scan,
+            account=args.account,
+            region=args.region,
+            flow_logs_status=args.flow_logs,
+            destination=args.destination,
+            only_destination=args.only_destination,
+            group_by=args.group_by
+        )
+    
+    if args.format == 'json':
+        print(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        print("No matching results")
+        return
+    columns = list(rows[0].keys())
+    print("| " + " | ".join(columns) + " |")
+    print("|" + "|".join("---" for _ in columns) + "|")
+    for row in rows:
+        print("| " + " | ".join('-' if row[column] in [None, ''] else str(row[column]) for column in columns) + " |")
+
+
+def render_command(args):
+    """
+    Render the markdown report for a stored scan without contacting AWS.
+    """
+    vpc_data_list, account_regions = load_scan(args.db, args.scan)
+    if vpc_data_list is None:
+        print(f"No scan found in {args.db}")
+        return
+    
+    if args.shard_dir:
+        print_shard_counts(args.shard_dir, write_sharded_report(vpc_data_list, account_regions, args.shard_dir))
+        return
+    if args.html:
+        write_html_report(args.html, vpc_data_list, account_regions)
+        print(f"HTML report has been generated in {args.html}")
+        return
+    
+    with open(args.output, 'w') as f:
+        f.write(generate_markdown(vpc_data_list, account_regions))
+    
+    print(f"VPC documentation has been generated in {args.output}")
+
+
+def print_shard_counts(directory, counts):
+    """
+    Report where a sharded report was written and how many account files changed.
+    """
+    print(f"\nVPC documentation has been generated in {os.path.join(directory, SHARD_INDEX_FILE)} "
+          f"({counts['written']} account file(s) written, {counts['unchanged']} unchanged, {counts['removed']} removed)")
+
+
+class WatchInventory:
+    """
+    In-memory VPC inventory served by watch mode.
+    
+    Each account/region is replaced as a whole when it is refreshed, so
+    readers always see the last complete result for every region and never
+    wait on AWS. The rendered report is cached until the inventory changes.
+    """
+
+    def __init__(self, account_regions):
+        self.account_regions = account_regions
+        self.lock = threading.Lock()
+        self.units = {
+            (ar['account_id'], ar['region']): {
+                'vpcs': [], 'shared_vpcs': [], 'refreshed_at': None, 'error': None, 'version': 0
+            }
+            for ar in account_regions
+        }
+        self.version = 0
+        self.report_cache = (None, None)
+
+    def update(self, account_id, region, vpcs=None, error=None, refreshed_at=None, shared_vpcs=None):
+        """
+        Record the outcome of refreshing one account/region.
+        
+        On error the previous VPC list is kept and the error is reported
+        alongside its age.
+        """
+        with self.lock:
+            unit = dict(self.units[(account_id, region)])
+            if error is None:
+                unit['vpcs'] = vpcs
+                unit['shared_vpcs'] = shared_vpcs or []
+                unit['refreshed_at'] = refreshed_at or time.time()
+            unit['error'] = error
+            unit['version'] += 1
+            self.units[(account_id, region)] = unit
+            self.version += 1
+
+    def unit(self, account_id, region):
+        """
+        Get the current state of one account/region: its VPC list, shared
+        VPC references, refresh time, last error and version.
+        """
+        with self.lock:
+            return self.units[(account_id, region)]
+
+    def apply_changes(self, account_id, region, vpcs, shared_vpcs, version):
+        """
+        Replace one account/region's VPC list after applying change events.
+        
+        The records were derived from the unit as it was at version; if a
+        refresh replaced it since, they are dropped rather than overwrite the
+        newer result. The region's refresh time is kept because only some of
+        its VPCs were re-read.
+        
+        Returns:
+            bool: True if the unit was replaced
+        """
+        with self.lock:
+            unit = dict(self.units[(account_id, region)])
+            if unit['version'] != version:
+                return False
+            unit['vpcs'] = vpcs
+            unit['shared_vpcs'] = shared_vpcs
+            unit['version'] += 1
+            self.units[(account_id, region)] = unit
+            self.version += 1
+            return True
+
+    def view(self):
+        """
+        Get a consistent view of the inventory.
+        
+        Returns:
+            tuple: (vpc_data_list, freshness, version)
+        """
+        with self.lock:
+            units = dict(self.units)
+            version = self.version
+        
+        now = time.time()
+        vpc_data_list = []
+        freshness = {}
+        for ar in self.account_regions:
+            unit = units[(ar['account_id'], ar['region'])]
+            vpc_data_list.extend(unit['vpcs'])
+            
+            account_key = f"{ar['account_name']} ({ar['account_id']})"
+            age = now - unit['refreshed_at'] if unit['refreshed_at'] else None
+            account = freshness.setdefault(account_key, {'age_seconds': 0, 'regions': {}})
+            account['regions'][ar['region']] = {
+                'refreshed_at': datetime.fromtimestamp(unit['refreshed_at']).isoformat(timespec='seconds') if unit['refreshed_at'] else None,
+                'age_seconds': round(age) if age is not None else None,
+                'error': unit['error']
+            }
+            # An account is as old as its stalest region; never-refreshed regions make it unknown
+            if age is None or account['age_seconds'] is None:
+                account['age_seconds'] = None
+            else:
+                account['age_seconds'] = max(account['age_seconds'], round(age))
+        
+        return vpc_data_list, freshness, version
+
+    def report(self):
+        """
+        Get the markdown report, rendering it only when the inventory changed.
+        """
+        vpc_data_list, freshness, version = self.view()
+        cached_version, cached_report = self.report_cache
+        if cached_version != version:
+            cached_report = generate_markdown(vpc_data_list, self.account_regions)
+            self.report_cache = (version, cached_report)
+        return cached_report + generate_freshness_section(freshness)
+
+
+def generate_freshness_section(freshness):
+    """
+    Generate the markdown section showing how old each account's data is.
+    
+    Args:
+        freshness: Freshness dictionary from WatchInventory.view
+        
+    Returns:
+        str: Markdown table of data ages per account
+    """
+    markdown_content = "## Data Freshness\n\n"
+    markdown_content += "| Account | Oldest Region Data | Errors |\n"
+    markdown_content += "|---------|--------------------|--------|\n"
+    for account_key, account in freshness.items():
+        age = f"{account['age_seconds']}s" if account['age_seconds'] is not None else 'Not yet scanned'
+        errors = ', '.join(region for region, data in account['regions'].items() if data['error']) or '-'
+        markdown_content += f"| {account_key} | {age} | {errors} |\n"
+    markdown_content += "\n"
+    return markdown_content
+
+
+def seed_watch_inventory(inventory, db_path=RESULT_DB, scan_id=None):
+    """
+    Fill the inventory from the latest stored scan so reads are served at once.
+    
+    Args:
+        inventory: WatchInventory to fill
+        db_path: Path to the SQLite result store
+        scan_id: Scan to load instead of the latest of either kind
+        
+    Returns:
+        list: Account/region entries of the loaded scan, empty if none
+    """
+    if not os.path.exists(db_path):
+        return []
+    scans = [scan for scan in list_scans(db_path, kinds=SCAN_KINDS) if scan_id in (None, scan['scan_id'])]
+    if not scans:
+        return []
+    vpc_data_list, account_regions = load_scan(db_path, scans[0]['scan_id'])
+    refreshed_at = datetime.fromisoformat(scans[0]['generated_at']).timestamp()
+    shared_vpcs = {(ar['account_id'], ar['region']): ar.get('shared_vpcs', []) for ar in account_regions}
+    
+    by_unit = {}
+    for vpc in vpc_data_list:
+        by_unit.setdefault((vpc['account_id'], vpc['region']), []).append(vpc)
+    for account_id, region in inventory.units:
+        if (account_id, region) in by_unit:
+            inventory.update(account_id, region, by_unit[(account_id, region)], refreshed_at=refreshed_at,
+                             shared_vpcs=shared_vpcs.get((account_id, region)))
+    return account_regions
+
+
+def build_watch_schedule(unit_count, interval, start):
+    """
+    Spread first refreshes of all units evenly across one interval.
+    
+    Args:
+        unit_count: Number of account/region units
+        interval: Seconds between refreshes of the same unit
+        start: Epoch time of the first refresh
+        
+    Returns:
+        list: Heap of (due_time, unit_index)
+    """
+    stagger = interval / unit_count if unit_count else 0
+    schedule = [(start + index * stagger, index) for index in range(unit_count)]
+    heapq.heapify(schedule)
+    return schedule
+
+
+def refresh_watch_unit(inventory, aws_sso, account, region, sessions):
+    """
+    Re-scan one account/region and store the result in the inventory.
+    
+    Sessions are reused per account and dropped after a failure so the next
+    refresh re-authenticates.
+    """
+    try:
+        if account['id'] not in sessions:
+            sessions[account['id']] = get_account_session(aws_sso, account)
+        shared_vpcs = []
+        vpc_list = scan_region(sessions[account['id']], account['name'], account['id'], region, shared_vpcs=shared_vpcs)
+        inventory.update(account['id'], region, vpc_list, shared_vpcs=shared_vpcs)
+    except Exception as error:
+        print(f"  Error refreshing {account['name']} ({account['id']}) {region}: {error}")
+        sessions.pop(account['id'], None)
+        inventory.update(account['id'], region, error=str(error))
+
+
+def run_watch_refresher(inventory, config, interval, stop_event):
+    """
+    Refresh account/regions on a staggered schedule until stopped.
+    
+    Only one unit is refreshed at a time and each unit's refreshes are one
+    interval apart, so API calls are spread evenly instead of arriving in a
+    burst per full scan.
+    """
+    units = [(account, region) for account in config['Accounts'] for region in get_account_regions(account)]
+    schedule = build_watch_schedule(len(units), interval, time.time())
+    sessions = {}
+    
+    while schedule and not stop_event.is_set():
+        due, index = schedule[0]
+        wait = due - time.time()
+        if wait > 0:
+            stop_event.wait(wait)
+            continue
+        heapq.heappop(schedule)
+        account, region = units[index]
+        refresh_watch_unit(inventory, config['SSO'], account, region, sessions)
+        heapq.heappush(schedule, (due + interval, index))
+
+
+def make_watch_handler(inventory):
+    """
+    Build the HTTP request handler for watch mode.
+    
+    Routes:
+        /report   Markdown report with a data freshness section
+        /vpcs     JSON VPC records
+        /summary  JSON flow logs coverage summary
+        /status   JSON data age and last error per account/region
+    """
+
+    class WatchRequestHandler(http_server.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip('/') or '/report'
+            if path == '/report':
+                self.send_body(inventory.report(), 'text/markdown; charset=utf-8')
+                return
+            
+            vpc_data_list, freshness, _ = inventory.view()
+            if path == '/vpcs':
+                body = {'data_age': freshness, 'vpcs': vpc_data_list}
+            elif path == '/summary':
+                body = {'data_age': freshness, 'summary': calculate_flow_logs_summary(vpc_data_list)}
+            elif path == '/status':
+                body = {'data_age': freshness}
+            else:
+                self.send_error(404)
+                return
+            self.send_body(json.dumps(body, default=str), 'application/json')
+
+        def send_body(self, text, content_type):
+            data = text.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return WatchRequestHandler
+
+
+def parse_change_event(body):
+    """
+    Parse an SQS message body holding an EC2 change event.
+    
+    Accepts EventBridge "AWS API Call via CloudTrail" events, either raw or
+    wrapped in an SNS notification. Failed API calls and calls that do not
+    change a VPC record are ignored.
+    
+    Args:
+        body: SQS message body
+        
+    Returns:
+        dict: Parsed event, or None if it does not affect the inventory
+        {
+            'event_name': str,
+            'scope': str,
+            'account_id': str,
+            'region': str,
+            'resource_ids': [str, ...]
+        }
+    """
+    try:
+        event = json.loads(body)
+        if isinstance(event.get('Message'), str):
+            event = json.loads(event['Message'])
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(event, dict):
+        return None
+    
+    detail = event.get('detail') or {}
+    event_name = detail.get('eventName')
+    if event_name not in CHANGE_EVENT_SCOPES or detail.get('errorCode'):
+        return None
+    
+    affected = json.dumps([detail.get('requestParameters'), detail.get('responseElements')])
+    return {
+        'event_name': event_name,
+        'scope': CHANGE_EVENT_SCOPES[event_name],
+        'account_id': event.get('account') or detail.get('recipientAccountId'),
+        'region': event.get('region') or detail.get('awsRegion'),
+        'resource_ids': sorted(set(RESOURCE_ID_PATTERN.findall(affected)))
+    }
+
+
+def resolve_event_vpcs(event, vpcs_by_id, resource_index):
+    """
+    Work out which VPCs a change event affects.
+    
+    VPC IDs are taken from the event directly; subnet, network interface and
+    flow log IDs are mapped to their VPC. Deletes that only name a resource
+    the index does not know fall back to the VPCs that could have had it.
+    
+    Args:
+        event: Parsed change event
+        vpcs_by_id: Current VPC records of the event's account/region
+        resource_index: Subnet, network interface and flow log ID to VPC ID
+            mapping for the same records (see build_resource_index)
+        
+    Returns:
+        set: Affected VPC IDs, or None if the whole region must be re-read
+    """
+    vpc_ids = set()
+    for resource_id in event['resource_ids']:
+        if resource_id.startswith('vpc-'):
+            vpc_ids.add(resource_id)
+        elif resource_id in resource_index:
+            vpc_ids.add(resource_index[resource_id])
+    if vpc_ids:
+        return vpc_ids
+    
+    if event['event_name'] == 'DeleteFlowLogs':
+        return {vpc_id for vpc_id, vpc in vpcs_by_id.items() if vpc.get('flow_logs_status') != 'Disabled'}
+    if event['event_name'] == 'DeleteNatGateway':
+        return {vpc_id for vpc_id, vpc in vpcs_by_id.items() if vpc.get('natgw_count') != 0}
+    return None
+
+
+def refresh_vpc_fields(client, logs_client, vpc, scopes, flow_logs_by_resource=None, interfaces_by_vpc=None,
+                       log_group_cache=None, keep_destination_checks=True):
+    """
+    Re-read only the parts of a VPC record named by change events.
+    
+    Flow log changes need the region's flow logs and the VPC's network
+    interfaces. Callers refreshing several VPCs pass listings read once for
+    all of them; otherwise they are read here.
+    
+    Args:
+        client: EC2 boto3 client
+        logs_client: CloudWatch Logs boto3 client
+        vpc: VPC data dictionary, updated in place
+        scopes: Set of change scopes ('flow_logs', 'nat_gateways', 'internet_gateway')
+        flow_logs_by_resource: Output of get_region_flow_logs, or None
+        interfaces_by_vpc: Output of get_region_network_interfaces covering
+            the VPC, or None
+        log_group_cache: Log group cache shared across VPCs, or None
+        keep_destination_checks: Keep earlier S3 and Firehose findings for
+            callers that do not run check_flow_log_destinations again
+    """
+    vpc_id = vpc['vpc_id']
+    if 'internet_gateway' in scopes:
+        vpc['igw_present'] = get_vpc_igw(client, vpc_id)
+    if 'nat_gateways' in scopes:
+        vpc['natgw_count'] = get_natgws(client, vpc_id)
+    
+    if 'flow_logs' in scopes:
+        log_group_cache = {} if log_group_cache is None else log_group_cache
+        previous_issues = vpc.get('flow_logs_destination_issues', [])
+        # Subnet and ENI flow logs count too; the record's subnets and the
+        # VPC's interfaces attribute them
+        if flow_logs_by_resource is None:
+            flow_logs_by_resource = get_region_flow_logs(client)
+        if interfaces_by_vpc is None:
+            interfaces_by_vpc = get_region_network_interfaces(client, [{'Name': 'vpc-id', 'Values': [vpc_id]}])
+        subnets_by_vpc = {vpc_id: [{'SubnetId': subnet['subnet_id']} for subnet in vpc.get('subnets', [])]}
+        apply_flow_log_fields([vpc], flow_logs_by_resource, subnets_by_vpc, interfaces_by_vpc, logs_client, log_group_cache)
+        # Bucket and stream checks need the account session, so without one
+        # keep earlier findings for destinations the VPC still uses
+        if keep_destination_checks:
+            vpc['flow_logs_destination_issues'] += [
+                issue for issue in previous_issues
+                if issue['type'] in ('S3', 'Kinesis') and issue['destination'] in vpc['flow_logs_destination_arns']
+            ]
+        apply_cost_estimates([vpc], log_group_cache)
+    elif 'nat_gateways' in scopes:
+        # Flow log storage was not re-read, so keep its previous estimate
+        costs = estimate_vpc_costs(vpc)
+        costs['flow_log_storage'] = vpc.get('estimated_costs', {}).get('flow_log_storage', 0.0)
+        costs['total'] = round(costs['nat_gateways'] + costs['interface_endpoints'] + costs['flow_log_storage'], 2)
+        vpc['estimated_costs'] = costs
+
+
+def apply_unit_change_events(client, logs_client, account, vpcs, events, shared_vpcs=None, boto3_sso_session=None,
+                             destination_cache=None, volume_hours=FLOW_LOG_VOLUME_HOURS):
+    """
+    Apply a batch of change events to one account/region's VPC records.
+    
+    Events are merged first so each affected VPC is re-read once: VPC-level
+    changes rebuild the record through get_vpcs limited to those VPCs, and
+    flow log, NAT gateway and internet gateway changes re-read only that
+    field. A VPC-level change that names no VPC re-reads the whole region.
+    The region-wide flow log and network interface listings are read at
+    most once per batch, however many VPCs they are needed for. As in a
+    scan, VPCs shared into the account through AWS RAM are not rebuilt as
+    records of this account; only their references are kept. Given the
+    account session, rebuilt and flow log refreshed records get the same
+    destination checks and flow log volumes as in a scan.
+    
+    Args:
+        client: EC2 boto3 client for the region
+        logs_client: CloudWatch Logs boto3 client for the region
+        account: Account entry from the configuration
+        vpcs: Current VPC records of the account/region
+        events: Parsed change events for the account/region
+        shared_vpcs: Optional list of the account/region's shared VPC
+            references, updated in place for the VPCs rebuilt
+        boto3_sso_session: Optional session for the account, needed for
+            destination checks and flow log volumes
+        destination_cache: Optional DestinationCache shared across regions
+        volume_hours: Window for flow log volumes; 0 skips them
+        
+    Returns:
+        list: Updated VPC records
+    """
+    vpcs_by_id = {vpc['vpc_id']: dict(vpc) for vpc in vpcs}
+    resource_index = build_resource_index(vpcs)
+    
+    # Network interfaces are not kept in the records, so one listing maps
+    # the interfaces events name (e.g. flow logs created on an ENI)
+    interfaces_by_vpc = None
+    if any(resource_id.startswith('eni-') and resource_id not in resource_index
+           for event in events for resource_id in event['resource_ids']):
+        interfaces_by_vpc = get_region_network_interfaces(client)
+        for vpc_id, interfaces in interfaces_by_vpc.items():
+            for interface in interfaces:
+                resource_index[interface['NetworkInterfaceId']] = vpc_id
+    
+    deleted = set()
+    rebuild = set()
+    field_refreshes = {}
+    refresh_region = False
+    for event in events:
+        affected = resolve_event_vpcs(event, vpcs_by_id, resource_index)
+        if event['event_name'] == 'DeleteVpc':
+            deleted |= affected or set()
+            continue
+        if affected is None:
+            if event['scope'] == 'vpc':
+                refresh_region = True
+                continue
+            affected = set(vpcs_by_id)
+        for vpc_id in affected:
+            # A VPC missing from the inventory can only be filled in by a rebuild
+            if event['scope'] == 'vpc' or vpc_id not in vpcs_by_id:
+                rebuild.add(vpc_id)
+            else:
+                field_refreshes.setdefault(vpc_id, set()).add(event['scope'])
+    
+    shared_vpcs = [] if shared_vpcs is None else shared_vpcs
+    if refresh_region:
+        shared_vpcs.clear()
+        rebuilt = get_vpcs(client, logs_client, account_id=account['id'], shared_vpcs=shared_vpcs)
+        vpcs_by_id = {}
+    else:
+        for vpc_id in deleted:
+            vpcs_by_id.pop(vpc_id, None)
+        rebuild -= deleted
+        # Rebuilt VPCs get a fresh shared reference if they are still shared
+        shared_vpcs[:] = [reference for reference in shared_vpcs if reference['vpc_id'] not in rebuild | deleted]
+        rebuilt = get_vpcs(client, logs_client, sorted(rebuild), account_id=account['id'],
+                           shared_vpcs=shared_vpcs) if rebuild else []
+        # VPCs that no longer exist are not returned and drop out of the inventory
+        for vpc_id in rebuild:
+            vpcs_by_id.pop(vpc_id, None)
+    
+    for vpc in rebuilt:
+        vpc['account_name'] = account['name']
+        vpc['account_id'] = account['id']
+        vpcs_by_id[vpc['vpc_id']] = vpc
+    
+    reread = list(rebuilt)
+    if not refresh_region:
+        field_refreshes = {
+            vpc_id: scopes for vpc_id, scopes in field_refreshes.items()
+            if vpc_id in vpcs_by_id and vpc_id not in rebuild
+        }
+        flow_logs_by_resource = None
+        log_group_cache = {}
+        flow_log_vpcs = sorted(vpc_id for vpc_id, scopes in field_refreshes.items() if 'flow_logs' in scopes)
+        if flow_log_vpcs:
+            flow_logs_by_resource = get_region_flow_logs(client)
+            if interfaces_by_vpc is None:
+                filters = [{'Name': 'vpc-id', 'Values': flow_log_vpcs}] if len(flow_log_vpcs) <= EC2_FILTER_VALUES else None
+                interfaces_by_vpc = get_region_network_interfaces(client, filters)
+        for vpc_id, scopes in field_refreshes.items():
+            refresh_vpc_fields(client, logs_client, vpcs_by_id[vpc_id], scopes,
+                               flow_logs_by_resource, interfaces_by_vpc, log_group_cache,
+                               keep_destination_checks=boto3_sso_session is None)
+        reread += [vpcs_by_id[vpc_id] for vpc_id in flow_log_vpcs]
+    
+    if boto3_sso_session is not None and reread:
+        check_flow_log_destinations(boto3_sso_session, account['id'], reread, destination_cache)
+        if volume_hours:
+            # Shared log groups are split across the region's VPCs, so every record is updated
+            collect_flow_log_volumes(boto3_sso_session, client.meta.region_name, list(vpcs_by_id.values()), volume_hours)
+    
+    return list(vpcs_by_id.values())
+
+
+def build_resource_index(vpcs):
+    """
+    Map the subnet and flow log IDs held in VPC records to their VPC.
+    
+    Args:
+        vpcs: VPC data dictionaries
+        
+    Returns:
+        dict: Resource ID to VPC ID
+    """
+    resource_index = {}
+    for vpc in vpcs:
+        for subnet in vpc.get('subnets', []):
+            resource_index[subnet['subnet_id']] = vpc['vpc_id']
+        for flow_log_id in vpc.get('flow_log_ids', []):
+            resource_index[flow_log_id] = vpc['vpc_id']
+    return resource_index
+
+
+def process_change_events(inventory, config, events, sessions, volume_hours=FLOW_LOG_VOLUME_HOURS):
+    """
+    Apply parsed change events to the inventory, one account/region at a time.
+    
+    Events for accounts or regions outside the configuration are ignored.
+    Sessions are reused per account and dropped after a failure. A unit
+    refreshed by watch mode while its events were applied counts as failed,
+    so its events are applied again on top of the refreshed records.
+    
+    Args:
+        inventory: WatchInventory to update
+        config: Configuration with 'SSO' and 'Accounts'
+        events: Parsed change events
+        sessions: Account ID to boto3 session cache
+        volume_hours: Window for flow log volumes of re-read VPCs; 0 skips them
+        
+    Returns:
+        set: (account_id, region) pairs whose events could not be applied
+    """
+    accounts = {account['id']: account for account in config['Accounts']}
+    by_unit = {}
+    for event in events:
+        unit = (event['account_id'], event['region'])
+        if unit in inventory.units:
+            by_unit.setdefault(unit, []).append(event)
+    
+    # Destinations are checked once per batch, so deletions show up by the next one
+    destination_cache = DestinationCache()
+    failed = set()
+    for (account_id, region), unit_events in by_unit.items():
+        account = accounts[account_id]
+        try:
+            if account_id not in sessions:
+                sessions[account_id] = get_account_session(config['SSO'], account)
+            client = sessions[account_id].client('ec2', region_name=region)
+            logs_client = sessions[account_id].client('logs', region_name=region)
+            unit = inventory.unit(account_id, region)
+            shared_vpcs = list(unit['shared_vpcs'])
+            try:
+                vpcs = apply_unit_change_events(client, logs_client, account, unit['vpcs'], unit_events, shared_vpcs,
+                                                sessions[account_id], destination_cache, volume_hours)
+            finally:
+                client.close()
+                logs_client.close()
+            if not inventory.apply_changes(account_id, region, vpcs, shared_vpcs, unit['version']):
+                # The events are delivered again and applied to the refreshed records
+                print(f"  {account['name']} ({account_id}) {region} was refreshed while change events were applied; "
+                      f"they will be applied again")
+                failed.add((account_id, region))
+                continue
+            print(f"  Applied {len(unit_events)} change event(s) to {account['name']} ({account_id}) {region}")
+        except Exception as error:
+            print(f"  Error applying change events to {account['name']} ({account_id}) {region}: {error}")
+            sessions.pop(account_id, None)
+            failed.add((account_id, region))
+    return failed
+
+
+def receive_change_messages(sqs_client, queue_url, wait_seconds=SQS_WAIT_SECONDS):
+    """
+    Receive up to CHANGE_EVENT_BATCH messages from the change event queue.
+    
+    The first receive long-polls; further receives only collect messages
+    that are already waiting, so bursts are applied together.
+    """
+    messages = []
+    while len(messages) < CHANGE_EVENT_BATCH:
+        response = sqs_client.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=0 if messages else wait_seconds
+        )
+        received = response.get('Messages', [])
+        messages.extend(received)
+        if len(received) < 10:
+            break
+    return messages
+
+
+def consume_change_events(sqs_client, queue_url, apply_batch, stop_event, drain=False):
+    """
+    Read change events from SQS and apply them until stopped.
+    
+    A message is deleted once its event has been applied or found not to
+    affect the inventory. Messages for account/regions that failed stay in
+    the queue and are delivered again after their visibility timeout.
+    
+    Args:
+        sqs_client: SQS boto3 client (or a local stand-in)
+        queue_url: URL of the change event queue
+        apply_batch: Callable taking parsed events and returning failed units
+        stop_event: threading.Event that ends the loop
+        drain: Stop once the queue is empty instead of waiting for more
+    """
+    while not stop_event.is_set():
+        messages = receive_change_messages(sqs_client, queue_url, 0 if drain else SQS_WAIT_SECONDS)
+        if not messages:
+            if drain:
+                return
+            continue
+        
+        parsed = [(message, parse_change_event(message['Body'])) for message in messages]
+        failed = apply_batch([event for _, event in parsed if event])
+        done = [
+            message for message, event in parsed
+            if event is None or (event['account_id'], event['region']) not in failed
+        ]
+        for start in range(0, len(done), 10):
+            sqs_client.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle']}
+                    for index, message in enumerate(done[start:start + 10])
+                ]
+            )
+
+
+def get_config_account_regions(config):
+    """
+    List every configured account/region.
+    """
+    return [
+        {'account_name': account['name'], 'account_id': account['id'], 'region': region}
+        for account in config['Accounts'] for region in get_account_regions(account)
+    ]
+
+
+def get_event_account_regions(inventory, scanned_account_regions):
+    """
+    Build the account/region list stored with an event-updated inventory.
+    
+    Each region keeps the status and timing of the scan the inventory was
+    loaded from, with the shared VPC references left by the events, so the
+    stored inventory renders like a full scan.
+    
+    Args:
+        inventory: WatchInventory updated from change events
+        scanned_account_regions: Account/region entries of the loaded scan
+        
+    Returns:
+        list: Account/region dictionaries
+    """
+    scanned = {(ar['account_id'], ar['region']): ar for ar in scanned_account_regions}
+    account_regions = []
+    for ar in inventory.account_regions:
+        unit = (ar['account_id'], ar['region'])
+        entry = dict(scanned.get(unit, {'scan_status': 'partial', 'scan_note': EVENTS_ONLY_NOTE}), **ar)
+        entry['shared_vpcs'] = [dict(reference) for reference in inventory.unit(*unit)['shared_vpcs']]
+        account_regions.append(entry)
+    return account_regions
+
+
+def events_command(args):
+    """
+    Keep the stored inventory current from EC2 change events instead of
+    re-scanning every VPC.
+    
+    The latest stored scan is loaded, each batch of events re-reads only
+    the affected VPCs, and the result replaces the stored 'events' scan.
+    A full scan stored while the command runs is loaded before the next
+    batch, so the stored inventory never goes back to older data.
+    """
+    print_banner()
+    config = load_config(args.config)
+    
+    inventory = WatchInventory(get_config_account_regions(config))
+    scanned = {'account_regions': seed_watch_inventory(inventory, args.db), 'scan_id': get_latest_full_scan(args.db)}
+    sessions = {}
+    
+    def apply_batch(events):
+        latest_scan_id = get_latest_full_scan(args.db)
+        if latest_scan_id != scanned['scan_id']:
+            print(f"Loading scan {latest_scan_id} stored since the inventory was loaded")
+            scanned['account_regions'] = seed_watch_inventory(inventory, args.db, latest_scan_id)
+            scanned['scan_id'] = latest_scan_id
+        version = inventory.version
+        failed = process_change_events(inventory, config, events, sessions)
+        if inventory.version != version:
+            vpc_data_list, _, _ = inventory.view()
+            account_regions = get_event_account_regions(inventory, scanned['account_regions'])
+            resolve_shared_vpcs(vpc_data_list, account_regions)
+            scan_id = save_scan(vpc_data_list, account_regions, args.db, kind='events')
+            print(f"Scan results have been stored in {args.db} (scan {scan_id})")
+        return failed
+    
+    sqs_client = boto3.client('sqs', region_name=args.queue_region, endpoint_url=args.sqs_endpoint_url)
+    print(f"Reading change events from {args.queue_url}")
+    try:
+        consume_change_events(sqs_client, args.queue_url, apply_batch, threading.Event(), drain=args.drain)
+    except KeyboardInterrupt:
+        pass
+
+
+def watch_command(args):
+    """
+    Keep the inventory in memory, refresh it on a staggered schedule and
+    serve it over a local HTTP endpoint.
+    """
+    print_banner()
+    config = load_config(args.config)
+    account_regions = get_config_account_regions(config)
+    
+    inventory = WatchInventory(account_regions)
+    seed_watch_inventory(inventory, args.db)
+    
+    stop_event = threading.Event()
+    refresher = threading.Thread(
+        target=run_watch_refresher,
+        args=(inventory, config, args.interval, stop_event),
+        daemon=True
+    )
+    refresher.start()
+    
+    if args.queue_url:
+        # Apply change events between scheduled refreshes
+        sqs_client = boto3.client('sqs', region_name=args.queue_region, endpoint_url=args.sqs_endpoint_url)
+        event_sessions = {}
+        consumer = threading.Thread(
+            target=consume_change_events,
+            args=(
+                sqs_client, args.queue_url,
+                lambda events: process_change_events(inventory, config, events, event_sessions),
+                stop_event
+            ),
+            daemon=True
+        )
+        consumer.start()
+    
+    server = http_server.ThreadingHTTPServer((args.host, args.port), make_watch_handler(inventory))
+    print(f"Serving VPC inventory on http://{args.host}:{args.port}/report (refreshing every {args.interval}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Document VPCs across AWS accounts and regions.')
+    parser.set_defaults(command='scan', snapshot_dir=SNAPSHOT_DIR, db=RESULT_DB, deadline=None,
+                        connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                        hedge=False, max_hedges=HEDGE_MAX_IN_FLIGHT, volume_hours=FLOW_LOG_VOLUME_HOURS,
+                        workers=SCAN_WORKERS, auth_ahead=AUTH_AHEAD, plan=False, json=None, shard_dir=None, html=None)
+    parser.add_argument('--config', default=CONFIG_FILE, help='account list configuration file')
+    fixture_group = parser.add_mutually_exclusive_group()
+    fixture_group.add_argument('--record', metavar='DIR', help='save sanitized AWS responses to fixture files in DIR')
+    fixture_group.add_argument('--replay', metavar='DIR', help='answer AWS calls from fixture files in DIR, offline')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    scan_parser = subparsers.add_parser('scan', help='scan accounts and generate the report (default)')
+    add_config_argument(scan_parser)
+    scan_parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR, help='directory for scan snapshots')
+    scan_parser.add_argument('--db', default=RESULT_DB, help='SQLite result store')
+    scan_parser.add_argument('--deadline', type=float, help='stop collecting after this many seconds and report what was collected')
+    scan_parser.add_argument('--connect-timeout', type=float, default=CONNECT_TIMEOUT, help='per-call connect timeout in seconds')
+    scan_parser.add_argument('--read-timeout', type=float, default=READ_TIMEOUT, help='per-call read timeout in seconds')
+    scan_parser.add_argument('--hedge', action='store_true', help='duplicate describe calls that run past their p95 latency')
+    scan_parser.add_argument('--max-hedges', type=int, default=HEDGE_MAX_IN_FLIGHT, help='most hedged calls in flight at once')
+    scan_parser.add_argument('--volume-hours', type=float, default=FLOW_LOG_VOLUME_HOURS,
+                             help='window for CloudWatch flow log volumes in hours (0 to skip)')
+    scan_parser.add_argument('--workers', type=int, default=SCAN_WORKERS,
+                             help='account/regions scanned at once, longest first by previous scan duration')
+    scan_parser.add_argument('--auth-ahead', type=int, default=AUTH_AHEAD,
+                             help='most accounts signed in to via SSO before their regions start')
+    scan_parser.add_argument('--json', metavar='PATH', help='also stream VPC records to a JSON file as regions complete')
+    scan_parser.add_argument('--shard-dir', metavar='DIR',
+                             help='write one markdown file per account plus an index to DIR instead of vpc-documentation.md')
+    scan_parser.add_argument('--html', metavar='PATH', help='also write a self-contained HTML report with a filterable VPC table')
+    scan_parser.add_argument('--plan', action='store_true',
+                             help='estimate API calls and scan time from the config and latest snapshot, without scanning')
+    
+    diff_parser = subparsers.add_parser('diff', help='compare two scan snapshots')
+    diff_parser.add_argument('old', nargs='?', help='older snapshot (default: second most recent)')
+    diff_parser.add_argument('new', nargs='?', help='newer snapshot (default: most recent)')
+    diff_parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR, help='directory for scan snapshots')
+    diff_parser.add_argument('--output', default='vpc-drift', help='output path without extension')
+    
+    query_parser = subparsers.add_parser('query', help='filter or aggregate stored scan results')
+    query_parser.add_argument('--db', default=RESULT_DB, help='SQLite result store')
+    query_parser.add_argument('--scan', type=int, help='scan ID (default: latest)')
+    query_parser.add_argument('--list-scans', action='store_true', help='list stored scans')
+    query_parser.add_argument('--account', help='account ID or name')
+    query_parser.add_argument('--region', help='region name')
+    query_parser.add_argument('--flow-logs', choices=['Enabled', 'Disabled', 'Multiple', 'Error'], help='flow logs status')
+    query_parser.add_argument('--destination', choices=['CloudWatch', 'S3', 'Kinesis'], help='flow logs destination')
+    query_parser.add_argument('--only-destination', choices=['CloudWatch', 'S3', 'Kinesis'], help='sole flow logs destination')
+    query_parser.add_argument('--group-by', choices=sorted(QUERY_GROUP_COLUMNS), help='count VPCs per group')
+    query_parser.add_argument('--format', choices=['table', 'json'], default='table')
+    
+    render_parser = subparsers.add_parser('render', help='render the report for a stored scan')
+    render_parser.add_argument('--db', default=RESULT_DB, help='SQLite result store')
+    render_parser.add_argument('--scan', type=int, help='scan ID (default: latest)')
+    render_parser.add_argument('--output', default='vpc-documentation.md', help='markdown output file')
+    render_parser.add_argument('--shard-dir', metavar='DIR', help='write one markdown file per account plus an index to DIR instead')
+    render_parser.add_argument('--html', metavar='PATH', help='write a self-contained HTML report to PATH instead')
+    
+    watch_parser = subparsers.add_parser('watch', help='keep the inventory fresh and serve it over HTTP')
+    watch_parser.add_argument('--interval', type=int, default=WATCH_INTERVAL, help='seconds between refreshes of each account/region')
+    watch_parser.add_argument('--host', default=WATCH_HOST, help='address to listen on')
+    watch_parser.add_argument('--port', type=int, default=WATCH_PORT, help='port to listen on')
+    watch_parser.add_argument('--db', default=RESULT_DB, help='SQLite result store used to warm-start the inventory')
+    add_config_argument(watch_parser)
+    add_queue_arguments(watch_parser, required=False)
+    
+    events_parser = subparsers.add_parser('events', help='update stored results from EC2 change events in SQS')
+    events_parser.add_argument('--db', default=RESULT_DB, help='SQLite result store')
+    events_parser.add_argument('--drain', action='store_true', help='exit once the queue is empty')
+    add_config_argument(events_parser)
+    add_queue_arguments(events_parser, required=True)
+    
+    validate_parser = subparsers.add_parser('validate', help='check the account list configuration')
+    add_config_argument(validate_parser)
+    
+    return parser.parse_args(argv)
+
+
+def add_config_argument(parser):
+    """
+    Accept --config after a subcommand as well as before it.
+    """
+    parser.add_argument('--config', default=argparse.SUPPRESS, help='account list configuration file')
+
+
+def add_queue_arguments(parser, required):
+    """
+    Add the change event queue options to a subcommand parser.
+    """
+    parser.add_argument('--queue-url', required=required, help='SQS queue receiving EC2 change events')
+    parser.add_argument('--queue-region', help='region of the SQS queue')
+    parser.add_argument('--sqs-endpoint-url', help='SQS endpoint override, e.g. a local SQS stand-in')
+
+
+def main(argv=None):
+    """
+    Dispatch to the requested command; scanning is the default.
+    """
+    args = parse_args(argv)
+    fixtures = start_fixtures(args)
+    try:
+        run_command(args)
+    finally:
+        if fixtures and fixtures.mode == 'record':
+            fixtures.save(load_config(args.config) if os.path.exists(args.config) else None)
+            print(f"Recorded AWS responses have been saved to {fixtures.directory}")
+
+
+def run_command(args):
+    """
+    Run the subcommand selected on the command line.
+    """
+    if args.command == 'diff':
+        diff_command(args)
+    elif args.command == 'query':
+        query_command(args)
+    elif args.command == 'render':
+        render_command(args)
+    elif args.command == 'watch':
+        watch_command(args)
+    elif args.command == 'events':
+        events_command(args)
+    elif args.command == 'validate':
+        validate_command(args)
+    elif args.plan:
+        plan_command(args)
+    else:
+        scan_command(args)
+
+
+def load_config(path=CONFIG_FILE):
+    """
+    Load the account list configuration.
+    
+    Args:
+        path: Path to account-list.json
+        
+    Returns:
+        dict: Configuration with 'SSO' and 'Accounts'
+    """
+    with open(path) as account_file:
+        return json.load(account_file)
+
+
+def validate_config(config):
+    """
+    Check the account list configuration without contacting AWS.
+    
+    Args:
+        config: Parsed configuration
+        
+    Returns:
+        list: Problems found, empty when the configuration is valid
+    """
+    if not isinstance(config, dict):
+        return ["Configuration must be a JSON object"]
+    
+    errors = []
+    aws_sso = config.get('SSO')
+    if not isinstance(aws_sso, dict):
+        errors.append("SSO: missing or not an object")
+    else:
+        if not str(aws_sso.get('start_url', '')).startswith('https://'):
+            errors.append("SSO.start_url: must be an https:// URL")
+        if not REGION_PATTERN.match(str(aws_sso.get('region', ''))):
+            errors.append(f"SSO.region: invalid region {aws_sso.get('region')!r}")
+    
+    accounts = config.get('Accounts')
+    if not isinstance(accounts, list) or not accounts:
+        errors.append("Accounts: missing or empty")
+        return errors
+    
+    seen_ids = set()
+    for index, account in enumerate(accounts):
+        label = f"Accounts[{index}]"
+        if not isinstance(account, dict):
+            errors.append(f"{label}: not an object")
+            continue
+        label = f"Accounts[{index}] ({account.get('name', 'unnamed')})"
+        if not account.get('name'):
+            errors.append(f"{label}: missing name")
+        if not isinstance(account.get('id'), str) or not re.fullmatch(r'\d{12}', account['id']):
+            errors.append(f"{label}: id must be a 12-digit account ID as a string")
+        elif account['id'] in seen_ids:
+            errors.append(f"{label}: duplicate account id {account['id']}")
+        else:
+            seen_ids.add(account['id'])
+        if not account.get('role_name'):
+            errors.append(f"{label}: missing role_name")
+        
+        regions = get_account_regions(account)
+        if not isinstance(regions, list) or not regions or regions == [None]:
+            errors.append(f"{label}: needs 'regions' (a list) or 'region'")
+            continue
+        for region in regions:
+            if not REGION_PATTERN.match(str(region)):
+                errors.append(f"{label}: invalid region {region!r}")
+    return errors
+
+
+def validate_command(args):
+    """
+    Validate the account list configuration and exit non-zero on problems.
+    """
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as error:
+        print(f"Cannot read {args.config}: {error}")
+        sys.exit(1)
+    
+    errors = validate_config(config)
+    if errors:
+        print(f"{args.config} has {len(errors)} problem(s):")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    
+    unit_count = len(get_config_account_regions(config))
+    print(f"{args.config} is valid: {len(config['Accounts'])} account(s), {unit_count} account/region(s)")
+
+
+def get_account_regions(account):
+    return account.get('regions', [account.get('region')])  # Support both old and new format
+
+
+def get_account_session(aws_sso, account):
+    """
+    Create an SSO session for an account.
+    
+    Args:
+        aws_sso: 'SSO' section of the configuration
+        account: Account entry from the configuration
+        
+    Returns:
+        boto3.Session: Session for the account's role; with --record or
+            --replay, a FixtureSession
+    """
+    if active_fixtures is not None and active_fixtures.mode == 'replay':
+        return active_fixtures.session(account)
+    session = aws_sso_lib.get_boto3_session(aws_sso['start_url'],
+                                            aws_sso['region'],
+                                            account['id'], account['role_name'],
+                                            region=aws_sso['region'],  # Use SSO region for session
+                                            login=True)
+    if active_fixtures is not None:
+        return active_fixtures.session(account, session)
+    return session
+
+
+# Set by main() for --record and --replay; get_account_session consults it
+active_fixtures = None
+
+
+class AwsFixtures:
+    """
+    Record AWS responses to fixture files, or serve them back offline.
+    
+    Both modes hook botocore's event system on each client, so the code
+    under test uses ordinary clients and paginators. Recording captures the
+    parameters and parsed response of every call after it completes.
+    Replaying answers each call from the fixtures before any request is
+    sent, using clients with placeholder credentials, so no SSO login or
+    network access is needed.
+    
+    Recorded data is sanitized: account IDs (any 12-digit number in a
+    string) are replaced by fake IDs in a stable order starting with the
+    configured accounts, and response metadata such as request IDs is
+    dropped. Calls are matched on operation and parameters, with datetimes
+    ignored so time windows still match; repeated identical calls are
+    answered in recorded order, and a call made more often than it was
+    recorded fails rather than repeating the last response.
+    """
+
+    def __init__(self, mode, directory):
+        self.mode = mode
+        self.directory = directory
+        self.calls = {}
+        self.account_ids = {}
+        self.lock = threading.Lock()
+        self.botocore_session = None
+    
+    def fake_account_id(self, account_id):
+        with self.lock:
+            if account_id not in self.account_ids:
+                self.account_ids[account_id] = f"{len(self.account_ids) + 1:012d}"
+            return self.account_ids[account_id]
+    
+    def sanitize(self, value):
+        """
+        Return a JSON-ready copy of value with account IDs replaced.
+        """
+        if isinstance(value, dict):
+            return {key: self.sanitize(item) for key, item in value.items() if key != 'ResponseMetadata'}
+        if isinstance(value, (list, tuple)):
+            return [self.sanitize(item) for item in value]
+        if isinstance(value, str):
+            return ACCOUNT_ID_PATTERN.sub(lambda match: self.fake_account_id(match.group(0)), value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+    
+    @staticmethod
+    def call_key(operation_name, params):
+        return f"{operation_name} " + json.dumps(params, sort_keys=True, default=AwsFixtures.placeholder)
+    
+    @staticmethod
+    def placeholder(value):
+        # Time windows move between runs, so parameters match whatever the datetime
+        return '<datetime>' if isinstance(value, datetime) else str(value)
+    
+    def fixture_path(self, account_id, region, service_name):
+        return os.path.join(self.directory, account_id, region or FIXTURE_GLOBAL_REGION, f"{service_name}.json")
+    
+    def load(self, path):
+        """
+        Index a fixture file by call key, keeping responses in recorded order.
+        """
+        if path not in self.calls:
+            calls = {}
+            if os.path.exists(path):
+                with open(path) as fixture_file:
+                    for call in json.load(fixture_file)['calls']:
+                        calls.setdefault(self.call_key(call['operation'], call['params']), []).append(call)
+            self.calls[path] = calls
+        return self.calls[path]
+    
+    def session(self, account, boto3_session=None):
+        """
+        Wrap an account session (record) or stand in for one (replay).
+        """
+        if self.mode == 'record':
+            return FixtureSession(self, self.fake_account_id(account['id']), boto3_session)
+        return FixtureSession(self, account['id'])
+    
+    def create_client(self, account_id, service_name, region_name, config, boto3_session):
+        if self.mode == 'record':
+            client = boto3_session.client(service_name, region_name=region_name, config=config)
+        else:
+            # Replayed errors are final; retries would only wait
+            no_retries = botocore.config.Config(retries={'total_max_attempts': 1})
+            with self.lock:
+                if self.botocore_session is None:
+                    self.botocore_session = botocore.session.get_session()
+                client = self.botocore_session.create_client(
+                    service_name, region_name=region_name or 'us-east-1',
+                    aws_access_key_id='replay', aws_secret_access_key='replay',
+                    config=config.merge(no_retries) if config else no_retries
+                )
+        path = self.fixture_path(account_id, region_name, service_name)
+        events = client.meta.events
+        events.register('provide-client-params.*.*', self.remember_params)
+        if self.mode == 'record':
+            events.register('after-call.*.*', functools.partial(self.record, path))
+        else:
+            events.register('before-call.*.*', functools.partial(self.replay, path))
+        return client
+    
+    def remember_params(self, params, context, **kwargs):
+        context['fixture_params'] = dict(params)
+    
+    def record(self, path, http_response, parsed, model, context, **kwargs):
+        call = {
+            'operation': model.name,
+            'params': self.sanitize(json.loads(json.dumps(context.get('fixture_params', {}), default=self.placeholder))),
+            'status_code': http_response.status_code,
+            'response': self.sanitize(parsed)
+        }
+        with self.lock:
+            self.calls.setdefault(path, {}).setdefault(self.call_key(call['operation'], call['params']), []).append(call)
+    
+    def replay(self, path, model, context, **kwargs):
+        key = self.call_key(model.name, context.get('fixture_params', {}))
+        with self.lock:
+            recorded = self.load(path).get(key)
+            if not recorded:
+                if recorded is None:
+                    message = f"No recorded response for {key}"
+                else:
+                    message = f"All {key} responses were already replayed"
+                error = botocore.exceptions.ClientError(
+                    {'Error': {'Code': 'FixtureNotFound', 'Message': message}}, model.name
+                )
+                # Another attempt would miss the fixtures again
+                error.retryable = False
+                raise error
+            call = recorded.pop(0)
+            status_code, response = call['status_code'], call['response']
+        return botocore.awsrequest.AWSResponse('', status_code, {}, None), json.loads(json.dumps(response))
+    
+    def save(self, config=None):
+        """
+        Write recorded calls, and a sanitized copy of the account list.
+        """
+        for path, calls in self.calls.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as fixture_file:
+                json.dump({'calls': [call for key in sorted(calls) for call in calls[key]]}, fixture_file, indent=1)
+        if config is not None:
+            sanitized = {
+                'SSO': {'start_url': 'https://example.awsapps.com/start', 'region': config['SSO']['region']},
+                'Accounts': self.sanitize(config['Accounts'])
+            }
+            with open(os.path.join(self.directory, FIXTURE_CONFIG_FILE), 'w') as config_file:
+                json.dump(sanitized, config_file, indent=2)
+
+
+class FixtureSession:
+    """
+    boto3 session stand-in whose clients record or replay through AwsFixtures.
+    """
+
+    def __init__(self, fixtures, account_id, boto3_session=None):
+        self.fixtures = fixtures
+        self.account_id = account_id
+        self.boto3_session = boto3_session
+    
+    def client(self, service_name, region_name=None, config=None):
+        return self.fixtures.create_client(self.account_id, service_name, region_name, config, self.boto3_session)
+    
+    def get_credentials(self):
+        return self.boto3_session.get_credentials() if self.boto3_session else None
+
+
+def start_fixtures(args):
+    """
+    Turn on --record or --replay for this run.
+    
+    Replaying defaults to the account list saved with the fixtures.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        AwsFixtures: The active fixtures, or None if neither option is set
+    """
+    global active_fixtures
+    if args.record:
+        active_fixtures = AwsFixtures('record', args.record)
+        # Configured accounts get the first fake IDs, in configuration order
+        if os.path.exists(args.config):
+            for account in load_config(args.config)['Accounts']:
+                active_fixtures.fake_account_id(account['id'])
+    elif args.replay:
+        active_fixtures = AwsFixtures('replay', args.replay)
+        if args.config == CONFIG_FILE:
+            args.config = os.path.join(args.replay, FIXTURE_CONFIG_FILE)
+    else:
+        active_fixtures = None
+    return active_fixtures
+
+
+class RequestHedger:
+    """
+    Hedge slow idempotent AWS calls.
+    
+    Every call runs on a worker thread. If it has not returned within the
+    p95 latency measured for its operation, a duplicate is sent and
+    whichever answer arrives first is used. A semaphore caps the hedges in
+    flight; when the cap is reached the call simply waits for its original
+    request.
+    """
+
+    def __init__(self, max_in_flight=HEDGE_MAX_IN_FLIGHT, min_samples=HEDGE_MIN_SAMPLES, callers=1):
+        self.min_samples = min_samples
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        # Room for every hedge, its original and the calls still being made
+        # by each thread using the hedger
+        self.executor = futures.ThreadPoolExecutor(max_workers=2 * max_in_flight + callers + 1, thread_name_prefix='hedge')
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.stats = {}
+
+    def wrap(self, client):
+        """
+        Wrap a boto3 client so its read calls and paginators are hedged.
+        """
+        return HedgedClient(client, self)
+
+    def threshold(self, operation):
+        """
+        Get the p95 latency of an operation in seconds, or None until enough samples exist.
+        """
+        with self.lock:
+            samples = list(self.latencies.get(operation, ()))
+        if len(samples) < max(self.min_samples, 2):
+            return None
+        return statistics.quantiles(samples, n=20)[-1]
+
+    def record(self, operation, elapsed):
+        """
+        Add a latency sample for an operation.
+        """
+        with self.lock:
+            self.latencies.setdefault(operation, deque(maxlen=HEDGE_SAMPLE_WINDOW)).append(elapsed)
+
+    def count(self, operation, field):
+        with self.lock:
+            stats = self.stats.setdefault(operation, {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'capped': 0})
+            stats[field] += 1
+
+    def call(self, operation, method, kwargs):
+        """
+        Make one call, hedging it if it runs past its operation's p95.
+        
+        Only the original request's latency is sampled, so hedging does not
+        hide the tail it is measuring.
+        """
+        self.count(operation, 'calls')
+        threshold = self.threshold(operation)
+        start = time.monotonic()
+        primary = self.executor.submit(method, **kwargs)
+        primary.add_done_callback(lambda _: self.record(operation, time.monotonic() - start))
+        
+        if threshold is None or futures.wait([primary], timeout=threshold).done:
+            return primary.result()
+        
+        if not self.slots.acquire(blocking=False):
+            self.count(operation, 'capped')
+            return primary.result()
+        self.count(operation, 'hedged')
+        hedge = self.executor.submit(method, **kwargs)
+        hedge.add_done_callback(lambda _: self.slots.release())
+        
+        # Use the first successful answer; an error only counts once both have failed
+        pending = {primary, hedge}
+        while True:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            succeeded = [future for future in (primary, hedge) if future in done and future.exception() is None]
+            if succeeded:
+                if succeeded[0] is hedge:
+                    self.count(operation, 'hedge_wins')
+                return succeeded[0].result()
+            if not pending:
+                return primary.result()
+
+    def summary(self):
+        """
+        Get hedging statistics per operation.
+        
+        Returns:
+            dict: {operation: {'calls', 'hedged', 'hedge_wins', 'capped',
+            'hit_rate', 'p95_ms'}} sorted by operation
+        """
+        summary = {}
+        for operation in sorted(self.stats):
+            with self.lock:
+                stats = dict(self.stats[operation])
+            threshold = self.threshold(operation)
+            stats['hit_rate'] = stats['hedge_wins'] / stats['hedged'] * 100 if stats['hedged'] else None
+            stats['p95_ms'] = round(threshold * 1000) if threshold is not None else None
+            summary[operation] = stats
+        return summary
+
+    def shutdown(self):
+        """
+        Stop accepting calls; hedges still running finish in the background.
+        """
+        self.executor.shutdown(wait=False)
+
+
+@functools.lru_cache(maxsize=None)
+def get_paginator_model(service_name, api_version):
+    """
+    Load a service's pagination configuration from botocore's data files.
+    """
+    return botocore.session.get_session().get_paginator_model(service_name, api_version)
+
+
+class HedgedClient:
+    """
+    boto3 client proxy that routes read calls through a RequestHedger.
+    
+    Everything else, including close() and meta, goes to the wrapped client.
+    """
+
+    def __init__(self, client, hedger):
+        self._client = client
+        self._hedger = hedger
+        self._service = client.meta.service_model.service_name
+
+    def _hedged(self, name, method):
+        operation = f"{self._service}.{name}"
+        
+        def call(**kwargs):
+            return self._hedger.call(operation, method, kwargs)
+        return call
+
+    def get_paginator(self, operation_name):
+        # Build the paginator around the hedged client method so every page is hedged
+        api_name = self._client.meta.method_to_api_mapping[operation_name]
+        service_model = self._client.meta.service_model
+        return botocore.paginate.Paginator(
+            self._hedged(operation_name, getattr(self._client, operation_name)),
+            get_paginator_model(self._service, service_model.api_version).get_paginator(api_name),
+            service_model.operation_model(api_name)
+        )
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith(HEDGE_PREFIXES):
+            return self._hedged(name, attribute)
+        return attribute
+
+
+def generate_hedging_section(summary):
+    """
+    Generate the markdown section with request hedging statistics.
+    
+    Args:
+        summary: Output of RequestHedger.summary
+        
+    Returns:
+        str: Markdown section
+    """
+    content = "## Request Hedging\n\n"
+    content += "| Operation | Calls | p95 | Hedged | Hedge Wins | Hit Rate | Capped |\n"
+    content += "|-----------|-------|-----|--------|------------|----------|--------|\n"
+    for operation, stats in summary.items():
+        p95 = f"{stats['p95_ms']} ms" if stats['p95_ms'] is not None else '-'
+        hit_rate = f"{stats['hit_rate']:.1f}%" if stats['hit_rate'] is not None else '-'
+        content += f"| {operation} | {stats['calls']} | {p95} | {stats['hedged']} | {stats['hedge_wins']} | {hit_rate} | {stats['capped']} |\n"
+    
+    hedged = sum(stats['hedged'] for stats in summary.values())
+    wins = sum(stats['hedge_wins'] for stats in summary.values())
+    if hedged:
+        content += f"\n*{hedged} hedged call(s); the hedge answered first for {wins} ({wins / hedged * 100:.1f}%).*\n"
+    return content + "\n"
+
+
+def make_client_config(connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+    """
+    Build the botocore client configuration with per-call timeouts.
+    
+    Standard retry mode caps each call at three attempts, so a call can take
+    at most about three times its timeouts.
+    """
+    return botocore.config.Config(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={'mode': 'standard'}
+    )
+
+
+def collect_flow_log_volumes(boto3_sso_session, region, vpc_list, window_hours, client_config=None):
+    """
+    Read and attach flow log volumes for one region's VPCs.
+    
+    Args:
+        boto3_sso_session: Session for the account
+        region: Region of the VPCs and their log groups
+        vpc_list: VPC data dictionaries, updated in place
+        window_hours: Length of the window summed
+        client_config: Optional botocore Config for the CloudWatch client
+    """
+    log_group_names = [log_group_name for vpc in vpc_list for log_group_name in vpc['flow_logs_log_groups']]
+    volumes = {}
+    if log_group_names:
+        cloudwatch_client = boto3_sso_session.client('cloudwatch', region_name=region, config=client_config)
+        try:
+            volumes = get_log_group_volumes(cloudwatch_client, log_group_names, window_hours)
+        finally:
+            cloudwatch_client.close()
+    apply_flow_log_volumes(vpc_list, volumes, window_hours)
+
+
+def scan_region(boto3_sso_session, account_name, account_id, region, client_config=None, deadline=None,
+                hedger=None, destination_cache=None, volume_hours=FLOW_LOG_VOLUME_HOURS, shared_vpcs=None):
+    """
+    Collect VPC records for one account and region.
+    
+    Args:
+        boto3_sso_session: Session for the account
+        account_name: Account name from the configuration
+        account_id: Account ID
+        region: Region to scan
+        client_config: Optional botocore Config for the regional clients
+        deadline: Optional time.time() value after which collection stops
+        hedger: Optional RequestHedger for the regional clients' read calls
+        destination_cache: Optional flow log destination cache shared by
+            every region in the run (see check_flow_log_destinations)
+        volume_hours: Window for flow log volumes; 0 skips them
+        shared_vpcs: Optional list that references to VPCs shared into the
+            account by another owner are appended to; their details are
+            collected only in the owner account
+        
+    Returns:
+        list: VPC data dictionaries tagged with the account
+        
+    Raises:
+        ScanDeadlineExceeded: With the tagged VPCs collected before the deadline
+    """
+    # Create regional clients
+    client = boto3_sso_session.client('ec2', region_name=region, config=client_config)
+    logs_client = boto3_sso_session.client('logs', region_name=region, config=client_config)
+    if hedger:
+        client = hedger.wrap(client)
+        logs_client = hedger.wrap(logs_client)
+    
+    try:
+        exceeded = None
+        try:
+            vpc_list = get_vpcs(client, logs_client, deadline=deadline, account_id=account_id, shared_vpcs=shared_vpcs)
+        except ScanDeadlineExceeded as error:
+            exceeded = error
+            vpc_list = error.vpc_list
+        if not exceeded:
+            check_flow_log_destinations(boto3_sso_session, account_id, vpc_list, destination_cache, client_config)
+            if volume_hours:
+                collect_flow_log_volumes(boto3_sso_session, region, vpc_list, volume_hours, client_config)
+        # Add account info to each VPC
+        for vpc in vpc_list:
+            vpc['account_name'] = account_name
+            vpc['account_id'] = account_id
+        if exceeded:
+            raise exceeded
+        return vpc_list
+    finally:
+        client.close()
+        logs_client.close()
+
+
+def resolve_shared_vpcs(vpc_data_list, account_regions):
+    """
+    Mark which shared VPC references point at a collected owner record.
+    
+    Args:
+        vpc_data_list: VPC data dictionaries collected by the scan
+        account_regions: Account/region entries whose shared_vpcs references
+            are updated in place with 'owner_scanned'
+    """
+    collected = {get_record_key(vpc) for vpc in vpc_data_list}
+    for ar in account_regions:
+        for reference in ar.get('shared_vpcs', []):
+            reference['owner_scanned'] = reference['key'] in collected
+
+
+def load_unit_history(db_path=RESULT_DB, scan_count=SCHEDULE_HISTORY_SCANS):
+    """
+    Read how long each account/region took to scan from recent stored scans.
+    
+    Only full scans are read, only regions that completed count, and the
+    most recent duration wins. Scans stored before scheduling existed have
+    no durations and add nothing.
+    
+    Args:
+        db_path: Path to the SQLite result store
+        scan_count: Number of most recent scans to read
+    
+    Returns:
+        dict: (account_id, region) -> {'duration', 'vpc_count', 'interface_count'}
+    """
+    if not os.path.exists(db_path):
+        return {}
+    connection = open_store(db_path)
+    try:
+        rows = connection.execute(
+            "SELECT account_regions FROM scans WHERE kind = 'scan' ORDER BY scan_id DESC LIMIT ?", (scan_count,)
+        ).fetchall()
+    finally:
+        connection.close()
+
+    history = {}
+    for row in rows:
+        for ar in json.loads(row['account_regions']):
+            if ar.get('scan_status') == 'complete' and ar.get('duration') is not None:
+                history.setdefault((ar['account_id'], ar['region']), {
+                    'duration': ar['duration'],
+                    'vpc_count': ar.get('vpc_count'),
+                    'interface_count': ar.get('interface_count')
+                })
+    return history
+
+
+def predict_unit_durations(units, history):
+    """
+    Predict how long each account/region will take to scan.
+    
+    A unit scanned before is expected to take as long as it did last time.
+    A new unit is estimated without any AWS call: the median duration of its
+    account's other regions, else of every known unit, else
+    DEFAULT_UNIT_SECONDS.
+    
+    Args:
+        units: (account_id, region) pairs
+        history: Output of load_unit_history
+    
+    Returns:
+        dict: unit -> (seconds, basis), basis being 'history' or 'estimate'
+    """
+    all_durations = [stats['duration'] for stats in history.values()]
+    account_durations = {}
+    for (account_id, _), stats in history.items():
+        account_durations.setdefault(account_id, []).append(stats['duration'])
+
+    predictions = {}
+    for unit in units:
+        if unit in history:
+            predictions[unit] = (history[unit]['duration'], 'history')
+            continue
+        known = account_durations.get(unit[0]) or all_durations
+        predictions[unit] = (statistics.median(known) if known else DEFAULT_UNIT_SECONDS, 'estimate')
+    return predictions
+
+
+def order_longest_first(account_regions):
+    """
+    Order account/regions for scanning, longest predicted duration first.
+    
+    With several workers the scan ends when its slowest region does, so
+    starting the large regions first keeps one from running alone at the
+    end. Ties keep configuration order.
+    
+    Args:
+        account_regions: Account/region entries with 'predicted_duration';
+            entries without one (never scheduled) go last
+    
+    Returns:
+        list: Indexes into account_regions in scan order
+    """
+    return sorted(range(len(account_regions)), key=lambda index: -account_regions[index].get('predicted_duration', 0))
+
+
+class AccountSessions:
+    """
+    Account sessions shared by the scan's worker threads, signed in ahead of use.
+    
+    A background thread creates each account's session and resolves its
+    credentials in the order the scan first needs the accounts, while
+    earlier accounts are being collected. Like a bounded queue between the
+    two stages, it signs in at most `ahead` accounts that no worker has
+    started on yet, so credentials are never fetched long before they are
+    used. boto3 sessions are not thread-safe, so clients are created one at
+    a time per session; the clients themselves can be used concurrently.
+    
+    Args:
+        aws_sso: 'SSO' section of the configuration
+        accounts: Account entries in the order the scan first needs them
+        ahead: Most accounts signed in but not yet in use
+    """
+
+    def __init__(self, aws_sso, accounts, ahead=AUTH_AHEAD):
+        self.aws_sso = aws_sso
+        self.accounts = accounts
+        self.slots = threading.Semaphore(max(1, ahead))
+        self.lock = threading.Lock()
+        self.sessions = {account['id']: futures.Future() for account in accounts}
+        self.used = set()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.sign_in, name='sign-in', daemon=True)
+        self.thread.start()
+
+    def sign_in(self):
+        for account in self.accounts:
+            self.slots.acquire()
+            if self.stopped or not self.sessions[account['id']].set_running_or_notify_cancel():
+                return
+            try:
+                session = get_account_session(self.aws_sso, account)
+                # Fetch the role credentials now rather than on the first client
+                session.get_credentials()
+                self.sessions[account['id']].set_result(SerializedSession(session))
+            except Exception as error:
+                self.sessions[account['id']].set_exception(error)
+
+    def get(self, account, timeout=None):
+        """
+        Wait for an account's session; its first use frees a sign-in slot.
+        
+        Raises futures.TimeoutError if the session is not ready within
+        timeout seconds.
+        """
+        try:
+            return self.sessions[account['id']].result(timeout)
+        finally:
+            with self.lock:
+                first_use = account['id'] not in self.used
+                self.used.add(account['id'])
+            if first_use:
+                self.slots.release()
+
+    def close(self):
+        """
+        Stop signing in to accounts the scan no longer needs.
+        
+        Workers still waiting for an account that will not be signed in to
+        get a CancelledError rather than waiting forever.
+        """
+        self.stopped = True
+        for session in self.sessions.values():
+            session.cancel()
+        self.slots.release()
+
+
+class SerializedSession:
+    """
+    Session wrapper that creates one client at a time.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.lock = threading.Lock()
+
+    def client(self, *args, **kwargs):
+        with self.lock:
+            return self.session.client(*args, **kwargs)
+
+
+def generate_schedule_section(account_regions, scan_order, elapsed, workers):
+    """
+    Generate the markdown section comparing predicted and actual region scan times.
+    
+    Args:
+        account_regions: Account/region entries with predicted and actual durations
+        scan_order: Indexes into account_regions in the order they were started
+        elapsed: Wall-clock seconds for the whole collection
+        workers: Number of worker threads
+    
+    Returns:
+        str: Markdown section
+    """
+    content = "## Scan Schedule\n\n"
+    content += "| Account | Region | VPCs | ENIs | Predicted | Actual | Basis |\n"
+    content += "|---------|--------|------|------|-----------|--------|-------|\n"
+    for index in scan_order:
+        ar = account_regions[index]
+        if ar.get('duration') is None:
+            continue
+        content += (
+            f"| {ar['account_name']} ({ar['account_id']}) | {ar['region']} | {ar['vpc_count']} | {ar['interface_count']} "
+            f"| {ar['predicted_duration']:.1f}s | {ar['duration']:.1f}s | {ar['prediction_basis']} |\n"
+        )
+    return content + f"\n*{summarize_schedule(account_regions, elapsed, workers)}*\n\n"
+
+
+def summarize_schedule(account_regions, elapsed, workers):
+    """
+    Describe the scan's wall-clock time and how well durations were predicted.
+    
+    Returns:
+        str: One-line summary
+    """
+    total = sum(ar.get('duration') or 0 for ar in account_regions)
+    summary = f"Collected in {elapsed:.1f}s on {workers} worker(s); region scans took {total:.1f}s in total."
+    errors = [abs(ar['duration'] - ar['predicted_duration']) for ar in account_regions
+              if ar.get('duration') is not None and ar.get('prediction_basis') == 'history']
+    if errors:
+        summary += f" Predictions from history were off by {sum(errors) / len(errors):.1f}s on average."
+    credential_wait = sum(ar.get('credential_wait') or 0 for ar in account_regions)
+    if credential_wait >= 0.1:
+        summary += f" Workers waited {credential_wait:.1f}s for SSO sign-in."
+    return summary
+
+
+def get_region_sizes(snapshot):
+    """
+    Size each completed account/region of a snapshot by the items a scan lists.
+    
+    Args:
+        snapshot: Snapshot dictionary (see build_snapshot)
+    
+    Returns:
+        dict: (account_id, region) -> sizes keyed like PLAN_DEFAULT_REGION,
+        plus 'duration' when the snapshot recorded one
+    """
+    def count(value):
+        return value if isinstance(value, int) else 0
+
+    sizes = {}
+    log_groups = {}
+    for ar in snapshot.get('account_regions', []):
+        # Incomplete regions would understate their size
+        if ar.get('scan_status', 'complete') != 'complete':
+            continue
+        unit = (ar['account_id'], ar['region'])
+        sizes[unit] = dict.fromkeys(PLAN_DEFAULT_REGION, 0)
+        sizes[unit]['shared_vpcs'] = len(ar.get('shared_vpcs', []))
+        if ar.get('duration') is not None:
+            sizes[unit]['duration'] = ar['duration']
+        log_groups[unit] = set()
+
+    for entry in snapshot.get('vpcs', {}).values():
+        record = entry['record']
+        size = sizes.get((record.get('account_id'), record.get('region')))
+        if size is None:
+            continue
+        size['vpcs'] += 1
+        size['subnets'] += count(record.get('subnet_count'))
+        size['interfaces'] += count(record.get('interface_count'))
+        size['security_groups'] += count(record.get('security_group_count'))
+        size['network_acls'] += 1 + count(record.get('custom_nacl_count'))
+        size['endpoints'] += count(record.get('endpoint_count'))
+        # VPC, subnet and ENI flow logs; records from before flow_log_ids
+        # only show one per destination
+        size['flow_logs'] += len(record.get('flow_log_ids', record.get('flow_logs_destinations') or []))
+        log_groups[(record['account_id'], record['region'])].update(record.get('flow_logs_log_groups') or [])
+
+    for unit, names in log_groups.items():
+        sizes[unit]['log_groups'] = len(names)
+    return sizes
+
+
+def estimate_region_calls(size, volume_hours=FLOW_LOG_VOLUME_HOURS):
+    """
+    Estimate the AWS calls a scan makes in one account/region, by operation.
+    
+    Region-wide listings take one call per page; internet and NAT gateways
+    are read per VPC and log groups are described once each. Flow logs are
+    paged by the flow logs themselves, which subnet and ENI flow logs can
+    make far more numerous than the VPCs.
+    
+    Args:
+        size: Region sizes keyed like PLAN_DEFAULT_REGION
+        volume_hours: Window for flow log volumes; 0 skips GetMetricData
+    
+    Returns:
+        dict: 'service:Operation' -> estimated calls
+    """
+    def pages(items):
+        return max(1, -(-items // PLAN_PAGE_SIZE))
+
+    log_groups = size['log_groups']
+    metric_queries = log_groups * len(FLOW_LOG_VOLUME_METRICS)
+    return {
+        'ec2:DescribeSecurityGroups': pages(size['security_groups']),
+        'ec2:DescribeSecurityGroupRules': pages(size['security_groups'] * PLAN_RULES_PER_GROUP),
+        'ec2:DescribeNetworkInterfaces': pages(size['interfaces']),
+        'ec2:DescribeSubnets': pages(size['subnets']),
+        'ec2:DescribeFlowLogs': pages(size['flow_logs']),
+        'ec2:DescribeNetworkAcls': pages(size['network_acls']),
+        'ec2:DescribeVpcEndpoints': pages(size['endpoints']),
+        'ec2:DescribeVpcs': pages(size['vpcs'] + size['shared_vpcs']),
+        'ec2:DescribeInternetGateways': size['vpcs'],
+        'ec2:DescribeNatGateways': size['vpcs'],
+        'logs:DescribeLogGroups': log_groups,
+        'cloudwatch:GetMetricData': -(-metric_queries // METRIC_DATA_BATCH) if volume_hours else 0
+    }
+
+
+def plan_scan(config, snapshot=None, workers=SCAN_WORKERS, volume_hours=FLOW_LOG_VOLUME_HOURS):
+    """
+    Estimate a scan's API calls and duration without contacting AWS.
+    
+    Regions in the snapshot are sized from its records. Other regions are
+    sized like the median of their account's regions, else of every region,
+    else PLAN_DEFAULT_REGION. A region's time is its snapshot duration if
+    there is one, else its call count at the seconds per call measured
+    across the snapshot (PLAN_CALL_SECONDS without durations), and never
+    less than the EC2 rate limit allows. Regions are then laid out longest
+    first on the workers, as the scan schedules them.
+    
+    Args:
+        config: Configuration with 'Accounts'
+        snapshot: Previous snapshot dictionary, or None
+        workers: Number of account/regions scanned at once
+        volume_hours: Window for flow log volumes; 0 skips them
+    
+    Returns:
+        dict: {'regions', 'operations', 'total_calls', 'seconds_per_call',
+        'sequential_seconds', 'expected_seconds', 'workers'}
+    """
+    known = get_region_sizes(snapshot) if snapshot else {}
+    timed = [(size['duration'], sum(estimate_region_calls(size, volume_hours).values()))
+             for size in known.values() if 'duration' in size]
+    seconds_per_call = PLAN_CALL_SECONDS
+    if timed and sum(calls for _, calls in timed):
+        seconds_per_call = sum(duration for duration, _ in timed) / sum(calls for _, calls in timed)
+
+    regions = []
+    operations = {}
+    for account in config['Accounts']:
+        for region in get_account_regions(account):
+            size = known.get((account['id'], region))
+            basis = 'snapshot'
+            if size is None:
+                basis = 'estimate'
+                similar = [known[unit] for unit in known if unit[0] == account['id']] or list(known.values())
+                size = dict(PLAN_DEFAULT_REGION)
+                if similar:
+                    size = {name: int(round(statistics.median(other[name] for other in similar))) for name in PLAN_DEFAULT_REGION}
+
+            calls = estimate_region_calls(size, volume_hours)
+            total_calls = sum(calls.values())
+            ec2_calls = sum(count for operation, count in calls.items() if operation.startswith('ec2:'))
+            seconds = size.get('duration', total_calls * seconds_per_call)
+            # Describe calls beyond the bucket's burst come at its refill rate
+            seconds = max(seconds, (ec2_calls - EC2_DESCRIBE_BURST) / EC2_DESCRIBE_RATE)
+
+            for operation, count in calls.items():
+                operations[operation] = operations.get(operation, 0) + count
+            regions.append({
+                'account_name': account['name'],
+                'account_id': account['id'],
+                'region': region,
+                'vpcs': size['vpcs'],
+                'calls': calls,
+                'total_calls': total_calls,
+                'seconds': seconds,
+                'basis': basis
+            })
+
+    # Each region goes to whichever worker frees up first, longest first
+    worker_finish_times = [0.0] * max(1, workers)
+    for region in sorted(regions, key=lambda region: -region['seconds']):
+        heapq.heappush(worker_finish_times, heapq.heappop(worker_finish_times) + region['seconds'])
+
+    return {
+        'regions': regions,
+        'operations': operations,
+        'total_calls': sum(operations.values()),
+        'seconds_per_call': seconds_per_call,
+        'sequential_seconds': sum(region['seconds'] for region in regions),
+        'expected_seconds': max(worker_finish_times),
+        'workers': max(1, workers)
+    }
+
+
+def plan_command(args):
+    """
+    Print the estimated API calls and duration of a scan, without scanning.
+    """
+    config = load_config(args.config)
+    latest = find_latest_snapshots(args.snapshot_dir, count=1)
+    snapshot = load_snapshot(latest[0]) if latest else None
+    plan = plan_scan(config, snapshot, args.workers, args.volume_hours)
+
+    print(f"Scan plan for {args.config}, sized from {latest[0] if latest else 'defaults (no previous snapshot)'}\n")
+    print("| Account | Region | VPCs | Calls | Estimated Time | Basis |")
+    print("|---------|--------|------|-------|----------------|-------|")
+    for region in plan['regions']:
+        print(f"| {region['account_name']} ({region['account_id']}) | {region['region']} | {region['vpcs']} "
+              f"| {region['total_calls']} | {region['seconds']:.1f}s | {region['basis']} |")
+
+    print("\n| Operation | Calls |")
+    print("|-----------|-------|")
+    for operation, count in sorted(plan['operations'].items(), key=lambda item: -item[1]):
+        if count:
+            print(f"| {operation} | {count} |")
+
+    print(f"\nAbout {plan['total_calls']} API calls, taking about {plan['expected_seconds']:.0f}s on "
+          f"{plan['workers']} worker(s) ({plan['sequential_seconds']:.0f}s one region at a time, "
+          f"{plan['seconds_per_call']:.2f}s per call).")
+    if args.deadline and plan['expected_seconds'] > args.deadline:
+        print(f"The scan is expected to pass its {args.deadline:.0f}s deadline; raise --workers or --deadline.")
+
+
+def scan(config, workers=SCAN_WORKERS, deadline=None, client_config=None, hedger=None,
+         volume_hours=FLOW_LOG_VOLUME_HOURS, history=None, auth_ahead=AUTH_AHEAD):
+    """
+    Scan the configured accounts and regions, yielding each account/region's
+    VPC records as soon as it completes.
+    
+    Account/regions run on worker threads, longest predicted duration first,
+    so results arrive in completion order rather than configuration order.
+    SSO sign-in runs ahead of collection on its own thread (see
+    AccountSessions). Closing the generator early cancels the
+    account/regions not yet started.
+    
+    Required IAM permissions:
+    - ec2:DescribeVpcs
+    - ec2:DescribeSubnets
+    - ec2:DescribeInternetGateways
+    - ec2:DescribeNatGateways
+    - ec2:DescribeNetworkInterfaces
+    - ec2:DescribeSecurityGroups
+    - ec2:DescribeSecurityGroupRules
+    - ec2:DescribeNetworkAcls
+    - ec2:DescribeVpcEndpoints
+    - ec2:DescribeFlowLogs (for Flow Logs detection)
+    - logs:DescribeLogGroups (for CloudWatch retention periods)
+    - s3:ListAllMyBuckets, s3:ListBucket (for S3 flow log destination checks)
+    - firehose:ListDeliveryStreams (for Firehose flow log destination checks)
+    - cloudwatch:GetMetricData (for flow log volumes)
+    
+    Args:
+        config: Configuration with 'SSO' and 'Accounts' (see load_config)
+        workers: Number of account/regions scanned at once
+        deadline: Optional time.time() value after which collection stops
+        client_config: Optional botocore Config for the regional clients;
+            defaults to make_client_config()
+        hedger: Optional RequestHedger for the regional clients' read calls
+        volume_hours: Window for flow log volumes; 0 skips them
+        history: Previous durations from load_unit_history, used to order
+            the account/regions
+        auth_ahead: Most accounts signed in before any of their regions start
+        
+    Yields:
+        tuple: (account_region, vpc_list), the account/region entry with its
+        scan status, predicted and actual duration and shared VPC references,
+        and the VPC data dictionaries collected there
+    """
+    client_config = client_config or make_client_config()
+    # Flow log destinations checked so far, shared by every account and region
+    destination_cache = DestinationCache()
+    
+    accounts = {account['id']: account for account in config['Accounts']}
+    account_regions = get_config_account_regions(config)
+    
+    # Start the regions expected to take longest first
+    predictions = predict_unit_durations([(ar['account_id'], ar['region']) for ar in account_regions], history or {})
+    for ar in account_regions:
+        ar['scan_status'] = 'complete'
+        ar['predicted_duration'], ar['prediction_basis'] = predictions[(ar['account_id'], ar['region'])]
+    scan_order = order_longest_first(account_regions)
+    
+    # Sign in to accounts in the order their first region will start
+    sign_in_order = []
+    for index in scan_order:
+        account = accounts[account_regions[index]['account_id']]
+        if account not in sign_in_order:
+            sign_in_order.append(account)
+    sessions = AccountSessions(config['SSO'], sign_in_order, auth_ahead)
+    
+    def collect(account, scanned):
+        region = scanned['region']
+        label = f"{account['name']} ({account['id']}) {region}"
+        
+        # Skip the region if there is no time left to use it, including
+        # time spent waiting for the account's sign-in
+        def skip(note):
+            print(f"  Skipping {label}: scan deadline reached")
+            scanned['scan_status'] = 'timed_out'
+            scanned['scan_note'] = note
+            return []
+        
+        if deadline is not None and time.time() >= deadline:
+            return skip('Scan deadline reached before this region was scanned')
+        
+        waited = time.monotonic()
+        try:
+            session = sessions.get(account, None if deadline is None else max(0, deadline - time.time()))
+        except futures.TimeoutError:
+            return skip('Scan deadline reached while signing in to the account')
+        finally:
+            scanned['credential_wait'] = round(time.monotonic() - waited, 2)
+        if deadline is not None and time.time() >= deadline:
+            return skip('Scan deadline reached before this region was scanned')
+        print(f"  Getting VPC information from {label} (predicted {scanned['predicted_duration']:.1f}s)")
+        started = time.monotonic()
+        try:
+            scanned['shared_vpcs'] = []
+            vpc_list = scan_region(session, account['name'], account['id'], region,
+                                   client_config=client_config, deadline=deadline, hedger=hedger,
+                                   destination_cache=destination_cache, volume_hours=volume_hours,
+                                   shared_vpcs=scanned['shared_vpcs'])
+        except ScanDeadlineExceeded as exceeded:
+            print(f"  Stopped {label}: {exceeded}")
+            vpc_list = exceeded.vpc_list
+            scanned['scan_status'] = 'partial' if exceeded.vpc_list else 'timed_out'
+            scanned['scan_note'] = f"{exceeded}; remaining VPCs were not collected"
+        except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as error:
+            # BotoCoreError covers connect and read timeouts
+            print(f"  Error accessing {label}: {str(error)}")
+            vpc_list = []
+            scanned['scan_status'] = 'error'
+            scanned['scan_note'] = str(error).replace('|', '/')
+        
+        scanned['duration'] = round(time.monotonic() - started, 2)
+        scanned['vpc_count'] = len(vpc_list)
+        scanned['interface_count'] = sum(vpc['interface_count'] for vpc in vpc_list
+                                         if isinstance(vpc.get('interface_count'), int))
+        return vpc_list
+    
+    executor = futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+    submitted = {}
+    try:
+        for index in scan_order:
+            scanned = account_regions[index]
+            submitted[executor.submit(collect, accounts[scanned['account_id']], scanned)] = scanned
+        for future in futures.as_completed(submitted):
+            yield submitted[future], future.result()
+    finally:
+        # Regions not yet started are dropped if the caller stops early or
+        # one fails outright (e.g. SSO login)
+        for future in submitted:
+            future.cancel()
+        sessions.close()
+        executor.shutdown()
+
+
+class MarkdownSink:
+    """
+    Scan sink writing the markdown report once the scan is complete.
+    
+    Args:
+        path: Report file
+        footer: Optional callable taking the account/region list and
+            returning markdown to append, such as run statistics
+    """
+
+    def __init__(self, path='vpc-documentation.md', footer=None):
+        self.path = path
+        self.footer = footer
+
+    def add(self, account_region, vpc_list):
+        pass
+
+    def close(self, vpc_data_list, account_regions):
+        markdown_content = generate_markdown(vpc_data_list, account_regions)
+        if self.footer:
+            markdown_content += self.footer(account_regions)
+        with open(self.path, 'w') as f:
+            f.write(markdown_content)
+
+
+class ShardedMarkdownSink:
+    """
+    Scan sink writing the report as one markdown file per account plus an
+    index (see write_sharded_report); the file counts are kept in self.counts.
+    
+    Args:
+        directory: Report directory
+        footer: Optional callable taking the account/region list and
+            returning markdown to append to the index
+        workers: Most processes rendering account files at once
+    """
+
+    def __init__(self, directory, footer=None, workers=REPORT_WORKERS):
+        self.directory = directory
+        self.footer = footer
+        self.workers = workers
+        self.counts = None
+
+    def add(self, account_region, vpc_list):
+        pass
+
+    def close(self, vpc_data_list, account_regions):
+        footer = self.footer(account_regions) if self.footer else ''
+        self.counts = write_sharded_report(vpc_data_list, account_regions, self.directory, footer, self.workers)
+
+
+class HtmlSink:
+    """
+    Scan sink writing the HTML report (see stream_html_report) once the scan
+    is complete.
+    
+    Args:
+        path: Report file
+        footer: Optional callable taking the account/region list and
+            returning markdown to append to the summary
+    """
+
+    def __init__(self, path='vpc-documentation.html', footer=None):
+        self.path = path
+        self.footer = footer
+
+    def add(self, account_region, vpc_list):
+        pass
+
+    def close(self, vpc_data_list, account_regions):
+        footer = self.footer(account_regions) if self.footer else ''
+        write_html_report(self.path, vpc_data_list, account_regions, footer)
+
+
+class JsonSink:
+    """
+    Scan sink streaming VPC records to a JSON file as account/regions complete.
+    
+    The file holds {"vpcs": [...], "account_regions": [...]}. Records are
+    written in completion order as they arrive; the account/region list is
+    written last, in configuration order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.path, 'w')
+            self.file.write('{"vpcs": [')
+
+    def add(self, account_region, vpc_list):
+        self.open()
+        for vpc in vpc_list:
+            self.file.write(('' if self.count == 0 else ',') + '\n' + json.dumps(vpc, default=str))
+            self.count += 1
+
+    def close(self, vpc_data_list, account_regions):
+        self.open()
+        try:
+            self.file.write('\n], "account_regions": ')
+            json.dump(account_regions, self.file, default=str)
+            self.file.write('}\n')
+        finally:
+            self.file.close()
+
+
+class CallbackSink:
+    """
+    Scan sink calling a function with each account/region as it completes.
+    
+    Args:
+        callback: Callable taking (account_region, vpc_list)
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def add(self, account_region, vpc_list):
+        self.callback(account_region, vpc_list)
+
+    def close(self, vpc_data_list, account_regions):
+        pass
+
+
+class SnapshotSink:
+    """
+    Scan sink saving a drift snapshot; the file path is kept in self.path.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.path = None
+
+    def add(self, account_region, vpc_list):
+        pass
+
+    def close(self, vpc_data_list, account_regions):
+        self.path = save_snapshot(vpc_data_list, account_regions, self.snapshot_dir)
+
+
+class StoreSink:
+    """
+    Scan sink saving the scan to the result store; its ID is kept in self.scan_id.
+    """
+
+    def __init__(self, db_path=RESULT_DB):
+        self.db_path = db_path
+        self.scan_id = None
+
+    def add(self, account_region, vpc_list):
+        pass
+
+    def close(self, vpc_data_list, account_regions):
+        self.scan_id = save_scan(vpc_data_list, account_regions, self.db_path)
+
+
+def run_scan(config, sinks=(), **options):
+    """
+    Scan the configured accounts and regions and feed the results to sinks.
+    
+    Each sink's add() is called with every account/region as it completes.
+    Once all are done, shared VPC references are resolved and each sink's
+    close() is called with the whole scan in configuration order. Sinks are
+    closed even when the scan raises: account/regions not scanned by then
+    are marked 'error' with the reason, and the exception is re-raised.
+    
+    Args:
+        config: Configuration with 'SSO' and 'Accounts' (see load_config)
+        sinks: Objects with add(account_region, vpc_list) and
+            close(vpc_data_list, account_regions) methods
+        **options: Keyword arguments for scan()
+        
+    Returns:
+        tuple: (vpc_data_list, account_regions) in configuration order
+    """
+    results = []
+    stopped = None
+    try:
+        for account_region, vpc_list in scan(config, **options):
+            results.append((account_region, vpc_list))
+            for sink in sinks:
+                sink.add(account_region, vpc_list)
+    except BaseException as error:
+        stopped = error
+        raise
+    finally:
+        # Report in configuration order whatever order the regions ran in
+        configured = get_config_account_regions(config)
+        if stopped is not None:
+            finished = {(ar['account_id'], ar['region']) for ar, _ in results}
+            note = f"Scan stopped before this region was scanned: {stopped or type(stopped).__name__}".replace('|', '/')
+            results.extend((dict(ar, scan_status='error', scan_note=note), []) for ar in configured
+                           if (ar['account_id'], ar['region']) not in finished)
+        order = {(ar['account_id'], ar['region']): index for index, ar in enumerate(configured)}
+        results.sort(key=lambda result: order[(result[0]['account_id'], result[0]['region'])])
+        account_regions = [account_region for account_region, _ in results]
+        vpc_data_list = [vpc for _, vpc_list in results for vpc in vpc_list]
+        resolve_shared_vpcs(vpc_data_list, account_regions)
+        
+        for sink in sinks:
+            sink.close(vpc_data_list, account_regions)
+    return vpc_data_list, account_regions
+
+
+def scan_command(args):
+    """
+    Scan VPCs across multiple AWS accounts and regions and write the report,
+    snapshot and result store entry (see scan for the IAM permissions).
+    """
+    # Print the ASCII art banner
+    print_banner()
+    
+    # Load the configuration file
+    config = load_config(args.config)
+    
+    deadline = time.time() + args.deadline if args.deadline else None
+    client_config = make_client_config(args.connect_timeout, args.read_timeout)
+    hedger = RequestHedger(args.max_hedges, callers=args.workers) if args.hedge else None
+    history = load_unit_history(args.db)
+    started = time.monotonic()
+    run_stats = []
+    
+    def run_statistics(account_regions):
+        # Hedging and scheduling statistics for the end of the report,
+        # worked out once however many reports include them
+        if run_stats:
+            return run_stats[0]
+        elapsed = time.monotonic() - started
+        content = ''
+        if hedger:
+            hedging_section = generate_hedging_section(hedger.summary())
+            content += hedging_section
+            print(f"\n{hedging_section}")
+        content += generate_schedule_section(account_regions, order_longest_first(account_regions), elapsed, args.workers)
+        print(f"\n{summarize_schedule(account_regions, elapsed, args.workers)}")
+        run_stats.append(content)
+        return content
+    
+    if args.shard_dir:
+        report_sink = ShardedMarkdownSink(args.shard_dir, footer=run_statistics)
+    else:
+        report_sink = MarkdownSink('vpc-documentation.md', footer=run_statistics)
+    snapshot_sink = SnapshotSink(args.snapshot_dir)
+    store_sink = StoreSink(args.db)
+    sinks = [report_sink, snapshot_sink, store_sink]
+    if args.json:
+        sinks.append(JsonSink(args.json))
+    if args.html:
+        sinks.append(HtmlSink(args.html, footer=run_statistics))
+    try:
+        run_scan(config, sinks, workers=args.workers, deadline=deadline, client_config=client_config,
+                 hedger=hedger, volume_hours=args.volume_hours, history=history, auth_ahead=args.auth_ahead)
+    finally:
+        if hedger:
+            hedger.shutdown()
+    
+    if args.shard_dir:
+        print_shard_counts(args.shard_dir, report_sink.counts)
+    else:
+        print(f"\nVPC documentation has been generated in vpc-documentation.md")
+    print(f"Scan snapshot has been saved to {snapshot_sink.path}")
+    print(f"Scan results have been stored in {args.db} (scan {store_sink.scan_id})")
+    if args.json:
+        print(f"VPC records have been written to {args.json}")
+    if args.html:
+        print(f"HTML report has been generated in {args.html}")
+
+if __name__ == "__main__":
+    main()